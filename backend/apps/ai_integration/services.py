@@ -70,21 +70,23 @@ class OpenAIService(AIServiceBase):
     def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate response using OpenAI API."""
         try:
-            from openai import OpenAI
+            from core.http_client import get_client, openai_client
             
             if not self.api_key:
                 raise AIServiceError("OpenAI API key not configured")
             
-            client = OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": kwargs.get('system_prompt', 'You are a helpful medical assistant.')},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=kwargs.get('max_tokens', 4000),
-                temperature=kwargs.get('temperature', 0.7),
-            )
+            # Client is cached per key so its connection pool survives between calls
+            client = openai_client(self.api_key)
+            with get_client('openai').track():
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": kwargs.get('system_prompt', 'You are a helpful medical assistant.')},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=kwargs.get('max_tokens', 4000),
+                    temperature=kwargs.get('temperature', 0.7),
+                )
             
             content = response.choices[0].message.content if response.choices else ""
             usage = getattr(response, 'usage', None)
@@ -125,22 +127,23 @@ class AnthropicService(AIServiceBase):
     def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate response using Anthropic API."""
         try:
-            import anthropic
+            from core.http_client import anthropic_client, get_client
             
             if not self.api_key:
                 raise AIServiceError("Anthropic API key not configured")
             
-            client = anthropic.Anthropic(api_key=self.api_key)
-            
-            response = client.messages.create(
-                model=self.model,
-                max_tokens=kwargs.get('max_tokens', 4000),
-                temperature=kwargs.get('temperature', 0.7),
-                system=kwargs.get('system_prompt', 'You are a helpful medical assistant.'),
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            # Client is cached per key so its connection pool survives between calls
+            client = anthropic_client(self.api_key)
+            with get_client('anthropic').track():
+                response = client.messages.create(
+                    model=self.model,
+                    max_tokens=kwargs.get('max_tokens', 4000),
+                    temperature=kwargs.get('temperature', 0.7),
+                    system=kwargs.get('system_prompt', 'You are a helpful medical assistant.'),
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
             
             return {
                 'content': response.content[0].text,
@@ -66,7 +66,7 @@ def log_appointment_action(
             ip_address = request.META.get('REMOTE_ADDR')
         user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
     
-    AuditLog.objects.create(
+    AuditLog(
         user=user,
         user_role=user_role,
         action=f'appointment.{action}',
@@ -75,7 +75,7 @@ def log_appointment_action(
         ip_address=ip_address,
         user_agent=user_agent,
         metadata=metadata or {}
-    )
+    ).record()
 
 
 class AppointmentViewSet(viewsets.ModelViewSet):
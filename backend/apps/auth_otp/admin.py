@@ -9,7 +9,7 @@ from .models import LoginOTP, LoginAuditLog
 class LoginOTPAdmin(admin.ModelAdmin):
     list_display = ['user', 'channel', 'recipient', 'is_used', 'created_at', 'expires_at']
     list_filter = ['channel', 'is_used', 'created_at']
-    search_fields = ['user__username', 'user__email', 'recipient', 'otp_code']
+    search_fields = ['user__username', 'user__email', 'recipient']
     readonly_fields = ['created_at', 'used_at']
     date_hierarchy = 'created_at'
 
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def invalidate_plaintext_otps(apps, schema_editor):
+    # Outstanding codes were stored in plaintext and can't be hashed after the
+    # column is gone; they expire within 5 minutes anyway, so users request a new one.
+    LoginOTP = apps.get_model('auth_otp', 'LoginOTP')
+    LoginOTP.objects.filter(is_used=False).update(is_used=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_otp', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(invalidate_plaintext_otps, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='loginotp',
+            name='login_otps_otp_cod_cf405f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loginotp',
+            name='login_otps_is_used_846b06_idx',
+        ),
+        migrations.RemoveField(
+            model_name='loginotp',
+            name='otp_code',
+        ),
+        migrations.AddField(
+            model_name='loginotp',
+            name='code_hash',
+            field=models.CharField(default='', help_text='HMAC-SHA256 of the 6-digit code (see hash_otp_code)', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='loginotp',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_used', False)), fields=('recipient', 'code_hash'), name='login_otp_active_code_uniq'),
+        ),
+    ]
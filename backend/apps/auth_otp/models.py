@@ -3,16 +3,31 @@ OTP Authentication Models
 
 Passwordless authentication for patient portal.
 - OTP-based login (email, SMS, WhatsApp)
-- 6-digit codes
+- 6-digit codes, stored only as a keyed hash
 - 5-minute expiry
 - Audit logging
 """
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
 from django.utils import timezone
-from django.core.validators import RegexValidator
 from datetime import timedelta
-import random
-import string
+import hashlib
+import hmac
+import secrets
+
+from core.audit_buffer import enqueue_audit_entry
+
+
+def hash_otp_code(recipient, code):
+    """
+    Keyed hash of an OTP code, bound to the recipient it was sent to.
+
+    HMAC with SECRET_KEY so a leaked table can't be brute-forced offline
+    (a 6-digit space is trivial to enumerate against a plain hash).
+    """
+    message = f"{recipient}:{code}".encode('utf-8')
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), message, hashlib.sha256).hexdigest()
 
 
 class LoginOTP(models.Model):
@@ -25,6 +40,10 @@ class LoginOTP(models.Model):
     - 5-minute expiry
     - Single use only
     - One active OTP per user
+    
+    Only the HMAC of the code is stored. Verification is an indexed lookup on
+    (recipient, code_hash) among unused OTPs followed by a conditional UPDATE,
+    so a code can be consumed exactly once even under concurrent requests.
     """
     
     CHANNEL_CHOICES = [
@@ -40,10 +59,9 @@ class LoginOTP(models.Model):
         help_text="User this OTP is for"
     )
     
-    otp_code = models.CharField(
-        max_length=6,
-        validators=[RegexValidator(r'^\d{6}$', 'OTP must be 6 digits')],
-        help_text="6-digit OTP code"
+    code_hash = models.CharField(
+        max_length=64,
+        help_text="HMAC-SHA256 of the 6-digit code (see hash_otp_code)"
     )
     
     channel = models.CharField(
@@ -94,10 +112,16 @@ class LoginOTP(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', '-created_at']),
-            models.Index(fields=['otp_code']),
-            models.Index(fields=['is_used']),
             models.Index(fields=['expires_at']),
         ]
+        constraints = [
+            # Verification lookup; also guarantees a code resolves to one active OTP
+            models.UniqueConstraint(
+                fields=['recipient', 'code_hash'],
+                condition=Q(is_used=False),
+                name='login_otp_active_code_uniq',
+            ),
+        ]
         verbose_name = 'Login OTP'
         verbose_name_plural = 'Login OTPs'
     
@@ -113,45 +137,86 @@ class LoginOTP(models.Model):
         return True
     
     def mark_as_used(self):
-        """Mark OTP as used."""
-        self.is_used = True
-        self.used_at = timezone.now()
-        self.save(update_fields=['is_used', 'used_at'])
+        """
+        Consume this OTP. Returns False if it was already used or has expired.
+        
+        A single conditional UPDATE: of two concurrent requests presenting the
+        same code, exactly one sees a row count of 1.
+        """
+        now = timezone.now()
+        consumed = type(self).objects.filter(
+            pk=self.pk,
+            is_used=False,
+            expires_at__gt=now
+        ).update(is_used=True, used_at=now)
+        if consumed:
+            self.is_used = True
+            self.used_at = now
+        return bool(consumed)
     
     @staticmethod
     def generate_otp_code():
         """Generate random 6-digit OTP code."""
-        return ''.join(random.choices(string.digits, k=6))
+        return f"{secrets.randbelow(10 ** 6):06d}"
     
     @classmethod
     def create_otp(cls, user, channel, recipient, ip_address=None, user_agent=''):
         """
         Create OTP for user.
         
-        Invalidates any existing active OTPs for this user.
+        Invalidates any existing unused OTPs for this user and recipient.
+        The plaintext code is only available on the returned instance as
+        `otp.code`; it is never stored.
         """
-        # Invalidate existing active OTPs for this user
+        # Invalidate existing unused OTPs (expired ones too, so the partial
+        # unique index only ever holds codes that can still be verified)
         cls.objects.filter(
-            user=user,
-            is_used=False,
-            expires_at__gt=timezone.now()
+            Q(user=user) | Q(recipient=recipient),
+            is_used=False
         ).update(is_used=True)
         
-        # Generate new OTP
-        otp_code = cls.generate_otp_code()
         expires_at = timezone.now() + timedelta(minutes=5)
+        for _ in range(3):
+            otp_code = cls.generate_otp_code()
+            try:
+                with transaction.atomic():
+                    otp = cls.objects.create(
+                        user=user,
+                        code_hash=hash_otp_code(recipient, otp_code),
+                        channel=channel,
+                        recipient=recipient,
+                        expires_at=expires_at,
+                        ip_address=ip_address,
+                        user_agent=user_agent
+                    )
+                break
+            except IntegrityError:
+                # A concurrent request for the same recipient drew the same code
+                continue
+        else:
+            raise IntegrityError("Could not allocate a unique OTP code")
         
-        otp = cls.objects.create(
-            user=user,
-            otp_code=otp_code,
-            channel=channel,
-            recipient=recipient,
-            expires_at=expires_at,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-        
+        otp.code = otp_code
         return otp
+    
+    @classmethod
+    def find_active(cls, recipient, code):
+        """
+        Look up the unused, unexpired OTP for recipient/code (with its user).
+        
+        Returns None if there is none. Served by login_otp_active_code_uniq.
+        """
+        return (
+            cls.objects
+            .select_related('user')
+            .filter(
+                recipient=recipient,
+                code_hash=hash_otp_code(recipient, code),
+                is_used=False,
+                expires_at__gt=timezone.now()
+            )
+            .first()
+        )
 
 
 class LoginAuditLog(models.Model):
@@ -260,8 +325,13 @@ class LoginAuditLog(models.Model):
     @classmethod
     def log_action(cls, action, user=None, identifier='', ip_address=None,
                    user_agent='', device_type='unknown', success=True, **metadata):
-        """Create audit log entry."""
-        return cls.objects.create(
+        """
+        Record an audit log entry.
+        
+        Written through the per-request audit buffer (core.audit_buffer), so a
+        login that logs several events costs one insert after the response.
+        """
+        return enqueue_audit_entry(cls(
             user=user,
             action=action,
             identifier=identifier,
@@ -270,4 +340,4 @@ class LoginAuditLog(models.Model):
             user_agent=user_agent,
             device_type=device_type,
             metadata=metadata
-        )
+        ))
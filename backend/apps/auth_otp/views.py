@@ -15,6 +15,7 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db import transaction
 from django.conf import settings
+from django.core.cache import cache
 import logging
 
 from .models import LoginOTP, LoginAuditLog
@@ -25,7 +26,7 @@ from .serializers import (
     BiometricLoginSerializer,
     PatientPortalUserSerializer,
 )
-from core.rate_limiting import rate_limit
+from core.rate_limiting import increment_counter, rate_limit
 import hmac
 from .utils import (
     send_email_otp,
@@ -40,8 +41,10 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-# Rate limiting helper
-_otp_request_counts = {}
+# Rate limits, counted in the shared cache so every worker sees the same totals
+OTP_REQUEST_LIMIT = (5, 3600)   # 5 OTP requests per hour per identifier
+OTP_VERIFY_LIMIT = (5, 900)     # 5 verification attempts per 15 minutes per recipient
+
 
 def check_rate_limit(identifier: str) -> bool:
     """
@@ -54,38 +57,19 @@ def check_rate_limit(identifier: str) -> bool:
     Returns:
         True if within limit, False if exceeded
     """
-    from datetime import datetime, timedelta
-    
-    now = datetime.now()
-    hour_ago = now - timedelta(hours=1)
-    
-    # Clean up old entries
-    for key in list(_otp_request_counts.keys()):
-        if _otp_request_counts[key]['last_request'] < hour_ago:
-            del _otp_request_counts[key]
-    
-    # Check current identifier
-    if identifier not in _otp_request_counts:
-        _otp_request_counts[identifier] = {
-            'count': 0,
-            'last_request': now
-        }
-    
-    entry = _otp_request_counts[identifier]
-    
-    # Reset if last request was over an hour ago
-    if entry['last_request'] < hour_ago:
-        entry['count'] = 0
-    
-    # Check limit
-    if entry['count'] >= 5:
-        return False
-    
-    # Increment
-    entry['count'] += 1
-    entry['last_request'] = now
+    limit, window = OTP_REQUEST_LIMIT
+    return increment_counter(f'otp:request:{identifier}', window) <= limit
+
+
+def check_verify_attempts(recipient: str) -> bool:
+    """
+    Count a verification attempt for recipient.
     
-    return True
+    Returns:
+        True if within limit, False if the recipient must wait for the window to pass
+    """
+    limit, window = OTP_VERIFY_LIMIT
+    return increment_counter(f'otp:verify:{recipient}', window) <= limit
 
 
 @api_view(['POST'])
@@ -243,11 +227,11 @@ def request_otp(request):
             patient_name = user.patient.get_full_name() if user.patient else ''
             
             if channel == 'email':
-                sent = send_email_otp(email, otp.otp_code, patient_name)
+                sent = send_email_otp(email, otp.code, patient_name)
             elif channel == 'sms':
-                sent = send_sms_otp(phone, otp.otp_code)
+                sent = send_sms_otp(phone, otp.code)
             elif channel == 'whatsapp':
-                sent = send_whatsapp_otp(phone, otp.otp_code, patient_name)
+                sent = send_whatsapp_otp(phone, otp.code, patient_name)
             else:
                 sent = False
             
@@ -353,85 +337,106 @@ def verify_otp(request):
     device_type = serializer.validated_data.get('device_type', 'web')
     
     identifier = email if email else phone
+    # OTPs are bound to the recipient they were sent to (see request_otp)
+    recipient = email if email else normalize_nigerian_phone(phone)
     
-    # Find user
-    try:
-        if email:
-            user = User.objects.get(email=email, role='PATIENT')
-        else:
-            normalized_phone = normalize_nigerian_phone(phone)
-            user = User.objects.get(phone=normalized_phone, role='PATIENT')
-    except User.DoesNotExist:
+    # Brute-force protection: a 6-digit code allows only a few guesses
+    if not recipient or not check_verify_attempts(recipient):
         LoginAuditLog.log_action(
             action='OTP_FAILED',
             identifier=identifier,
             ip_address=get_client_ip(request),
             success=False,
-            error='User not found'
+            error='Too many attempts' if recipient else 'Invalid phone number'
         )
         
+        if not recipient:
+            return Response(
+                {
+                    'success': False,
+                    'error': 'Invalid credentials',
+                    'detail': 'No account found.'
+                },
+                status=status.HTTP_401_UNAUTHORIZED
+            )
         return Response(
             {
                 'success': False,
-                'error': 'Invalid credentials',
-                'detail': 'No account found.'
+                'error': 'Too many attempts',
+                'detail': 'Too many incorrect codes. Please request a new OTP later.'
             },
-            status=status.HTTP_401_UNAUTHORIZED
+            status=status.HTTP_429_TOO_MANY_REQUESTS
         )
     
-    # Check account status
-    if not user.is_active:
+    # Find valid OTP (one indexed lookup on recipient + code hash, user joined)
+    otp = LoginOTP.find_active(recipient, otp_code)
+    if otp is None or otp.user.role != 'PATIENT':
+        # Invalid or expired OTP
         LoginAuditLog.log_action(
-            action='LOGIN_FAILED',
-            user=user,
+            action='OTP_FAILED',
+            user=otp.user if otp else None,
             identifier=identifier,
             ip_address=get_client_ip(request),
             success=False,
-            error='Account disabled'
+            error='Invalid OTP'
         )
         
         return Response(
             {
                 'success': False,
-                'error': 'Account disabled',
-                'detail': 'Your account has been disabled.'
+                'error': 'Invalid OTP',
+                'detail': 'OTP is invalid or expired. Please request a new one.'
             },
-            status=status.HTTP_403_FORBIDDEN
+            status=status.HTTP_401_UNAUTHORIZED
         )
     
-    # Find valid OTP
-    try:
-        otp = LoginOTP.objects.filter(
-            user=user,
-            otp_code=otp_code,
-            is_used=False,
-            expires_at__gt=timezone.now()
-        ).latest('created_at')
-    except LoginOTP.DoesNotExist:
-        # Invalid or expired OTP
+    user = otp.user
+    
+    # Check account status
+    if not user.is_active:
         LoginAuditLog.log_action(
-            action='OTP_FAILED',
+            action='LOGIN_FAILED',
             user=user,
             identifier=identifier,
             ip_address=get_client_ip(request),
             success=False,
-            error='Invalid OTP'
+            error='Account disabled'
         )
         
         return Response(
             {
                 'success': False,
-                'error': 'Invalid OTP',
-                'detail': 'OTP is invalid or expired. Please request a new one.'
+                'error': 'Account disabled',
+                'detail': 'Your account has been disabled.'
             },
-            status=status.HTTP_401_UNAUTHORIZED
+            status=status.HTTP_403_FORBIDDEN
         )
     
-    # Verify OTP and issue tokens
+    # Consume the OTP and issue tokens in one transaction, so a failure
+    # while issuing tokens rolls the consumption back instead of burning the code
     try:
         with transaction.atomic():
-            # Mark OTP as used
-            otp.mark_as_used()
+            # A single conditional UPDATE, so a replayed or concurrently
+            # submitted code can only log in once
+            if not otp.mark_as_used():
+                LoginAuditLog.log_action(
+                    action='OTP_FAILED',
+                    user=user,
+                    identifier=identifier,
+                    ip_address=get_client_ip(request),
+                    success=False,
+                    error='OTP already used'
+                )
+                
+                return Response(
+                    {
+                        'success': False,
+                        'error': 'Invalid OTP',
+                        'detail': 'OTP is invalid or expired. Please request a new one.'
+                    },
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
+            cache.delete(f'otp:verify:{recipient}')
             
             # Update user device info
             user_agent = request.META.get('HTTP_USER_AGENT', '')
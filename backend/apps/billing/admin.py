@@ -2,7 +2,7 @@
 Admin configuration for billing app.
 """
 from django.contrib import admin
-from .models import Payment, VisitCharge, PaymentIntent
+from .models import Payment, VisitCharge, PaymentIntent, PaystackWebhookEvent
 from .insurance_models import HMOProvider, VisitInsurance
 from .bill_models import Bill, BillItem, BillPayment, InsuranceProvider, InsurancePolicy
 from .price_lists import (
@@ -148,6 +148,35 @@ class PaymentIntentAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(PaystackWebhookEvent)
+class PaystackWebhookEventAdmin(admin.ModelAdmin):
+    """
+    Admin interface for stored Paystack webhook events.
+    
+    Events are processed by the process_paystack_events command.
+    """
+    list_display = ['id', 'event', 'reference', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['status', 'event', 'received_at']
+    search_fields = ['reference', 'event_key']
+    readonly_fields = [
+        'event_key',
+        'event',
+        'reference',
+        'payload',
+        'status',
+        'attempts',
+        'last_error',
+        'received_at',
+        'claimed_at',
+        'processed_at',
+    ]
+    date_hierarchy = 'received_at'
+    
+    def has_add_permission(self, request):
+        """Events are recorded by the webhook endpoint only."""
+        return False
+
+
 # Bill Models Admin
 @admin.register(Bill)
 class BillAdmin(admin.ModelAdmin):
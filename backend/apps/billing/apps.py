@@ -9,4 +9,5 @@ class BillingConfig(AppConfig):
         """Import signals when app is ready."""
         import apps.billing.signals  # noqa
         import apps.billing.billing_line_item_signals  # noqa
+        import apps.billing.reconciliation_signals  # noqa
 
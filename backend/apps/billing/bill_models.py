@@ -7,14 +7,57 @@ Per EMR Rules:
 - Payment belongs to Bill
 - Bill auto-calculates totals
 - Insurance bills have special rules
+
+Totals are maintained incrementally: adding an item or a payment applies
+its amount to the stored totals with a single UPDATE (F-expressions) in
+the same transaction, instead of re-summing every item and payment.
+BillTotalsService.find_drift() re-derives them to catch any drift.
 """
-from django.db import models
+import logging
+
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
+from django.db.models import Case, F, Sum, Value, When
 from django.db.models import Q
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
 from django.utils import timezone
 from decimal import Decimal
 
+from core.audit import AuditLog
+from core.audit_buffer import write_entries
+
+logger = logging.getLogger(__name__)
+
+# BillItem.department -> VisitCharge.category for the legacy charge mirror
+VISIT_CHARGE_CATEGORIES = {
+    'LAB': 'LAB',
+    'PHARMACY': 'DRUG',
+    'RADIOLOGY': 'RADIOLOGY',
+    'PROCEDURE': 'PROCEDURE',
+    'CONSULTATION': 'CONSULTATION',
+}
+
+
+def bill_status_expression(total, paid):
+    """
+    SQL expression for Bill.status given total and paid expressions.
+
+    Mirrors the rules in Bill.recalculate_totals(), so the status can be
+    set in the same UPDATE as the totals.
+    """
+    def by_balance(settled, partial, unpaid):
+        return Case(
+            When(LessThanOrEqual(total - paid, Decimal('0.00')), then=Value(settled)),
+            When(GreaterThan(paid, Decimal('0.00')), then=Value(partial)),
+            default=Value(unpaid),
+        )
+
+    return Case(
+        When(is_insurance_backed=True, then=by_balance('SETTLED', 'INSURANCE_CLAIMED', 'INSURANCE_PENDING')),
+        default=by_balance('PAID', 'PARTIALLY_PAID', 'UNPAID'),
+        output_field=models.CharField(),
+    )
+
 
 class Bill(models.Model):
     """
@@ -172,78 +215,111 @@ class Bill(models.Model):
         Returns:
             BillItem: Created bill item
         """
-        if amount <= 0:
-            raise ValidationError("Bill item amount must be greater than zero.")
+        return self.add_items(
+            [{
+                'department': department,
+                'service_name': service_name,
+                'amount': amount,
+                'item_status': item_status,
+            }],
+            created_by=created_by,
+        )[0]
+    
+    def add_items(self, items, created_by=None):
+        """
+        Add several bill items in one go (e.g. a multi-service order).
+        
+        Items are inserted with one bulk insert, the totals are moved by
+        their sum in one UPDATE, a BILL_ITEM_CREATED audit entry per item is
+        written with one more (bulk_create sends no post_save) and the
+        legacy VisitCharges are mirrored in one pass, all in one transaction.
+        
+        Args:
+            items: Iterable of dicts with department, service_name, amount
+                and optionally item_status (see add_item)
+            created_by: User who created the items (for audit)
         
+        Returns:
+            list[BillItem]: Created bill items, in the order given
+        """
         if self.visit.status == 'CLOSED':
             raise ValidationError("Cannot add items to a bill for a CLOSED visit.")
         
-        # Determine item status
-        if item_status is None:
-            # Auto-set status based on bill type
-            if self.is_insurance_backed:
-                item_status = 'INSURANCE'
-            else:
-                item_status = 'UNPAID'
+        # Auto-set status based on bill type
+        default_status = 'INSURANCE' if self.is_insurance_backed else 'UNPAID'
+        bill_items = []
+        for item in items:
+            if item['amount'] <= 0:
+                raise ValidationError("Bill item amount must be greater than zero.")
+            bill_item = BillItem(
+                bill=self,
+                department=item['department'],
+                service_name=item['service_name'],
+                amount=item['amount'],
+                status=item.get('item_status') or default_status,
+                created_by=created_by
+            )
+            # Choices and lengths; bill and visit were checked above
+            bill_item.clean_fields(exclude=['bill', 'created_by'])
+            bill_items.append(bill_item)
         
-        bill_item = BillItem.objects.create(
-            bill=self,
-            department=department,
-            service_name=service_name,
-            amount=amount,
-            status=item_status,
-            created_by=created_by
-        )
+        if not bill_items:
+            return []
+        
+        with transaction.atomic():
+            BillItem.objects.bulk_create(bill_items)
+            self.apply_total_deltas(total_delta=sum(item.amount for item in bill_items))
+            write_entries(AuditLog, [bill_item_audit_entry(item) for item in bill_items])
+            self._mirror_visit_charges(bill_items)
+        
+        return bill_items
+    
+    def _mirror_visit_charges(self, bill_items):
+        """
+        Create the VisitCharges matching bill_items, for backward compatibility
+        with the legacy charges endpoint. Charges identical to an existing one
+        (category, description, amount) are skipped.
+        """
+        # Import here to avoid circular import (models.py imports bill_models.py)
+        from apps.billing.models import VisitCharge
+        from .billing_service import BillingService
         
-        # Create corresponding VisitCharge for backward compatibility with legacy system
-        # This ensures charges show up in the charges endpoint
-        # Use lazy import to avoid circular import issues
         try:
-            # Import here to avoid circular import (models.py imports bill_models.py)
-            from apps.billing.models import VisitCharge
-            
-            # Map department to VisitCharge category
-            category_mapping = {
-                'LAB': 'LAB',
-                'PHARMACY': 'DRUG',
-                'RADIOLOGY': 'RADIOLOGY',
-                'PROCEDURE': 'PROCEDURE',
-                'CONSULTATION': 'CONSULTATION',
-            }
-            
-            charge_category = category_mapping.get(department, 'MISC')
-            
-            # Create VisitCharge (system-generated for backward compatibility)
-            # Check if a similar charge already exists to avoid duplicates
-            existing_charge = VisitCharge.objects.filter(
-                visit=self.visit,
-                category=charge_category,
-                description=service_name,
-                amount=amount
-            ).first()
-            
-            if not existing_charge:
-                VisitCharge.objects.create(
-                    visit=self.visit,
-                    category=charge_category,
-                    description=service_name,
-                    amount=amount,
-                    created_by_system=True
+            with transaction.atomic():
+                existing = set(
+                    (category, description, Decimal(amount))
+                    for category, description, amount in VisitCharge.objects.filter(
+                        visit_id=self.visit_id,
+                        description__in={item.service_name for item in bill_items},
+                    ).values_list('category', 'description', 'amount')
                 )
+                charges = []
+                for item in bill_items:
+                    key = (VISIT_CHARGE_CATEGORIES.get(item.department, 'MISC'), item.service_name, item.amount)
+                    if key in existing:
+                        continue
+                    existing.add(key)
+                    charges.append(VisitCharge(
+                        visit_id=self.visit_id,
+                        category=key[0],
+                        description=item.service_name,
+                        amount=item.amount,
+                        created_by_system=True
+                    ))
+                if not charges:
+                    return
+                VisitCharge.objects.bulk_create(charges)
+                
+                # VisitCharge.save() would do this once per charge
+                visit = self.visit
+                visit.payment_status = BillingService.compute_billing_summary(visit).payment_status
+                visit.save(update_fields=['payment_status'])
         except Exception as e:
             # Log error but don't fail bill item creation
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(
-                f"Failed to create VisitCharge for BillItem {bill_item.id}: {str(e)}",
+                f"Failed to create VisitCharges for BillItems {[item.id for item in bill_items]}: {str(e)}",
                 exc_info=True
             )
-        
-        # Recalculate totals
-        self.recalculate_totals()
-        self.save(update_fields=['total_amount', 'outstanding_balance', 'updated_at'])
-        
-        return bill_item
     
     def add_payment(self, amount: Decimal, payment_method: str, transaction_reference: str = '', 
                    notes: str = '', processed_by=None):
@@ -277,8 +353,8 @@ class Bill(models.Model):
                 "Only POS, TRANSFER, WALLET, or INSURANCE methods are allowed."
             )
         
-        # Create payment
-        payment = BillPayment.objects.create(
+        # Create payment (BillPayment.save() applies it to the totals)
+        return BillPayment.objects.create(
             bill=self,
             amount=amount,
             payment_method=payment_method,
@@ -286,16 +362,30 @@ class Bill(models.Model):
             notes=notes,
             processed_by=processed_by
         )
+    
+    def apply_total_deltas(self, total_delta=Decimal('0.00'), paid_delta=Decimal('0.00')):
+        """
+        Move the stored totals by the given amounts.
         
-        # Recalculate totals
-        self.recalculate_totals()
-        self.save(update_fields=['amount_paid', 'outstanding_balance', 'status', 'updated_at'])
-        
-        return payment
+        One UPDATE computes total_amount, amount_paid, outstanding_balance
+        and status from the current row, so concurrent additions do not
+        overwrite each other. The in-memory fields are then refreshed.
+        """
+        total = F('total_amount') + total_delta
+        paid = F('amount_paid') + paid_delta
+        Bill.objects.filter(pk=self.pk).update(
+            total_amount=total,
+            amount_paid=paid,
+            outstanding_balance=total - paid,
+            status=bill_status_expression(total, paid),
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=['total_amount', 'amount_paid', 'outstanding_balance', 'status', 'updated_at'])
     
     def recalculate_totals(self):
         """
-        Recalculate bill totals.
+        Recalculate bill totals from scratch (see apply_total_deltas for the
+        incremental path).
         
         Calculates:
         - total_amount: Sum of all bill items
@@ -345,6 +435,38 @@ class Bill(models.Model):
         return self.is_insurance_backed
 
 
+def bill_item_audit_entry(item):
+    """Unsaved BILL_ITEM_CREATED audit entry for a bill item."""
+    return AuditLog.build(
+        user=item.created_by,
+        role=getattr(item.created_by, 'role', None) if item.created_by else None,
+        action="BILL_ITEM_CREATED",
+        visit_id=item.bill.visit_id,
+        resource_type="bill_item",
+        resource_id=item.id,
+        request=None,
+        metadata={
+            'bill_item_id': item.id,
+            'bill_id': item.bill_id,
+            'visit_id': item.bill.visit_id,
+            'department': item.department,
+            'service_name': item.service_name,
+            'amount': str(item.amount),
+            'status': item.status,
+        }
+    )
+
+
+def _amount_delta(instance, update_fields=None):
+    """How much saving instance (a BillItem or BillPayment) changes its bill's sum."""
+    if instance._state.adding:
+        return instance.amount
+    if update_fields is not None and 'amount' not in update_fields:
+        return Decimal('0.00')
+    stored = type(instance).objects.filter(pk=instance.pk).values_list('amount', flat=True).first()
+    return instance.amount - stored if stored is not None else instance.amount
+
+
 class BillItem(models.Model):
     """
     BillItem model - belongs to Bill.
@@ -454,14 +576,13 @@ class BillItem(models.Model):
             raise ValidationError("Cannot modify items for a bill on a CLOSED visit.")
     
     def save(self, *args, **kwargs):
-        """Override save to run validation."""
+        """Override save to run validation and apply the amount to the bill totals."""
         self.full_clean()
-        super().save(*args, **kwargs)
-        
-        # Recalculate bill totals
-        if self.bill:
-            self.bill.recalculate_totals()
-            self.bill.save(update_fields=['total_amount', 'outstanding_balance', 'updated_at'])
+        with transaction.atomic():
+            delta = _amount_delta(self, kwargs.get('update_fields'))
+            super().save(*args, **kwargs)
+            if delta:
+                self.bill.apply_total_deltas(total_delta=delta)
     
     def delete(self, *args, **kwargs):
         """Prevent deletion - bill items are immutable."""
@@ -583,14 +704,13 @@ class BillPayment(models.Model):
             )
     
     def save(self, *args, **kwargs):
-        """Override save to run validation."""
+        """Override save to run validation and apply the amount to the bill totals."""
         self.full_clean()
-        super().save(*args, **kwargs)
-        
-        # Recalculate bill totals
-        if self.bill:
-            self.bill.recalculate_totals()
-            self.bill.save(update_fields=['amount_paid', 'outstanding_balance', 'status', 'updated_at'])
+        with transaction.atomic():
+            delta = _amount_delta(self, kwargs.get('update_fields'))
+            super().save(*args, **kwargs)
+            if delta:
+                self.bill.apply_total_deltas(paid_delta=delta)
     
     def delete(self, *args, **kwargs):
         """Prevent deletion - payments are append-only."""
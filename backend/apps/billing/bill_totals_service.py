@@ -0,0 +1,99 @@
+"""
+Bill totals verification.
+
+Bill totals are maintained incrementally (Bill.apply_total_deltas). This
+service re-derives them from BillItems and BillPayments to detect drift,
+e.g. from rows written with queryset.update() or raw SQL, and repairs it
+on request. docker/scheduler.sh runs: python manage.py verify_bill_totals --fix
+"""
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .bill_models import Bill, BillItem, BillPayment, bill_status_expression
+
+logger = logging.getLogger(__name__)
+
+TOTAL_FIELDS = ['total_amount', 'amount_paid', 'outstanding_balance', 'status']
+
+
+def _sum_for_bill(model):
+    amounts = (
+        model.objects.filter(bill=OuterRef('pk'))
+        .order_by()
+        .values('bill')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    return Coalesce(
+        Subquery(amounts),
+        Value(Decimal('0.00')),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+class BillTotalsService:
+    """Detect and repair drift between stored Bill totals and their items/payments."""
+
+    @staticmethod
+    def bills_with_expected_totals(bill_ids: Optional[Iterable[int]] = None):
+        """Bills annotated with expected_<field> for each of TOTAL_FIELDS."""
+        queryset = Bill.objects.annotate(
+            expected_total_amount=_sum_for_bill(BillItem),
+            expected_amount_paid=_sum_for_bill(BillPayment),
+        ).annotate(
+            expected_outstanding_balance=F('expected_total_amount') - F('expected_amount_paid'),
+            expected_status=bill_status_expression(F('expected_total_amount'), F('expected_amount_paid')),
+        )
+        if bill_ids is not None:
+            queryset = queryset.filter(pk__in=bill_ids)
+        return queryset
+
+    @staticmethod
+    def find_drift(bill_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Bills whose stored totals differ from their items and payments.
+
+        One query over all (or the given) bills. Each entry has bill_id and,
+        per drifted field, the stored and expected values.
+        """
+        # A bill with nothing on it yet keeps the status it was created with
+        empty = Q(expected_total_amount=0, expected_amount_paid=0)
+        drifted = BillTotalsService.bills_with_expected_totals(bill_ids).exclude(
+            Q(status=F('expected_status')) | empty,
+            total_amount=F('expected_total_amount'),
+            amount_paid=F('expected_amount_paid'),
+            outstanding_balance=F('expected_outstanding_balance'),
+        ).order_by('pk')
+
+        results = []
+        for bill in drifted.iterator():
+            fields = {
+                field: {'stored': getattr(bill, field), 'expected': getattr(bill, f'expected_{field}')}
+                for field in TOTAL_FIELDS
+                if getattr(bill, field) != getattr(bill, f'expected_{field}')
+            }
+            if not bill.expected_total_amount and not bill.expected_amount_paid:
+                fields.pop('status', None)
+            results.append({'bill_id': bill.pk, 'fields': fields})
+        return results
+
+    @staticmethod
+    @transaction.atomic
+    def repair(bill_ids: Iterable[int]) -> int:
+        """Reset the totals of the given bills from their items and payments. Returns bills updated."""
+        bills = list(
+            BillTotalsService.bills_with_expected_totals(bill_ids).select_for_update(of=('self',))
+        )
+        for bill in bills:
+            for field in TOTAL_FIELDS:
+                if field == 'status' and not bill.expected_total_amount and not bill.expected_amount_paid:
+                    continue
+                setattr(bill, field, getattr(bill, f'expected_{field}'))
+            logger.warning("Repaired drifted totals of Bill %s", bill.pk)
+        # bulk_update skips auto_now; the repair is not a billing change
+        return Bill.objects.bulk_update(bills, TOTAL_FIELDS)
@@ -71,9 +71,8 @@ class VisitBillingSummaryView(APIView):
             # Create empty bill if it doesn't exist
             bill = Bill.objects.create(visit=visit)
         
-        # Recalculate totals to ensure accuracy (real-time)
-        bill.recalculate_totals()
-        bill.save(update_fields=['total_amount', 'amount_paid', 'outstanding_balance', 'status'])
+        # Totals are kept current as items and payments are added
+        # (see BillTotalsService for drift checks)
         
         # Get patient details
         patient = visit.patient
@@ -77,6 +77,33 @@ class BillingEndpointView(views.APIView):
                 detail="Only Receptionists can process billing operations.",
                 code='role_forbidden'
             )
+    
+    def refresh_bill(self, visit, user):
+        """
+        Recalculate the visit's Bill from its items and payments, creating
+        an empty Bill if there is none yet.
+        
+        Bill totals only cover BillItems and BillPayments (what
+        BillTotalsService verifies); visit charges, payments and wallet
+        debits are reflected in visit.payment_status instead.
+        """
+        try:
+            bill = Bill.objects.get(visit=visit)
+        except Bill.DoesNotExist:
+            try:
+                Bill.objects.create(visit=visit, created_by=user)
+            except Exception as e:
+                # Log error but don't fail the payment creation
+                logger = logging.getLogger(__name__)
+                logger.error(f"Failed to create bill for visit {visit.id}: {str(e)}", exc_info=True)
+            return
+        try:
+            bill.recalculate_totals()
+            bill.save(update_fields=['status', 'total_amount', 'amount_paid', 'outstanding_balance', 'updated_at'])
+        except Exception as e:
+            # Log error but don't fail the payment creation
+            logger = logging.getLogger(__name__)
+            logger.error(f"Failed to update bill for visit {visit.id}: {str(e)}", exc_info=True)
 
 
 class BillingSummaryView(BillingEndpointView):
@@ -367,37 +394,9 @@ class BillingPaymentsView(BillingEndpointView):
             visit.payment_status = summary.payment_status
             visit.save(update_fields=['payment_status'])
             
-            # Also update bill status if bill exists
-            try:
-                bill = Bill.objects.get(visit=visit)
-                bill.status = summary.payment_status
-                # Recalculate bill amounts
-                bill.total_amount = summary.total_charges
-                bill.amount_paid = summary.total_payments + summary.total_wallet_debits
-                bill.outstanding_balance = summary.outstanding_balance
-                bill.save(update_fields=['status', 'total_amount', 'amount_paid', 'outstanding_balance', 'updated_at'])
-                # Refresh visit from database to ensure is_payment_cleared() uses updated bill
-                visit.refresh_from_db()
-            except Bill.DoesNotExist:
-                # No bill exists yet, create one
-                try:
-                    bill = Bill.objects.create(
-                        visit=visit,
-                        status=summary.payment_status,
-                        total_amount=summary.total_charges,
-                        amount_paid=summary.total_payments + summary.total_wallet_debits,
-                        outstanding_balance=summary.outstanding_balance,
-                        created_by=request.user
-                    )
-                    visit.refresh_from_db()
-                except Exception as e:
-                    # Log error but don't fail the payment creation
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Failed to create bill for visit {visit.id}: {str(e)}", exc_info=True)
-            except Exception as e:
-                # Log error but don't fail the payment creation
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to update bill for visit {visit.id}: {str(e)}", exc_info=True)
+            self.refresh_bill(visit, request.user)
+            # Refresh visit from database to ensure is_payment_cleared() uses updated bill
+            visit.refresh_from_db()
         except Exception as e:
             # Log error but don't fail the payment creation - billing summary calculation failed
             logger = logging.getLogger(__name__)
@@ -516,37 +515,9 @@ class BillingWalletDebitView(BillingEndpointView):
         visit.payment_status = updated_summary.payment_status
         visit.save(update_fields=['payment_status'])
         
-        # Also update bill status if bill exists
-        try:
-            bill = Bill.objects.get(visit=visit)
-            bill.status = updated_summary.payment_status
-            # Recalculate bill amounts
-            bill.total_amount = updated_summary.total_charges
-            bill.amount_paid = updated_summary.total_payments + updated_summary.total_wallet_debits
-            bill.outstanding_balance = updated_summary.outstanding_balance
-            bill.save(update_fields=['status', 'total_amount', 'amount_paid', 'outstanding_balance', 'updated_at'])
-            # Refresh visit from database to ensure is_payment_cleared() uses updated bill
-            visit.refresh_from_db()
-        except Bill.DoesNotExist:
-            # No bill exists yet, create one
-            try:
-                bill = Bill.objects.create(
-                    visit=visit,
-                    status=updated_summary.payment_status,
-                    total_amount=updated_summary.total_charges,
-                    amount_paid=updated_summary.total_payments + updated_summary.total_wallet_debits,
-                    outstanding_balance=updated_summary.outstanding_balance,
-                    created_by=request.user
-                )
-                visit.refresh_from_db()
-            except Exception as e:
-                # Log error but don't fail the payment creation
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to create bill for visit {visit.id}: {str(e)}", exc_info=True)
-        except Exception as e:
-            # Log error but don't fail the payment creation
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to update bill for visit {visit.id}: {str(e)}", exc_info=True)
+        self.refresh_bill(visit, request.user)
+        # Refresh visit from database to ensure is_payment_cleared() uses updated bill
+        visit.refresh_from_db()
         
         # Audit log
         user_role = getattr(request.user, 'role', None) or \
@@ -44,6 +44,13 @@ class BillingLineItem(models.Model):
         ('PAYSTACK', 'Paystack'),
     ]
     
+    # Fields a payment changes; save(update_fields=...) limited to these
+    # skips full_clean() (see clean_payment_fields)
+    PAYMENT_FIELDS = [
+        'amount_paid', 'outstanding_amount', 'bill_status', 'payment_method',
+        'paid_at', 'modified_by', 'updated_at',
+    ]
+    
     # Core relationships
     service_catalog = models.ForeignKey(
         'billing.ServiceCatalog',
@@ -196,8 +203,8 @@ class BillingLineItem(models.Model):
     def __str__(self):
         return f"{self.source_service_code} - {self.amount} NGN ({self.bill_status})"
     
-    def clean(self):
-        """Validate billing line item data."""
+    def _amount_errors(self):
+        """Errors in the amount / amount_paid / outstanding_amount invariants (no queries)."""
         errors = {}
         
         # Validate amount
@@ -223,6 +230,52 @@ class BillingLineItem(models.Model):
                 f"Expected: {expected_outstanding}, Got: {self.outstanding_amount}"
             )
         
+        return errors
+    
+    def get_stored_state(self):
+        """
+        Stored bill_status, payment_method and visit status of this row.
+        
+        None for unsaved rows. Read once per save() and shared by validation
+        and the pre_save status trackers.
+        """
+        if self.pk is None:
+            return None
+        state = getattr(self, '_saving_stored_state', None)
+        if state is None:
+            state = BillingLineItem.objects.filter(pk=self.pk).values(
+                'bill_status', 'payment_method', 'visit__status'
+            ).first()
+        return state
+    
+    def clean_payment_fields(self, stored_state=None):
+        """
+        Validate a payment-only change (amount_paid, bill_status, payment_method).
+        
+        Checks the amount invariants and the two rules a payment can break -
+        a PAID item's payment method is immutable, and a CLOSED visit keeps no
+        unpaid items - from the stored state, without full_clean()'s lookups
+        of every foreign key.
+        """
+        errors = self._amount_errors()
+        stored = stored_state if stored_state is not None else self.get_stored_state()
+        if stored:
+            if stored['bill_status'] == 'PAID' and stored['payment_method'] != self.payment_method:
+                errors['payment_method'] = (
+                    "Cannot modify payment_method for a PAID billing line item. "
+                    "Per EMR governance rules, billing is immutable once paid."
+                )
+            if stored['visit__status'] == 'CLOSED' and self.bill_status != 'PAID':
+                errors['visit'] = (
+                    "Cannot create or modify unpaid billing line items for a CLOSED visit."
+                )
+        if errors:
+            raise ValidationError(errors)
+    
+    def clean(self):
+        """Validate billing line item data."""
+        errors = self._amount_errors()
+        
         # Validate consultation relationship
         if self.consultation:
             # Consultation must belong to the same visit
@@ -240,15 +293,11 @@ class BillingLineItem(models.Model):
         # ❌ GOVERNANCE RULE: Billing is immutable once paid
         # Per EMR Context Document v2: "Billing is immutable once paid"
         # Only enforce when the item was ALREADY PAID in DB (not when transitioning PENDING -> PAID)
-        if self.pk:
-            try:
-                old_instance = BillingLineItem.objects.get(pk=self.pk)
-                if old_instance.bill_status != 'PAID':
-                    old_instance = None  # Skip immutability checks
-            except BillingLineItem.DoesNotExist:
-                old_instance = None
+        stored = self.get_stored_state()
+        if stored and stored['bill_status'] == 'PAID':
+            old_instance = BillingLineItem.objects.filter(pk=self.pk).first()
         else:
-            old_instance = None
+            old_instance = None  # Skip immutability checks
         if self.pk and old_instance and old_instance.bill_status == 'PAID':
             # Item was already PAID in DB - enforce immutability
             if old_instance.amount != self.amount:
@@ -312,6 +361,30 @@ class BillingLineItem(models.Model):
             self.source_service_name = self.service_catalog.name
         
         # Update bill_status based on payment
+        self._update_bill_status()
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # Fields derived above follow the amounts they are derived from
+            update_fields = set(update_fields) | {'updated_at'}
+            if update_fields & {'amount', 'amount_paid'}:
+                update_fields |= {'outstanding_amount', 'bill_status', 'paid_at'}
+            kwargs['update_fields'] = sorted(update_fields)
+        
+        self._saving_stored_state = self.get_stored_state()
+        try:
+            # Payment-only saves validate what a payment can change; anything
+            # else runs full validation (includes immutability check for PAID items)
+            if update_fields is not None and update_fields <= set(self.PAYMENT_FIELDS):
+                self.clean_payment_fields()
+            else:
+                self.full_clean()
+            super().save(*args, **kwargs)
+        finally:
+            self._saving_stored_state = None
+    
+    def _update_bill_status(self):
+        """Derive bill_status (and paid_at) from amount_paid."""
         if self.amount_paid >= self.amount:
             self.bill_status = 'PAID'
             if not self.paid_at:
@@ -321,18 +394,10 @@ class BillingLineItem(models.Model):
             self.bill_status = 'PARTIALLY_PAID'
         else:
             self.bill_status = 'PENDING'
-        
-        # Run validation (includes immutability check for PAID items)
-        self.full_clean()
-        super().save(*args, **kwargs)
     
-    def apply_payment(self, payment_amount: Decimal, payment_method: str) -> None:
+    def prepare_payment(self, payment_amount: Decimal, payment_method: str) -> None:
         """
-        Apply payment to this billing line item.
-        
-        Args:
-            payment_amount: Amount to apply
-            payment_method: Payment method (CASH, WALLET, HMO, PAYSTACK)
+        Apply payment to this billing line item in memory, without saving.
         
         Raises:
             ValidationError: If item is already paid or payment exceeds outstanding amount
@@ -352,16 +417,21 @@ class BillingLineItem(models.Model):
         self.amount_paid += payment_amount
         self.outstanding_amount = self.amount - self.amount_paid
         self.payment_method = payment_method
+        self._update_bill_status()
+    
+    def apply_payment(self, payment_amount: Decimal, payment_method: str) -> None:
+        """
+        Apply payment to this billing line item.
         
-        # Update status
-        if self.amount_paid >= self.amount:
-            self.bill_status = 'PAID'
-            from django.utils import timezone
-            self.paid_at = timezone.now()
-        else:
-            self.bill_status = 'PARTIALLY_PAID'
+        Args:
+            payment_amount: Amount to apply
+            payment_method: Payment method (CASH, WALLET, HMO, PAYSTACK)
         
-        self.save()
+        Raises:
+            ValidationError: If item is already paid or payment exceeds outstanding amount
+        """
+        self.prepare_payment(payment_amount, payment_method)
+        self.save(update_fields=self.PAYMENT_FIELDS)
     
     def is_immutable(self) -> bool:
         """Check if this billing line item is immutable (paid)."""
@@ -10,13 +10,16 @@ Per EMR Rules:
 """
 from django.db import transaction
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from decimal import Decimal
 from typing import Optional, Tuple, List
 
 from .billing_line_item_models import BillingLineItem
+from .domain_events import billing_line_items_paid
 from .service_catalog_models import ServiceCatalog
 from apps.visits.models import Visit
 from apps.consultations.models import Consultation
+from apps.visits.visit_summary import invalidate_visit_summary
 
 
 def create_billing_line_item_from_service(
@@ -202,20 +205,17 @@ def allocate_payment_to_line_items(
     if amount <= 0:
         return []
 
-    pending = list(
-        BillingLineItem.objects.filter(visit=visit)
-        .exclude(bill_status="PAID")
-        .select_related("service_catalog")
-        .order_by("created_at")
-    )
-    if not pending:
-        return []
-
-    pending.sort(key=_allocation_order_key)
-    updated: List[BillingLineItem] = []
-    remaining = amount
-
     with transaction.atomic():
+        pending = list(
+            _locked_line_items()
+            .filter(visit=visit)
+            .exclude(bill_status="PAID")
+            .order_by("created_at")
+        )
+        pending.sort(key=_allocation_order_key)
+        allocations: List[Tuple[BillingLineItem, Decimal]] = []
+        remaining = amount
+
         for item in pending:
             if remaining <= 0:
                 break
@@ -223,10 +223,79 @@ def allocate_payment_to_line_items(
             if outstanding <= 0:
                 continue
             to_apply = min(remaining, outstanding)
-            item.apply_payment(to_apply, payment_method)
-            updated.append(item)
+            allocations.append((item, to_apply))
             remaining -= to_apply
 
+        return _write_payments(allocations, payment_method)
+
+
+def apply_payments_to_line_items(
+    allocations: List[Tuple[BillingLineItem, Decimal]],
+    payment_method: str,
+    modified_by=None,
+) -> List[BillingLineItem]:
+    """
+    Apply payments to several BillingLineItems as one batch.
+
+    The items are re-read under lock in one query, validated in memory and
+    written with one bulk_update; PAYMENT_CONFIRMED events for the items that
+    became PAID are fired once for the batch (billing_line_items_paid).
+
+    Args:
+        allocations: (BillingLineItem, payment amount) pairs, one per item
+        payment_method: CASH, WALLET, HMO, PAYSTACK
+        modified_by: User recorded as modified_by on every item (optional)
+
+    Returns:
+        The updated BillingLineItem instances, in allocation order
+
+    Raises:
+        ValidationError: If any payment is invalid; no item is changed
+    """
+    if not allocations:
+        return []
+
+    with transaction.atomic():
+        locked = _locked_line_items().in_bulk([item.pk for item, _ in allocations])
+        return _write_payments(
+            [(locked[item.pk], payment_amount) for item, payment_amount in allocations],
+            payment_method,
+            modified_by,
+        )
+
+
+def _locked_line_items():
+    # Only the line item rows are locked; visit status and the timeline
+    # description's service/creator come along in the same query
+    return BillingLineItem.objects.select_for_update(of=("self",)).select_related(
+        "visit", "service_catalog", "created_by"
+    )
+
+
+def _write_payments(allocations, payment_method, modified_by=None) -> List[BillingLineItem]:
+    """Apply payments to line items read by _locked_line_items(); call inside a transaction."""
+    now = timezone.now()
+    updated: List[BillingLineItem] = []
+    for item, payment_amount in allocations:
+        stored = {
+            "bill_status": item.bill_status,
+            "payment_method": item.payment_method,
+            "visit__status": item.visit.status,
+        }
+        item.prepare_payment(payment_amount, payment_method)
+        item.clean_payment_fields(stored_state=stored)
+        if modified_by is not None:
+            item.modified_by = modified_by
+        item.updated_at = now
+        updated.append(item)
+
+    if updated:
+        BillingLineItem.objects.bulk_update(updated, BillingLineItem.PAYMENT_FIELDS)
+        # bulk_update sends no post_save; drop the cached billing summaries itself
+        invalidate_visit_summary({item.visit_id for item in updated}, "billing")
+        paid = [item for item in updated if item.bill_status == "PAID"]
+        if paid:
+            billing_line_items_paid.send(sender=BillingLineItem, items=paid)
     return updated
 
 
@@ -12,8 +12,8 @@ from django.dispatch import receiver
 from django.db import transaction
 
 from .billing_line_item_models import BillingLineItem
-from .domain_events import PaymentConfirmedEvent
-from .payment_event_handlers import handle_payment_confirmed_idempotent
+from .domain_events import PaymentConfirmedEvent, billing_line_items_paid
+from .payment_event_handlers import handle_payment_confirmed_idempotent, handle_payments_confirmed
 
 logger = logging.getLogger(__name__)
 
@@ -22,22 +22,28 @@ logger = logging.getLogger(__name__)
 _previous_bill_status = {}
 
 
+def _payment_confirmed_event(line_item):
+    return PaymentConfirmedEvent(
+        billing_line_item_id=line_item.id,
+        visit_id=line_item.visit_id,
+        service_code=line_item.source_service_code,
+        amount=line_item.amount,
+        payment_method=line_item.payment_method or 'CASH',
+        consultation_id=line_item.consultation_id,
+    )
+
+
 @receiver(pre_save, sender=BillingLineItem)
 def track_billing_line_item_status_change(sender, instance, **kwargs):
     """
     Track bill_status before save to detect transitions.
     
     This allows us to detect when status changes from non-PAID to PAID.
+    The stored state was already read by BillingLineItem.save() for
+    validation, so this costs no extra query.
     """
-    if instance.pk:
-        try:
-            old_instance = BillingLineItem.objects.get(pk=instance.pk)
-            _previous_bill_status[instance.pk] = old_instance.bill_status
-        except BillingLineItem.DoesNotExist:
-            _previous_bill_status[instance.pk] = None
-    else:
-        # New instance
-        _previous_bill_status[instance.pk] = None
+    stored = instance.get_stored_state()
+    _previous_bill_status[instance.pk] = stored['bill_status'] if stored else None
 
 
 @receiver(post_save, sender=BillingLineItem)
@@ -80,14 +86,7 @@ def handle_billing_line_item_payment_confirmed(sender, instance, created, **kwar
     
     # Fire PAYMENT_CONFIRMED event
     try:
-        event = PaymentConfirmedEvent(
-            billing_line_item_id=instance.id,
-            visit_id=instance.visit.id,
-            service_code=instance.source_service_code,
-            amount=instance.amount,
-            payment_method=instance.payment_method or 'CASH',
-            consultation_id=instance.consultation.id if instance.consultation else None,
-        )
+        event = _payment_confirmed_event(instance)
         
         # Handle event (idempotent)
         # Use transaction to ensure atomicity
@@ -105,3 +104,21 @@ def handle_billing_line_item_payment_confirmed(sender, instance, created, **kwar
             exc_info=True
         )
 
+
+@receiver(billing_line_items_paid)
+def handle_billing_line_items_paid(sender, items, **kwargs):
+    """
+    Fire PAYMENT_CONFIRMED events for a batch payment.
+    
+    The batch's line items are saved with bulk_update (no post_save), so
+    their events arrive here together and are handled in one pass.
+    """
+    try:
+        handle_payments_confirmed([_payment_confirmed_event(item) for item in items])
+    except Exception as e:
+        # Log error but don't fail the payment, as for single saves
+        logger.error(
+            f"Error firing PAYMENT_CONFIRMED events for BillingLineItems "
+            f"{[item.id for item in items]}: {str(e)}",
+            exc_info=True
+        )
@@ -11,7 +11,7 @@ from django.dispatch import receiver
 from django.core.exceptions import ValidationError
 import logging
 
-from .bill_models import Bill, BillItem, BillPayment
+from .bill_models import Bill, BillItem, BillPayment, bill_item_audit_entry
 from apps.wallet.models import WalletTransaction
 from core.audit import AuditLog
 
@@ -47,24 +47,7 @@ def log_bill_item_created(sender, instance, created, **kwargs):
     """Log bill item creation."""
     if created:
         try:
-            AuditLog.log(
-                user=instance.created_by,
-                role=getattr(instance.created_by, 'role', None) if instance.created_by else None,
-                action="BILL_ITEM_CREATED",
-                visit_id=instance.bill.visit_id,
-                resource_type="bill_item",
-                resource_id=instance.id,
-                request=None,
-                metadata={
-                    'bill_item_id': instance.id,
-                    'bill_id': instance.bill_id,
-                    'visit_id': instance.bill.visit_id,
-                    'department': instance.department,
-                    'service_name': instance.service_name,
-                    'amount': str(instance.amount),
-                    'status': instance.status,
-                }
-            )
+            bill_item_audit_entry(instance).record()
         except Exception as e:
             logger.error(f"Failed to log bill item creation: {e}")
 
@@ -0,0 +1,130 @@
+"""
+Receipt/invoice number allocation (hi/lo blocks).
+
+Each worker process reserves a block of numbers from DocumentNumberSequence
+with one compare-and-set UPDATE and then hands them out from memory, so
+generating a receipt does not serialize on the sequence row. Blocks are
+recorded in DocumentNumberBlock; audit_document_numbers() explains every
+gap in the issued numbers against that ledger.
+
+Block size comes from EMR_SETTINGS['DOCUMENT_NUMBER_BLOCK_SIZE'] (default
+20). A block larger than 1 means numbers are unique and gap-auditable but,
+across workers, not strictly in time order.
+
+Reserved blocks live only in process memory: when a worker restarts (deploy,
+crash, autoscaling, max-requests recycling) the unused rest of its blocks is
+never issued, so invoice and receipt numbers have gaps. Each gap is recorded
+in DocumentNumberBlock and reported by audit_document_numbers(); set the
+block size to 1 where gapless numbering is required.
+
+Usage:
+    number = document_number_allocator.next_number('RECEIPT')  # REC-2026-0042
+    report = audit_document_numbers('RECEIPT', 2026)
+"""
+import os
+import socket
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+DEFAULT_BLOCK_SIZE = 20
+
+
+def get_block_size():
+    """Numbers reserved per worker at a time."""
+    return max(1, int(getattr(settings, 'EMR_SETTINGS', {}).get('DOCUMENT_NUMBER_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)))
+
+
+class DocumentNumberAllocator:
+    """Per-process pool of reserved document numbers."""
+
+    def __init__(self, block_size=None):
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        # (document_type, year) -> [next_number, last_number]
+        self._blocks = {}
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+    @property
+    def block_size(self):
+        return self._block_size or get_block_size()
+
+    def next_number(self, document_type):
+        """Return the next formatted number for a document type."""
+        from .invoice_receipt_models import DocumentNumberSequence
+
+        year = timezone.localdate().year
+        return DocumentNumberSequence.format_number(document_type, year, self.allocate(document_type, year))
+
+    def allocate(self, document_type, year):
+        """Return the next raw sequence number for (document_type, year)."""
+        from .invoice_receipt_models import DocumentNumberSequence
+
+        key = (document_type, year)
+        if transaction.get_connection().in_atomic_block:
+            # A block reserved here would vanish if the caller rolls back while
+            # the pool still held it; reserve only what this transaction uses.
+            first, _ = DocumentNumberSequence.reserve_block(
+                document_type, year, size=1, reserved_by=self.worker
+            )
+            return first
+
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None or block[0] > block[1]:
+                first, last = DocumentNumberSequence.reserve_block(
+                    document_type, year, size=self.block_size, reserved_by=self.worker
+                )
+                block = self._blocks[key] = [first, last]
+            number = block[0]
+            block[0] += 1
+            return number
+
+    def release(self):
+        """Forget the pooled blocks (their unused numbers become audited gaps)."""
+        with self._lock:
+            self._blocks.clear()
+
+
+document_number_allocator = DocumentNumberAllocator()
+
+
+def audit_document_numbers(document_type, year):
+    """
+    Account for every number reserved for a document type in a year.
+
+    Returns a dict with the issued count, the numbers reserved but never
+    stored as an InvoiceReceipt (grouped by the worker that reserved them),
+    and any stored number that no reserved block covers.
+    """
+    from .invoice_receipt_models import DocumentNumberBlock, DocumentNumberSequence, InvoiceReceipt
+
+    prefix = f"{DocumentNumberSequence._get_prefix(document_type)}-{year}-"
+    issued = set()
+    for document_number in InvoiceReceipt.objects.filter(
+        document_type=document_type, document_number__startswith=prefix
+    ).values_list('document_number', flat=True).iterator():
+        suffix = document_number[len(prefix):]
+        if suffix.isdigit():
+            issued.add(int(suffix))
+
+    unused = {}
+    covered = set()
+    for block in DocumentNumberBlock.objects.filter(document_type=document_type, year=year).iterator():
+        numbers = range(block.first_number, block.last_number + 1)
+        covered.update(numbers)
+        missing = [n for n in numbers if n not in issued]
+        if missing:
+            unused.setdefault(block.reserved_by or 'unknown', []).extend(missing)
+
+    return {
+        'document_type': document_type,
+        'year': year,
+        'issued': len(issued),
+        'reserved': len(covered),
+        'unused_by_worker': unused,
+        'unaccounted': sorted(issued - covered),
+    }
@@ -11,6 +11,15 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 from decimal import Decimal
 
+from django.dispatch import Signal
+
+
+# Sent once per batch payment (apply_payments_to_line_items) with
+# items=[BillingLineItems that became PAID]. The batch is written with
+# bulk_update, which sends no post_save, so PAYMENT_CONFIRMED listeners
+# subscribe here as well.
+billing_line_items_paid = Signal()
+
 
 @dataclass
 class PaymentConfirmedEvent:
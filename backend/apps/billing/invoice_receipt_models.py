@@ -179,7 +179,6 @@ class DocumentNumberSequence(models.Model):
     document_type = models.CharField(
         max_length=20,
         choices=DOCUMENT_TYPE_CHOICES,
-        unique=True,
         help_text="Type of document"
     )
     
@@ -206,6 +205,9 @@ class DocumentNumberSequence(models.Model):
         db_table = 'document_number_sequences'
         unique_together = [['document_type', 'year']]
     
+    # Lost compare-and-set races before reserve_block falls back to a row lock
+    RESERVE_CAS_ATTEMPTS = 5
+    
     def __str__(self):
         return f"{self.document_type} {self.prefix}-{self.current_number:04d} ({self.year})"
     
@@ -214,28 +216,77 @@ class DocumentNumberSequence(models.Model):
         """
         Get next sequential number for a document type.
         
+        Numbers come from blocks reserved per worker process (see
+        apps.billing.document_numbers), so issuing a number normally does
+        not touch this row at all.
+        
         Returns format: PREFIX-YYYY-NNNN (e.g., REC-2026-0001)
         """
-        from datetime import datetime
+        from .document_numbers import document_number_allocator
+        
+        return document_number_allocator.next_number(document_type)
+    
+    @classmethod
+    def reserve_block(cls, document_type: str, year: int, size: int = 1, reserved_by: str = ''):
+        """
+        Reserve `size` consecutive numbers and record them in the block ledger.
         
-        current_year = datetime.now().year
+        Uses a compare-and-set UPDATE rather than a row lock, so the only
+        write contention is the single statement that moves the high-water
+        mark. After RESERVE_CAS_ATTEMPTS lost races the row is locked with
+        select_for_update instead. Returns (first_number, last_number).
+        """
+        from django.db import transaction
         
-        # Get or create sequence for this document type and year
-        sequence, created = cls.objects.get_or_create(
-            document_type=document_type,
-            year=current_year,
-            defaults={
-                'current_number': 0,
-                'prefix': cls._get_prefix(document_type),
-            }
-        )
+        for _ in range(cls.RESERVE_CAS_ATTEMPTS):
+            sequence = cls._get_sequence(document_type, year)
+            first = sequence.current_number + 1
+            last = sequence.current_number + size
+            with transaction.atomic():
+                updated = cls.objects.filter(
+                    pk=sequence.pk, current_number=sequence.current_number
+                ).update(current_number=last, updated_at=timezone.now())
+                if updated:
+                    cls._record_block(document_type, year, first, last, reserved_by)
+                    return first, last
         
-        # Increment and save
-        sequence.current_number += 1
-        sequence.save()
+        # Heavy contention: wait for the row instead of retrying
+        pk = cls._get_sequence(document_type, year).pk
+        with transaction.atomic():
+            sequence = cls.objects.select_for_update().get(pk=pk)
+            first = sequence.current_number + 1
+            last = sequence.current_number + size
+            sequence.current_number = last
+            sequence.save(update_fields=['current_number', 'updated_at'])
+            cls._record_block(document_type, year, first, last, reserved_by)
+        return first, last
+    
+    @classmethod
+    def _get_sequence(cls, document_type: str, year: int):
+        from django.db import IntegrityError, transaction
         
-        # Format: PREFIX-YYYY-NNNN
-        return f"{sequence.prefix}-{current_year}-{sequence.current_number:04d}"
+        defaults = {'current_number': 0, 'prefix': cls._get_prefix(document_type)}
+        try:
+            with transaction.atomic():
+                return cls.objects.get_or_create(document_type=document_type, year=year, defaults=defaults)[0]
+        except IntegrityError:
+            # Another worker created the row first
+            return cls.objects.get(document_type=document_type, year=year)
+    
+    @staticmethod
+    def _record_block(document_type: str, year: int, first: int, last: int, reserved_by: str):
+        DocumentNumberBlock.objects.create(
+            document_type=document_type,
+            year=year,
+            first_number=first,
+            last_number=last,
+            reserved_by=reserved_by,
+        )
+    
+    @classmethod
+    def format_number(cls, document_type: str, year: int, number: int) -> str:
+        """Format a sequence number as PREFIX-YYYY-NNNN."""
+        return f"{cls._get_prefix(document_type)}-{year}-{number:04d}"
     
     @staticmethod
     def _get_prefix(document_type: str) -> str:
@@ -247,3 +298,56 @@ class DocumentNumberSequence(models.Model):
         }
         return prefixes.get(document_type, 'DOC')
 
+
+
+
+class DocumentNumberBlock(models.Model):
+    """
+    Ledger of number ranges reserved from a DocumentNumberSequence.
+    
+    Every number handed out belongs to exactly one block, so any number
+    missing from InvoiceReceipt can be traced to the worker that reserved it
+    (e.g. a block left partly unused when a worker restarted).
+    """
+    
+    document_type = models.CharField(
+        max_length=20,
+        choices=DocumentNumberSequence.DOCUMENT_TYPE_CHOICES,
+        help_text="Type of document"
+    )
+    
+    year = models.IntegerField(
+        help_text="Sequence year the block was reserved from"
+    )
+    
+    first_number = models.IntegerField(
+        help_text="First number in the block (inclusive)"
+    )
+    
+    last_number = models.IntegerField(
+        help_text="Last number in the block (inclusive)"
+    )
+    
+    reserved_by = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Worker that reserved the block (host:pid)"
+    )
+    
+    reserved_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="When the block was reserved"
+    )
+    
+    class Meta:
+        db_table = 'document_number_blocks'
+        ordering = ['document_type', 'year', 'first_number']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['document_type', 'year', 'first_number'],
+                name='document_number_block_uniq',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.document_type} {self.year} {self.first_number}-{self.last_number}"
@@ -0,0 +1,59 @@
+"""
+Django management command to audit receipt/invoice numbering gaps.
+
+Numbers are handed out from blocks reserved per worker; this lists every
+reserved number that never became a stored document, grouped by the worker
+that reserved it, and flags stored numbers that no reserved block covers.
+
+Usage:
+    python manage.py audit_document_numbers
+    python manage.py audit_document_numbers --type INVOICE --year 2025
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.billing.document_numbers import audit_document_numbers
+
+
+class Command(BaseCommand):
+    help = 'Account for gaps in receipt/invoice numbers using the reserved block ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            dest='document_types',
+            action='append',
+            choices=['RECEIPT', 'INVOICE', 'STATEMENT'],
+            help='Document type to audit (default: RECEIPT and INVOICE); may be repeated',
+        )
+        parser.add_argument(
+            '--year',
+            type=int,
+            default=None,
+            help='Sequence year (default: current year)',
+        )
+
+    def handle(self, *args, **options):
+        year = options['year'] or timezone.localdate().year
+        for document_type in options['document_types'] or ['RECEIPT', 'INVOICE']:
+            report = audit_document_numbers(document_type, year)
+            self.stdout.write(self.style.SUCCESS(
+                f"{document_type} {year}: {report['issued']} issued, {report['reserved']} reserved"
+            ))
+            for worker, numbers in report['unused_by_worker'].items():
+                self.stdout.write(f"  - {len(numbers)} unused from {worker}: {self._ranges(numbers)}")
+            if report['unaccounted']:
+                self.stdout.write(self.style.ERROR(
+                    f"  - Not covered by any reserved block: {self._ranges(report['unaccounted'])}"
+                ))
+
+    @staticmethod
+    def _ranges(numbers):
+        """Compact 1,2,3,7 into '1-3, 7'."""
+        ranges = []
+        for number in sorted(numbers):
+            if ranges and number == ranges[-1][1] + 1:
+                ranges[-1][1] = number
+            else:
+                ranges.append([number, number])
+        return ', '.join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
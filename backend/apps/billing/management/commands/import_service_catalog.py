@@ -167,6 +167,7 @@ class Command(BaseCommand):
         self.stdout.write(f"Total rows processed: {stats['total']}")
         self.stdout.write(self.style.SUCCESS(f"Created: {stats['created']}"))
         self.stdout.write(self.style.SUCCESS(f"Updated: {stats['updated']}"))
+        self.stdout.write(f"Unchanged: {stats.get('unchanged', 0)}")
         self.stdout.write(self.style.WARNING(f"Skipped: {stats['skipped']}"))
         
         if stats['errors']:
@@ -181,6 +182,12 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS("\nNo errors!"))
         
         if dry_run:
+            diff = stats.get('diff', {})
+            for row in diff.get('create', []):
+                self.stdout.write(f"  Would create (row {row['row']}): {row['service_code']}")
+            for row in diff.get('update', []):
+                changes = ', '.join(f"{field}: {old} -> {new}" for field, (old, new) in row['changes'].items())
+                self.stdout.write(f"  Would update (row {row['row']}): {row['service_code']} ({changes})")
             self.stdout.write(
                 self.style.WARNING("\nThis was a dry run. Use without --dry-run to save changes.")
             )
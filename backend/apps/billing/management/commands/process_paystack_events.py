@@ -0,0 +1,64 @@
+"""
+Management command to apply stored Paystack webhook events.
+
+Usage:
+    python manage.py process_paystack_events
+    python manage.py process_paystack_events --batch-size 200 --workers 16
+
+Run every minute by docker/scheduler.sh (see DEPLOYMENT.md). Each batch
+coalesces events by reference, verifies the transactions with Paystack
+concurrently and applies the successful payments. Events whose verification
+call failed are retried on a later run, up to MAX_ATTEMPTS times.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.billing.paystack_event_processing import process_paystack_events
+
+
+class Command(BaseCommand):
+    help = 'Verify and apply stored Paystack webhook events in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Events claimed per batch (default: 100)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Concurrent Paystack verify calls (default: PAYSTACK_VERIFY_WORKERS)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches (default: drain every pending event)',
+        )
+
+    def handle(self, *args, **options):
+        batches = 0
+        totals = {'events': 0, 'verified': 0, 'already_verified': 0, 'failed': 0, 'retried': 0}
+        while options['max_batches'] is None or batches < options['max_batches']:
+            result = process_paystack_events(
+                batch_size=options['batch_size'],
+                max_workers=options['workers'],
+            )
+            if not result.events:
+                break
+            batches += 1
+            for key in totals:
+                totals[key] += getattr(result, key)
+            if result.retried:
+                # Leave retries for the next run instead of spinning on a failing provider
+                break
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {totals['events']} event(s) in {batches} batch(es): "
+                f"verified {totals['verified']}, already verified {totals['already_verified']}, "
+                f"failed {totals['failed']}, to retry {totals['retried']}"
+            )
+        )
@@ -0,0 +1,56 @@
+"""
+Management command to verify every Paystack payment intent still awaiting payment.
+
+Usage:
+    python manage.py reconcile_paystack_payments
+    python manage.py reconcile_paystack_payments --min-age 30 --limit 500 --workers 16
+
+Catches payments whose webhook never arrived: all PENDING/INITIALIZED
+intents older than --min-age minutes are verified with Paystack
+concurrently, successful ones are applied and finally failed ones marked
+FAILED. Anything else (e.g. checkout still open) is left for a later run.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.billing.paystack_event_processing import reconcile_pending_intents
+
+
+class Command(BaseCommand):
+    help = 'Verify all pending Paystack payment intents concurrently and apply settled payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=5,
+            help='Only intents created at least this many minutes ago (default: 5)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maximum number of intents to verify (default: all)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Concurrent Paystack verify calls (default: PAYSTACK_VERIFY_WORKERS)',
+        )
+
+    def handle(self, *args, **options):
+        result = reconcile_pending_intents(
+            min_age=timedelta(minutes=options['min_age']),
+            limit=options['limit'],
+            max_workers=options['workers'],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {result.references} intent(s): verified {result.verified}, "
+                f"failed {result.failed}, still pending {result.pending}, "
+                f"verification errors {result.retried}"
+            )
+        )
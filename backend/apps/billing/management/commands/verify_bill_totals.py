@@ -0,0 +1,41 @@
+"""
+Django management command to verify incrementally maintained Bill totals.
+
+Usage:
+    python manage.py verify_bill_totals
+    python manage.py verify_bill_totals --fix
+    python manage.py verify_bill_totals --bill 12 --bill 13
+"""
+from django.core.management.base import BaseCommand
+
+from apps.billing.bill_totals_service import BillTotalsService
+
+
+class Command(BaseCommand):
+    help = 'Detect (and optionally repair) Bill totals that drifted from their items and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bill', type=int, action='append', dest='bill_ids',
+                            help='Only check this bill (repeatable)')
+        parser.add_argument('--fix', action='store_true',
+                            help='Reset drifted totals from items and payments')
+
+    def handle(self, *args, **options):
+        drift = BillTotalsService.find_drift(options['bill_ids'])
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Bill totals are consistent."))
+            return
+
+        for entry in drift:
+            changes = ', '.join(
+                f"{field}: {values['stored']} (expected {values['expected']})"
+                for field, values in entry['fields'].items()
+            )
+            self.stdout.write(self.style.WARNING(f"Bill {entry['bill_id']}: {changes}"))
+
+        if options['fix']:
+            repaired = BillTotalsService.repair([entry['bill_id'] for entry in drift])
+            self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} bill(s)."))
+        else:
+            self.stdout.write(f"{len(drift)} bill(s) drifted. Run with --fix to repair.")
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:52
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_totals(apps, schema_editor):
+    Payment = apps.get_model('billing', 'Payment')
+    DailyPaymentTotal = apps.get_model('billing', 'DailyPaymentTotal')
+    rows = (
+        Payment.objects.filter(status__in=['CLEARED', 'PARTIAL'])
+        .annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values('day', 'payment_method')
+        .annotate(count=Count('id'), total=Sum('amount'))
+    )
+    DailyPaymentTotal.objects.bulk_create([
+        DailyPaymentTotal(
+            date=row['day'],
+            payment_method=row['payment_method'],
+            payment_count=row['count'],
+            total_amount=row['total'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0021_rename_insurance_c_patient_6a8c0d_idx_insurance_c_patient_374c53_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPaymentTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Local date the payments were made')),
+                ('payment_method', models.CharField(help_text='Payment method (Payment.payment_method)', max_length=20)),
+                ('payment_count', models.IntegerField(default=0, help_text='Number of counted (CLEARED/PARTIAL) payments')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of counted payment amounts', max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When these totals last changed')),
+            ],
+            options={
+                'verbose_name': 'Daily Payment Total',
+                'verbose_name_plural': 'Daily Payment Totals',
+                'db_table': 'daily_payment_totals',
+                'ordering': ['-date', 'payment_method'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'payment_method'), name='daily_payment_totals_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_totals, migrations.RunPython.noop),
+    ]
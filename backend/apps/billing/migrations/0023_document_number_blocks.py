@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:59
+
+from django.db import migrations, models
+
+
+def record_existing_numbers(apps, schema_editor):
+    """Numbers issued before the ledger existed form one block per sequence."""
+    DocumentNumberSequence = apps.get_model('billing', 'DocumentNumberSequence')
+    DocumentNumberBlock = apps.get_model('billing', 'DocumentNumberBlock')
+    DocumentNumberBlock.objects.bulk_create([
+        DocumentNumberBlock(
+            document_type=sequence.document_type,
+            year=sequence.year,
+            first_number=1,
+            last_number=sequence.current_number,
+            reserved_by='pre-ledger',
+        )
+        for sequence in DocumentNumberSequence.objects.filter(current_number__gt=0)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0022_daily_payment_totals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentnumbersequence',
+            name='document_type',
+            field=models.CharField(choices=[('RECEIPT', 'Receipt'), ('INVOICE', 'Invoice'), ('STATEMENT', 'Billing Statement')], help_text='Type of document', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DocumentNumberBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_type', models.CharField(choices=[('RECEIPT', 'Receipt'), ('INVOICE', 'Invoice'), ('STATEMENT', 'Billing Statement')], help_text='Type of document', max_length=20)),
+                ('year', models.IntegerField(help_text='Sequence year the block was reserved from')),
+                ('first_number', models.IntegerField(help_text='First number in the block (inclusive)')),
+                ('last_number', models.IntegerField(help_text='Last number in the block (inclusive)')),
+                ('reserved_by', models.CharField(blank=True, help_text='Worker that reserved the block (host:pid)', max_length=100)),
+                ('reserved_at', models.DateTimeField(auto_now_add=True, help_text='When the block was reserved')),
+            ],
+            options={
+                'db_table': 'document_number_blocks',
+                'ordering': ['document_type', 'year', 'first_number'],
+                'constraints': [models.UniqueConstraint(fields=('document_type', 'year', 'first_number'), name='document_number_block_uniq')],
+            },
+        ),
+        migrations.RunPython(record_existing_numbers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0023_document_number_blocks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaystackWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_key', models.CharField(help_text='Event type plus Paystack transaction ID (or reference); redeliveries share it', max_length=255, unique=True)),
+                ('event', models.CharField(help_text='Paystack event type, e.g. charge.success', max_length=100)),
+                ('reference', models.CharField(db_index=True, help_text='Paystack transaction reference', max_length=255)),
+                ('payload', models.JSONField(help_text='Webhook body as received')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('PROCESSED', 'Processed'), ('IGNORED', 'Ignored'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, help_text='When a worker last claimed the event', null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Paystack Webhook Event',
+                'verbose_name_plural': 'Paystack Webhook Events',
+                'db_table': 'paystack_webhook_events',
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='paystack_we_status_9afe08_idx')],
+            },
+        ),
+    ]
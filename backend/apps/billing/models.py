@@ -673,3 +673,48 @@ class PaymentIntent(models.Model):
             # Store failure reason in notes if we had a notes field
             pass
         self.save()
+
+
+class PaystackWebhookEvent(models.Model):
+    """
+    Raw Paystack webhook event, stored on receipt and processed later.
+
+    The webhook endpoint only verifies the signature, records the event and
+    acknowledges it; process_paystack_events drains PENDING events in batches
+    (see paystack_event_processing). event_key makes redelivered events a no-op.
+    """
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('PROCESSED', 'Processed'),
+        ('IGNORED', 'Ignored'),
+        ('FAILED', 'Failed'),
+    ]
+
+    event_key = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Event type plus Paystack transaction ID (or reference); redeliveries share it"
+    )
+    event = models.CharField(max_length=100, help_text="Paystack event type, e.g. charge.success")
+    reference = models.CharField(max_length=255, db_index=True, help_text="Paystack transaction reference")
+    payload = models.JSONField(help_text="Webhook body as received")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    received_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True, help_text="When a worker last claimed the event")
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'paystack_webhook_events'
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['status', 'received_at']),
+        ]
+        verbose_name = 'Paystack Webhook Event'
+        verbose_name_plural = 'Paystack Webhook Events'
+
+    def __str__(self):
+        return f"{self.event} {self.reference} ({self.status})"
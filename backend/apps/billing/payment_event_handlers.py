@@ -7,6 +7,8 @@ Per EMR Rules:
 - No side effects if already processed
 """
 import logging
+from typing import List
+
 from django.db import transaction
 from django.core.exceptions import ValidationError
 
@@ -58,6 +60,39 @@ def handle_payment_confirmed(event: PaymentConfirmedEvent) -> None:
         )
 
 
+def handle_payments_confirmed(events: List[PaymentConfirmedEvent]) -> None:
+    """
+    Handle the PAYMENT_CONFIRMED events of one batch payment.
+    
+    Same effects as handle_payment_confirmed for each event, but each visit
+    is locked and its status updated once, however many of its items were paid.
+    
+    Args:
+        events: PaymentConfirmedEvent instances of the batch
+    """
+    by_visit = {}
+    for event in events:
+        by_visit.setdefault(event.visit_id, []).append(event)
+    
+    with transaction.atomic():
+        for visit_id, visit_events in by_visit.items():
+            try:
+                visit = Visit.objects.select_for_update().get(pk=visit_id)
+            except Visit.DoesNotExist:
+                logger.error(f"Visit {visit_id} not found for payment confirmed events")
+                continue
+            
+            consultation_ids = dict.fromkeys(e.consultation_id for e in visit_events if e.consultation_id)
+            for consultation_id in consultation_ids:
+                _unlock_consultation(consultation_id, visit)
+            
+            _update_visit_status(visit)
+    
+    logger.info(
+        f"Processed {len(events)} PAYMENT_CONFIRMED event(s) for {len(by_visit)} visit(s)"
+    )
+
+
 def _unlock_consultation(consultation_id: int, visit: Visit) -> None:
     """
     Unlock consultation if it's in PENDING status.
@@ -0,0 +1,311 @@
+"""
+Batched Paystack webhook and verification pipeline.
+
+The webhook endpoint only verifies the signature, stores the event
+(record_webhook_event) and acknowledges it, so Paystack never waits on our
+database or on a verify call. process_paystack_events then drains stored
+events in batches:
+
+1. Claims up to batch_size PENDING events (and PROCESSING ones whose worker
+   died) in one UPDATE. An event abandoned MAX_ATTEMPTS times is failed
+   instead of being claimed again.
+2. Coalesces them by reference: redeliveries and repeated events for one
+   transaction cost a single verify call.
+3. Loads every PaymentIntent for the batch in one query and verifies the
+   unverified ones with Paystack through a thread pool (pooled keep-alive
+   client).
+4. Applies each successful payment: the intent is marked verified, its
+   Payment is allocated to the visit's BillingLineItems, and line items
+   reaching PAID fire PAYMENT_CONFIRMED through
+   handle_payment_confirmed_idempotent (billing_line_item_signals).
+5. Writes event outcomes back with one bulk_update. An error applying one
+   reference is recorded on its events and retried on a later run (up to
+   MAX_ATTEMPTS); it does not stop the rest of the batch.
+
+reconcile_pending_intents runs steps 3-4 for every intent still waiting on
+Paystack (missed webhooks, abandoned checkouts) - the bulk counterpart of
+PaymentIntentViewSet.verify.
+
+Worker threads only talk to Paystack; all database work happens on the
+calling thread.
+"""
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.audit import AuditLog
+from core.audit_buffer import write_entries
+
+from .billing_line_item_service import allocate_payment_to_line_items
+from .billing_service import BillingService
+from .models import PaymentIntent, PaystackWebhookEvent
+from .paystack_service import PaystackVisitService
+
+logger = logging.getLogger(__name__)
+
+HANDLED_EVENTS = ('charge.success',)
+MAX_ATTEMPTS = 5
+# A PROCESSING event not finished within this time is claimed again.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# Paystack transaction statuses that will never turn into a successful charge.
+FINAL_FAILURE_STATUSES = ('failed', 'reversed')
+AWAITING_PAYMENT_STATUSES = ('PENDING', 'INITIALIZED')
+
+
+@dataclass
+class PaystackBatchResult:
+    events: int = 0
+    references: int = 0
+    verified: int = 0
+    already_verified: int = 0
+    failed: int = 0
+    pending: int = 0
+    retried: int = 0
+
+
+def webhook_event_key(event, data):
+    """Idempotency key: Paystack redelivers an event with the same type and transaction."""
+    return f"{event}:{data.get('id') or data.get('reference')}"[:255]
+
+
+def record_webhook_event(webhook_data):
+    """
+    Store a signature-verified webhook body; returns (event, created).
+
+    Event types the pipeline does not handle are stored as IGNORED so the
+    raw payload is still on record.
+    """
+    event_type = webhook_data.get('event') or ''
+    data = webhook_data.get('data') or {}
+    return PaystackWebhookEvent.objects.get_or_create(
+        event_key=webhook_event_key(event_type, data),
+        defaults={
+            'event': event_type,
+            'reference': data.get('reference') or '',
+            'payload': webhook_data,
+            'status': 'PENDING' if event_type in HANDLED_EVENTS else 'IGNORED',
+        },
+    )
+
+
+def verify_references(service, references, max_workers=None):
+    """{reference: (paystack_response, error)} for references, verified concurrently."""
+    references = list(references)
+    if not references:
+        return {}
+    max_workers = max_workers or getattr(settings, 'PAYSTACK_VERIFY_WORKERS', 8)
+
+    def verify(reference):
+        try:
+            return service.verify_transaction(reference), None
+        except Exception as e:
+            return None, str(e)
+
+    if max_workers <= 1 or len(references) == 1:
+        outcomes = [verify(reference) for reference in references]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(references))) as pool:
+            outcomes = list(pool.map(verify, references))
+    return dict(zip(references, outcomes))
+
+
+def apply_verification(intent, paystack_response, service, fail_unsuccessful=True):
+    """
+    Apply one Paystack verify response to its PaymentIntent.
+
+    Returns (outcome, detail) with outcome one of 'verified',
+    'already_verified', 'failed' or 'pending'. An unsuccessful transaction
+    fails the intent when fail_unsuccessful is set (Paystack reported the
+    charge as successful but verification disagrees); otherwise only
+    FINAL_FAILURE_STATUSES do, and anything else stays pending.
+    """
+    if intent.is_verified():
+        return 'already_verified', ''
+
+    if not service.is_transaction_successful(paystack_response):
+        paystack_status = (paystack_response.get('data') or {}).get('status')
+        if not fail_unsuccessful and paystack_status not in FINAL_FAILURE_STATUSES:
+            return 'pending', f"Paystack status: {paystack_status}"
+        return _fail_intent(intent, "Transaction not successful")
+
+    # Security check: the transaction must belong to this intent's visit
+    if service.extract_visit_id_from_metadata(paystack_response) != intent.visit_id:
+        return _fail_intent(intent, "Visit ID mismatch in Paystack metadata")
+
+    try:
+        with transaction.atomic():
+            # Re-read under lock so concurrent workers cannot record the payment twice
+            intent = PaymentIntent.objects.select_for_update().select_related('visit').get(pk=intent.pk)
+            if intent.is_verified():
+                return 'already_verified', ''
+            payment = intent.mark_as_verified(paystack_response)
+            allocate_payment_to_line_items(intent.visit, Decimal(str(payment.amount)), 'PAYSTACK')
+            visit = intent.visit
+            visit.payment_status = BillingService.compute_billing_summary(visit).payment_status
+            visit.save(update_fields=['payment_status'])
+    except ValidationError as e:
+        logger.warning("Could not apply Paystack payment %s: %s", intent.paystack_reference, e)
+        return 'failed', '; '.join(e.messages)
+    return 'verified', ''
+
+
+def _fail_intent(intent, reason):
+    if intent.can_be_modified():
+        intent.mark_as_failed(reason=reason)
+    return 'failed', reason
+
+
+def _audit_entry(intent, action, metadata=None):
+    # System action, attributed to the receptionist who initialized the payment
+    # (audit entries require a user)
+    return AuditLog.build(
+        user=intent.created_by,
+        role='SYSTEM',
+        action=action,
+        visit_id=intent.visit_id,
+        resource_type='payment_intent',
+        resource_id=intent.id,
+        metadata={'reference': intent.paystack_reference, **(metadata or {})},
+    )
+
+
+def _claim_events(batch_size):
+    now = timezone.now()
+    abandoned = Q(status='PROCESSING', claimed_at__lt=now - CLAIM_TIMEOUT)
+    PaystackWebhookEvent.objects.filter(abandoned, attempts__gte=MAX_ATTEMPTS).update(
+        status='FAILED', processed_at=now, last_error=f"Abandoned by a worker {MAX_ATTEMPTS} times",
+    )
+    claimable = Q(status='PENDING') | abandoned
+    ids = list(
+        PaystackWebhookEvent.objects.filter(claimable)
+        .order_by('received_at')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    PaystackWebhookEvent.objects.filter(claimable, pk__in=ids).update(
+        status='PROCESSING', claimed_at=now, attempts=F('attempts') + 1,
+    )
+    # Rows another worker claimed in between keep its timestamp
+    return list(PaystackWebhookEvent.objects.filter(pk__in=ids, status='PROCESSING', claimed_at=now))
+
+
+def process_paystack_events(batch_size=100, max_workers=None, service=None):
+    """Drain one batch of stored webhook events; returns a PaystackBatchResult."""
+    result = PaystackBatchResult()
+    events = _claim_events(batch_size)
+    if not events:
+        return result
+    service = service or PaystackVisitService()
+
+    by_reference = defaultdict(list)
+    for event in events:
+        by_reference[event.reference].append(event)
+    result.events = len(events)
+    result.references = len(by_reference)
+
+    intents = {
+        intent.paystack_reference: intent
+        for intent in PaymentIntent.objects.filter(paystack_reference__in=by_reference).select_related('payment', 'created_by')
+    }
+    to_verify = [ref for ref, intent in intents.items() if not intent.is_verified()]
+    responses = verify_references(service, to_verify, max_workers)
+
+    outcomes = {}
+    audit_entries = []
+    for reference in by_reference:
+        intent = intents.get(reference)
+        if intent is None:
+            outcomes[reference] = ('failed', f"PaymentIntent not found for reference: {reference}")
+            continue
+        if reference not in responses:
+            outcomes[reference] = ('already_verified', '')
+            continue
+        paystack_response, error = responses[reference]
+        if error:
+            outcomes[reference] = ('retry', error)
+            continue
+        try:
+            outcome = outcomes[reference] = apply_verification(intent, paystack_response, service)
+        except Exception as e:
+            logger.exception("Error applying Paystack payment %s", reference)
+            outcomes[reference] = ('retry', str(e) or type(e).__name__)
+            continue
+        if outcome[0] == 'verified':
+            audit_entries.append(_audit_entry(intent, 'PAYSTACK_WEBHOOK_PROCESSED', {
+                'events': len(by_reference[reference]),
+            }))
+
+    processed_at = timezone.now()
+    for reference, (outcome, detail) in outcomes.items():
+        counter = 'retried' if outcome == 'retry' else outcome
+        setattr(result, counter, getattr(result, counter) + 1)
+        for event in by_reference[reference]:
+            event.last_error = detail
+            if outcome == 'retry':
+                event.status = 'FAILED' if event.attempts >= MAX_ATTEMPTS else 'PENDING'
+            else:
+                event.status = 'FAILED' if outcome == 'failed' else 'PROCESSED'
+                event.processed_at = processed_at
+    PaystackWebhookEvent.objects.bulk_update(events, ['status', 'last_error', 'processed_at'], batch_size=500)
+    write_entries(AuditLog, audit_entries)
+
+    logger.info(
+        "Paystack events: events=%d references=%d verified=%d already_verified=%d failed=%d retried=%d",
+        result.events, result.references, result.verified, result.already_verified, result.failed, result.retried,
+    )
+    return result
+
+
+def reconcile_pending_intents(min_age=timedelta(minutes=5), limit=None, max_workers=None, service=None):
+    """
+    Verify every intent still awaiting payment and apply the settled ones.
+
+    Intents younger than min_age are left alone (the customer may still be
+    at checkout). Transactions Paystack reports as neither successful nor
+    finally failed stay pending for a later run.
+    """
+    result = PaystackBatchResult()
+    intents = PaymentIntent.objects.filter(
+        status__in=AWAITING_PAYMENT_STATUSES,
+        created_at__lte=timezone.now() - min_age,
+    ).select_related('created_by').order_by('created_at')
+    intents = list(intents[:limit] if limit else intents)
+    if not intents:
+        return result
+    service = service or PaystackVisitService()
+    result.references = len(intents)
+
+    responses = verify_references(service, [intent.paystack_reference for intent in intents], max_workers)
+
+    audit_entries = []
+    for intent in intents:
+        paystack_response, error = responses[intent.paystack_reference]
+        if error:
+            result.retried += 1
+            continue
+        try:
+            outcome, _ = apply_verification(intent, paystack_response, service, fail_unsuccessful=False)
+        except Exception:
+            logger.exception("Error reconciling Paystack payment %s", intent.paystack_reference)
+            result.retried += 1
+            continue
+        setattr(result, outcome, getattr(result, outcome) + 1)
+        if outcome == 'verified':
+            audit_entries.append(_audit_entry(intent, 'PAYSTACK_PAYMENT_RECONCILED'))
+    write_entries(AuditLog, audit_entries)
+
+    logger.info(
+        "Paystack reconcile: intents=%d verified=%d failed=%d pending=%d errors=%d",
+        result.references, result.verified, result.failed, result.pending, result.retried,
+    )
+    return result
@@ -377,9 +377,7 @@ def paystack_webhook_view(request):
             status=200
         )
     
-    # Update Bill totals
-    bill.recalculate_totals()
-    bill.save(update_fields=['total_amount', 'amount_paid', 'outstanding_balance', 'status', 'updated_at'])
+    # Bill totals were updated when the payment was saved
     
     # Update Visit payment_status
     billing_summary = BillingService.compute_billing_summary(visit)
@@ -16,6 +16,8 @@ from typing import Dict, Any, Optional
 from django.conf import settings
 from django.core.exceptions import ValidationError
 
+from core.http_client import get_client
+
 
 class PaystackVisitService:
     """
@@ -32,6 +34,8 @@ class PaystackVisitService:
         self.secret_key = getattr(settings, 'PAYSTACK_SECRET_KEY', '')
         self.public_key = getattr(settings, 'PAYSTACK_PUBLIC_KEY', '')
         self.base_url = 'https://api.paystack.co'
+        # Shared keep-alive session (connection pool, retries, circuit breaker)
+        self.http = get_client('paystack')
         
         if not self.secret_key or self.secret_key.strip() == '':
             raise ValueError(
@@ -94,7 +98,7 @@ class PaystackVisitService:
             payload['callback_url'] = callback_url
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f'{self.base_url}/transaction/initialize',
                 json=payload,
                 headers=self._get_headers(),
@@ -128,7 +132,7 @@ class PaystackVisitService:
             Transaction details from Paystack
         """
         try:
-            response = requests.get(
+            response = self.http.get(
                 f'{self.base_url}/transaction/verify/{reference}',
                 headers=self._get_headers(),
                 timeout=30
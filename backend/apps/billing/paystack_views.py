@@ -29,6 +29,7 @@ from .serializers import (
     PaymentIntentVerifySerializer,
 )
 from .paystack_service import PaystackVisitService
+from .paystack_event_processing import record_webhook_event
 from .permissions import CanProcessPayment
 from apps.visits.models import Visit
 from core.permissions import IsVisitOpen
@@ -326,16 +327,19 @@ class PaymentIntentViewSet(viewsets.ModelViewSet):
 @permission_classes([AllowAny])  # Webhook must be accessible without auth
 def paystack_webhook(request):
     """
-    Paystack webhook handler - idempotent and secure.
+    Paystack webhook intake - idempotent and secure.
     
     POST /api/v1/billing/paystack/webhook/
     
     Security Rules:
     1. Webhook signature MUST be verified
-    2. Idempotent processing (can be called multiple times safely)
-    3. Server-side verification only
+    2. Idempotent intake (redelivered events are stored once)
+    3. Server-side verification only (done by process_paystack_events)
     4. No PHI in processing
-    5. Audit logging
+    5. Audit logging (when the payment is applied)
+    
+    The event is stored and acknowledged immediately; verification and
+    payment application happen in batches (paystack_event_processing).
     
     Webhook payload structure:
     {
@@ -387,86 +391,15 @@ def paystack_webhook(request):
             status=400
         )
     
-    # Only process charge.success events
-    if event != 'charge.success':
-        return JsonResponse(
-            {'message': f'Event {event} not processed'},
-            status=200
-        )
-    
-    # Find PaymentIntent by reference
-    try:
-        payment_intent = PaymentIntent.objects.get(paystack_reference=reference)
-    except PaymentIntent.DoesNotExist:
-        return JsonResponse(
-            {'error': f'PaymentIntent not found for reference: {reference}'},
-            status=404
-        )
-    
-    # Idempotency check: If already verified, return success
-    if payment_intent.is_verified():
-        return JsonResponse(
-            {
-                'message': 'Payment already verified (idempotent)',
-                'payment_intent_id': payment_intent.id,
-                'payment_id': payment_intent.payment.id if payment_intent.payment else None
-            },
-            status=200
-        )
-    
-    # Verify transaction server-side (do not trust webhook data alone)
-    try:
-        paystack_response = paystack_service.verify_transaction(reference)
-    except Exception as e:
-        payment_intent.mark_as_failed(reason=f"Webhook verification failed: {str(e)}")
-        return JsonResponse(
-            {'error': f'Paystack verification failed: {str(e)}'},
-            status=500
-        )
-    
-    # Check if transaction is successful
-    if not paystack_service.is_transaction_successful(paystack_response):
-        payment_intent.mark_as_failed(reason="Transaction not successful")
-        return JsonResponse(
-            {'error': 'Transaction not successful'},
-            status=400
-        )
-    
-    # Verify visit_id in metadata matches (security check)
-    metadata_visit_id = paystack_service.extract_visit_id_from_metadata(paystack_response)
-    if metadata_visit_id != payment_intent.visit_id:
-        payment_intent.mark_as_failed(reason="Visit ID mismatch in Paystack metadata")
-        return JsonResponse(
-            {'error': 'Security check failed: Visit ID mismatch'},
-            status=400
-        )
-    
-    # Mark as verified and create Payment record
-    try:
-        payment = payment_intent.mark_as_verified(paystack_response)
-    except Exception as e:
-        return JsonResponse(
-            {'error': f'Failed to create payment record: {str(e)}'},
-            status=500
-        )
-    
-    # Audit log (webhook processing)
-    AuditLog.log(
-        user=None,  # System action
-        role='SYSTEM',
-        action="PAYSTACK_WEBHOOK_PROCESSED",
-        visit_id=payment_intent.visit_id,
-        resource_type="payment_intent",
-        resource_id=payment_intent.id,
-        request=request
-    )
+    # Store the event and acknowledge; process_paystack_events applies it.
+    # Redeliveries map to the stored event and are acknowledged again.
+    stored_event, created = record_webhook_event(webhook_data)
     
     return JsonResponse(
         {
-            'message': 'Webhook processed successfully',
-            'payment_intent_id': payment_intent.id,
-            'payment_id': payment.id if payment else None
+            'message': 'Event received' if created else 'Event already received (idempotent)',
+            'event': event,
+            'status': stored_event.status,
         },
         status=200
     )
-
@@ -3,11 +3,16 @@ PDF Generation Service for Invoices and Receipts
 
 Uses WeasyPrint for HTML to PDF conversion.
 Modern, professional PDF generation with QR codes.
+
+WeasyPrint (and its GTK/Pango libraries) and qrcode are imported on the
+first PDF, not when this module is imported, so URL loading and worker boot
+don't pay for them.
 """
 import io
 import logging
 import sys
-import qrcode
+import threading
+from contextlib import redirect_stderr
 from django.conf import settings
 
 _logger = logging.getLogger(__name__)
@@ -18,22 +23,36 @@ from django.core.files.base import ContentFile
 from django.utils import timezone
 from datetime import datetime
 
-# Suppress WeasyPrint's own "could not import external libraries" message when GTK is missing
-try:
-    from contextlib import redirect_stderr
-    _devnull = io.StringIO()
-    with redirect_stderr(_devnull):
-        from weasyprint import HTML, CSS
-        from weasyprint.text.fonts import FontConfiguration
-    WEASYPRINT_AVAILABLE = True
-except (ImportError, OSError) as e:
-    # WeasyPrint not available or system dependencies missing
-    WEASYPRINT_AVAILABLE = False
-    HTML = None
-    CSS = None
-    FontConfiguration = None
-    # Store error for informative messages
-    WEASYPRINT_ERROR = str(e)
+_weasyprint = None
+_weasyprint_error = None
+_weasyprint_lock = threading.Lock()
+
+
+def get_weasyprint():
+    """
+    The weasyprint module, imported on first use.
+    
+    Raises:
+        ImportError: If WeasyPrint or its system libraries are not available
+    """
+    global _weasyprint, _weasyprint_error
+    if _weasyprint is None and _weasyprint_error is None:
+        with _weasyprint_lock:
+            if _weasyprint is None and _weasyprint_error is None:
+                # Suppress WeasyPrint's own "could not import external libraries" message when GTK is missing
+                try:
+                    with redirect_stderr(io.StringIO()):
+                        import weasyprint
+                    _weasyprint = weasyprint
+                except (ImportError, OSError) as e:
+                    # WeasyPrint not available or system dependencies missing
+                    _weasyprint_error = str(e)
+    if _weasyprint is None:
+        raise ImportError(
+            f"WeasyPrint is not available. Error: {_weasyprint_error}"
+            "\nFor Windows: WeasyPrint requires GTK+ libraries. Consider using reportlab or xhtml2pdf instead."
+        )
+    return _weasyprint
 
 
 class PDFService:
@@ -53,6 +72,7 @@ class PDFService:
             Base64 encoded image string
         """
         import base64
+        import qrcode
         
         qr = qrcode.QRCode(
             version=1,
@@ -105,12 +125,7 @@ class PDFService:
         Raises:
             ImportError: If WeasyPrint is not available
         """
-        if not WEASYPRINT_AVAILABLE:
-            error_msg = "WeasyPrint is not available."
-            if 'WEASYPRINT_ERROR' in globals():
-                error_msg += f" Error: {WEASYPRINT_ERROR}"
-            error_msg += "\nFor Windows: WeasyPrint requires GTK+ libraries. Consider using reportlab or xhtml2pdf instead."
-            raise ImportError(error_msg)
+        weasyprint = get_weasyprint()
         
         # Generate QR code
         qr_data = f"RECEIPT:{receipt_data.get('receipt_number')}:VISIT:{receipt_data.get('visit_id')}"
@@ -146,7 +161,7 @@ class PDFService:
                 _logger.debug("Receipt PDF: No logo path found, base_url=None")
         
         # Generate PDF with base_url so <img src="logo.png"> resolves
-        html = HTML(string=html_content, base_url=base_url)
+        html = weasyprint.HTML(string=html_content, base_url=base_url)
         pdf_bytes = html.write_pdf()
         
         return pdf_bytes
@@ -165,12 +180,7 @@ class PDFService:
         Raises:
             ImportError: If WeasyPrint is not available
         """
-        if not WEASYPRINT_AVAILABLE:
-            error_msg = "WeasyPrint is not available."
-            if 'WEASYPRINT_ERROR' in globals():
-                error_msg += f" Error: {WEASYPRINT_ERROR}"
-            error_msg += "\nFor Windows: WeasyPrint requires GTK+ libraries. Consider using reportlab or xhtml2pdf instead."
-            raise ImportError(error_msg)
+        weasyprint = get_weasyprint()
         
         # Generate QR code
         qr_data = f"INVOICE:{invoice_data.get('invoice_number')}:VISIT:{invoice_data.get('visit_id')}"
@@ -206,7 +216,7 @@ class PDFService:
                 _logger.debug("Invoice PDF: No logo path found, base_url=None")
         
         # Generate PDF with base_url so <img src="logo.png"> resolves
-        html = HTML(string=html_content, base_url=base_url)
+        html = weasyprint.HTML(string=html_content, base_url=base_url)
         pdf_bytes = html.write_pdf()
         
         return pdf_bytes
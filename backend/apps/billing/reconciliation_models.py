@@ -307,3 +307,55 @@ class EndOfDayReconciliation(models.Model):
             'finalized_at': self.finalized_at.isoformat() if self.finalized_at else None,
         }
 
+
+
+class DailyPaymentTotal(models.Model):
+    """
+    Running payment totals for one day and payment method.
+    
+    Kept current from payment events (see reconciliation_signals), so the
+    day's figures are available at any time without scanning payments.
+    Reconciliation recomputes them with a grouped query and rewrites these
+    rows if they have drifted (e.g. after bulk updates that skip signals).
+    """
+    
+    date = models.DateField(
+        help_text="Local date the payments were made"
+    )
+    
+    payment_method = models.CharField(
+        max_length=20,
+        help_text="Payment method (Payment.payment_method)"
+    )
+    
+    payment_count = models.IntegerField(
+        default=0,
+        help_text="Number of counted (CLEARED/PARTIAL) payments"
+    )
+    
+    total_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Sum of counted payment amounts"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When these totals last changed"
+    )
+    
+    class Meta:
+        db_table = 'daily_payment_totals'
+        ordering = ['-date', 'payment_method']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'payment_method'],
+                name='daily_payment_totals_uniq',
+            ),
+        ]
+        verbose_name = 'Daily Payment Total'
+        verbose_name_plural = 'Daily Payment Totals'
+    
+    def __str__(self):
+        return f"{self.date} {self.payment_method}: {self.total_amount} ({self.payment_count})"
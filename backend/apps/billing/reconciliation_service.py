@@ -16,7 +16,8 @@ from django.db.models import Sum, Q, Count
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
-from .reconciliation_models import EndOfDayReconciliation
+from .reconciliation_models import EndOfDayReconciliation, DailyPaymentTotal
+from .reconciliation_signals import COUNTED_STATUSES
 from apps.visits.models import Visit
 from apps.billing.billing_line_item_models import BillingLineItem
 from apps.billing.models import Payment
@@ -24,6 +25,18 @@ from apps.billing.leak_detection_service import LeakDetectionService
 
 logger = logging.getLogger(__name__)
 
+# Payment method -> reconciliation total it is reported under.
+# INSURANCE is also reported separately as a subset of HMO.
+PAYMENT_METHOD_BUCKETS = {
+    'CASH': 'cash',
+    'POS': 'cash',
+    'TRANSFER': 'cash',
+    'WALLET': 'wallet',
+    'PAYSTACK': 'paystack',
+    'HMO': 'hmo',
+    'INSURANCE': 'hmo',
+}
+
 
 class ReconciliationService:
     """Service for end-of-day reconciliation."""
@@ -120,6 +133,9 @@ class ReconciliationService:
         """
         Perform the actual reconciliation calculations.
         
+        Every figure comes from a grouped query, so the number of queries does
+        not depend on how many visits, payments or line items the day had.
+        
         Args:
             reconciliation: EndOfDayReconciliation instance
             close_active_visits: Whether to close active visits
@@ -131,172 +147,83 @@ class ReconciliationService:
             created_at__date=reconciliation_date
         )
         
-        reconciliation.total_visits = visits.count()
-        
         # Close active visits if requested
         # Visit model uses OPEN/CLOSED statuses.
-        active_visits = visits.filter(status='OPEN')
         if close_active_visits:
-            closed_count = active_visits.update(status='CLOSED')
+            closed_count = visits.filter(status='OPEN').update(status='CLOSED')
             reconciliation.active_visits_closed = closed_count
             logger.info(f"Closed {closed_count} active visits for {reconciliation_date}")
         
-        # Get all billing line items for visits on this date (for outstanding calculations)
-        billing_items = BillingLineItem.objects.filter(
-            visit__created_at__date=reconciliation_date
+        visits_by_status = dict(
+            visits.order_by().values('status').annotate(count=Count('id')).values_list('status', 'count')
         )
+        reconciliation.total_visits = sum(visits_by_status.values())
         
-        # Calculate revenue from actual Payment transactions for the date
-        # Use a direct Python approach instead of aggregation for transparency and accuracy
-        # Filter by payment created_at date (when payment was made), not visit created_at date
-        # Use select_related to efficiently fetch related visit and patient data
+        # Revenue: payment totals per method for the day (by payment date, not visit date)
         payments = Payment.objects.filter(
             created_at__date=reconciliation_date,
-            status__in=['CLEARED', 'PARTIAL']  # Count both cleared and partial payments
-        ).select_related(
-            'visit',
-            'visit__patient',
-            'processed_by'
-        ).order_by('id')  # Order for consistent logging
-        
-        # Initialize totals
-        total_cash = Decimal('0.00')
-        total_wallet = Decimal('0.00')
-        total_paystack = Decimal('0.00')
-        total_hmo = Decimal('0.00')
-        total_insurance = Decimal('0.00')
-        
-        # Calculate totals directly from payments (more transparent than aggregation)
-        payment_count = 0
-        total_payment_sum = Decimal('0.00')
-        
-        logger.info(f"Processing payments for {reconciliation_date}")
-        for payment in payments:
-            payment_count += 1
-            total_payment_sum += payment.amount
-            
-            # Categorize payment by method
-            method = payment.payment_method
-            if method in ['CASH', 'POS', 'TRANSFER']:
-                total_cash += payment.amount
-                logger.info(f"Payment {payment.id}: NGN {payment.amount} CASH (method={method}, visit={payment.visit_id})")
-            elif method == 'WALLET':
-                total_wallet += payment.amount
-                logger.info(f"Payment {payment.id}: NGN {payment.amount} WALLET (visit={payment.visit_id})")
-            elif method == 'PAYSTACK':
-                total_paystack += payment.amount
-                logger.info(f"Payment {payment.id}: NGN {payment.amount} PAYSTACK (visit={payment.visit_id})")
-            elif method in ['HMO', 'INSURANCE']:
-                total_hmo += payment.amount
-                if method == 'INSURANCE':
-                    total_insurance += payment.amount
-                logger.info(f"Payment {payment.id}: NGN {payment.amount} {method} (visit={payment.visit_id})")
-            else:
-                logger.warning(f"Payment {payment.id}: Unknown payment method '{method}', amount={payment.amount}")
-        
-        # Assign totals to reconciliation
-        reconciliation.total_cash = total_cash
-        reconciliation.total_wallet = total_wallet
-        reconciliation.total_paystack = total_paystack
-        reconciliation.total_hmo = total_hmo
-        reconciliation.total_insurance = total_insurance
+            status__in=COUNTED_STATUSES  # Count both cleared and partial payments
+        )
+        method_totals = {
+            row['payment_method']: (row['count'], row['total'] or Decimal('0.00'))
+            for row in payments.order_by().values('payment_method').annotate(
+                count=Count('id'), total=Sum('amount')
+            )
+        }
+        
+        totals = {bucket: Decimal('0.00') for bucket in ('cash', 'wallet', 'paystack', 'hmo', 'insurance')}
+        for method, (count, total) in method_totals.items():
+            bucket = PAYMENT_METHOD_BUCKETS.get(method)
+            if bucket is None:
+                logger.warning(f"Unknown payment method '{method}' in reconciliation: {count} payment(s), NGN {total}")
+                continue
+            totals[bucket] += total
+            if method == 'INSURANCE':
+                totals['insurance'] += total
+        
+        reconciliation.total_cash = totals['cash']
+        reconciliation.total_wallet = totals['wallet']
+        reconciliation.total_paystack = totals['paystack']
+        reconciliation.total_hmo = totals['hmo']
+        reconciliation.total_insurance = totals['insurance']
         
         # Calculate total revenue (insurance is already included in HMO, so don't add it again)
-        reconciliation.total_revenue = total_cash + total_wallet + total_paystack + total_hmo
-        
-        # Log summary
-        logger.info(f"=== RECONCILIATION SUMMARY ===")
-        logger.info(f"Date: {reconciliation_date}")
-        logger.info(f"Total payments found: {payment_count}")
-        logger.info(f"Sum of all payment amounts: NGN {total_payment_sum}")
-        logger.info(f"Breakdown by method:")
-        logger.info(f"  Cash (CASH/POS/TRANSFER): NGN {total_cash}")
-        logger.info(f"  Wallet: NGN {total_wallet}")
-        logger.info(f"  Paystack: NGN {total_paystack}")
-        logger.info(f"  HMO (includes Insurance): NGN {total_hmo}")
-        logger.info(f"  Insurance (subset of HMO): NGN {total_insurance}")
-        logger.info(f"Total Revenue (Cash+Wallet+Paystack+HMO): NGN {reconciliation.total_revenue}")
-        
-        # Verify calculation
-        if payment_count > 0:
-            if abs(total_payment_sum - reconciliation.total_revenue) > Decimal('0.01'):
-                logger.error(f"ERROR: Total revenue ({reconciliation.total_revenue}) does not match sum of payments ({total_payment_sum})")
-                logger.error(f"Difference: NGN {abs(total_payment_sum - reconciliation.total_revenue)}")
-            else:
-                logger.info(f"Verification passed: Total revenue matches sum of all payments")
-                logger.info(f"Expected: NGN {total_payment_sum}, Actual: NGN {reconciliation.total_revenue}")
-        
-        # Calculate outstanding balances with detailed breakdown
-        outstanding_items = billing_items.filter(
-            bill_status__in=['PENDING', 'PARTIALLY_PAID']
-        ).select_related(
-            'visit',
-            'visit__patient',
-            'service_catalog'
-        ).order_by('visit_id', 'id')
-        
-        outstanding_amount = outstanding_items.aggregate(
-            total=Sum('outstanding_amount')
-        )['total'] or Decimal('0.00')
+        reconciliation.total_revenue = (
+            reconciliation.total_cash + reconciliation.total_wallet +
+            reconciliation.total_paystack + reconciliation.total_hmo
+        )
+        payment_count = sum(count for count, _ in method_totals.values())
+        total_payment_sum = sum((total for _, total in method_totals.values()), Decimal('0.00'))
         
-        reconciliation.total_outstanding = outstanding_amount
-        reconciliation.outstanding_visits_count = outstanding_items.values(
-            'visit'
-        ).distinct().count()
-        
-        # Build detailed list of outstanding items for transparency
-        outstanding_details_list = []
-        current_visit_id = None
-        visit_outstanding_items = []
-        visit_total_outstanding = Decimal('0.00')
-        
-        for item in outstanding_items:
-            # Group by visit
-            if current_visit_id is not None and item.visit_id != current_visit_id:
-                # Save previous visit's outstanding items
-                if visit_outstanding_items:
-                    outstanding_details_list.append({
-                        'visit_id': current_visit_id,
-                        'visit_status': visit_outstanding_items[0].visit.status if visit_outstanding_items[0].visit else None,
-                        'patient': {
-                            'id': visit_outstanding_items[0].visit.patient.id if visit_outstanding_items[0].visit and visit_outstanding_items[0].visit.patient else None,
-                            'name': f"{visit_outstanding_items[0].visit.patient.first_name} {visit_outstanding_items[0].visit.patient.last_name}".strip() if visit_outstanding_items[0].visit and visit_outstanding_items[0].visit.patient else None,
-                            'mrn': visit_outstanding_items[0].visit.patient.patient_id if visit_outstanding_items[0].visit and visit_outstanding_items[0].visit.patient else None,
-                        } if visit_outstanding_items[0].visit and visit_outstanding_items[0].visit.patient else None,
-                        'total_outstanding': float(visit_total_outstanding),
-                        'items': visit_outstanding_items,
-                    })
-                visit_outstanding_items = []
-                visit_total_outstanding = Decimal('0.00')
-            
-            current_visit_id = item.visit_id
-            visit_total_outstanding += item.outstanding_amount
-            
-            visit_outstanding_items.append({
-                'id': item.id,
-                'service_name': item.source_service_name,
-                'service_code': item.source_service_code,
-                'amount': float(item.amount),
-                'amount_paid': float(item.amount_paid),
-                'outstanding_amount': float(item.outstanding_amount),
-                'bill_status': item.bill_status,
-            })
+        if abs(total_payment_sum - reconciliation.total_revenue) > Decimal('0.01'):
+            logger.error(
+                f"Total revenue ({reconciliation.total_revenue}) does not match sum of payments "
+                f"({total_payment_sum}) for {reconciliation_date}"
+            )
         
-        # Add last visit's items
-        if visit_outstanding_items:
-            outstanding_details_list.append({
-                'visit_id': current_visit_id,
-                'visit_status': visit_outstanding_items[0].visit.status if visit_outstanding_items[0].visit else None,
-                'patient': {
-                    'id': visit_outstanding_items[0].visit.patient.id if visit_outstanding_items[0].visit and visit_outstanding_items[0].visit.patient else None,
-                    'name': f"{visit_outstanding_items[0].visit.patient.first_name} {visit_outstanding_items[0].visit.patient.last_name}".strip() if visit_outstanding_items[0].visit and visit_outstanding_items[0].visit.patient else None,
-                    'mrn': visit_outstanding_items[0].visit.patient.patient_id if visit_outstanding_items[0].visit and visit_outstanding_items[0].visit.patient else None,
-                } if visit_outstanding_items[0].visit and visit_outstanding_items[0].visit.patient else None,
-                'total_outstanding': float(visit_total_outstanding),
-                'items': visit_outstanding_items,
-            })
+        ReconciliationService._sync_intraday_totals(reconciliation_date, method_totals)
         
-        logger.info(f"Outstanding balances: {reconciliation.outstanding_visits_count} visit(s) with NGN {outstanding_amount} total outstanding")
+        # Billing line items for visits on this date (for outstanding calculations)
+        billing_items = BillingLineItem.objects.filter(
+            visit__created_at__date=reconciliation_date
+        )
+        outstanding_filter = Q(bill_status__in=['PENDING', 'PARTIALLY_PAID'])
+        billing_stats = billing_items.aggregate(
+            total_items=Count('id'),
+            paid_items=Count('id', filter=Q(bill_status='PAID')),
+            pending_items=Count('id', filter=Q(bill_status='PENDING')),
+            partially_paid_items=Count('id', filter=Q(bill_status='PARTIALLY_PAID')),
+            outstanding_amount=Sum('outstanding_amount', filter=outstanding_filter),
+            outstanding_visits=Count('visit', filter=outstanding_filter, distinct=True),
+        )
+        outstanding_amount = billing_stats.pop('outstanding_amount') or Decimal('0.00')
+        reconciliation.total_outstanding = outstanding_amount
+        reconciliation.outstanding_visits_count = billing_stats.pop('outstanding_visits')
+        
+        outstanding_details_list = ReconciliationService._outstanding_details(
+            billing_items.filter(outstanding_filter)
+        )
+        payment_details_list = ReconciliationService._payment_details(payments)
         
         # Initialize leak detection fields (will be populated outside transaction)
         reconciliation.revenue_leaks_detected = 0
@@ -306,71 +233,14 @@ class ReconciliationService:
         reconciliation.has_mismatches = False
         reconciliation.mismatch_details = {}
         
-        # Build comprehensive list of payment details with related information
-        payment_details_list = []
-        for payment in payments:
-            visit = payment.visit
-            patient = visit.patient if visit else None
-            processed_by = payment.processed_by
-            
-            # Get billing line items for this visit to show what was paid for
-            visit_billing_items = BillingLineItem.objects.filter(
-                visit=visit,
-                bill_status='PAID'
-            ).select_related('service_catalog')[:10]  # Limit to 10 items to avoid huge payload
-            
-            billing_items_summary = []
-            for item in visit_billing_items:
-                billing_items_summary.append({
-                    'service_name': item.source_service_name,
-                    'amount': float(item.amount),
-                    'payment_method': item.payment_method or payment.payment_method,
-                })
-            
-            payment_details_list.append({
-                'id': payment.id,
-                'amount': float(payment.amount),
-                'payment_method': payment.payment_method,
-                'status': payment.status,
-                'transaction_reference': payment.transaction_reference or None,
-                'notes': payment.notes or None,
-                'created_at': payment.created_at.isoformat() if payment.created_at else None,
-                'visit': {
-                    'id': visit.id if visit else None,
-                    'status': visit.status if visit else None,
-                    'created_at': visit.created_at.isoformat() if visit and visit.created_at else None,
-                    'payment_type': visit.payment_type if visit else None,
-                },
-                'patient': {
-                    'id': patient.id if patient else None,
-                    'name': f"{patient.first_name} {patient.last_name}".strip() if patient else None,
-                    'mrn': patient.patient_id if patient else None,
-                    'phone': getattr(patient, 'phone', None) if patient else None,
-                } if patient else None,
-                'processed_by': {
-                    'id': processed_by.id if processed_by else None,
-                    'name': processed_by.get_full_name() if processed_by else None,
-                    'username': processed_by.username if processed_by else None,
-                } if processed_by else None,
-                'billing_items': billing_items_summary,
-                'billing_items_count': BillingLineItem.objects.filter(visit=visit, bill_status='PAID').count() if visit else 0,
-            })
-        
         # Store detailed breakdown
         reconciliation.reconciliation_details = {
             'visits': {
                 'total': reconciliation.total_visits,
                 'active_closed': reconciliation.active_visits_closed,
-                'by_status': dict(visits.values('status').annotate(
-                    count=Count('id')
-                ).values_list('status', 'count')),
-            },
-            'billing': {
-                'total_items': billing_items.count(),
-                'paid_items': billing_items.filter(bill_status='PAID').count(),
-                'pending_items': billing_items.filter(bill_status='PENDING').count(),
-                'partially_paid_items': billing_items.filter(bill_status='PARTIALLY_PAID').count(),
+                'by_status': visits_by_status,
             },
+            'billing': billing_stats,
             'payment_methods': reconciliation.get_payment_method_breakdown(),
             'outstanding': {
                 'amount': float(reconciliation.total_outstanding),
@@ -389,8 +259,174 @@ class ReconciliationService:
             },
         }
         
+        logger.info(
+            f"Reconciliation for {reconciliation_date}: {payment_count} payment(s), "
+            f"revenue NGN {reconciliation.total_revenue}, "
+            f"{reconciliation.outstanding_visits_count} visit(s) with NGN {outstanding_amount} outstanding"
+        )
+        
         reconciliation.save()
     
+    @staticmethod
+    def _outstanding_details(outstanding_items) -> list:
+        """Outstanding line items grouped by visit (one query)."""
+        rows = outstanding_items.order_by('visit_id', 'id').values(
+            'id', 'visit_id', 'source_service_name', 'source_service_code',
+            'amount', 'amount_paid', 'outstanding_amount', 'bill_status',
+            'visit__status', 'visit__patient_id', 'visit__patient__first_name',
+            'visit__patient__last_name', 'visit__patient__patient_id',
+        )
+        
+        by_visit = {}
+        for row in rows:
+            visit_entry = by_visit.get(row['visit_id'])
+            if visit_entry is None:
+                visit_entry = by_visit[row['visit_id']] = {
+                    'visit_id': row['visit_id'],
+                    'visit_status': row['visit__status'],
+                    'patient': {
+                        'id': row['visit__patient_id'],
+                        'name': f"{row['visit__patient__first_name']} {row['visit__patient__last_name']}".strip(),
+                        'mrn': row['visit__patient__patient_id'],
+                    } if row['visit__patient_id'] else None,
+                    'total_outstanding': Decimal('0.00'),
+                    'items': [],
+                }
+            visit_entry['total_outstanding'] += row['outstanding_amount']
+            visit_entry['items'].append({
+                'id': row['id'],
+                'service_name': row['source_service_name'],
+                'service_code': row['source_service_code'],
+                'amount': float(row['amount']),
+                'amount_paid': float(row['amount_paid']),
+                'outstanding_amount': float(row['outstanding_amount']),
+                'bill_status': row['bill_status'],
+            })
+        
+        details = list(by_visit.values())
+        for visit_entry in details:
+            visit_entry['total_outstanding'] = float(visit_entry['total_outstanding'])
+        return details
+    
+    @staticmethod
+    def _payment_details(payments) -> list:
+        """Per-payment detail with the paid services of its visit (two queries)."""
+        rows = list(payments.order_by('id').values(
+            'id', 'amount', 'payment_method', 'status', 'transaction_reference', 'notes', 'created_at',
+            'visit_id', 'visit__status', 'visit__created_at', 'visit__payment_type',
+            'visit__patient_id', 'visit__patient__first_name', 'visit__patient__last_name',
+            'visit__patient__patient_id', 'visit__patient__phone',
+            'processed_by_id', 'processed_by__first_name', 'processed_by__last_name', 'processed_by__username',
+        ))
+        
+        # Paid services per visit: first 10 for display, plus the full count
+        paid_items = {}
+        paid_counts = {}
+        visit_ids = {row['visit_id'] for row in rows}
+        if visit_ids:
+            for item in BillingLineItem.objects.filter(
+                visit_id__in=visit_ids, bill_status='PAID'
+            ).order_by('visit_id', 'id').values('visit_id', 'source_service_name', 'amount', 'payment_method'):
+                paid_counts[item['visit_id']] = paid_counts.get(item['visit_id'], 0) + 1
+                items = paid_items.setdefault(item['visit_id'], [])
+                if len(items) < 10:  # Limit to 10 items to avoid huge payload
+                    items.append(item)
+        
+        details = []
+        for row in rows:
+            details.append({
+                'id': row['id'],
+                'amount': float(row['amount']),
+                'payment_method': row['payment_method'],
+                'status': row['status'],
+                'transaction_reference': row['transaction_reference'] or None,
+                'notes': row['notes'] or None,
+                'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+                'visit': {
+                    'id': row['visit_id'],
+                    'status': row['visit__status'],
+                    'created_at': row['visit__created_at'].isoformat() if row['visit__created_at'] else None,
+                    'payment_type': row['visit__payment_type'],
+                },
+                'patient': {
+                    'id': row['visit__patient_id'],
+                    'name': f"{row['visit__patient__first_name']} {row['visit__patient__last_name']}".strip(),
+                    'mrn': row['visit__patient__patient_id'],
+                    'phone': row['visit__patient__phone'],
+                } if row['visit__patient_id'] else None,
+                'processed_by': {
+                    'id': row['processed_by_id'],
+                    'name': f"{row['processed_by__first_name']} {row['processed_by__last_name']}".strip(),
+                    'username': row['processed_by__username'],
+                } if row['processed_by_id'] else None,
+                'billing_items': [
+                    {
+                        'service_name': item['source_service_name'],
+                        'amount': float(item['amount']),
+                        'payment_method': item['payment_method'] or row['payment_method'],
+                    }
+                    for item in paid_items.get(row['visit_id'], [])
+                ],
+                'billing_items_count': paid_counts.get(row['visit_id'], 0),
+            })
+        return details
+    
+    @staticmethod
+    def _sync_intraday_totals(reconciliation_date: date, method_totals: dict):
+        """
+        Make the running DailyPaymentTotal rows match the authoritative totals.
+        
+        They only drift when payments change without signals (bulk updates,
+        raw SQL); that is logged and the rows are rewritten.
+        """
+        current = {
+            row.payment_method: (row.payment_count, row.total_amount)
+            for row in DailyPaymentTotal.objects.filter(date=reconciliation_date)
+        }
+        expected = {method: (count, Decimal(total)) for method, (count, total) in method_totals.items()}
+        if {m: v for m, v in current.items() if v[0] or v[1]} == expected:
+            return
+        
+        logger.warning(f"Intraday payment totals for {reconciliation_date} had drifted; rebuilding")
+        DailyPaymentTotal.objects.filter(date=reconciliation_date).delete()
+        DailyPaymentTotal.objects.bulk_create([
+            DailyPaymentTotal(
+                date=reconciliation_date, payment_method=method, payment_count=count, total_amount=total,
+            )
+            for method, (count, total) in expected.items()
+        ])
+    
+    @staticmethod
+    def get_intraday_totals(reconciliation_date: date = None) -> dict:
+        """
+        Running revenue totals for a day, from the event-maintained snapshot.
+        
+        One small query; suitable for dashboards polled throughout the day.
+        """
+        if reconciliation_date is None:
+            reconciliation_date = timezone.localdate()
+        
+        totals = {bucket: Decimal('0.00') for bucket in ('cash', 'wallet', 'paystack', 'hmo', 'insurance')}
+        payment_count = 0
+        last_updated = None
+        for row in DailyPaymentTotal.objects.filter(date=reconciliation_date):
+            payment_count += row.payment_count
+            bucket = PAYMENT_METHOD_BUCKETS.get(row.payment_method)
+            if bucket:
+                totals[bucket] += row.total_amount
+                if row.payment_method == 'INSURANCE':
+                    totals['insurance'] += row.total_amount
+            if last_updated is None or row.updated_at > last_updated:
+                last_updated = row.updated_at
+        
+        return {
+            'date': str(reconciliation_date),
+            'total_revenue': float(totals['cash'] + totals['wallet'] + totals['paystack'] + totals['hmo']),
+            'payment_methods': {bucket: float(amount) for bucket, amount in totals.items()},
+            'payment_count': payment_count,
+            'updated_at': last_updated.isoformat() if last_updated else None,
+        }
+    
     @staticmethod
     @transaction.atomic
     def refresh_reconciliation(reconciliation_id: int) -> EndOfDayReconciliation:
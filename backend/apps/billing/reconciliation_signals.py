@@ -0,0 +1,85 @@
+"""
+Intraday reconciliation totals - kept current from payment events.
+
+Every Payment save/delete moves its contribution between DailyPaymentTotal
+rows with F-expression deltas, so the running totals for a day are always
+one small query away and closing the day does not need to scan payments.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Payment
+from .reconciliation_models import DailyPaymentTotal
+
+logger = logging.getLogger(__name__)
+
+# Payment statuses that count towards the day's revenue
+COUNTED_STATUSES = ('CLEARED', 'PARTIAL')
+
+
+def payment_contribution(payment):
+    """(date, method, amount) a payment adds to the daily totals, or None."""
+    if payment.status not in COUNTED_STATUSES or payment.created_at is None or payment.amount is None:
+        return None
+    return (timezone.localdate(payment.created_at), payment.payment_method, Decimal(payment.amount))
+
+
+def apply_payment_delta(day, method, count_delta, amount_delta):
+    """Add a delta to one day/method row, creating the row if needed."""
+    updated = DailyPaymentTotal.objects.filter(date=day, payment_method=method).update(
+        payment_count=F('payment_count') + count_delta,
+        total_amount=F('total_amount') + amount_delta,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            DailyPaymentTotal.objects.create(
+                date=day, payment_method=method, payment_count=count_delta, total_amount=amount_delta,
+            )
+    except IntegrityError:
+        # Created concurrently; apply the delta to that row
+        apply_payment_delta(day, method, count_delta, amount_delta)
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_contribution(sender, instance, **kwargs):
+    """Remember what the loaded payment currently contributes (no query)."""
+    instance._reconciliation_contribution = payment_contribution(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Payment)
+def update_daily_payment_totals(sender, instance, created, raw=False, **kwargs):
+    """Move the payment's contribution when it is created or changes."""
+    if raw:
+        return
+    old = getattr(instance, '_reconciliation_contribution', None)
+    new = payment_contribution(instance)
+    if old == new:
+        return
+    try:
+        # Savepoint: a failed delta rolls back only itself, not the caller's payment
+        with transaction.atomic():
+            if old is not None:
+                apply_payment_delta(old[0], old[1], -1, -old[2])
+            if new is not None:
+                apply_payment_delta(new[0], new[1], 1, new[2])
+    except Exception as e:
+        # Totals are re-verified at reconciliation; never fail the payment
+        logger.error(f"Error updating daily payment totals for payment {instance.pk}: {e}")
+    instance._reconciliation_contribution = new
+
+
+@receiver(post_delete, sender=Payment)
+def remove_from_daily_payment_totals(sender, instance, **kwargs):
+    """Take a deleted payment out of the daily totals."""
+    old = getattr(instance, '_reconciliation_contribution', None)
+    if old is not None:
+        apply_payment_delta(old[0], old[1], -1, -old[2])
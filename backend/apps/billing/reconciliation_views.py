@@ -2,6 +2,7 @@
 API views for End-of-Day Reconciliation.
 """
 import logging
+from datetime import date
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -201,6 +202,25 @@ class EndOfDayReconciliationViewSet(viewsets.ModelViewSet):
         serializer = EndOfDayReconciliationSerializer(reconciliation)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def intraday(self, request):
+        """
+        Running revenue totals for a day (defaults to today).
+        
+        Served from totals kept current by payment events, so it is cheap
+        to poll. Query param: date=YYYY-MM-DD.
+        """
+        reconciliation_date = None
+        if request.query_params.get('date'):
+            try:
+                reconciliation_date = date.fromisoformat(request.query_params['date'])
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid date. Use YYYY-MM-DD.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return Response(ReconciliationService.get_intraday_totals(reconciliation_date))
+    
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get summary of all reconciliations."""
@@ -2,12 +2,14 @@
 Shared logic for importing ServiceCatalog from CSV, Excel, or JSON.
 Used by both the management command and the web API.
 """
-from decimal import Decimal, InvalidOperation
 from django.db import transaction
-from django.core.exceptions import ValidationError
 
+from core.lazy_imports import lazy_import
+from core.tabular_import import BulkUpsert, TabularFrame
 from .service_catalog_models import ServiceCatalog
 
+pd = lazy_import('pandas')
+
 FIELD_MAPPINGS = {
     'department': ['department', 'dept', 'department_name'],
     'service_code': ['service code', 'service_code', 'servicecode', 'code', 'sku', 'item_code'],
@@ -24,6 +26,44 @@ FIELD_MAPPINGS = {
     'is_active': ['is active', 'is_active', 'active'],
 }
 
+VALID_DEPARTMENTS = [c[0] for c in ServiceCatalog.DEPARTMENT_CHOICES]
+VALID_CATEGORIES = [c[0] for c in ServiceCatalog.CATEGORY_CHOICES]
+VALID_WORKFLOW_TYPES = [c[0] for c in ServiceCatalog.WORKFLOW_TYPE_CHOICES]
+VALID_ROLES = ['ADMIN', 'DOCTOR', 'NURSE', 'LAB_TECH', 'RADIOLOGY_TECH', 'PHARMACIST', 'RECEPTIONIST', 'PATIENT']
+
+DEFAULT_CATEGORY = {
+    'CONSULTATION': 'CONSULTATION',
+    'LAB': 'LAB',
+    'PHARMACY': 'DRUG',
+    'RADIOLOGY': 'RADIOLOGY',
+    'PROCEDURE': 'PROCEDURE',
+}
+
+DEFAULT_WORKFLOW_TYPE = {
+    'CONSULTATION': 'GOPD_CONSULT',
+    'LAB': 'LAB_ORDER',
+    'PHARMACY': 'DRUG_DISPENSE',
+    'RADIOLOGY': 'RADIOLOGY_STUDY',
+    'PROCEDURE': 'PROCEDURE',
+}
+
+# Normalize common workflow_type variations
+WORKFLOW_ALIASES = {
+    'PROCEDURE ORDER': 'PROCEDURE',
+    'DENTAL': 'PROCEDURE',
+    'IVF ORDER': 'DRUG_DISPENSE',
+    'CONSUMABLE ORDER': 'DRUG_DISPENSE',
+    'LAB ORDER': 'LAB_ORDER',
+    'DRUG DISPENSE': 'DRUG_DISPENSE',
+    'RADIOLOGY STUDY': 'RADIOLOGY_STUDY',
+    'GOPD CONSULT': 'GOPD_CONSULT',
+}
+
+SERVICE_FIELDS = [
+    'department', 'service_code', 'name', 'amount', 'description', 'category', 'workflow_type',
+    'requires_visit', 'requires_consultation', 'auto_bill', 'bill_timing', 'allowed_roles', 'is_active',
+]
+
 
 def _normalize_field_name(field_name):
     if not field_name:
@@ -37,19 +77,6 @@ def _normalize_field_name(field_name):
     return None
 
 
-def _parse_boolean(value, default=None):
-    if value is None or value == '':
-        return default
-    if isinstance(value, bool):
-        return value
-    s = str(value).strip().lower()
-    if s in ['true', '1', 'yes', 'y', 't']:
-        return True
-    if s in ['false', '0', 'no', 'n', 'f']:
-        return False
-    return default
-
-
 def _parse_allowed_roles(value):
     if not value:
         return []
@@ -150,10 +177,16 @@ def _normalize_department(raw_department: str) -> tuple[str, str]:
 
 def import_services(data: list, update_existing: bool = False, dry_run: bool = False) -> dict:
     """
-    Import services from a list of row dicts (e.g. from pandas df.to_dict('records')).
-    Returns stats: {total, created, updated, skipped, errors}.
+    Import services from a list of row dicts (e.g. from pandas df.to_dict('records')) or a DataFrame.
+
+    Columns are validated as a whole, existing services are fetched in a few
+    IN queries and changes are written with bulk_create/bulk_update.
+    Returns stats: {total, created, updated, unchanged, skipped, errors}; dry
+    runs also return a diff of the rows that would be created or changed.
     """
-    stats = {'total': len(data), 'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+    if isinstance(data, pd.DataFrame):
+        data = data.to_dict('records')
+    stats = {'total': len(data), 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': []}
 
     # Upfront check: if first row lacks required fields, likely column/delimiter mismatch
     if data:
@@ -176,176 +209,87 @@ def import_services(data: list, update_existing: bool = False, dry_run: bool = F
             stats['skipped'] = len(data)
             return stats  # Skip processing to avoid hundreds of duplicate errors
 
+    frame = TabularFrame(data, FIELD_MAPPINGS)
+
+    raw_department = frame.text('department')
+    mapped = raw_department.map({value: _normalize_department(value) for value in raw_department.unique()})
+    department = mapped.str[0]
+    lab_subsection = mapped.str[1]
+    service_code = frame.text('service_code')
+    name = frame.text('name')
+    amount, invalid_amount = frame.decimal('amount', thousands_separator=False)
+
+    frame.reject(department == '', "Missing 'department'")
+    frame.reject(service_code == '', "Missing 'service_code'")
+    frame.reject(name == '', "Missing 'name'")
+    frame.reject(invalid_amount, "Invalid amount '" + frame.text('amount') + "'")
+    frame.reject(amount.map(lambda value: value is None or value <= 0), "Amount must be greater than zero")
+    frame.reject(
+        ~department.isin(VALID_DEPARTMENTS),
+        "Invalid department '" + raw_department + "'. "
+        f"Must be one of: {', '.join(VALID_DEPARTMENTS)} "
+        "(lab sub-disciplines such as HEMATOLOGY or CHEMICAL PATHOLOGY are accepted)",
+    )
+
+    category = frame.text('category', upper=True)
+    category = category.mask(category == '', department.map(DEFAULT_CATEGORY).fillna('CONSULTATION'))
+    frame.reject(
+        ~category.isin(VALID_CATEGORIES),
+        "Invalid category '" + category + f"'. Must be one of: {', '.join(VALID_CATEGORIES)}",
+    )
+
+    workflow_type = frame.text('workflow_type', upper=True)
+    workflow_type = workflow_type.mask(workflow_type == '', department.map(DEFAULT_WORKFLOW_TYPE).fillna('OTHER'))
+    workflow_type = workflow_type.replace(WORKFLOW_ALIASES)
+    frame.reject(
+        ~workflow_type.isin(VALID_WORKFLOW_TYPES),
+        "Invalid workflow_type '" + workflow_type + f"'. Must be one of: {', '.join(VALID_WORKFLOW_TYPES)}",
+    )
+
+    if frame.has_column('allowed_roles'):
+        allowed_roles = frame.df['allowed_roles'].map(
+            lambda value: value if isinstance(value, list) else (value if pd.notna(value) else '')
+        ).map(_parse_allowed_roles)
+    else:
+        allowed_roles = pd.Series([[] for _ in range(len(frame))], index=frame.df.index, dtype=object)
+    allowed_roles = allowed_roles.map(lambda roles: roles or ['DOCTOR'])
+    invalid_roles = allowed_roles.map(lambda roles: [r for r in roles if r not in VALID_ROLES])
+    frame.reject(
+        invalid_roles.map(bool),
+        "Invalid roles: " + invalid_roles.map(', '.join) + f". Valid: {', '.join(VALID_ROLES)}",
+    )
+
+    description = frame.text('description')
+    prefix = '[' + lab_subsection + ']'
+    description = description.mask(
+        lab_subsection != '',
+        (prefix + ' ' + description).str.strip(),
+    )
+    bill_timing = frame.text('bill_timing', upper=True)
+    bill_timing = bill_timing.where(bill_timing.isin(['BEFORE', 'AFTER']), 'AFTER')
+
+    records = frame.records({
+        'department': department,
+        'service_code': service_code,
+        'name': name,
+        'amount': amount,
+        'description': description,
+        'category': category,
+        'workflow_type': workflow_type,
+        'requires_visit': frame.boolean('requires_visit', default=True),
+        'requires_consultation': frame.boolean('requires_consultation', default=False),
+        'auto_bill': frame.boolean('auto_bill', default=True),
+        'bill_timing': bill_timing,
+        'allowed_roles': allowed_roles,
+        'is_active': frame.boolean('is_active', default=True),
+    })
+
     with transaction.atomic():
-        for index, row in enumerate(data, start=1):
-            try:
-                normalized_row = {}
-                for key, value in row.items():
-                    nk = _normalize_field_name(key)
-                    if nk:
-                        normalized_row[nk] = value
-
-                raw_department = str(normalized_row.get('department', '')).strip()
-                department, lab_subsection = _normalize_department(raw_department)
-                service_code = str(normalized_row.get('service_code', '')).strip()
-                name = str(normalized_row.get('name', '')).strip()
-                amount_str = str(normalized_row.get('amount', '0'))
-                category = str(normalized_row.get('category', '')).strip().upper()
-                workflow_type = str(normalized_row.get('workflow_type', '')).strip().upper()
-                allowed_roles_str = normalized_row.get('allowed_roles', '')
-
-                if not department:
-                    stats['errors'].append(f"Row {index}: Missing 'department'")
-                    stats['skipped'] += 1
-                    continue
-                if not service_code:
-                    stats['errors'].append(f"Row {index}: Missing 'service_code'")
-                    stats['skipped'] += 1
-                    continue
-                if not name:
-                    stats['errors'].append(f"Row {index}: Missing 'name'")
-                    stats['skipped'] += 1
-                    continue
-
-                try:
-                    amount = Decimal(amount_str)
-                    if amount <= 0:
-                        stats['errors'].append(f"Row {index}: Amount must be greater than zero")
-                        stats['skipped'] += 1
-                        continue
-                except (InvalidOperation, ValueError):
-                    stats['errors'].append(f"Row {index}: Invalid amount '{amount_str}'")
-                    stats['skipped'] += 1
-                    continue
-
-                description = str(normalized_row.get('description', '')).strip()
-                if lab_subsection:
-                    prefix = f'[{lab_subsection}]'
-                    description = f'{prefix} {description}'.strip() if description else prefix
-                requires_visit = _parse_boolean(normalized_row.get('requires_visit'), default=True)
-                requires_consultation = _parse_boolean(normalized_row.get('requires_consultation'), default=False)
-                auto_bill = _parse_boolean(normalized_row.get('auto_bill'), default=True)
-                bill_timing = str(normalized_row.get('bill_timing', 'AFTER')).strip().upper()
-                is_active = _parse_boolean(normalized_row.get('is_active'), default=True)
-                allowed_roles = _parse_allowed_roles(allowed_roles_str)
-
-                valid_depts = [c[0] for c in ServiceCatalog.DEPARTMENT_CHOICES]
-                if department not in valid_depts:
-                    stats['errors'].append(
-                        f"Row {index}: Invalid department '{raw_department}'. "
-                        f"Must be one of: {', '.join(valid_depts)} "
-                        f"(lab sub-disciplines such as HEMATOLOGY or CHEMICAL PATHOLOGY are accepted)"
-                    )
-                    stats['skipped'] += 1
-                    continue
-
-                if not category:
-                    category_map = {
-                        'CONSULTATION': 'CONSULTATION',
-                        'LAB': 'LAB',
-                        'PHARMACY': 'DRUG',
-                        'RADIOLOGY': 'RADIOLOGY',
-                        'PROCEDURE': 'PROCEDURE',
-                    }
-                    category = category_map.get(department, 'CONSULTATION')
-                valid_cats = [c[0] for c in ServiceCatalog.CATEGORY_CHOICES]
-                if category not in valid_cats:
-                    stats['errors'].append(
-                        f"Row {index}: Invalid category '{category}'. Must be one of: {', '.join(valid_cats)}"
-                    )
-                    stats['skipped'] += 1
-                    continue
-
-                if not workflow_type:
-                    workflow_map = {
-                        'CONSULTATION': 'GOPD_CONSULT',
-                        'LAB': 'LAB_ORDER',
-                        'PHARMACY': 'DRUG_DISPENSE',
-                        'RADIOLOGY': 'RADIOLOGY_STUDY',
-                        'PROCEDURE': 'PROCEDURE',
-                    }
-                    workflow_type = workflow_map.get(department, 'OTHER')
-                # Normalize common workflow_type variations
-                workflow_aliases = {
-                    'PROCEDURE ORDER': 'PROCEDURE',
-                    'DENTAL': 'PROCEDURE',
-                    'IVF ORDER': 'DRUG_DISPENSE',
-                    'CONSUMABLE ORDER': 'DRUG_DISPENSE',
-                    'LAB ORDER': 'LAB_ORDER',
-                    'DRUG DISPENSE': 'DRUG_DISPENSE',
-                    'RADIOLOGY STUDY': 'RADIOLOGY_STUDY',
-                    'GOPD CONSULT': 'GOPD_CONSULT',
-                }
-                workflow_type = workflow_aliases.get(workflow_type, workflow_type)
-                valid_wf = [c[0] for c in ServiceCatalog.WORKFLOW_TYPE_CHOICES]
-                if workflow_type not in valid_wf:
-                    stats['errors'].append(
-                        f"Row {index}: Invalid workflow_type '{workflow_type}'. Must be one of: {', '.join(valid_wf)}"
-                    )
-                    stats['skipped'] += 1
-                    continue
-
-                if bill_timing not in ['BEFORE', 'AFTER']:
-                    bill_timing = 'AFTER'
-
-                if not allowed_roles:
-                    allowed_roles = ['DOCTOR']
-                valid_roles = ['ADMIN', 'DOCTOR', 'NURSE', 'LAB_TECH', 'RADIOLOGY_TECH', 'PHARMACIST', 'RECEPTIONIST', 'PATIENT']
-                invalid_roles = [r for r in allowed_roles if r not in valid_roles]
-                if invalid_roles:
-                    stats['errors'].append(
-                        f"Row {index}: Invalid roles: {', '.join(invalid_roles)}. Valid: {', '.join(valid_roles)}"
-                    )
-                    stats['skipped'] += 1
-                    continue
-
-                existing = ServiceCatalog.objects.filter(service_code=service_code).first()
-                service_data = {
-                    'department': department,
-                    'service_code': service_code,
-                    'name': name,
-                    'amount': amount,
-                    'description': description,
-                    'category': category,
-                    'workflow_type': workflow_type,
-                    'requires_visit': requires_visit,
-                    'requires_consultation': requires_consultation,
-                    'auto_bill': auto_bill,
-                    'bill_timing': bill_timing,
-                    'allowed_roles': allowed_roles,
-                    'is_active': is_active,
-                }
-
-                if existing:
-                    if update_existing:
-                        if not dry_run:
-                            try:
-                                for k, v in service_data.items():
-                                    setattr(existing, k, v)
-                                existing.full_clean()
-                                existing.save()
-                            except ValidationError as e:
-                                stats['errors'].append(f"Row {index}: Validation error: {str(e)}")
-                                stats['skipped'] += 1
-                                continue
-                        stats['updated'] += 1
-                    else:
-                        stats['skipped'] += 1
-                else:
-                    if not dry_run:
-                        try:
-                            ServiceCatalog.objects.create(**service_data)
-                        except ValidationError as e:
-                            stats['errors'].append(f"Row {index}: Validation error: {str(e)}")
-                            stats['skipped'] += 1
-                            continue
-                    stats['created'] += 1
-
-            except Exception as e:
-                stats['errors'].append(f"Row {index}: {str(e)}")
-                stats['skipped'] += 1
-
-        if dry_run:
-            transaction.set_rollback(True)
+        result = BulkUpsert(ServiceCatalog, key='service_code', fields=SERVICE_FIELDS).run(
+            records, update_existing=update_existing, dry_run=dry_run,
+        )
 
+    stats.update({key: value for key, value in result.items() if key not in ('skipped', 'errors')})
+    stats['skipped'] = frame.error_count + result['skipped']
+    stats['errors'] = frame.errors() + result['errors']
     return stats
@@ -2,7 +2,6 @@
 Web API for importing Service Catalog from Excel or CSV files.
 Upload Excel/CSV → merge with existing ServiceCatalog (create new, update existing by service_code).
 """
-import pandas as pd
 from io import BytesIO
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -10,8 +9,12 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.exceptions import ValidationError as DRFValidationError
 
+from core.lazy_imports import lazy_import
+
 from .service_catalog_import import import_services
 
+pd = lazy_import('pandas')
+
 
 class ServiceCatalogImportView(APIView):
     """
@@ -25,6 +28,7 @@ class ServiceCatalogImportView(APIView):
     - file: Excel (.xlsx, .xls) or CSV (.csv)
     - update: true|false (default: false) — update existing services by service_code
     - sheet: Sheet name or index (default: 0) — Excel only
+    - dry_run: true|false (default: false) — validate and return the diff without saving
     """
     permission_classes = [IsAuthenticated, IsAdminUser]
 
@@ -47,6 +51,7 @@ class ServiceCatalogImportView(APIView):
             )
 
         update_existing = request.data.get('update', 'false').lower() == 'true'
+        dry_run = request.data.get('dry_run', 'false').lower() == 'true'
         sheet = request.data.get('sheet', 0)
         if isinstance(sheet, str) and sheet.isdigit():
             sheet = int(sheet)
@@ -69,9 +74,9 @@ class ServiceCatalogImportView(APIView):
         if not data:
             raise DRFValidationError("File has no data rows.")
 
-        stats = import_services(data, update_existing=update_existing, dry_run=False)
+        stats = import_services(data, update_existing=update_existing, dry_run=dry_run)
 
-        msg = (
+        msg = ('Dry run - ' if dry_run else '') + (
             f"Created: {stats['created']}, Updated: {stats['updated']}, Skipped: {stats['skipped']}"
             + (f". Errors: {len(stats['errors'])}" if stats['errors'] else "")
         )
@@ -3,10 +3,8 @@ Web-based service import from Excel files.
 
 Allows Receptionists to upload Excel files and import services directly through the API.
 """
-import pandas as pd
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.db import transaction
-from decimal import Decimal, InvalidOperation
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -22,6 +20,10 @@ from apps.billing.price_lists import (
 )
 from .permissions import CanProcessPayment
 from core.audit import AuditLog
+from core.lazy_imports import lazy_import
+from core.tabular_import import BulkUpsert, TabularFrame
+
+pd = lazy_import('pandas')
 
 # Map department names to models
 DEPARTMENT_MODELS = {
@@ -31,6 +33,16 @@ DEPARTMENT_MODELS = {
     'PROCEDURE': ProcedureServicePriceList,
 }
 
+PRICE_LIST_FIELDS = {
+    'department': ['department'],
+    'service_code': ['service code'],
+    'service_name': ['service name'],
+    'amount': ['amount'],
+    'description': ['description'],
+}
+
+PRICE_LIST_UPDATE_FIELDS = ['service_name', 'amount', 'description', 'is_active']
+
 
 class ImportServicesView(APIView):
     """
@@ -129,90 +141,50 @@ class ImportServicesView(APIView):
             'total': len(df),
             'created': 0,
             'updated': 0,
+            'unchanged': 0,
             'skipped': 0,
             'errors': []
         }
         
         try:
+            frame = TabularFrame(df, PRICE_LIST_FIELDS, first_row=2)
+            department = frame.text('department', upper=True)
+            service_code = frame.text('service_code')
+            service_name = frame.text('service_name')
+            amount, invalid_amount = frame.decimal('amount', thousands_separator=False)
+            
+            frame.reject(invalid_amount | amount.isna(), "Invalid amount '" + frame.text('amount') + "'")
+            frame.reject(
+                ~department.isin(list(DEPARTMENT_MODELS)),
+                "Invalid department '" + department + f"'. Must be one of: {', '.join(DEPARTMENT_MODELS.keys())}",
+            )
+            frame.reject(service_code == '', "Service code is required")
+            frame.reject(service_name == '', "Service name is required")
+            frame.reject(amount.map(lambda value: value is not None and value <= 0), "Amount must be greater than zero")
+            description = frame.text('description')
+            stats['skipped'] = frame.error_count
+            stats['errors'] = frame.errors()
+            
             with transaction.atomic():
-                for index, row in df.iterrows():
-                    try:
-                        # Extract data
-                        department = str(row['DEPARTMENT']).strip().upper()
-                        service_code = str(row['SERVICE CODE']).strip()
-                        service_name = str(row['SERVICE NAME']).strip()
-                        
-                        # Parse amount
-                        try:
-                            amount = Decimal(str(row['AMOUNT']))
-                        except (InvalidOperation, ValueError):
-                            stats['errors'].append(
-                                f"Row {index + 2}: Invalid amount '{row['AMOUNT']}'"
-                            )
-                            stats['skipped'] += 1
-                            continue
-                        
-                        # Get description if available
-                        description = ''
-                        if 'DESCRIPTION' in df.columns:
-                            description = str(row['DESCRIPTION']).strip() if pd.notna(row['DESCRIPTION']) else ''
-                        
-                        # Validate department
-                        if department not in DEPARTMENT_MODELS:
-                            stats['errors'].append(
-                                f"Row {index + 2}: Invalid department '{department}'. "
-                                f"Must be one of: {', '.join(DEPARTMENT_MODELS.keys())}"
-                            )
-                            stats['skipped'] += 1
-                            continue
-                        
-                        # Validate required fields
-                        if not service_code:
-                            stats['errors'].append(f"Row {index + 2}: Service code is required")
-                            stats['skipped'] += 1
-                            continue
-                        
-                        if not service_name:
-                            stats['errors'].append(f"Row {index + 2}: Service name is required")
-                            stats['skipped'] += 1
-                            continue
-                        
-                        if amount <= 0:
-                            stats['errors'].append(
-                                f"Row {index + 2}: Amount must be greater than zero"
-                            )
-                            stats['skipped'] += 1
-                            continue
-                        
-                        # Get model for department
-                        Model = DEPARTMENT_MODELS[department]
-                        
-                        # Check if service already exists
-                        existing = Model.objects.filter(service_code=service_code).first()
-                        
-                        if existing:
-                            if update_existing:
-                                existing.service_name = service_name
-                                existing.amount = amount
-                                existing.description = description
-                                existing.is_active = True
-                                existing.save()
-                                stats['updated'] += 1
-                            else:
-                                stats['skipped'] += 1
-                        else:
-                            Model.objects.create(
-                                service_code=service_code,
-                                service_name=service_name,
-                                amount=amount,
-                                description=description,
-                                is_active=True
-                            )
-                            stats['created'] += 1
-                    
-                    except Exception as e:
-                        stats['errors'].append(f"Row {index + 2}: {str(e)}")
-                        stats['skipped'] += 1
+                # One prefetch and bulk write per department price list
+                for dept, Model in DEPARTMENT_MODELS.items():
+                    records = frame.records({
+                        'service_code': service_code,
+                        'service_name': service_name,
+                        'amount': amount,
+                        'description': description,
+                        'is_active': True,
+                    }, where=department == dept)
+                    if not records:
+                        continue
+                    result = BulkUpsert(Model, key='service_code', fields=PRICE_LIST_UPDATE_FIELDS).run(
+                        records, update_existing=update_existing,
+                    )
+                    stats['created'] += result['created']
+                    stats['updated'] += result['updated']
+                    stats['unchanged'] += result['unchanged']
+                    stats['skipped'] += result['skipped']
+                    stats['errors'] += result['errors']
             
             # Audit log
             user_role = getattr(request.user, 'role', None) or \
@@ -49,6 +49,21 @@ def log_clinical_action(user, action, visit_id, resource_type, resource_id, requ
     )
 
 
+def create_vital_signs_alerts(visit, vital_signs):
+    """Create a ClinicalAlert for each abnormal flag of a vital signs record."""
+    for flag in vital_signs.get_abnormal_flags():
+        severity = 'CRITICAL' if flag in ['HYPOTENSION', 'HYPOXIA', 'FEVER'] else 'HIGH'
+        ClinicalAlert.objects.create(
+            visit=visit,
+            alert_type='VITAL_SIGNS',
+            severity=severity,
+            title=f"Abnormal Vital Sign: {flag}",
+            message=f"Vital signs recorded show {flag}. Please review.",
+            related_resource_type='vital_signs',
+            related_resource_id=vital_signs.id,
+        )
+
+
 class VitalSignsViewSet(viewsets.ModelViewSet):
     """
     ViewSet for Vital Signs.
@@ -168,19 +183,7 @@ class VitalSignsViewSet(viewsets.ModelViewSet):
         )
         
         # Check for abnormal values and create alerts
-        abnormal_flags = vital_signs.get_abnormal_flags()
-        if abnormal_flags:
-            for flag in abnormal_flags:
-                severity = 'CRITICAL' if flag in ['HYPOTENSION', 'HYPOXIA', 'FEVER'] else 'HIGH'
-                ClinicalAlert.objects.create(
-                    visit=visit,
-                    alert_type='VITAL_SIGNS',
-                    severity=severity,
-                    title=f"Abnormal Vital Sign: {flag}",
-                    message=f"Vital signs recorded show {flag}. Please review.",
-                    related_resource_type='vital_signs',
-                    related_resource_id=vital_signs.id,
-                )
+        create_vital_signs_alerts(visit, vital_signs)
         
         # Audit log
         log_clinical_action(
@@ -2,6 +2,9 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from apps.core.validators import validate_visit_required
 
+# Registers DiagnosisCode with the app, so lazy references (signal senders) resolve at startup
+from .diagnosis_models import DiagnosisCode
+
 
 class Consultation(models.Model):
     """
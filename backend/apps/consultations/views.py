@@ -27,6 +27,7 @@ from django.shortcuts import get_object_or_404
 from .models import Consultation
 from .serializers import ConsultationSerializer, ConsultationWithCodesSerializer
 from apps.visits.models import Visit
+from apps.patients.medical_history import append_medical_history
 from core.permissions import (
     IsDoctor,
     IsVisitOpen,
@@ -146,15 +147,15 @@ class ConsultationViewSet(viewsets.ModelViewSet):
         
         consultation_entry.append(f"\n{'='*60}\n")
         
-        # Append to patient's medical history
-        new_entry = "\n".join(consultation_entry)
-        if patient.medical_history:
-            patient.medical_history += new_entry
-        else:
-            patient.medical_history = new_entry
-        
-        # Save patient (this updates the medical_history field)
-        patient.save(update_fields=['medical_history'])
+        # Append to patient's medical history (one segment, the patient row is untouched)
+        append_medical_history(
+            patient,
+            "\n".join(consultation_entry),
+            source='consultation',
+            source_id=consultation.pk,
+            visit_id=visit.id,
+            recorded_at=timestamp,
+        )
     
     def perform_create(self, serializer):
         """
@@ -7,17 +7,31 @@ are locked and explaining why they are blocked.
 Key Principles:
 - No silent failures: Every lock must have an explanation
 - Deterministic: Same inputs always produce same lock status
-- Auditable: All lock evaluations are logged
+- Auditable: Lock evaluations are logged (sampled, at DEBUG level)
 - Human-readable: Lock messages explain the issue clearly
+
+A screen evaluates all of its locks in one call with
+LockEvaluator.evaluate_batch(): the visits, consultations and orders the
+actions refer to are loaded once into a shared LockContext, and every
+result carries an ETag so unchanged locks can be skipped by the client.
 """
+import hashlib
+import inspect
+import json
 import logging
+import random
 from typing import Dict, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
+from django.apps import apps
+from django.conf import settings
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+# Fraction of evaluations written to the DEBUG log (EMR_SETTINGS['LOCK_EVALUATION_LOG_SAMPLE_RATE'])
+DEFAULT_LOG_SAMPLE_RATE = 0.01
+
 
 class LockReasonCode(Enum):
     """Standard lock reason codes across the EMR."""
@@ -85,6 +99,94 @@ class LockResult:
             'details': self.details or {},
             'unlock_actions': self.unlock_actions or []
         }
+    
+    @property
+    def etag(self) -> str:
+        """Quoted ETag of the API representation; equal results share an ETag."""
+        payload = json.dumps(self.to_dict(), sort_keys=True, default=str)
+        return '"%s"' % hashlib.sha1(payload.encode()).hexdigest()[:20]
+
+
+class LockContext:
+    """
+    Records shared by the lock evaluations of one request.
+    
+    Each record is loaded at most once, with its visit (and consultation)
+    joined, so evaluating eight actions of one consultation screen costs a
+    handful of queries instead of one or two per action. Missing records
+    are remembered as None.
+    """
+    
+    # label: (model, select_related)
+    RECORDS = {
+        'visit': ('visits.Visit', ()),
+        'consultation': ('consultations.Consultation', ()),
+        'lab_order': ('laboratory.LabOrder', ('visit',)),
+        'radiology_order': ('radiology.RadiologyRequest', ('visit',)),
+        'prescription': ('pharmacy.Prescription', ('visit', 'consultation')),
+    }
+    
+    # Evaluator parameter -> record label
+    PARAMS = {
+        'prescription_id': 'prescription',
+        'lab_order_id': 'lab_order',
+        'radiology_order_id': 'radiology_order',
+        'visit_id': 'visit',
+        'consultation_id': 'consultation',
+    }
+    
+    def __init__(self):
+        self._records = {}
+        self._payment_cleared = {}
+    
+    def prefetch(self, params_list):
+        """Load every record referenced by a list of evaluator kwargs, one query per record type."""
+        wanted = {}
+        for params in params_list:
+            for param, label in self.PARAMS.items():
+                value = params.get(param)
+                if value not in (None, ''):
+                    try:
+                        wanted.setdefault(label, set()).add(int(value))
+                    except (TypeError, ValueError):
+                        continue
+        # PARAMS lists orders first, so their joined visits are known before visits are queried
+        for label in dict.fromkeys(self.PARAMS.values()):
+            if label in wanted:
+                self._load(label, wanted[label])
+    
+    def get(self, label, pk):
+        """The record with this primary key, or None if it does not exist."""
+        pk = int(pk)
+        if (label, pk) not in self._records:
+            self._load(label, [pk])
+        return self._records[(label, pk)]
+    
+    def is_payment_cleared(self, visit) -> bool:
+        """visit.is_payment_cleared(), evaluated once per visit."""
+        if visit.pk not in self._payment_cleared:
+            self._payment_cleared[visit.pk] = visit.is_payment_cleared()
+        return self._payment_cleared[visit.pk]
+    
+    def _load(self, label, pks):
+        pks = [pk for pk in pks if (label, pk) not in self._records]
+        if not pks:
+            return
+        model_label, related = self.RECORDS[label]
+        queryset = apps.get_model(model_label).objects.all()
+        if related:
+            queryset = queryset.select_related(*related)
+        found = queryset.in_bulk(pks)
+        for pk in pks:
+            record = found.get(pk)
+            self._records[(label, pk)] = record
+            if record is None:
+                continue
+            # Share joined visits/consultations with later evaluations
+            for field in related:
+                joined = getattr(record, field)
+                if joined is not None:
+                    self._records.setdefault((field, joined.pk), joined)
 
 
 class LockEvaluator:
@@ -96,7 +198,11 @@ class LockEvaluator:
     """
     
     @staticmethod
-    def evaluate_consultation_lock(visit_id: int, user_role: str = None) -> LockResult:
+    def evaluate_consultation_lock(
+        visit_id: int,
+        user_role: str = None,
+        context: Optional[LockContext] = None
+    ) -> LockResult:
         """
         Evaluate if consultation is locked.
         
@@ -104,11 +210,9 @@ class LockEvaluator:
         - Visit is closed
         - Visit not found
         """
-        from apps.visits.models import Visit
-        
-        try:
-            visit = Visit.objects.get(pk=visit_id)
-        except Visit.DoesNotExist:
+        context = context or LockContext()
+        visit = context.get('visit', visit_id)
+        if visit is None:
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.VISIT_NOT_FOUND,
@@ -136,7 +240,8 @@ class LockEvaluator:
     @staticmethod
     def evaluate_radiology_upload_lock(
         radiology_order_id: int,
-        visit_id: int = None
+        visit_id: int = None,
+        context: Optional[LockContext] = None
     ) -> LockResult:
         """
         Evaluate if radiology image upload is locked.
@@ -146,11 +251,9 @@ class LockEvaluator:
         - Order not paid
         - Visit payment not cleared
         """
-        from apps.radiology.models import RadiologyRequest
-        
-        try:
-            radiology_order = RadiologyRequest.objects.get(pk=radiology_order_id)
-        except RadiologyRequest.DoesNotExist:
+        context = context or LockContext()
+        radiology_order = context.get('radiology_order', radiology_order_id)
+        if radiology_order is None:
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.ORDER_NOT_FOUND,
@@ -161,7 +264,7 @@ class LockEvaluator:
         visit = radiology_order.visit
         
         # Check visit payment
-        if not visit.is_payment_cleared():
+        if not context.is_payment_cleared(visit):
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.PAYMENT_NOT_CLEARED,
@@ -203,7 +306,8 @@ class LockEvaluator:
     @staticmethod
     def evaluate_drug_dispense_lock(
         prescription_id: int,
-        visit_id: int = None
+        visit_id: int = None,
+        context: Optional[LockContext] = None
     ) -> LockResult:
         """
         Evaluate if drug dispense is locked.
@@ -213,11 +317,9 @@ class LockEvaluator:
         - Visit payment not cleared (unless emergency)
         - Consultation not active
         """
-        from apps.pharmacy.models import Prescription
-        
-        try:
-            prescription = Prescription.objects.get(pk=prescription_id)
-        except Prescription.DoesNotExist:
+        context = context or LockContext()
+        prescription = context.get('prescription', prescription_id)
+        if prescription is None:
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.ORDER_NOT_FOUND,
@@ -230,7 +332,7 @@ class LockEvaluator:
         # Emergency prescriptions bypass payment check
         if not prescription.is_emergency:
             # Check visit payment
-            if not visit.is_payment_cleared():
+            if not context.is_payment_cleared(visit):
                 return LockResult(
                     is_locked=True,
                     reason_code=LockReasonCode.PAYMENT_NOT_CLEARED,
@@ -273,7 +375,11 @@ class LockEvaluator:
         )
     
     @staticmethod
-    def evaluate_lab_order_lock(visit_id: int, consultation_id: int = None) -> LockResult:
+    def evaluate_lab_order_lock(
+        visit_id: int,
+        consultation_id: int = None,
+        context: Optional[LockContext] = None
+    ) -> LockResult:
         """
         Evaluate if lab order creation is locked.
         
@@ -281,11 +387,9 @@ class LockEvaluator:
         - Visit payment not cleared
         - Consultation not active (if consultation_id provided)
         """
-        from apps.visits.models import Visit
-        
-        try:
-            visit = Visit.objects.get(pk=visit_id)
-        except Visit.DoesNotExist:
+        context = context or LockContext()
+        visit = context.get('visit', visit_id)
+        if visit is None:
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.VISIT_NOT_FOUND,
@@ -294,7 +398,7 @@ class LockEvaluator:
             )
         
         # Check visit payment
-        if not visit.is_payment_cleared():
+        if not context.is_payment_cleared(visit):
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.PAYMENT_NOT_CLEARED,
@@ -309,30 +413,28 @@ class LockEvaluator:
         
         # Check consultation if provided
         if consultation_id:
-            from apps.consultations.models import Consultation
-            try:
-                consultation = Consultation.objects.get(pk=consultation_id)
-                # Allow lab orders when consultation is ACTIVE or PENDING.
-                # Only lock when consultation is CLOSED or in an incompatible state.
-                if consultation.status == 'CLOSED':
-                    return LockResult(
-                        is_locked=True,
-                        reason_code=LockReasonCode.CONSULTATION_NOT_ACTIVE,
-                        human_readable_message=(
-                            f"Lab order is locked because the consultation is closed. "
-                            f"Current consultation status: {consultation.status}. "
-                            f"Only open (active or pending) consultations can have new lab orders."
-                        ),
-                        details={'consultation_status': consultation.status},
-                        unlock_actions=["Create a new consultation or reopen the workflow"]
-                    )
-            except Consultation.DoesNotExist:
+            consultation = context.get('consultation', consultation_id)
+            if consultation is None:
                 return LockResult(
                     is_locked=True,
                     reason_code=LockReasonCode.CONSULTATION_NOT_STARTED,
                     human_readable_message=f"Consultation {consultation_id} not found.",
                     unlock_actions=["Create a consultation first"]
                 )
+            # Allow lab orders when consultation is ACTIVE or PENDING.
+            # Only lock when consultation is CLOSED or in an incompatible state.
+            if consultation.status == 'CLOSED':
+                return LockResult(
+                    is_locked=True,
+                    reason_code=LockReasonCode.CONSULTATION_NOT_ACTIVE,
+                    human_readable_message=(
+                        f"Lab order is locked because the consultation is closed. "
+                        f"Current consultation status: {consultation.status}. "
+                        f"Only open (active or pending) consultations can have new lab orders."
+                    ),
+                    details={'consultation_status': consultation.status},
+                    unlock_actions=["Create a new consultation or reopen the workflow"]
+                )
         
         # Lab order is not locked
         return LockResult(
@@ -342,7 +444,7 @@ class LockEvaluator:
         )
     
     @staticmethod
-    def evaluate_lab_result_post_lock(lab_order_id: int) -> LockResult:
+    def evaluate_lab_result_post_lock(lab_order_id: int, context: Optional[LockContext] = None) -> LockResult:
         """
         Evaluate if lab result posting is locked.
         
@@ -353,9 +455,9 @@ class LockEvaluator:
         """
         from apps.laboratory.models import LabOrder
         
-        try:
-            lab_order = LabOrder.objects.get(pk=lab_order_id)
-        except LabOrder.DoesNotExist:
+        context = context or LockContext()
+        lab_order = context.get('lab_order', lab_order_id)
+        if lab_order is None:
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.ORDER_NOT_FOUND,
@@ -366,7 +468,7 @@ class LockEvaluator:
         visit = lab_order.visit
         
         # Check visit payment
-        if not visit.is_payment_cleared():
+        if not context.is_payment_cleared(visit):
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.PAYMENT_NOT_CLEARED,
@@ -400,7 +502,7 @@ class LockEvaluator:
         )
     
     @staticmethod
-    def evaluate_radiology_report_lock(radiology_order_id: int) -> LockResult:
+    def evaluate_radiology_report_lock(radiology_order_id: int, context: Optional[LockContext] = None) -> LockResult:
         """
         Evaluate if radiology report posting is locked.
         
@@ -409,11 +511,9 @@ class LockEvaluator:
         - Visit payment not cleared
         - Order not active
         """
-        from apps.radiology.models import RadiologyRequest
-        
-        try:
-            radiology_order = RadiologyRequest.objects.get(pk=radiology_order_id)
-        except RadiologyRequest.DoesNotExist:
+        context = context or LockContext()
+        radiology_order = context.get('radiology_order', radiology_order_id)
+        if radiology_order is None:
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.ORDER_NOT_FOUND,
@@ -424,7 +524,7 @@ class LockEvaluator:
         visit = radiology_order.visit
         
         # Check visit payment
-        if not visit.is_payment_cleared():
+        if not context.is_payment_cleared(visit):
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.PAYMENT_NOT_CLEARED,
@@ -458,7 +558,7 @@ class LockEvaluator:
         )
 
     @staticmethod
-    def evaluate_radiology_view_lock(radiology_order_id: int) -> LockResult:
+    def evaluate_radiology_view_lock(radiology_order_id: int, context: Optional[LockContext] = None) -> LockResult:
         """
         Evaluate if viewing a radiology order/result is locked.
 
@@ -466,11 +566,9 @@ class LockEvaluator:
         - Radiology order not found
         - Visit payment not cleared (policy: pay before viewing results)
         """
-        from apps.radiology.models import RadiologyRequest
-
-        try:
-            radiology_order = RadiologyRequest.objects.get(pk=radiology_order_id)
-        except RadiologyRequest.DoesNotExist:
+        context = context or LockContext()
+        radiology_order = context.get('radiology_order', radiology_order_id)
+        if radiology_order is None:
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.ORDER_NOT_FOUND,
@@ -480,7 +578,7 @@ class LockEvaluator:
 
         visit = radiology_order.visit
 
-        if not visit.is_payment_cleared():
+        if not context.is_payment_cleared(visit):
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.PAYMENT_NOT_CLEARED,
@@ -500,7 +598,11 @@ class LockEvaluator:
         )
 
     @staticmethod
-    def evaluate_procedure_lock(visit_id: int, consultation_id: int = None) -> LockResult:
+    def evaluate_procedure_lock(
+        visit_id: int,
+        consultation_id: int = None,
+        context: Optional[LockContext] = None
+    ) -> LockResult:
         """
         Evaluate if procedure creation is locked.
         
@@ -508,11 +610,9 @@ class LockEvaluator:
         - Visit payment not cleared
         - Consultation not active (if consultation_id provided)
         """
-        from apps.visits.models import Visit
-        
-        try:
-            visit = Visit.objects.get(pk=visit_id)
-        except Visit.DoesNotExist:
+        context = context or LockContext()
+        visit = context.get('visit', visit_id)
+        if visit is None:
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.VISIT_NOT_FOUND,
@@ -521,7 +621,7 @@ class LockEvaluator:
             )
         
         # Check visit payment
-        if not visit.is_payment_cleared():
+        if not context.is_payment_cleared(visit):
             return LockResult(
                 is_locked=True,
                 reason_code=LockReasonCode.PAYMENT_NOT_CLEARED,
@@ -536,28 +636,26 @@ class LockEvaluator:
         
         # Check consultation if provided
         if consultation_id:
-            from apps.consultations.models import Consultation
-            try:
-                consultation = Consultation.objects.get(pk=consultation_id)
-                if consultation.status != 'ACTIVE':
-                    return LockResult(
-                        is_locked=True,
-                        reason_code=LockReasonCode.CONSULTATION_NOT_ACTIVE,
-                        human_readable_message=(
-                            f"Procedure is locked because the consultation is not active. "
-                            f"Current consultation status: {consultation.status}. "
-                            f"Only active consultations can have procedures."
-                        ),
-                        details={'consultation_status': consultation.status},
-                        unlock_actions=["Activate the consultation"]
-                    )
-            except Consultation.DoesNotExist:
+            consultation = context.get('consultation', consultation_id)
+            if consultation is None:
                 return LockResult(
                     is_locked=True,
                     reason_code=LockReasonCode.CONSULTATION_NOT_STARTED,
                     human_readable_message=f"Consultation {consultation_id} not found.",
                     unlock_actions=["Create a consultation first"]
                 )
+            if consultation.status != 'ACTIVE':
+                return LockResult(
+                    is_locked=True,
+                    reason_code=LockReasonCode.CONSULTATION_NOT_ACTIVE,
+                    human_readable_message=(
+                        f"Procedure is locked because the consultation is not active. "
+                        f"Current consultation status: {consultation.status}. "
+                        f"Only active consultations can have procedures."
+                    ),
+                    details={'consultation_status': consultation.status},
+                    unlock_actions=["Activate the consultation"]
+                )
         
         # Procedure is not locked
         return LockResult(
@@ -566,9 +664,24 @@ class LockEvaluator:
             human_readable_message="Procedure is available."
         )
     
+    @staticmethod
+    def action_evaluators() -> Dict[str, Any]:
+        """Evaluator function for each action type."""
+        return {
+            'consultation': LockEvaluator.evaluate_consultation_lock,
+            'radiology_upload': LockEvaluator.evaluate_radiology_upload_lock,
+            'radiology_view': LockEvaluator.evaluate_radiology_view_lock,
+            'drug_dispense': LockEvaluator.evaluate_drug_dispense_lock,
+            'lab_order': LockEvaluator.evaluate_lab_order_lock,
+            'lab_result_post': LockEvaluator.evaluate_lab_result_post_lock,
+            'radiology_report': LockEvaluator.evaluate_radiology_report_lock,
+            'procedure': LockEvaluator.evaluate_procedure_lock,
+        }
+    
     @staticmethod
     def evaluate_action_lock(
         action_type: str,
+        context: Optional[LockContext] = None,
         **kwargs
     ) -> LockResult:
         """
@@ -576,23 +689,13 @@ class LockEvaluator:
         
         Args:
             action_type: Type of action (e.g., 'consultation', 'radiology_upload', 'drug_dispense')
+            context: Shared LockContext when evaluating several actions at once
             **kwargs: Action-specific parameters
         
         Returns:
             LockResult
         """
-        action_evaluators = {
-            'consultation': LockEvaluator.evaluate_consultation_lock,
-            'radiology_upload': LockEvaluator.evaluate_radiology_upload_lock,
-            'radiology_view': LockEvaluator.evaluate_radiology_view_lock,
-            'drug_dispense': LockEvaluator.evaluate_drug_dispense_lock,
-            'lab_order': LockEvaluator.evaluate_lab_order_lock,
-            'lab_result_post': LockEvaluator.evaluate_lab_result_post_lock,
-            'radiology_report': LockEvaluator.evaluate_radiology_report_lock,
-            'procedure': LockEvaluator.evaluate_procedure_lock,
-        }
-        
-        evaluator = action_evaluators.get(action_type)
+        evaluator = LockEvaluator.action_evaluators().get(action_type)
         if not evaluator:
             return LockResult(
                 is_locked=True,
@@ -602,13 +705,8 @@ class LockEvaluator:
             )
         
         try:
-            result = evaluator(**kwargs)
-            # Log lock evaluation for audit trail
-            logger.info(
-                f"Lock evaluation: action={action_type}, "
-                f"locked={result.is_locked}, reason={result.reason_code.value}, "
-                f"kwargs={kwargs}"
-            )
+            result = evaluator(context=context, **kwargs)
+            _log_evaluation(action_type, result, kwargs)
             return result
         except Exception as e:
             logger.error(f"Error evaluating lock for action {action_type}: {e}")
@@ -618,4 +716,51 @@ class LockEvaluator:
                 human_readable_message=f"Error evaluating lock: {str(e)}",
                 details={'error': str(e)}
             )
+    
+    @staticmethod
+    def evaluate_batch(actions: list, shared: Optional[Dict[str, Any]] = None) -> list:
+        """
+        Evaluate several actions against one shared LockContext.
+        
+        Args:
+            actions: [(action_type, params)] pairs
+            shared: Parameters common to the screen (e.g. visit_id, consultation_id),
+                passed to every action whose evaluator accepts them unless the
+                action sets its own value
+        
+        Returns:
+            [LockResult] in the order of actions
+        """
+        evaluators = LockEvaluator.action_evaluators()
+        resolved = []
+        for action_type, params in actions:
+            evaluator = evaluators.get(action_type)
+            merged = dict(params)
+            if evaluator and shared:
+                accepted = inspect.signature(evaluator).parameters
+                for key, value in shared.items():
+                    if key in accepted and key != 'context':
+                        merged.setdefault(key, value)
+            resolved.append((action_type, merged))
+        
+        context = LockContext()
+        context.prefetch(params for _, params in resolved)
+        return [
+            LockEvaluator.evaluate_action_lock(action_type, context=context, **params)
+            for action_type, params in resolved
+        ]
+
+
+def _log_sample_rate() -> float:
+    return getattr(settings, 'EMR_SETTINGS', {}).get('LOCK_EVALUATION_LOG_SAMPLE_RATE', DEFAULT_LOG_SAMPLE_RATE)
+
 
+def _log_evaluation(action_type: str, result: LockResult, kwargs: Dict[str, Any]):
+    """Log a sampled fraction of evaluations at DEBUG (locks are polled far too often for INFO)."""
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= _log_sample_rate():
+        return
+    logger.debug(
+        f"Lock evaluation: action={action_type}, "
+        f"locked={result.is_locked}, reason={result.reason_code.value}, "
+        f"params={sorted(kwargs)}"
+    )
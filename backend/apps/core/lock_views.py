@@ -1,6 +1,7 @@
 """
 API views for Explainable Lock System.
 """
+import hashlib
 import logging
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -11,6 +12,11 @@ from .lock_system import LockEvaluator, LockReasonCode
 
 logger = logging.getLogger(__name__)
 
+MAX_BATCH_ACTIONS = 50
+
+# Top-level batch parameters shared by all actions of a screen
+SHARED_PARAMS = ('visit_id', 'consultation_id')
+
 
 class LockEvaluationViewSet(viewsets.ViewSet):
     """
@@ -53,6 +59,84 @@ class LockEvaluationViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Evaluate the locks of a whole screen in one request.
+        
+        Records are loaded once for all actions (see LockContext). Each
+        result carries an ETag; an action sent with the ETag it last saw gets
+        {"etag": ..., "not_modified": true} instead of the full result. The
+        response ETag covers all results, so If-None-Match yields 304 when
+        nothing changed.
+        
+        Request body:
+        {
+            "visit_id": 123,            // shared: applied to actions taking it
+            "consultation_id": 456,     // shared, optional
+            "actions": [
+                {"key": "lab_order", "action_type": "lab_order", "etag": "\"...\""},
+                {"key": "upload-7", "action_type": "radiology_upload", "radiology_order_id": 7}
+            ]
+        }
+        
+        Response:
+        {"results": {"lab_order": {...lock result..., "etag": "..."}, "upload-7": {...}}}
+        """
+        actions = request.data.get('actions')
+        if not isinstance(actions, list) or not actions:
+            return Response(
+                {'error': 'actions must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(actions) > MAX_BATCH_ACTIONS:
+            return Response(
+                {'error': f'At most {MAX_BATCH_ACTIONS} actions per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        keys = []
+        pairs = []
+        client_etags = {}
+        for item in actions:
+            if not isinstance(item, dict) or not item.get('action_type'):
+                return Response(
+                    {'error': 'Each action needs an action_type'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            key = str(item.get('key') or item['action_type'])
+            if key in keys:
+                return Response(
+                    {'error': f'Duplicate action key: {key}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            keys.append(key)
+            if item.get('etag'):
+                client_etags[key] = item['etag']
+            params = {k: v for k, v in item.items() if k not in ('key', 'action_type', 'etag')}
+            pairs.append((item['action_type'], params))
+        
+        shared = {k: v for k, v in request.data.items() if k in SHARED_PARAMS}
+        results = LockEvaluator.evaluate_batch(pairs, shared=shared)
+        
+        payload = {}
+        for key, result in zip(keys, results):
+            etag = result.etag
+            if client_etags.get(key) == etag:
+                payload[key] = {'etag': etag, 'not_modified': True}
+            else:
+                payload[key] = {**result.to_dict(), 'etag': etag}
+        
+        combined = '"%s"' % hashlib.sha1(
+            ''.join(f'{key}={result.etag};' for key, result in zip(keys, results)).encode()
+        ).hexdigest()[:20]
+        if request.headers.get('If-None-Match') == combined:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({'results': payload}, status=status.HTTP_200_OK)
+        response['ETag'] = combined
+        return response
+    
     @action(detail=False, methods=['get'])
     def consultation(self, request):
         """Check if consultation is locked for a visit."""
@@ -0,0 +1,157 @@
+"""
+Lab analyte values - structured numeric values extracted from lab results.
+
+LabResult.result_data is free text. Each numeric analyte in a result
+(e.g. Hemoglobin 11.2 g/dL) is stored here once, keyed by patient,
+normalized analyte name and observation time, so trends across visits
+are read from one index range instead of re-parsing every result.
+Rows are written when a result is posted and by the backfill command
+(see analytes.py); LabAnalyteScan records which results have been read.
+"""
+from django.db import models
+
+
+class LabAnalyteValue(models.Model):
+    """
+    One numeric analyte value of a LabResult.
+
+    Derived from the (immutable) result, so rows follow their result and
+    are never edited.
+    """
+
+    FLAG_CHOICES = [
+        ('LOW', 'Low'),
+        ('NORMAL', 'Normal'),
+        ('HIGH', 'High'),
+    ]
+
+    SOURCE_CHOICES = [
+        ('STRUCTURED', 'Posted as a structured value'),
+        ('PARSED', 'Parsed from the result text'),
+    ]
+
+    # Leading column of the trend index, which also serves patient lookups
+    patient = models.ForeignKey(
+        'patients.Patient',
+        on_delete=models.CASCADE,
+        related_name='lab_analyte_values',
+        db_index=False,
+        help_text="Patient the value was measured for"
+    )
+
+    visit = models.ForeignKey(
+        'visits.Visit',
+        on_delete=models.CASCADE,
+        related_name='lab_analyte_values',
+        db_index=False,
+        help_text="Visit of the lab order"
+    )
+
+    lab_result = models.ForeignKey(
+        'laboratory.LabResult',
+        on_delete=models.CASCADE,
+        related_name='analyte_values',
+        db_index=False,  # Covered by the (lab_result, analyte) constraint
+        help_text="Lab result the value was taken from"
+    )
+
+    analyte = models.CharField(
+        max_length=100,
+        help_text="Normalized analyte key (e.g., 'hemoglobin', 'hba1c')"
+    )
+
+    analyte_name = models.CharField(
+        max_length=200,
+        help_text="Display name of the analyte"
+    )
+
+    value = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        help_text="Numeric value"
+    )
+
+    unit = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="Unit of measurement"
+    )
+
+    reference_min = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Catalog minimum normal value at the time of the result"
+    )
+
+    reference_max = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Catalog maximum normal value at the time of the result"
+    )
+
+    flag = models.CharField(
+        max_length=10,
+        choices=FLAG_CHOICES,
+        blank=True,
+        help_text="Value against the reference range (blank without a range)"
+    )
+
+    observed_at = models.DateTimeField(
+        help_text="When the result was recorded"
+    )
+
+    source = models.CharField(
+        max_length=10,
+        choices=SOURCE_CHOICES,
+        default='PARSED',
+        help_text="How the value was obtained"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'lab_analyte_values'
+        ordering = ['patient', 'analyte', 'observed_at']
+        indexes = [
+            models.Index(fields=['patient', 'analyte', 'observed_at'], name='lab_analyte_trend_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['lab_result', 'analyte'], name='unique_analyte_per_lab_result'),
+        ]
+        verbose_name = 'Lab Analyte Value'
+        verbose_name_plural = 'Lab Analyte Values'
+
+    def __str__(self):
+        return f"{self.analyte_name} {self.value} {self.unit} ({self.observed_at:%Y-%m-%d})".strip()
+
+
+class LabAnalyteScan(models.Model):
+    """
+    Marks a LabResult whose analytes have been recorded.
+
+    Many results hold no numeric analyte (e.g. 'Malaria parasite: not
+    seen'), so LabAnalyteValue alone cannot tell the backfill which
+    results it has already parsed.
+    """
+
+    lab_result = models.OneToOneField(
+        'laboratory.LabResult',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='analyte_scan',
+        help_text="Lab result whose analytes were recorded"
+    )
+
+    scanned_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'lab_analyte_scans'
+        verbose_name = 'Lab Analyte Scan'
+        verbose_name_plural = 'Lab Analyte Scans'
+
+    def __str__(self):
+        return f"Analytes of LabResult {self.lab_result_id}"
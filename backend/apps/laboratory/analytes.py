@@ -0,0 +1,321 @@
+"""
+Structured lab analytes: extraction, backfill and trend queries.
+
+LabResult.result_data is free text, so charting a patient's haemoglobin
+or HbA1c used to mean parsing every historical result on each request.
+Numeric analyte values are instead stored in LabAnalyteValue:
+
+- When a result is posted, from the structured `analytes` the lab tech
+  sends, or else parsed from result_data.
+- For legacy results, by: python manage.py backfill_lab_analytes
+
+Known analytes are the tests named in active LabTestTemplates plus the
+active LabTestCatalog (which adds units and reference ranges); names
+are normalized, so 'Haemoglobin', 'Hb' and 'HGB' are one analyte.
+
+Trends are read with one query over the (patient, analyte, observed_at)
+index; deltas between consecutive values are computed in the database.
+
+Usage:
+    record_result_analytes(lab_result, [{'analyte': 'Hemoglobin', 'value': Decimal('11.2')}])
+    analyte_trends(patient.pk, ['hemoglobin', 'hba1c'])
+"""
+import logging
+import re
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, Exists, F, OuterRef, When, Window
+from django.db.models.functions import Lag
+
+from .analyte_models import LabAnalyteScan, LabAnalyteValue
+from .catalog_models import LabTestCatalog
+from .template_models import LabTestTemplate
+
+logger = logging.getLogger(__name__)
+
+# Normalized spellings and abbreviations -> normalized analyte name
+ANALYTE_ALIASES = {
+    'haemoglobin': 'hemoglobin',
+    'hb': 'hemoglobin',
+    'hgb': 'hemoglobin',
+    'a1c': 'hba1c',
+    'hb a1c': 'hba1c',
+    'hemoglobin a1c': 'hba1c',
+    'haemoglobin a1c': 'hba1c',
+    'glycated hemoglobin': 'hba1c',
+    'glycated haemoglobin': 'hba1c',
+    'haematocrit': 'hematocrit',
+    'hct': 'hematocrit',
+    'pcv': 'hematocrit',
+    'packed cell volume': 'hematocrit',
+    'wbc': 'wbc count',
+    'white blood cell count': 'wbc count',
+    'total wbc': 'wbc count',
+    'plt': 'platelet count',
+    'platelets': 'platelet count',
+    'fbs': 'fasting blood sugar',
+    'rbs': 'random blood sugar',
+}
+
+MAX_VALUE = Decimal('1e10')  # LabAnalyteValue.value holds 10 integer digits
+VALUE_QUANTUM = Decimal('0.0001')
+
+# Entries within a result: lines, ';' or '|', or ', ' before the next name
+_ENTRY_SEPARATOR = re.compile(r'[\n;|]+|,\s+(?=[A-Za-z])')
+# "Hemoglobin: 11.2 g/dL", "- HbA1c 6.8%", "WBC = 5,400 /uL"
+_ENTRY = re.compile(
+    r"^[\s\-*•]*(?P<name>[A-Za-z][A-Za-z0-9 ()/%.'-]*?)"
+    r"(?:\s*[:=]\s*|\s+)"
+    r"(?P<value>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)(?![\d.,]\d)"
+    r"\s*(?P<unit>[^\s,;]*)"
+)
+
+
+def analyte_key(name: str) -> str:
+    """Normalized analyte key: 'Haemoglobin (Hb)' -> 'hemoglobin', 'WBC Count' -> 'wbc_count'."""
+    words = re.sub(r'\([^)]*\)', ' ', (name or '').lower())
+    words = re.sub(r'[^a-z0-9]+', ' ', words).strip()
+    return ANALYTE_ALIASES.get(words, words).replace(' ', '_')
+
+
+@dataclass(frozen=True)
+class AnalyteDefinition:
+    """A known analyte, with the catalog unit and reference range when there is one."""
+    key: str
+    name: str
+    unit: str = ''
+    reference_min: Optional[Decimal] = None
+    reference_max: Optional[Decimal] = None
+
+    def applies_to(self, unit: str) -> bool:
+        """Whether the reference range applies to a value reported in `unit`."""
+        return not unit or not self.unit or unit.lower() == self.unit.lower()
+
+    def flag(self, value: Decimal) -> str:
+        if self.reference_min is not None and value < self.reference_min:
+            return 'LOW'
+        if self.reference_max is not None and value > self.reference_max:
+            return 'HIGH'
+        if self.reference_min is None and self.reference_max is None:
+            return ''
+        return 'NORMAL'
+
+
+def analyte_definitions() -> Dict[str, AnalyteDefinition]:
+    """
+    Known analytes by every normalized name they may be written under.
+
+    Template test names first, then catalog codes, then catalog names, so a
+    catalog entry (with its unit and range) wins over a bare template name.
+    """
+    definitions = {}
+    for tests in LabTestTemplate.objects.filter(is_active=True).values_list('tests', flat=True):
+        for name in tests if isinstance(tests, list) else []:
+            if isinstance(name, str) and analyte_key(name):
+                key = analyte_key(name)
+                definitions.setdefault(key, AnalyteDefinition(key=key, name=name.strip()))
+
+    catalog = [
+        (test_code, test_name, AnalyteDefinition(
+            key=analyte_key(test_name), name=test_name, unit=unit,
+            reference_min=reference_min, reference_max=reference_max,
+        ))
+        for test_code, test_name, unit, reference_min, reference_max in LabTestCatalog.objects.filter(
+            is_active=True
+        ).values_list('test_code', 'test_name', 'unit', 'reference_range_min', 'reference_range_max')
+        if analyte_key(test_name)
+    ]
+    for test_code, _, definition in catalog:
+        if analyte_key(test_code):
+            definitions[analyte_key(test_code)] = definition
+    for _, test_name, definition in catalog:
+        definitions[definition.key] = definition
+    return definitions
+
+
+def resolve_analyte(name: str, definitions: Dict[str, AnalyteDefinition]) -> Optional[AnalyteDefinition]:
+    return definitions.get(analyte_key(name))
+
+
+def _to_value(raw) -> Optional[Decimal]:
+    try:
+        value = Decimal(str(raw).replace(',', ''))
+    except (InvalidOperation, ValueError):
+        return None
+    if not value.is_finite() or abs(value) >= MAX_VALUE:
+        return None
+    return value.quantize(VALUE_QUANTUM)
+
+
+def parse_result_text(
+    text: str, definitions: Dict[str, AnalyteDefinition]
+) -> List[Tuple[AnalyteDefinition, Decimal, str]]:
+    """
+    (definition, value, unit) for each known analyte written in free text.
+
+    One "name value [unit]" entry per line (or ';'-separated); entries for
+    unknown names and non-numeric values are ignored, and the first value
+    of an analyte wins.
+    """
+    found = {}
+    for entry in _ENTRY_SEPARATOR.split(text or ''):
+        match = _ENTRY.match(entry)
+        if not match:
+            continue
+        definition = resolve_analyte(match.group('name'), definitions)
+        value = _to_value(match.group('value'))
+        if definition is None or value is None or definition.key in found:
+            continue
+        found[definition.key] = (definition, value, match.group('unit')[:50])
+    return list(found.values())
+
+
+def _analyte_value(lab_result, visit, definition, value, unit, source) -> LabAnalyteValue:
+    unit = unit or definition.unit
+    in_range = definition.applies_to(unit)
+    return LabAnalyteValue(
+        patient_id=visit.patient_id,
+        visit_id=visit.pk,
+        lab_result=lab_result,
+        analyte=definition.key,
+        analyte_name=definition.name,
+        value=value,
+        unit=unit,
+        reference_min=definition.reference_min if in_range else None,
+        reference_max=definition.reference_max if in_range else None,
+        flag=definition.flag(value) if in_range else '',
+        observed_at=lab_result.recorded_at,
+        source=source,
+    )
+
+
+def result_analyte_values(
+    lab_result, values: Optional[Iterable[Dict[str, Any]]] = None,
+    definitions: Optional[Dict[str, AnalyteDefinition]] = None,
+) -> List[LabAnalyteValue]:
+    """
+    Unsaved LabAnalyteValues of a result.
+
+    `values` are structured entries ({'analyte', 'value', 'unit'?}) as
+    posted; without them the values are parsed from result_data.
+    """
+    if definitions is None:
+        definitions = analyte_definitions()
+    visit = lab_result.lab_order.visit
+
+    if values is None:
+        return [
+            _analyte_value(lab_result, visit, definition, value, unit, 'PARSED')
+            for definition, value, unit in parse_result_text(lab_result.result_data, definitions)
+        ]
+
+    rows = {}
+    for entry in values:
+        definition = resolve_analyte(entry['analyte'], definitions)
+        value = _to_value(entry['value'])
+        if definition is None or value is None:
+            logger.warning("Skipping analyte %r of LabResult %s", entry['analyte'], lab_result.pk)
+            continue
+        rows[definition.key] = _analyte_value(
+            lab_result, visit, definition, value, entry.get('unit') or '', 'STRUCTURED'
+        )
+    return list(rows.values())
+
+
+def record_result_analytes(lab_result, values=None, definitions=None) -> List[LabAnalyteValue]:
+    """Store the analyte values of a result (see result_analyte_values). Returns the rows."""
+    rows = result_analyte_values(lab_result, values, definitions)
+    with transaction.atomic():
+        rows = LabAnalyteValue.objects.bulk_create(rows, ignore_conflicts=True)
+        LabAnalyteScan.objects.bulk_create([LabAnalyteScan(lab_result=lab_result)], ignore_conflicts=True)
+    return rows
+
+
+def backfill_result_analytes(patient_id: Optional[int] = None, batch_size: int = 500) -> Tuple[int, int]:
+    """
+    Parse stored results whose analytes have not been recorded yet.
+
+    Walks results by primary key in batches, with one bulk insert of values
+    and one of LabAnalyteScans per batch, so results without any numeric
+    analyte are not parsed again on the next run. Safe to re-run.
+    Returns (results scanned, values created).
+    """
+    from .models import LabResult
+
+    definitions = analyte_definitions()
+    pending = LabResult.objects.filter(
+        ~Exists(LabAnalyteScan.objects.filter(lab_result=OuterRef('pk')))
+    ).select_related('lab_order__visit').only(
+        'result_data', 'recorded_at', 'lab_order__visit__patient_id'
+    ).order_by('pk')
+    if patient_id is not None:
+        pending = pending.filter(lab_order__visit__patient_id=patient_id)
+
+    scanned = created = 0
+    last_pk = 0
+    while True:
+        batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        rows = [row for lab_result in batch for row in result_analyte_values(lab_result, definitions=definitions)]
+        with transaction.atomic():
+            LabAnalyteValue.objects.bulk_create(rows, ignore_conflicts=True)
+            LabAnalyteScan.objects.bulk_create(
+                [LabAnalyteScan(lab_result=lab_result) for lab_result in batch], ignore_conflicts=True
+            )
+        scanned += len(batch)
+        created += len(rows)
+        last_pk = batch[-1].pk
+    return scanned, created
+
+
+TREND_COLUMNS = ['observed_at', 'value', 'delta', 'flag', 'unit', 'visit_id', 'lab_result_id']
+
+
+def analyte_trends(patient_id: int, analytes: Optional[Iterable[str]] = None,
+                   since=None, until=None) -> List[Dict[str, Any]]:
+    """
+    Column-oriented series per analyte for a patient, oldest point first.
+
+    One query over lab_analyte_trend_idx. `delta` is the change from the
+    previous value of the analyte in the same unit (None for the first
+    point of the range or after a unit change); `change` is the sum of the
+    deltas.
+    """
+    values = LabAnalyteValue.objects.filter(patient_id=patient_id)
+    if analytes:
+        values = values.filter(analyte__in={analyte_key(name) for name in analytes})
+    if since is not None:
+        values = values.filter(observed_at__gte=since)
+    if until is not None:
+        values = values.filter(observed_at__lte=until)
+
+    # Window and result order both follow the index, so nothing is sorted
+    def previous(field):
+        return Window(Lag(field), partition_by=[F('analyte')], order_by=F('observed_at').asc())
+
+    rows = values.annotate(
+        delta=Case(
+            When(unit=previous('unit'), then=F('value') - previous('value')),
+            output_field=DecimalField(max_digits=14, decimal_places=4),
+        ),
+    ).order_by('analyte', 'observed_at').values_list(
+        'analyte', 'analyte_name', 'reference_min', 'reference_max', *TREND_COLUMNS
+    )
+
+    series = {}
+    for analyte, name, reference_min, reference_max, *point in rows:
+        entry = series.setdefault(analyte, {'analyte': analyte, **{column: [] for column in TREND_COLUMNS}})
+        # The latest point's name and range describe the series
+        entry.update(name=name, reference_min=reference_min, reference_max=reference_max)
+        for column, value in zip(TREND_COLUMNS, point):
+            entry[column].append(value)
+
+    for entry in series.values():
+        entry['count'] = len(entry['value'])
+        entry['latest'] = entry['value'][-1]
+        entry['change'] = sum(delta for delta in entry['delta'] if delta is not None) if entry['count'] > 1 else None
+    return list(series.values())
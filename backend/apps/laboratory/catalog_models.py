@@ -127,6 +127,7 @@ class LabTestCatalog(models.Model):
             models.Index(fields=['category']),
             models.Index(fields=['is_active']),
             models.Index(fields=['test_name']),
+            models.Index(fields=['updated_at']),
         ]
         verbose_name = 'Lab Test Catalog'
         verbose_name_plural = 'Lab Test Catalog'
@@ -4,6 +4,7 @@ URL configuration for Lab Test Catalog (global endpoint).
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .catalog_views import LabTestCatalogViewSet
+from .trend_views import LabTrendView
 from .views import LabOrderWorklistView
 
 router = DefaultRouter()
@@ -11,4 +12,5 @@ router.register(r'lab-tests', LabTestCatalogViewSet, basename='lab-test-catalog'
 
 urlpatterns = [
     path('orders/worklist/', LabOrderWorklistView.as_view(), name='lab-order-worklist'),
+    path('trends/', LabTrendView.as_view(), name='lab-trends'),
 ] + router.urls
@@ -13,6 +13,7 @@ from .catalog_serializers import (
 )
 from .catalog_permissions import CanManageLabTestCatalog, CanViewLabTestCatalog
 from core.audit import AuditLog
+from core.catalog_sync import CatalogSyncMixin
 
 
 def log_lab_catalog_action(
@@ -58,11 +59,11 @@ def log_lab_catalog_action(
         user_agent=user_agent,
         metadata=metadata or {}
     )
-    audit_log.save()
+    audit_log.record()
     return audit_log
 
 
-class LabTestCatalogViewSet(viewsets.ModelViewSet):
+class LabTestCatalogViewSet(CatalogSyncMixin, viewsets.ModelViewSet):
     """
     ViewSet for Lab Test Catalog management.
     
@@ -74,7 +75,8 @@ class LabTestCatalogViewSet(viewsets.ModelViewSet):
     """
     
     queryset = LabTestCatalog.objects.all().select_related('created_by')
-    pagination_class = None  # Disable pagination for catalog
+    pagination_class = None  # Full snapshot; clients then sync with ?updated_since= (CatalogSyncMixin)
+    catalog_name = 'lab_test_catalog'
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
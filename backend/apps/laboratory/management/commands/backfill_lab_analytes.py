@@ -0,0 +1,33 @@
+"""
+Django management command to populate the structured lab analyte store from stored results.
+
+Parses the free-text result_data of results recorded before analytes
+were stored (or imported without them). Parsed results are recorded in
+LabAnalyteScan, so a re-run only reads results added since.
+
+Usage:
+    python manage.py backfill_lab_analytes
+    python manage.py backfill_lab_analytes --patient 42 --batch-size 1000
+"""
+from django.core.management.base import BaseCommand
+
+from apps.laboratory.analytes import backfill_result_analytes
+
+
+class Command(BaseCommand):
+    help = 'Parse numeric analyte values from lab results not parsed yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patient', type=int, dest='patient_id',
+                            help='Only backfill this patient')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Results parsed per insert (default: 500)')
+
+    def handle(self, *args, **options):
+        scanned, created = backfill_result_analytes(
+            patient_id=options['patient_id'],
+            batch_size=max(options['batch_size'], 1),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Parsed {scanned} lab result(s); stored {created} analyte value(s)."
+        ))
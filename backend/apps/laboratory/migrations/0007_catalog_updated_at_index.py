@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laboratory', '0006_alter_labresult_lab_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='labtestcatalog',
+            index=models.Index(fields=['updated_at'], name='lab_test_ca_updated_41d8c6_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laboratory', '0007_catalog_updated_at_index'),
+        ('patients', '0012_medical_history_segments'),
+        ('visits', '0008_service_area'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabAnalyteValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('analyte', models.CharField(help_text="Normalized analyte key (e.g., 'hemoglobin', 'hba1c')", max_length=100)),
+                ('analyte_name', models.CharField(help_text='Display name of the analyte', max_length=200)),
+                ('value', models.DecimalField(decimal_places=4, help_text='Numeric value', max_digits=14)),
+                ('unit', models.CharField(blank=True, help_text='Unit of measurement', max_length=50)),
+                ('reference_min', models.DecimalField(blank=True, decimal_places=2, help_text='Catalog minimum normal value at the time of the result', max_digits=10, null=True)),
+                ('reference_max', models.DecimalField(blank=True, decimal_places=2, help_text='Catalog maximum normal value at the time of the result', max_digits=10, null=True)),
+                ('flag', models.CharField(blank=True, choices=[('LOW', 'Low'), ('NORMAL', 'Normal'), ('HIGH', 'High')], help_text='Value against the reference range (blank without a range)', max_length=10)),
+                ('observed_at', models.DateTimeField(help_text='When the result was recorded')),
+                ('source', models.CharField(choices=[('STRUCTURED', 'Posted as a structured value'), ('PARSED', 'Parsed from the result text')], default='PARSED', help_text='How the value was obtained', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lab_result', models.ForeignKey(db_index=False, help_text='Lab result the value was taken from', on_delete=django.db.models.deletion.CASCADE, related_name='analyte_values', to='laboratory.labresult')),
+                ('patient', models.ForeignKey(db_index=False, help_text='Patient the value was measured for', on_delete=django.db.models.deletion.CASCADE, related_name='lab_analyte_values', to='patients.patient')),
+                ('visit', models.ForeignKey(db_index=False, help_text='Visit of the lab order', on_delete=django.db.models.deletion.CASCADE, related_name='lab_analyte_values', to='visits.visit')),
+            ],
+            options={
+                'verbose_name': 'Lab Analyte Value',
+                'verbose_name_plural': 'Lab Analyte Values',
+                'db_table': 'lab_analyte_values',
+                'ordering': ['patient', 'analyte', 'observed_at'],
+                'indexes': [models.Index(fields=['patient', 'analyte', 'observed_at'], name='lab_analyte_trend_idx')],
+                'constraints': [models.UniqueConstraint(fields=('lab_result', 'analyte'), name='unique_analyte_per_lab_result')],
+            },
+        ),
+    ]
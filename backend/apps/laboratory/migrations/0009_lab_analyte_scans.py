@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def mark_recorded_results(apps, schema_editor):
+    """Results that already have analyte values were recorded when posted or backfilled."""
+    LabResult = apps.get_model('laboratory', 'LabResult')
+    LabAnalyteScan = apps.get_model('laboratory', 'LabAnalyteScan')
+    LabAnalyteValue = apps.get_model('laboratory', 'LabAnalyteValue')
+
+    recorded = LabResult.objects.filter(
+        Exists(LabAnalyteValue.objects.filter(lab_result=OuterRef('pk')))
+    ).values_list('pk', flat=True).order_by('pk')
+    LabAnalyteScan.objects.bulk_create(
+        (LabAnalyteScan(lab_result_id=pk) for pk in recorded.iterator(chunk_size=1000)),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laboratory', '0008_lab_analyte_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabAnalyteScan',
+            fields=[
+                ('lab_result', models.OneToOneField(help_text='Lab result whose analytes were recorded', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analyte_scan', serialize=False, to='laboratory.labresult')),
+                ('scanned_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Lab Analyte Scan',
+                'verbose_name_plural': 'Lab Analyte Scans',
+                'db_table': 'lab_analyte_scans',
+            },
+        ),
+        migrations.RunPython(mark_recorded_results, migrations.RunPython.noop),
+    ]
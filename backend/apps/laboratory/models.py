@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError
 
 # Import catalog models for easy access
 from .catalog_models import LabTestCatalog
+from .analyte_models import LabAnalyteScan, LabAnalyteValue
 from apps.core.validators import validate_consultation_required, validate_active_lab_order
 
 
@@ -6,10 +6,20 @@ Per EMR Rules:
 - Doctor: Can view results (read-only)
 - Data minimization: Lab Tech sees only what's needed
 """
+from django.db import transaction
 from rest_framework import serializers
+from .analytes import analyte_definitions, record_result_analytes, resolve_analyte
 from .models import LabResult, LabOrder
 
 
+class LabAnalyteInputSerializer(serializers.Serializer):
+    """One structured analyte value posted with a result."""
+    
+    analyte = serializers.CharField(max_length=200)
+    value = serializers.DecimalField(max_digits=14, decimal_places=4)
+    unit = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+
 class LabResultCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating lab results (Lab Tech only).
@@ -18,6 +28,8 @@ class LabResultCreateSerializer(serializers.ModelSerializer):
     - lab_order (required - ID of the lab order)
     - result_data (required)
     - abnormal_flag (optional, defaults to NORMAL)
+    - analytes (optional - structured values, e.g. [{"analyte": "Hemoglobin", "value": 11.2, "unit": "g/dL"}];
+      without them, values are parsed from result_data)
     
     System sets:
     - recorded_by (from authenticated user)
@@ -29,6 +41,13 @@ class LabResultCreateSerializer(serializers.ModelSerializer):
         help_text="Lab order this result belongs to"
     )
     
+    analytes = LabAnalyteInputSerializer(
+        many=True,
+        required=False,
+        write_only=True,
+        help_text="Structured analyte values (names from lab templates / catalog)"
+    )
+    
     class Meta:
         model = LabResult
         fields = [
@@ -36,6 +55,7 @@ class LabResultCreateSerializer(serializers.ModelSerializer):
             "lab_order",
             "result_data",
             "abnormal_flag",
+            "analytes",
         ]
         read_only_fields = ["id"]
     
@@ -69,6 +89,20 @@ class LabResultCreateSerializer(serializers.ModelSerializer):
             )
         return value
     
+    def validate_analytes(self, value):
+        """Ensure each analyte is a known lab test, posted once."""
+        definitions = analyte_definitions()
+        unknown = [entry['analyte'] for entry in value if resolve_analyte(entry['analyte'], definitions) is None]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown analyte(s): {', '.join(unknown)}. Use test names from the lab templates or catalog."
+            )
+        keys = [resolve_analyte(entry['analyte'], definitions).key for entry in value]
+        if len(keys) != len(set(keys)):
+            raise serializers.ValidationError("Each analyte can only be posted once per result.")
+        self._analyte_definitions = definitions
+        return value
+    
     def create(self, validated_data):
         """
         Create lab result with user from context.
@@ -78,11 +112,17 @@ class LabResultCreateSerializer(serializers.ModelSerializer):
         - visit: Visit instance (from URL parameter)
         """
         request = self.context["request"]
+        analytes = validated_data.pop("analytes", None)
         
-        lab_result = LabResult.objects.create(
-            recorded_by=request.user,
-            **validated_data
-        )
+        with transaction.atomic():
+            lab_result = LabResult.objects.create(
+                recorded_by=request.user,
+                **validated_data
+            )
+            # Structured analyte store for trends (see analytes.py)
+            record_result_analytes(
+                lab_result, analytes, getattr(self, '_analyte_definitions', None)
+            )
         
         return lab_result
 
@@ -0,0 +1,78 @@
+"""
+Lab trend endpoint - patient-scoped, read-only (Doctor).
+
+Endpoint: GET /api/v1/laboratory/trends/?patient=<id>&analyte=hemoglobin,hba1c&since=2026-01-01&until=...
+
+Series of numeric analyte values across all of the patient's visits,
+read from the structured analyte store (see analytes.py): one query per
+request, whatever the number of historical results.
+"""
+from datetime import datetime, time
+
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.patients.models import Patient
+from core.audit import AuditLog
+from core.permissions import IsDoctor
+
+from .analytes import analyte_key, analyte_trends
+
+
+def _parse_bound(request, name, end_of_day=False):
+    """Aware datetime from a date or datetime query param; a bare `until` date includes that day."""
+    raw = request.query_params.get(name)
+    if not raw:
+        return None
+    try:
+        # A bare date first: parse_datetime() also accepts one, as midnight
+        day = parse_date(raw)
+        value = datetime.combine(day, time.max if end_of_day else time.min) if day else parse_datetime(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise DRFValidationError({name: f"Invalid date '{raw}'. Use YYYY-MM-DD or an ISO datetime."})
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+class LabTrendView(APIView):
+    """
+    Per-analyte trends for one patient.
+
+    Query params:
+    - patient (required): patient ID
+    - analyte: comma-separated analyte names (default: all)
+    - since / until: date or datetime bounds on when results were recorded
+
+    Each series is column-oriented: observed_at, value, delta, flag, unit,
+    visit_id and lab_result_id are parallel lists, oldest first.
+    """
+    permission_classes = [IsDoctor]
+
+    def get(self, request):
+        patient_id = request.query_params.get('patient')
+        if not patient_id or not patient_id.isdigit():
+            raise DRFValidationError({'patient': 'A patient ID is required.'})
+        patient = get_object_or_404(Patient.objects.only('pk'), pk=int(patient_id))
+
+        analytes = [name for name in request.query_params.get('analyte', '').split(',') if analyte_key(name)]
+        since = _parse_bound(request, 'since')
+        until = _parse_bound(request, 'until', end_of_day=True)
+
+        series = analyte_trends(patient.pk, analytes or None, since=since, until=until)
+
+        AuditLog.log(
+            user=request.user,
+            role=getattr(request.user, 'role', None) or 'UNKNOWN',
+            action='LAB_TRENDS_READ',
+            visit_id=None,
+            resource_type='patient',
+            resource_id=patient.pk,
+            request=request,
+            metadata={'analytes': [entry['analyte'] for entry in series]},
+        )
+        return Response({'patient_id': patient.pk, 'series': series})
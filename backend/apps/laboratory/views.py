@@ -161,7 +161,7 @@ def log_lab_order_action(
         user_agent=user_agent,
         metadata=metadata or {}
     )
-    audit_log.save()
+    audit_log.record()
     return audit_log
 
 
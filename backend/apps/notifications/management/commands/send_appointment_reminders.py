@@ -5,13 +5,11 @@ Usage:
     python manage.py send_appointment_reminders
 
 This command should be run periodically (e.g., via cron) to send
-reminder emails for upcoming appointments.
+reminder emails for upcoming appointments. Each appointment gets at most
+one email reminder per --hours value, however often the command runs.
 """
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
-from apps.appointments.models import Appointment
-from apps.notifications.utils import send_appointment_reminder
+from apps.notifications.reminder_dispatcher import ReminderDispatcher
 
 
 class Command(BaseCommand):
@@ -24,43 +22,24 @@ class Command(BaseCommand):
             default=24,
             help='Number of hours ahead to send reminders (default: 24)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Concurrent send workers (default: REMINDER_DISPATCH_WORKERS)',
+        )
 
     def handle(self, *args, **options):
-        hours_ahead = options['hours']
-        now = timezone.now()
-        reminder_time = now + timedelta(hours=hours_ahead)
-        
-        # Find appointments scheduled within the reminder window
-        appointments = Appointment.objects.filter(
-            status__in=['SCHEDULED', 'CONFIRMED'],
-            appointment_date__gte=now,
-            appointment_date__lte=reminder_time,
-        ).select_related('patient', 'doctor')
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for appointment in appointments:
-            try:
-                if appointment.patient and appointment.patient.email:
-                    send_appointment_reminder(appointment)
-                    sent_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'Sent reminder for appointment #{appointment.id} '
-                            f'({appointment.patient.get_full_name()})'
-                        )
-                    )
-            except Exception as e:
-                failed_count += 1
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'Failed to send reminder for appointment #{appointment.id}: {e}'
-                    )
-                )
+        result = ReminderDispatcher(
+            'email',
+            hours_before=options['hours'],
+            max_workers=options['workers'],
+            catch_all=True,
+        ).run()
         
         self.stdout.write(
             self.style.SUCCESS(
-                f'\nReminder emails sent: {sent_count}, Failed: {failed_count}'
+                f'\nReminder emails sent: {result.sent}, Failed: {result.failed}, '
+                f'Skipped (no email): {result.skipped}'
             )
         )
@@ -3,21 +3,36 @@ Send WhatsApp appointment reminders (24h and 2h before).
 
 Usage:
     python manage.py send_whatsapp_reminders
+    python manage.py send_whatsapp_reminders --workers 16
 
 Run periodically via cron (e.g. every 15 minutes) or Celery Beat.
+Reminders that fell due while cron was not running are sent on the next run.
 """
 from django.core.management.base import BaseCommand
-from apps.notifications.tasks import run_whatsapp_reminders_24h, run_whatsapp_reminders_2h
+from apps.notifications.reminder_dispatcher import ReminderDispatcher
 
 
 class Command(BaseCommand):
     help = 'Send WhatsApp reminders for appointments (24h and 2h before)'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Concurrent send workers (default: REMINDER_DISPATCH_WORKERS)',
+        )
+
     def handle(self, *args, **options):
-        s24 = run_whatsapp_reminders_24h()
-        s2 = run_whatsapp_reminders_2h()
+        results = {}
+        for hours in (24, 2):
+            results[hours] = ReminderDispatcher(
+                'whatsapp', hours_before=hours, max_workers=options['workers'],
+            ).run()
         self.stdout.write(
             self.style.SUCCESS(
-                f'WhatsApp reminders sent: 24h={s24}, 2h={s2}'
+                f'WhatsApp reminders sent: 24h={results[24].sent}, 2h={results[2].sent} '
+                f'(failed: {results[24].failed + results[2].failed}, '
+                f'skipped: {results[24].skipped + results[2].skipped})'
             )
         )
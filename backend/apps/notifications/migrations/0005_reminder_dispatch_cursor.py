@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_service_area'),
+        ('notifications', '0004_rename_appt_reminder_appt_idx_appointment_appoint_0135cb_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderDispatchCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('whatsapp', 'WhatsApp'), ('sms', 'SMS'), ('email', 'Email')], help_text='Reminder channel', max_length=20)),
+                ('hours_before', models.IntegerField(help_text='Reminder offset in hours before the appointment')),
+                ('dispatched_until', models.DateTimeField(blank=True, help_text='Time of the last completed dispatch run', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Reminder Dispatch Cursor',
+                'verbose_name_plural': 'Reminder Dispatch Cursors',
+                'db_table': 'reminder_dispatch_cursors',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='appointmentreminder',
+            index=models.Index(fields=['appointment', 'channel', 'hours_before'], name='appt_reminder_dedupe_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reminderdispatchcursor',
+            constraint=models.UniqueConstraint(fields=('channel', 'hours_before'), name='unique_reminder_dispatch_cursor'),
+        ),
+    ]
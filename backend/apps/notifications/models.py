@@ -188,9 +188,43 @@ class AppointmentReminder(models.Model):
             models.Index(fields=['appointment']),
             models.Index(fields=['status']),
             models.Index(fields=['channel']),
+            # Dispatcher anti-join: "no reminder yet for this appointment/channel/offset"
+            models.Index(fields=['appointment', 'channel', 'hours_before'], name='appt_reminder_dedupe_idx'),
         ]
         verbose_name = 'Appointment Reminder'
         verbose_name_plural = 'Appointment Reminders'
     
     def __str__(self):
         return f"Reminder #{self.id} – {self.appointment_id} ({self.channel}) {self.status}"
+
+
+class ReminderDispatchCursor(models.Model):
+    """
+    How far the reminder dispatcher has processed one (channel, hours_before) pair.
+    
+    dispatched_until is the time of the last completed dispatch run; the next run
+    covers every reminder that fell due after it, so missed cron runs are caught up.
+    """
+    channel = models.CharField(
+        max_length=20,
+        choices=AppointmentReminder.CHANNEL_CHOICES,
+        help_text="Reminder channel",
+    )
+    hours_before = models.IntegerField(help_text="Reminder offset in hours before the appointment")
+    dispatched_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Time of the last completed dispatch run",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'reminder_dispatch_cursors'
+        constraints = [
+            models.UniqueConstraint(fields=['channel', 'hours_before'], name='unique_reminder_dispatch_cursor'),
+        ]
+        verbose_name = 'Reminder Dispatch Cursor'
+        verbose_name_plural = 'Reminder Dispatch Cursors'
+    
+    def __str__(self):
+        return f"{self.channel} {self.hours_before}h dispatched until {self.dispatched_until}"
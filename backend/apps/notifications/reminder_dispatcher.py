@@ -0,0 +1,320 @@
+"""
+Batched appointment reminder dispatcher.
+
+One dispatcher run for a (channel, hours_before) pair:
+1. Selects every appointment whose reminder has come due since the last run in
+   a single query (patient and patient.user joined), excluding appointments
+   that already have a reminder for this channel/offset via a NOT EXISTS anti-join.
+2. Claims them by bulk-creating PENDING AppointmentReminder rows.
+3. Sends the messages through a thread pool, throttled per provider.
+4. Writes the outcomes back with one bulk_update.
+
+A persistent ReminderDispatchCursor records how far each pair has been
+processed, so a cron run after downtime picks up every reminder that fell due
+in the gap (as long as the appointment is still in the future) and never sends
+the same reminder twice.
+
+Worker threads only talk to the provider; all database work happens on the
+calling thread.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+# How far either side of the exact reminder moment an appointment is still caught.
+DEFAULT_LEAD = {
+    24: timedelta(hours=1),
+    2: timedelta(minutes=10),
+}
+
+# Default per-provider send rate (messages/second); override with REMINDER_PROVIDER_RATES.
+DEFAULT_PROVIDER_RATES = {
+    'whatsapp': 10.0,
+    'email': 5.0,
+}
+
+
+@dataclass
+class DispatchResult:
+    selected: int = 0
+    sent: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+class ProviderThrottle:
+    """Thread-safe fixed-interval throttle: at most `rate` acquisitions per second."""
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    @classmethod
+    def for_provider(cls, provider):
+        """Shared throttle per provider, so concurrent dispatchers share one budget."""
+        with cls._registry_lock:
+            if provider not in cls._registry:
+                rates = {**DEFAULT_PROVIDER_RATES, **getattr(settings, 'REMINDER_PROVIDER_RATES', {})}
+                cls._registry[provider] = cls(rates.get(provider))
+            return cls._registry[provider]
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _format_whatsapp_message(appointment):
+    from .tasks import REMINDER_TEMPLATE, _get_clinic_name
+
+    apt_date = timezone.localtime(appointment.appointment_date)
+    return REMINDER_TEMPLATE.format(
+        clinic=_get_clinic_name(),
+        date=apt_date.strftime('%A, %d %B %Y'),
+        time=apt_date.strftime('%I:%M %p'),
+    )
+
+
+def _build_whatsapp_payload(appointment):
+    from .tasks import _format_phone
+
+    phone = _format_phone(appointment.patient)
+    if not phone:
+        return None
+    return {'recipient': phone, 'message': _format_whatsapp_message(appointment)}
+
+
+def _send_whatsapp(payload):
+    from .whatsapp_service import send_whatsapp_message
+    return send_whatsapp_message(payload['recipient'], payload['message'])
+
+
+def _build_email_payload(appointment):
+    patient = appointment.patient
+    if not patient.email:
+        return None
+    doctor = appointment.doctor
+    context = {
+        'patient_name': patient.full_name,
+        'doctor_name': f"{doctor.first_name} {doctor.last_name}",
+        'appointment_date': appointment.appointment_date.strftime('%B %d, %Y'),
+        'appointment_time': appointment.appointment_date.strftime('%I:%M %p'),
+        'reason': appointment.reason or 'General consultation',
+        'current_year': timezone.now().year,
+    }
+    html_message = render_to_string('notifications/appointment_reminder.html', context)
+    return {
+        'recipient': patient.email,
+        'recipient_name': patient.full_name,
+        'subject': f'Appointment Reminder - {context["appointment_date"]}',
+        'html_message': html_message,
+        'message': strip_tags(html_message),
+    }
+
+
+def _send_email(payload):
+    send_mail(
+        subject=payload['subject'],
+        message=payload['message'],
+        html_message=payload['html_message'],
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[payload['recipient']],
+        fail_silently=False,
+    )
+    return True
+
+
+CHANNELS = {
+    'whatsapp': (_build_whatsapp_payload, _send_whatsapp),
+    'email': (_build_email_payload, _send_email),
+}
+
+
+class ReminderDispatcher:
+    """
+    Dispatch all due reminders for one channel and offset.
+
+    Usage:
+        ReminderDispatcher('whatsapp', hours_before=24).run()
+        ReminderDispatcher('email', hours_before=24, catch_all=True).run()
+    """
+
+    def __init__(self, channel, hours_before, lead=None, max_workers=None, now=None, catch_all=False):
+        if channel not in CHANNELS:
+            raise ValueError(f"Unsupported reminder channel: {channel}")
+        self.channel = channel
+        self.hours_before = hours_before
+        self.lead = lead if lead is not None else DEFAULT_LEAD.get(hours_before, timedelta(minutes=30))
+        self.max_workers = max_workers or getattr(settings, 'REMINDER_DISPATCH_WORKERS', 8)
+        self.now = now or timezone.now()
+        self.catch_all = catch_all
+        self.build_payload, self.sender = CHANNELS[channel]
+        self.throttle = ProviderThrottle.for_provider(channel)
+
+    def due_window(self, dispatched_until):
+        """
+        Appointment-time window whose reminders are due in this run.
+
+        Upper bound: reminder moment (appointment - hours_before) reached, with lead.
+        Lower bound: just after what the previous run covered, but never in the past.
+        With catch_all, every upcoming appointment within hours_before is due.
+        """
+        offset = timedelta(hours=self.hours_before)
+        if self.catch_all:
+            return self.now, self.now + offset
+        window_end = self.now + offset + self.lead
+        if dispatched_until is None:
+            window_start = self.now + offset - self.lead
+        else:
+            window_start = dispatched_until + offset + self.lead
+        return max(window_start, self.now), window_end
+
+    def select_due(self, window_start, window_end):
+        from apps.appointments.models import Appointment
+        from .models import AppointmentReminder
+
+        already_sent = AppointmentReminder.objects.filter(
+            appointment=OuterRef('pk'),
+            channel=self.channel,
+            hours_before=self.hours_before,
+        )
+        return list(
+            Appointment.objects.filter(
+                status__in=['SCHEDULED', 'CONFIRMED'],
+                appointment_date__gt=window_start,
+                appointment_date__lte=window_end,
+            )
+            .exclude(Exists(already_sent))
+            .select_related('patient', 'patient__user', 'doctor')
+            .order_by('appointment_date', 'id')
+        )
+
+    def run(self):
+        from .models import AppointmentReminder, ReminderDispatchCursor
+
+        result = DispatchResult()
+        with transaction.atomic():
+            # Row lock serializes concurrent runs for the same channel/offset
+            cursor, _ = ReminderDispatchCursor.objects.select_for_update().get_or_create(
+                channel=self.channel, hours_before=self.hours_before,
+            )
+            window_start, window_end = self.due_window(cursor.dispatched_until)
+            appointments = self.select_due(window_start, window_end)
+            result.selected = len(appointments)
+
+            jobs = []
+            for appointment in appointments:
+                payload = self.build_payload(appointment)
+                if payload is None:
+                    logger.warning(
+                        "No %s recipient for patient %s, skip reminder", self.channel, appointment.patient_id
+                    )
+                    result.skipped += 1
+                    continue
+                jobs.append((appointment, payload))
+
+            reminders = AppointmentReminder.objects.bulk_create([
+                AppointmentReminder(
+                    appointment=appointment,
+                    channel=self.channel,
+                    hours_before=self.hours_before,
+                    status='PENDING',
+                )
+                for appointment, _ in jobs
+            ])
+            if reminders and reminders[0].pk is None:
+                # Backends that cannot return ids from bulk inserts
+                by_appointment = {
+                    r.appointment_id: r
+                    for r in AppointmentReminder.objects.filter(
+                        appointment_id__in=[a.id for a, _ in jobs],
+                        channel=self.channel,
+                        hours_before=self.hours_before,
+                        status='PENDING',
+                    )
+                }
+                reminders = [by_appointment[a.id] for a, _ in jobs]
+
+            cursor.dispatched_until = self.now
+            cursor.save(update_fields=['dispatched_until', 'updated_at'])
+
+        outcomes = self._send_all([payload for _, payload in jobs])
+
+        sent_at = timezone.now()
+        for reminder, (ok, error) in zip(reminders, outcomes):
+            reminder.sent_at = sent_at
+            reminder.status = 'SENT' if ok else 'FAILED'
+            reminder.error_message = '' if ok else (error or 'Send failed (stub or provider error)')
+            if ok:
+                result.sent += 1
+            else:
+                result.failed += 1
+        AppointmentReminder.objects.bulk_update(reminders, ['sent_at', 'status', 'error_message'], batch_size=500)
+
+        if self.channel == 'email':
+            self._record_email_notifications(jobs, outcomes, sent_at)
+
+        logger.info(
+            "Reminder dispatch %s/%sh: selected=%d sent=%d failed=%d skipped=%d",
+            self.channel, self.hours_before, result.selected, result.sent, result.failed, result.skipped,
+        )
+        return result
+
+    def _send_one(self, payload):
+        self.throttle.acquire()
+        try:
+            return bool(self.sender(payload)), None
+        except Exception as e:
+            logger.warning("Reminder send via %s failed: %s", self.channel, e)
+            return False, str(e)
+
+    def _send_all(self, payloads):
+        if not payloads:
+            return []
+        if self.max_workers <= 1 or len(payloads) == 1:
+            return [self._send_one(p) for p in payloads]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(payloads))) as pool:
+            return list(pool.map(self._send_one, payloads))
+
+    def _record_email_notifications(self, jobs, outcomes, sent_at):
+        """Email reminders are also logged as EmailNotification rows, like send_email_notification()."""
+        from .models import EmailNotification
+
+        EmailNotification.objects.bulk_create([
+            EmailNotification(
+                notification_type='APPOINTMENT_REMINDER',
+                status='SENT' if ok else 'FAILED',
+                recipient_email=payload['recipient'],
+                recipient_name=payload['recipient_name'],
+                appointment=appointment,
+                subject=payload['subject'],
+                email_body=payload['message'],
+                created_by_id=appointment.created_by_id,
+                sent_at=sent_at if ok else None,
+                error_message=error or '',
+            )
+            for (appointment, payload), (ok, error) in zip(jobs, outcomes)
+        ], batch_size=500)
@@ -99,8 +99,8 @@ def _send_via_twilio(phone_number, message, notification):
     - TWILIO_PHONE_NUMBER in settings
     """
     try:
-        from twilio.rest import Client
         from django.utils import timezone
+        from core.http_client import get_client, twilio_client
         
         account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
         auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
@@ -109,13 +109,12 @@ def _send_via_twilio(phone_number, message, notification):
         if not all([account_sid, auth_token, from_number]):
             raise ValueError("Twilio credentials not configured")
         
-        client = Client(account_sid, auth_token)
-        
-        message_obj = client.messages.create(
-            body=message,
-            from_=from_number,
-            to=phone_number
-        )
+        with get_client('twilio').track():
+            message_obj = twilio_client(account_sid, auth_token).messages.create(
+                body=message,
+                from_=from_number,
+                to=phone_number
+            )
         
         notification.status = 'SENT'
         notification.sent_at = timezone.now()
@@ -139,8 +138,8 @@ def _send_via_termii(phone_number, message, notification):
     - TERMII_SENDER_ID in settings (alphanumeric, 3-11 chars)
     - TERMII_BASE_URL in settings (per-account, default api.termii.com)
     """
-    import requests
     from django.utils import timezone
+    from core.http_client import get_client
 
     api_key = getattr(settings, 'TERMII_API_KEY', None)
     sender_id = getattr(settings, 'TERMII_SENDER_ID', None)
@@ -162,7 +161,7 @@ def _send_via_termii(phone_number, message, notification):
         'channel': 'dnd',  # Transactional - bypasses DND, no time restrictions
     }
 
-    response = requests.post(url, json=payload, timeout=30)
+    response = get_client('termii').post(url, json=payload)
     try:
         data = response.json() if response.text else {}
     except Exception:
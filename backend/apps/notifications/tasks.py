@@ -1,6 +1,9 @@
 """
 Background tasks for appointment reminders (24h and 2h before).
 
+Batch runs go through apps.notifications.reminder_dispatcher.ReminderDispatcher;
+send_reminder_for_appointment() remains for one-off sends.
+
 Run via:
 - Cron: python manage.py send_whatsapp_reminders
 - Or Celery Beat if CELERY_APP is configured (see below).
@@ -85,48 +88,12 @@ def send_reminder_for_appointment(appointment, hours_before):
 
 
 def run_whatsapp_reminders_24h():
-    """Find appointments in the 24h window and send reminders (if not already sent)."""
-    from apps.appointments.models import Appointment
-    from apps.notifications.models import AppointmentReminder
-    
-    now = timezone.now()
-    window_start = now + timedelta(hours=23)
-    window_end = now + timedelta(hours=25)
-    
-    appointments = Appointment.objects.filter(
-        status__in=['SCHEDULED', 'CONFIRMED'],
-        appointment_date__gte=window_start,
-        appointment_date__lte=window_end,
-    ).select_related('patient')
-    
-    sent = 0
-    for apt in appointments:
-        if AppointmentReminder.objects.filter(appointment=apt, hours_before=24, channel='whatsapp').exists():
-            continue
-        if send_reminder_for_appointment(apt, hours_before=24):
-            sent += 1
-    return sent
+    """Send 24h WhatsApp reminders that have come due since the last run (never twice)."""
+    from apps.notifications.reminder_dispatcher import ReminderDispatcher
+    return ReminderDispatcher('whatsapp', hours_before=24).run().sent
 
 
 def run_whatsapp_reminders_2h():
-    """Find appointments in the 2h window and send reminders (if not already sent)."""
-    from apps.appointments.models import Appointment
-    from apps.notifications.models import AppointmentReminder
-    
-    now = timezone.now()
-    window_start = now + timedelta(hours=1, minutes=50)
-    window_end = now + timedelta(hours=2, minutes=10)
-    
-    appointments = Appointment.objects.filter(
-        status__in=['SCHEDULED', 'CONFIRMED'],
-        appointment_date__gte=window_start,
-        appointment_date__lte=window_end,
-    ).select_related('patient')
-    
-    sent = 0
-    for apt in appointments:
-        if AppointmentReminder.objects.filter(appointment=apt, hours_before=2, channel='whatsapp').exists():
-            continue
-        if send_reminder_for_appointment(apt, hours_before=2):
-            sent += 1
-    return sent
+    """Send 2h WhatsApp reminders that have come due since the last run (never twice)."""
+    from apps.notifications.reminder_dispatcher import ReminderDispatcher
+    return ReminderDispatcher('whatsapp', hours_before=2).run().sent
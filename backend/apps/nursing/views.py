@@ -25,6 +25,7 @@ from .serializers import (
 )
 from .permissions import IsNurse, CanViewNursingRecords, IsVisitActiveAndPaid
 from apps.visits.models import Visit
+from apps.patients.medical_history import append_medical_history
 
 
 class NursingNoteViewSet(viewsets.ModelViewSet):
@@ -128,15 +129,15 @@ class NursingNoteViewSet(viewsets.ModelViewSet):
         note_entry.append(f"\nRecorded by: {note.recorded_by.get_full_name()}")
         note_entry.append(f"{'='*60}\n")
         
-        # Append to patient's medical history
-        new_entry = "\n".join(note_entry)
-        if patient.medical_history:
-            patient.medical_history += new_entry
-        else:
-            patient.medical_history = new_entry
-        
-        # Save patient (this updates the medical_history field)
-        patient.save(update_fields=['medical_history'])
+        # Append to patient's medical history (one segment, the patient row is untouched)
+        append_medical_history(
+            patient,
+            "\n".join(note_entry),
+            source='nursing_note',
+            source_id=note.pk,
+            visit_id=visit.id,
+            recorded_at=timestamp,
+        )
     
     def perform_create(self, serializer):
         """Create nursing note."""
@@ -301,13 +302,14 @@ class MedicationAdministrationViewSet(viewsets.ModelViewSet):
         entry.append(f"\nAdministered by: {administration.administered_by.get_full_name()}")
         entry.append(f"{'='*60}\n")
         
-        new_entry = "\n".join(entry)
-        if patient.medical_history:
-            patient.medical_history += new_entry
-        else:
-            patient.medical_history = new_entry
-        
-        patient.save(update_fields=['medical_history'])
+        append_medical_history(
+            patient,
+            "\n".join(entry),
+            source='medication_administration',
+            source_id=administration.pk,
+            visit_id=visit.id,
+            recorded_at=timestamp,
+        )
     
     def perform_create(self, serializer):
         """Create medication administration record."""
@@ -490,13 +492,14 @@ class LabSampleCollectionViewSet(viewsets.ModelViewSet):
         entry.append(f"\nCollected by: {collection.collected_by.get_full_name()}")
         entry.append(f"{'='*60}\n")
         
-        new_entry = "\n".join(entry)
-        if patient.medical_history:
-            patient.medical_history += new_entry
-        else:
-            patient.medical_history = new_entry
-        
-        patient.save(update_fields=['medical_history'])
+        append_medical_history(
+            patient,
+            "\n".join(entry),
+            source='lab_sample_collection',
+            source_id=collection.pk,
+            visit_id=visit.id,
+            recorded_at=timestamp,
+        )
     
     def perform_create(self, serializer):
         """Create lab sample collection record."""
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offline', '0004_rename_sync_logs_user_device_idx_sync_logs_user_id_90da59_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncqueue',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Client-generated key; replaying it returns the stored result', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='syncqueue',
+            name='resource_id',
+            field=models.IntegerField(blank=True, help_text='ID of the record the action created or updated', null=True),
+        ),
+        migrations.AlterField(
+            model_name='syncqueue',
+            name='action_type',
+            field=models.CharField(choices=[('CREATE_CONSULTATION', 'Create Consultation'), ('UPDATE_CONSULTATION', 'Update Consultation'), ('CREATE_LAB_ORDER', 'Create Lab Order'), ('CREATE_RADIOLOGY_ORDER', 'Create Radiology Order'), ('CREATE_PRESCRIPTION', 'Create Prescription'), ('RECORD_VITALS', 'Record Vital Signs'), ('CREATE_NURSING_NOTE', 'Create Nursing Note'), ('ADMINISTER_MEDICATION', 'Administer Medication'), ('SAVE_CONSULTATION_DRAFT', 'Save Consultation Draft')], help_text='Type of action to sync', max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='syncqueue',
+            constraint=models.UniqueConstraint(fields=('created_by', 'idempotency_key'), name='sync_queue_user_idempotency_key'),
+        ),
+    ]
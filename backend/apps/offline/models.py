@@ -121,6 +121,10 @@ class SyncQueue(models.Model):
         ('CREATE_LAB_ORDER', 'Create Lab Order'),
         ('CREATE_RADIOLOGY_ORDER', 'Create Radiology Order'),
         ('CREATE_PRESCRIPTION', 'Create Prescription'),
+        ('RECORD_VITALS', 'Record Vital Signs'),
+        ('CREATE_NURSING_NOTE', 'Create Nursing Note'),
+        ('ADMINISTER_MEDICATION', 'Administer Medication'),
+        ('SAVE_CONSULTATION_DRAFT', 'Save Consultation Draft'),
     ]
     
     STATUS_CHOICES = [
@@ -180,6 +184,20 @@ class SyncQueue(models.Model):
         help_text="Number of sync retry attempts"
     )
     
+    # Idempotency (batched sync protocol)
+    idempotency_key = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text="Client-generated key; replaying it returns the stored result"
+    )
+    
+    resource_id = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="ID of the record the action created or updated"
+    )
+    
     # Audit timestamps
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -201,6 +219,12 @@ class SyncQueue(models.Model):
             models.Index(fields=['created_by']),
             models.Index(fields=['created_at']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['created_by', 'idempotency_key'],
+                name='sync_queue_user_idempotency_key',
+            ),
+        ]
         verbose_name = 'Sync Queue Item'
         verbose_name_plural = 'Sync Queue Items'
     
@@ -0,0 +1,34 @@
+"""
+Request parsers for the offline sync API.
+"""
+import io
+import zlib
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+# Upper bound on a decompressed sync body (guards against gzip bombs)
+MAX_DECOMPRESSED_BYTES = 10 * 1024 * 1024
+
+
+class GzipJSONParser(JSONParser):
+    """
+    JSON parser that also accepts a gzip-compressed body (Content-Encoding: gzip).
+
+    Queued ward actions are repetitive JSON and typically compress 5-10x,
+    which matters on the slow links the offline workflow exists for.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '') if request is not None else ''
+        if encoding.strip().lower() == 'gzip' and stream is not None:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                body = decompressor.decompress(stream.read(), MAX_DECOMPRESSED_BYTES + 1)
+            except zlib.error as e:
+                raise ParseError(f'Invalid gzip body: {e}')
+            if len(body) > MAX_DECOMPRESSED_BYTES or decompressor.unconsumed_tail:
+                raise ParseError('Decompressed body is too large')
+            stream = io.BytesIO(body)
+        return super().parse(stream, media_type, parser_context)
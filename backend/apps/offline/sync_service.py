@@ -0,0 +1,416 @@
+"""
+Batched offline sync protocol (SyncQueue / OfflineDraft).
+
+A ward tablet queues actions while offline and replays them in one request
+when it reconnects:
+
+    {
+        "device_id": "ward-3-tablet",
+        "cursor": "2026-05-01T09:30:00.123456+00:00",   // from the last sync, or null
+        "visit_ids": [12, 15],                             // visits the device tracks
+        "actions": [
+            {"idempotency_key": "6f1c...", "action_type": "RECORD_VITALS",
+             "visit_id": 12, "data": {"temperature": "37.2", "pulse": 88}},
+            {"idempotency_key": "7a2d...", "action_type": "SAVE_CONSULTATION_DRAFT",
+             "visit_id": 15, "base_updated_at": "...", "data": {"history": "..."}}
+        ]
+    }
+
+Actions are grouped by visit. Each visit's actions are applied in client
+order inside one transaction holding the visit row lock; every action runs
+in its own savepoint, so a rejected action does not discard the rest of the
+visit. Outcomes are recorded on SyncQueue under (user, idempotency_key):
+replaying a synced key returns the stored result without writing again,
+and failed keys may be retried.
+
+Result statuses:
+- applied:   written now
+- duplicate: the key was already synced; resource_id is the original record
+- conflict:  valid, but the server moved on (visit closed, consultation
+             edited since base_updated_at); consultation drafts are kept
+             as an OfflineDraft so nothing typed offline is lost
+- rejected:  invalid data, wrong role, unknown visit or action type
+"""
+import logging
+from collections import namedtuple
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError as DRFValidationError
+
+from apps.clinical.models import VitalSigns
+from apps.clinical.serializers import VitalSignsCreateSerializer, VitalSignsSerializer
+from apps.clinical.views import create_vital_signs_alerts, log_clinical_action
+from apps.consultations.models import Consultation
+from apps.consultations.serializers import ConsultationSerializer
+from apps.nursing.models import MedicationAdministration, NursingNote
+from apps.nursing.serializers import (
+    MedicationAdministrationCreateSerializer,
+    MedicationAdministrationSerializer,
+    NursingNoteCreateSerializer,
+    NursingNoteSerializer,
+)
+from apps.visits.models import Visit
+from core.audit import log_consultation_action, log_nurse_action
+
+from .models import OfflineDraft, SyncQueue
+
+logger = logging.getLogger(__name__)
+
+MAX_SYNC_ACTIONS = 500
+MAX_SYNC_VISITS = 100
+
+# Rows committed by transactions that were still open when the previous
+# cursor was taken can carry an older timestamp; re-sending that window is
+# harmless because clients upsert by id.
+CURSOR_OVERLAP = timedelta(seconds=30)
+
+# Conflicted consultation drafts are kept this long for the doctor to merge
+DRAFT_TTL = timedelta(days=7)
+
+APPLIED = 'applied'
+DUPLICATE = 'duplicate'
+CONFLICT = 'conflict'
+REJECTED = 'rejected'
+
+
+class SyncConflict(Exception):
+    """The action is valid, but the server state changed since the client read it."""
+
+    def __init__(self, reason, detail, server=None, draft_resource=None):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+        self.server = server
+        self.draft_resource = draft_resource
+
+
+class SyncRejected(Exception):
+    """The action can never apply as sent."""
+
+    def __init__(self, reason, detail, errors=None):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+        self.errors = errors
+
+
+def _record_vitals(action, visit, user, request):
+    serializer = VitalSignsCreateSerializer(data=action['data'])
+    serializer.is_valid(raise_exception=True)
+    vital_signs = serializer.save(visit=visit, recorded_by=user)
+    create_vital_signs_alerts(visit, vital_signs)
+    log_clinical_action(
+        user=user,
+        action='VITAL_SIGNS_RECORDED',
+        visit_id=visit.id,
+        resource_type='vital_signs',
+        resource_id=vital_signs.id,
+        request=request,
+    )
+    return vital_signs
+
+
+def _create_nursing_note(action, visit, user, request):
+    from apps.nursing.views import NursingNoteViewSet
+
+    serializer = NursingNoteCreateSerializer(data=action['data'])
+    serializer.is_valid(raise_exception=True)
+    merge_with_patient = serializer.validated_data.pop('merge_with_patient_record', False)
+    note = serializer.save(visit=visit, recorded_by=user)
+    if merge_with_patient:
+        NursingNoteViewSet().merge_with_patient_history(note, visit)
+    log_nurse_action(
+        user=user,
+        action='nursing_note.create',
+        visit_id=visit.id,
+        resource_type='nursing_note',
+        resource_id=note.id,
+        request=request,
+        metadata={
+            'note_type': note.note_type,
+            'merged_with_patient_record': merge_with_patient,
+            'offline_sync': True,
+        }
+    )
+    return note
+
+
+def _administer_medication(action, visit, user, request):
+    from apps.nursing.views import MedicationAdministrationViewSet
+
+    serializer = MedicationAdministrationCreateSerializer(data=action['data'])
+    serializer.is_valid(raise_exception=True)
+    merge_with_patient = serializer.validated_data.pop('merge_with_patient_record', False)
+    prescription = serializer.validated_data.get('prescription')
+    if prescription and prescription.visit_id != visit.id:
+        raise DRFValidationError("Prescription must belong to the same visit.")
+    administration = serializer.save(visit=visit, administered_by=user)
+    if merge_with_patient:
+        MedicationAdministrationViewSet().merge_with_patient_history(administration, visit)
+    log_nurse_action(
+        user=user,
+        action='medication_administration.create',
+        visit_id=visit.id,
+        resource_type='medication_administration',
+        resource_id=administration.id,
+        request=request,
+        metadata={
+            'prescription_id': administration.prescription_id,
+            'status': administration.status,
+            'route': administration.route,
+            'merged_with_patient_record': merge_with_patient,
+            'offline_sync': True,
+        }
+    )
+    return administration
+
+
+def _save_consultation_draft(action, visit, user, request):
+    """
+    Create the visit's consultation, or update it if the client saw its latest version.
+
+    The client sends base_updated_at, the consultation's updated_at when it
+    last synced; an edit made on the server since then is a conflict.
+    """
+    from apps.consultations.views import ConsultationViewSet
+
+    consultation = Consultation.objects.select_for_update().filter(visit=visit).first()
+    if consultation is not None:
+        base = parse_datetime(action.get('base_updated_at') or '')
+        if base is None or consultation.updated_at > base:
+            raise SyncConflict(
+                'consultation_modified',
+                "The consultation was changed on the server after this draft was started.",
+                server=ConsultationSerializer(consultation).data,
+                draft_resource='CONSULTATION',
+            )
+    serializer = ConsultationSerializer(consultation, data=action['data'], partial=consultation is not None)
+    serializer.is_valid(raise_exception=True)
+    merge_with_patient = serializer.validated_data.pop('merge_with_patient_record', False)
+    if consultation is None:
+        consultation = serializer.save(visit=visit, created_by=user)
+        audit_action = 'create'
+    else:
+        consultation = serializer.save()
+        audit_action = 'update'
+    if merge_with_patient:
+        ConsultationViewSet().merge_with_patient_history(consultation, visit)
+    # A draft that applies supersedes any earlier conflicted drafts of this user
+    OfflineDraft.objects.filter(
+        visit_id=visit.id, resource_type='CONSULTATION', created_by=user, synced=False,
+    ).update(synced=True, synced_at=timezone.now())
+    log_consultation_action(
+        user=user,
+        action=audit_action,
+        visit_id=visit.id,
+        consultation_id=consultation.id,
+        request=request
+    )
+    return consultation
+
+
+ActionHandler = namedtuple('ActionHandler', ['apply', 'resource_type', 'roles'])
+
+ACTION_HANDLERS = {
+    'RECORD_VITALS': ActionHandler(_record_vitals, 'vital_signs', ('DOCTOR', 'NURSE')),
+    'CREATE_NURSING_NOTE': ActionHandler(_create_nursing_note, 'nursing_note', ('NURSE',)),
+    'ADMINISTER_MEDICATION': ActionHandler(_administer_medication, 'medication_administration', ('NURSE',)),
+    'SAVE_CONSULTATION_DRAFT': ActionHandler(_save_consultation_draft, 'consultation', ('DOCTOR',)),
+}
+
+
+def _user_role(user):
+    return getattr(user, 'role', None) or getattr(user, 'get_role', lambda: None)()
+
+
+def _result(action, status, **extra):
+    handler = ACTION_HANDLERS.get(action['action_type'])
+    return {
+        'idempotency_key': action['idempotency_key'],
+        'action_type': action['action_type'],
+        'visit_id': action['visit_id'],
+        'status': status,
+        'resource_type': handler.resource_type if handler else None,
+        **extra,
+    }
+
+
+def _apply_action(handler, action, visit, user, request):
+    """Run one action in a savepoint and describe its outcome."""
+    if _user_role(user) not in handler.roles:
+        raise SyncRejected('forbidden', f"Role may not perform {action['action_type']}.")
+    try:
+        with transaction.atomic():
+            instance = handler.apply(action, visit, user, request)
+    except (SyncConflict, SyncRejected):
+        raise
+    except DRFValidationError as e:
+        raise SyncRejected('invalid', 'Validation failed.', errors=e.detail)
+    except DjangoValidationError as e:
+        raise SyncRejected('invalid', 'Validation failed.', errors=e.messages)
+    except Exception as e:
+        logger.error(f"Offline sync action {action['idempotency_key']} failed: {e}", exc_info=True)
+        raise SyncRejected('server_error', str(e))
+    return _result(action, APPLIED, resource_id=instance.pk)
+
+
+def _apply_visit_actions(user, visit_id, visit_actions, request):
+    """Apply one visit's actions in a single transaction; returns [(index, result)]."""
+    outcomes = []
+    with transaction.atomic():
+        visit = Visit.objects.select_for_update().filter(pk=visit_id).first()
+        if visit is None:
+            return [
+                (index, _result(action, REJECTED, reason='visit_not_found', detail=f"Visit {visit_id} not found."))
+                for index, action in visit_actions
+            ]
+
+        keys = [action['idempotency_key'] for _, action in visit_actions]
+        entries = {
+            entry.idempotency_key: entry
+            for entry in SyncQueue.objects.filter(created_by=user, idempotency_key__in=keys)
+        }
+        now = timezone.now()
+        created = []
+        retried = []
+
+        for index, action in visit_actions:
+            entry = entries.get(action['idempotency_key'])
+            if entry is not None and entry.status == 'SYNCED':
+                outcomes.append((index, _result(action, DUPLICATE, resource_id=entry.resource_id)))
+                continue
+            handler = ACTION_HANDLERS.get(action['action_type'])
+            if handler is None:
+                outcomes.append((index, _result(
+                    action, REJECTED, reason='unknown_action_type',
+                    detail=f"Unknown action_type: {action['action_type']}",
+                )))
+                continue
+
+            try:
+                if visit.status == 'CLOSED':
+                    raise SyncConflict('visit_closed', "Visit is CLOSED. Closed visits are immutable.")
+                result = _apply_action(handler, action, visit, user, request)
+            except SyncConflict as e:
+                result = _result(action, CONFLICT, reason=e.reason, detail=e.detail)
+                if e.server is not None:
+                    result['server'] = e.server
+                if e.draft_resource:
+                    draft = OfflineDraft.objects.create(
+                        visit_id=visit.id,
+                        resource_type=e.draft_resource,
+                        draft_data=action['data'],
+                        created_by=user,
+                        expires_at=now + DRAFT_TTL,
+                    )
+                    result['draft_id'] = draft.id
+            except SyncRejected as e:
+                result = _result(action, REJECTED, reason=e.reason, detail=e.detail)
+                if e.errors is not None:
+                    result['errors'] = e.errors
+
+            if entry is None:
+                entry = SyncQueue(
+                    visit_id=visit.id,
+                    action_type=action['action_type'],
+                    action_data=action['data'],
+                    created_by=user,
+                    idempotency_key=action['idempotency_key'],
+                )
+                created.append(entry)
+            else:
+                entry.action_data = action['data']
+                entry.retry_count += 1
+                entry.updated_at = now
+                retried.append(entry)
+            if result['status'] == APPLIED:
+                entry.status = 'SYNCED'
+                entry.resource_id = result['resource_id']
+                entry.synced_at = now
+                entry.error_message = ''
+            else:
+                entry.status = 'FAILED'
+                entry.error_message = f"{result['reason']}: {result['detail']}"
+            outcomes.append((index, result))
+
+        # SyncQueue.save() runs full_clean per row; the protocol builds valid rows itself
+        if created:
+            SyncQueue.objects.bulk_create(created)
+        if retried:
+            SyncQueue.objects.bulk_update(
+                retried,
+                ['action_data', 'retry_count', 'status', 'resource_id', 'synced_at', 'error_message', 'updated_at'],
+            )
+    return outcomes
+
+
+def apply_sync_batch(user, actions, request=None):
+    """
+    Apply queued offline actions; returns one result dict per action, in input order.
+
+    Each action is a dict with idempotency_key, action_type, visit_id, data
+    and, for consultation drafts, base_updated_at.
+    """
+    by_visit = {}
+    for index, action in enumerate(actions):
+        by_visit.setdefault(action['visit_id'], []).append((index, action))
+    results = [None] * len(actions)
+    for visit_id, visit_actions in by_visit.items():
+        for index, result in _apply_visit_actions(user, visit_id, visit_actions, request):
+            results[index] = result
+    return results
+
+
+# Delta feed: (response key, queryset, timestamp field, serializer)
+SYNC_RESOURCES = (
+    ('vital_signs', lambda: VitalSigns.objects.select_related('recorded_by'), 'recorded_at', VitalSignsSerializer),
+    ('nursing_notes', lambda: NursingNote.objects.select_related('visit', 'recorded_by'), 'recorded_at',
+     NursingNoteSerializer),
+    ('medication_administrations', lambda: MedicationAdministration.objects.select_related(
+        'visit', 'prescription', 'administered_by'), 'recorded_at', MedicationAdministrationSerializer),
+    ('consultations', lambda: Consultation.objects.select_related('created_by'), 'updated_at',
+     ConsultationSerializer),
+)
+
+
+def parse_cursor(cursor):
+    """Parse a client cursor; None for a first sync. Raises ValueError if malformed."""
+    if cursor in (None, ''):
+        return None
+    parsed = parse_datetime(str(cursor))
+    if parsed is None:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def changes_since(visit_ids, since=None):
+    """
+    Server-side changes to the given visits since `since` (None: everything).
+
+    Returns (changes, cursor): a dict of serialized rows per resource, plus
+    visit status rows, and the cursor the client sends on its next sync.
+    Nursing and vital-sign records are append-only, so their recorded_at
+    orders them; consultations use updated_at.
+    """
+    cursor = timezone.now()
+    if since is not None:
+        since = since - CURSOR_OVERLAP
+
+    visits = Visit.objects.filter(pk__in=visit_ids)
+    if since is not None:
+        visits = visits.filter(updated_at__gte=since)
+    changes = {
+        'visits': list(visits.values('id', 'status', 'payment_status', 'updated_at')),
+    }
+    for key, queryset, timestamp_field, serializer_class in SYNC_RESOURCES:
+        rows = queryset().filter(visit_id__in=visit_ids)
+        if since is not None:
+            rows = rows.filter(**{f'{timestamp_field}__gte': since})
+        changes[key] = serializer_class(rows.order_by(timestamp_field, 'pk'), many=True).data
+    return changes, cursor
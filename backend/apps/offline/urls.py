@@ -0,0 +1,14 @@
+"""
+URL configuration for the offline sync API.
+"""
+from rest_framework.routers import DefaultRouter
+from .views import OfflineSyncViewSet
+
+router = DefaultRouter()
+router.register(
+    r'',  # Empty prefix since 'offline/' is already in the main URL config
+    OfflineSyncViewSet,
+    basename='offline-sync'
+)
+
+urlpatterns = router.urls
@@ -0,0 +1,157 @@
+"""
+Offline sync API.
+
+Endpoint:
+- POST /api/v1/offline/sync/ - apply a batch of queued offline actions and
+  return the server-side changes since the client's cursor
+  (see apps.offline.sync_service for the protocol).
+"""
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework.response import Response
+
+from .models import SyncLog
+from .parsers import GzipJSONParser
+from .sync_service import (
+    MAX_SYNC_ACTIONS,
+    MAX_SYNC_VISITS,
+    apply_sync_batch,
+    changes_since,
+    parse_cursor,
+)
+
+SYNC_ROLES = ('DOCTOR', 'NURSE')
+
+
+class CanSyncOffline(BasePermission):
+    """Permission: only ward clinicians (Doctor, Nurse) sync offline work."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        user_role = getattr(user, 'role', None) or getattr(user, 'get_role', lambda: None)()
+        return user_role in SYNC_ROLES
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+class OfflineSyncViewSet(viewsets.ViewSet):
+    """
+    Batched offline sync for ward tablets.
+
+    One request replaces the per-action round trips a reconnecting device
+    would otherwise make. The body may be gzip-compressed
+    (Content-Encoding: gzip) and the response is gzipped for clients that
+    accept it.
+    """
+    permission_classes = [IsAuthenticated, CanSyncOffline]
+    parser_classes = [GzipJSONParser]
+
+    @action(detail=False, methods=['post'])
+    @method_decorator(gzip_page)
+    def sync(self, request):
+        """
+        Apply queued actions, then return changes since the cursor.
+
+        Request body:
+        {
+            "device_id": "ward-3-tablet",
+            "cursor": "...",              // from the previous response, or null
+            "visit_ids": [12, 15],        // visits to pull changes for
+            "actions": [
+                {"idempotency_key": "...", "action_type": "RECORD_VITALS",
+                 "visit_id": 12, "data": {...}}
+            ]
+        }
+
+        Response:
+        {
+            "results": [{"idempotency_key": "...", "status": "applied", "resource_id": 91, ...}],
+            "changes": {"visits": [...], "vital_signs": [...], "nursing_notes": [...],
+                        "medication_administrations": [...], "consultations": [...]},
+            "cursor": "..."
+        }
+        """
+        actions = request.data.get('actions', [])
+        if not isinstance(actions, list):
+            return Response(
+                {'error': 'actions must be a list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(actions) > MAX_SYNC_ACTIONS:
+            return Response(
+                {'error': f'At most {MAX_SYNC_ACTIONS} actions per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        keys = set()
+        for item in actions:
+            if not isinstance(item, dict):
+                return Response(
+                    {'error': 'Each action must be an object'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            key = item.get('idempotency_key')
+            if not isinstance(key, str) or not key or len(key) > 64:
+                return Response(
+                    {'error': 'Each action needs an idempotency_key of at most 64 characters'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if key in keys:
+                return Response(
+                    {'error': f'Duplicate idempotency_key: {key}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            keys.add(key)
+            if not _is_id(item.get('visit_id')) or not isinstance(item.get('action_type'), str):
+                return Response(
+                    {'error': f'Action {key} needs a visit_id and an action_type'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not isinstance(item.get('data', {}), dict):
+                return Response(
+                    {'error': f'Action {key} data must be an object'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            item.setdefault('data', {})
+
+        visit_ids = request.data.get('visit_ids', [])
+        if not isinstance(visit_ids, list) or not all(_is_id(visit_id) for visit_id in visit_ids):
+            return Response(
+                {'error': 'visit_ids must be a list of visit IDs'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        visit_ids = list(dict.fromkeys(visit_ids + [item['visit_id'] for item in actions]))
+        if len(visit_ids) > MAX_SYNC_VISITS:
+            return Response(
+                {'error': f'At most {MAX_SYNC_VISITS} visits per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            since = parse_cursor(request.data.get('cursor'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = apply_sync_batch(request.user, actions, request=request)
+        changes, cursor = changes_since(visit_ids, since)
+
+        device_id = request.data.get('device_id')
+        if device_id:
+            SyncLog.objects.update_or_create(
+                user=request.user,
+                device_id=str(device_id)[:255],
+                defaults={'last_sync_time': timezone.now()},
+            )
+
+        return Response(
+            {'results': results, 'changes': changes, 'cursor': cursor.isoformat()},
+            status=status.HTTP_200_OK
+        )
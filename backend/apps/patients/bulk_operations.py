@@ -5,169 +5,321 @@ Per EMR Rules:
 - PHI data must be protected
 - All operations must be audited
 - Validation required for all imports
+
+Imports are processed in chunks: each chunk is validated, checked for
+duplicates set-wise (core.duplicate_prevention.find_patient_duplicates) and
+written with bulk_create, together with the patients' wallets and audit
+entries. Patient IDs are allocated inside each chunk's transaction; a chunk
+that collides with a concurrent registration is renumbered and retried.
+Exports are generators over queryset.iterator() so the whole
+registry can be streamed without building the file in memory.
 """
 import csv
 import json
+import logging
+from decimal import Decimal
 from io import StringIO
-from django.db import transaction
+from itertools import islice
+
+from django.db import IntegrityError, transaction
 from django.core.exceptions import ValidationError
 from .models import Patient
 from core.audit import AuditLog
+from core.audit_buffer import write_entries
+from core.duplicate_prevention import find_patient_duplicates
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+# Writes of a chunk before its rows are reported as failed
+IMPORT_CHUNK_ATTEMPTS = 3
+EXPORT_CHUNK_SIZE = 2000
+
+IMPORT_FIELDS = [
+    'first_name',
+    'last_name',
+    'middle_name',
+    'date_of_birth',
+    'gender',
+    'phone',
+    'email',
+    'address',
+    'national_id',
+]
+
+EXPORT_FIELDS = [
+    'patient_id',
+    'first_name',
+    'last_name',
+    'middle_name',
+    'date_of_birth',
+    'gender',
+    'phone',
+    'email',
+    'address',
+    'national_id',
+    'blood_group',
+    'allergies',
+    'created_at',
+]
+
+
+def _user_role(user):
+    role = getattr(user, 'role', None) or getattr(user, 'get_role', lambda: None)()
+    return role or 'UNKNOWN'
+
+
+def _next_patient_number():
+    """Numeric part of the next LMC patient ID."""
+    return int(Patient.generate_patient_id()[3:])
+
+
+def _write_patients(patients):
+    """Number and insert patients, with their wallets, in one transaction."""
+    from apps.wallet.models import Wallet
+
+    with transaction.atomic():
+        next_number = _next_patient_number()
+        for offset, patient in enumerate(patients):
+            patient.patient_id = f"LMC{next_number + offset:06d}"
+        # bulk_create skips post_save, so wallets are created here rather than by the signal
+        Patient.objects.bulk_create(patients)
+        Wallet.objects.bulk_create([
+            Wallet(patient=patient, balance=Decimal('0.00'), currency='NGN', is_active=True)
+            for patient in patients
+        ])
 
 
-def import_patients_from_csv(csv_content, created_by, request=None):
+def _build_patient(row):
+    """Unsaved Patient for one CSV row; raises ValidationError if the row is invalid."""
+    values = {field: (row.get(field) or '').strip() or None for field in IMPORT_FIELDS}
+    if not values['first_name'] or not values['last_name']:
+        raise ValidationError("first_name and last_name are required")
+    if values['gender']:
+        values['gender'] = values['gender'].upper()
+    patient = Patient(**values)
+    # Field validation only: Patient.clean() would query for a patient_id (assigned
+    # per chunk instead) and uniqueness is checked set-wise for the whole chunk
+    patient.clean_fields(exclude=['patient_id'])
+    return patient
+
+
+def _error_message(error):
+    if isinstance(error, ValidationError):
+        if hasattr(error, 'message_dict'):
+            return '; '.join(f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items())
+        return ' '.join(error.messages)
+    return str(error)
+
+
+def _archived_national_ids(patients):
+    """patient_id of archived patients already holding a national_id used in the chunk."""
+    national_ids = [patient.national_id for patient in patients if patient.national_id]
+    if not national_ids:
+        return {}
+    return dict(
+        Patient.objects.filter(national_id__in=national_ids, is_active=False)
+        .values_list('national_id', 'patient_id')
+    )
+
+
+def _import_chunk(rows, state, created_by, request, role):
+    """Validate and write one chunk of (row_number, row) pairs."""
+    errors = []
+    candidates = []
+    for row_num, row in rows:
+        try:
+            candidates.append((row_num, row, _build_patient(row)))
+        except ValidationError as e:
+            errors.append({'row': row_num, 'error': _error_message(e), 'data': row})
+
+    duplicates = find_patient_duplicates(
+        [
+            (row_num, {
+                'first_name': patient.first_name,
+                'last_name': patient.last_name,
+                'date_of_birth': patient.date_of_birth,
+                'phone': patient.phone,
+                'email': patient.email,
+                'national_id': patient.national_id,
+            })
+            for row_num, _, patient in candidates
+        ],
+        seen=state['seen'],
+    )
+    archived = _archived_national_ids(patient for _, _, patient in candidates)
+
+    patients = []
+    imported = []
+    for row_num, row, patient in candidates:
+        if row_num in duplicates:
+            errors.append({'row': row_num, 'error': duplicates[row_num], 'data': row})
+            continue
+        if patient.national_id in archived:
+            errors.append({
+                'row': row_num,
+                'error': (
+                    f"National ID {patient.national_id} belongs to archived patient "
+                    f"{archived[patient.national_id]}"
+                ),
+                'data': row,
+            })
+            continue
+        patients.append(patient)
+        imported.append((row_num, row))
+
+    for attempt in range(1, IMPORT_CHUNK_ATTEMPTS + 1):
+        if not patients:
+            break
+        try:
+            _write_patients(patients)
+            break
+        except IntegrityError as e:
+            # Usually a patient ID taken by a registration since the chunk was numbered
+            logger.warning("Patient import: chunk write failed (attempt %d): %s", attempt, e)
+            failure = e
+    else:
+        errors.extend(
+            {'row': row_num, 'error': f"Could not save patient: {failure}", 'data': row}
+            for row_num, row in imported
+        )
+        patients = []
+
+    if patients:
+        write_entries(AuditLog, [
+            AuditLog.build(
+                user=created_by,
+                role=role,
+                action="PATIENT_BULK_IMPORT",
+                visit_id=None,
+                resource_type="patient",
+                resource_id=patient.id,
+                request=request,
+                metadata={'import_row': row_num},
+            )
+            for patient, (row_num, _) in zip(patients, imported)
+        ])
+    return len(patients), errors
+
+
+def import_patients_from_csv(csv_content, created_by, request=None, chunk_size=IMPORT_CHUNK_SIZE,
+                             progress_callback=None):
     """
     Import patients from CSV content.
-    
+
     Expected CSV format:
     first_name,last_name,middle_name,date_of_birth,gender,phone,email,address,national_id
-    
+
+    Rows are processed chunk_size at a time; each chunk is committed on its
+    own, so a large file keeps the patients imported before a failure.
+    Duplicates follow check_patient_duplicate (against active patients and
+    earlier rows of the same file).
+
     Args:
-        csv_content: CSV file content (string)
+        csv_content: CSV file content (string or text file object)
         created_by: User performing the import
         request: Django request object (for audit logging)
-    
+        chunk_size: Rows validated and written per batch
+        progress_callback: Optional callable(result) called after each
+            chunk with the running totals
+
     Returns:
         dict: Summary of import results
     """
-    reader = csv.DictReader(StringIO(csv_content))
-    
-    imported = 0
-    failed = 0
-    errors = []
-    
-    with transaction.atomic():
-        for row_num, row in enumerate(reader, start=2):  # Start at 2 (row 1 is header)
-            try:
-                # Validate required fields
-                if not row.get('first_name') or not row.get('last_name'):
-                    raise ValidationError("first_name and last_name are required")
-                
-                # Create patient
-                patient = Patient.objects.create(
-                    first_name=row['first_name'],
-                    last_name=row['last_name'],
-                    middle_name=row.get('middle_name', ''),
-                    date_of_birth=row.get('date_of_birth') or None,
-                    gender=row.get('gender', ''),
-                    phone=row.get('phone', ''),
-                    email=row.get('email', ''),
-                    address=row.get('address', ''),
-                    national_id=row.get('national_id', ''),
-                )
-                
-                imported += 1
-                
-                # Audit log
-                user_role = getattr(created_by, 'role', None) or \
-                           getattr(created_by, 'get_role', lambda: None)()
-                if not user_role:
-                    user_role = 'UNKNOWN'
-                
-                AuditLog.log(
-                    user=created_by,
-                    role=user_role,
-                    action="PATIENT_BULK_IMPORT",
-                    resource_type="patient",
-                    resource_id=patient.id,
-                    request=request,
-                    metadata={'import_row': row_num}
-                )
-                
-            except Exception as e:
-                failed += 1
-                errors.append({
-                    'row': row_num,
-                    'error': str(e),
-                    'data': row
-                })
-    
-    return {
-        'imported': imported,
-        'failed': failed,
-        'errors': errors,
-        'total': imported + failed
-    }
+    source = StringIO(csv_content) if isinstance(csv_content, str) else csv_content
+    reader = enumerate(csv.DictReader(source), start=2)  # Start at 2 (row 1 is header)
+    role = _user_role(created_by)
+    state = {'seen': {}}
+    result = {'imported': 0, 'failed': 0, 'errors': [], 'total': 0}
+
+    while True:
+        rows = list(islice(reader, chunk_size))
+        if not rows:
+            break
+        imported, errors = _import_chunk(rows, state, created_by, request, role)
+        result['imported'] += imported
+        result['failed'] += len(errors)
+        result['errors'].extend(sorted(errors, key=lambda error: error['row']))
+        result['total'] = result['imported'] + result['failed']
+        logger.info("Patient import: %d rows processed (%d imported)", result['total'], result['imported'])
+        if progress_callback:
+            progress_callback(result)
+
+    return result
+
+
+def _export_rows(patients_queryset, chunk_size):
+    return patients_queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def _export_record(values):
+    record = dict(zip(EXPORT_FIELDS, values))
+    if record['date_of_birth']:
+        record['date_of_birth'] = record['date_of_birth'].isoformat()
+    record['created_at'] = record['created_at'].isoformat()
+    return record
+
+
+def iter_patients_csv(patients_queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream patients as CSV.
+
+    Yields the header line, then one string per chunk_size patients.
+    """
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for values in _export_rows(patients_queryset, chunk_size):
+        record = _export_record(values)
+        writer.writerow(['' if record[field] is None else record[field] for field in EXPORT_FIELDS])
+        count += 1
+        if count % chunk_size == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
+def iter_patients_json(patients_queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream patients as a JSON array (one object per line).
+
+    Yields one string per chunk_size patients.
+    """
+    parts = ['[']
+    separator = '\n  '
+    for values in _export_rows(patients_queryset, chunk_size):
+        parts.append(separator + json.dumps(_export_record(values)))
+        separator = ',\n  '
+        if len(parts) >= chunk_size:
+            yield ''.join(parts)
+            parts = []
+    parts.append('\n]')
+    yield ''.join(parts)
 
 
 def export_patients_to_csv(patients_queryset):
     """
     Export patients to CSV format.
-    
+
     Args:
         patients_queryset: QuerySet of Patient objects
-    
+
     Returns:
         str: CSV content
     """
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'patient_id',
-        'first_name',
-        'last_name',
-        'middle_name',
-        'date_of_birth',
-        'gender',
-        'phone',
-        'email',
-        'address',
-        'national_id',
-        'blood_group',
-        'allergies',
-        'created_at',
-    ])
-    
-    # Write data
-    for patient in patients_queryset:
-        writer.writerow([
-            patient.patient_id,
-            patient.first_name,
-            patient.last_name,
-            patient.middle_name or '',
-            patient.date_of_birth.isoformat() if patient.date_of_birth else '',
-            patient.gender or '',
-            patient.phone or '',
-            patient.email or '',
-            patient.address or '',
-            patient.national_id or '',
-            patient.blood_group or '',
-            patient.allergies or '',
-            patient.created_at.isoformat(),
-        ])
-    
-    return output.getvalue()
+    return ''.join(iter_patients_csv(patients_queryset))
 
 
 def export_patients_to_json(patients_queryset):
     """
     Export patients to JSON format.
-    
+
     Args:
         patients_queryset: QuerySet of Patient objects
-    
+
     Returns:
         str: JSON content
     """
-    patients_data = []
-    
-    for patient in patients_queryset:
-        patients_data.append({
-            'patient_id': patient.patient_id,
-            'first_name': patient.first_name,
-            'last_name': patient.last_name,
-            'middle_name': patient.middle_name,
-            'date_of_birth': patient.date_of_birth.isoformat() if patient.date_of_birth else None,
-            'gender': patient.gender,
-            'phone': patient.phone,
-            'email': patient.email,
-            'address': patient.address,
-            'national_id': patient.national_id,
-            'blood_group': patient.blood_group,
-            'allergies': patient.allergies,
-            'created_at': patient.created_at.isoformat(),
-        })
-    
-    return json.dumps(patients_data, indent=2)
+    return ''.join(iter_patients_json(patients_queryset))
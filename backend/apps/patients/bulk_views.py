@@ -8,19 +8,21 @@ Enforcement:
 2. Audit logging mandatory
 3. PHI data protection
 """
+import io
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.db.models import Q
 
 from .models import Patient
 from .bulk_operations import (
     import_patients_from_csv,
-    export_patients_to_csv,
-    export_patients_to_json,
+    iter_patients_csv,
+    iter_patients_json,
 )
 from .permissions import CanManagePatients
 
@@ -33,6 +35,30 @@ class PatientBulkViewSet(viewsets.ViewSet):
     """
     permission_classes = [IsAuthenticated, CanManagePatients]
     
+    def _export_queryset(self, request):
+        """
+        Patients to export, filtered by the search and is_active query params.
+        
+        Ordered by primary key so the streamed export walks the table in
+        index order.
+        """
+        queryset = Patient.objects.order_by('pk')
+        
+        search = request.query_params.get('search')
+        if search:
+            queryset = queryset.filter(
+                Q(first_name__icontains=search) |
+                Q(last_name__icontains=search) |
+                Q(patient_id__icontains=search) |
+                Q(national_id__icontains=search)
+            )
+        
+        is_active = request.query_params.get('is_active')
+        if is_active is not None:
+            queryset = queryset.filter(is_active=is_active.lower() == 'true')
+        
+        return queryset
+    
     @action(detail=False, methods=['post'], url_path='import-csv')
     def import_csv(self, request):
         """
@@ -44,8 +70,13 @@ class PatientBulkViewSet(viewsets.ViewSet):
         {
             "csv_content": "first_name,last_name,...\nJohn,Doe,..."
         }
+        
+        or a multipart upload with the CSV in "file" (read as a stream).
         """
         csv_content = request.data.get('csv_content')
+        upload = request.FILES.get('file')
+        if upload is not None:
+            csv_content = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
         
         if not csv_content:
             return Response(
@@ -79,27 +110,9 @@ class PatientBulkViewSet(viewsets.ViewSet):
         - search: Search term
         - is_active: Filter by active status
         """
-        queryset = Patient.objects.all()
-        
-        # Apply filters
-        search = request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(patient_id__icontains=search) |
-                Q(national_id__icontains=search)
-            )
-        
-        is_active = request.query_params.get('is_active')
-        if is_active is not None:
-            queryset = queryset.filter(is_active=is_active.lower() == 'true')
+        queryset = self._export_queryset(request)
         
-        # Generate CSV
-        csv_content = export_patients_to_csv(queryset)
-        
-        # Create HTTP response
-        response = HttpResponse(csv_content, content_type='text/csv')
+        response = StreamingHttpResponse(iter_patients_csv(queryset), content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="patients_export.csv"'
         
         return response
@@ -115,27 +128,9 @@ class PatientBulkViewSet(viewsets.ViewSet):
         - search: Search term
         - is_active: Filter by active status
         """
-        queryset = Patient.objects.all()
-        
-        # Apply filters
-        search = request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(patient_id__icontains=search) |
-                Q(national_id__icontains=search)
-            )
-        
-        is_active = request.query_params.get('is_active')
-        if is_active is not None:
-            queryset = queryset.filter(is_active=is_active.lower() == 'true')
-        
-        # Generate JSON
-        json_content = export_patients_to_json(queryset)
+        queryset = self._export_queryset(request)
         
-        # Create HTTP response
-        response = HttpResponse(json_content, content_type='application/json')
+        response = StreamingHttpResponse(iter_patients_json(queryset), content_type='application/json')
         response['Content-Disposition'] = 'attachment; filename="patients_export.json"'
         
         return response
@@ -0,0 +1,194 @@
+"""
+Maintenance of the per-patient medical history index (PatientHistoryEntry).
+
+Each indexed record type has a builder that turns a source row into the
+entry fields. Builders only read model fields and foreign keys, so they work
+on live instances (from signals) and on historical models alike (the
+backfill migration 0011 carries its own frozen copy).
+
+Usage:
+    index_record('lab_result', lab_result)       # upsert one entry
+    remove_record('lab_result', lab_result.pk)    # tombstone it
+    rebuild_patient_history()                     # reindex everything
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+UPSERT_FIELDS = ['patient', 'visit_id', 'occurred_at', 'title', 'status', 'details', 'is_deleted', 'updated_at']
+
+
+def _visit_entry(visit):
+    return {
+        'patient_id': visit.patient_id,
+        'visit_id': visit.pk,
+        'occurred_at': visit.created_at,
+        'title': f"{visit.visit_type or 'Visit'} visit".title(),
+        'status': visit.status,
+        'details': {
+            'visit_type': visit.visit_type,
+            'payment_status': visit.payment_status,
+            'chief_complaint': (visit.chief_complaint or '')[:200],
+        },
+    }
+
+
+def _consultation_entry(consultation):
+    return {
+        'patient_id': consultation.visit.patient_id,
+        'visit_id': consultation.visit_id,
+        'occurred_at': consultation.created_at,
+        'title': 'Consultation',
+        'status': consultation.status,
+        'details': {
+            'diagnosis': (consultation.diagnosis or '')[:200],
+            'doctor_id': consultation.created_by_id,
+        },
+    }
+
+
+def _lab_result_entry(result):
+    order = result.lab_order
+    tests = order.tests_requested
+    return {
+        'patient_id': order.visit.patient_id,
+        'visit_id': order.visit_id,
+        'occurred_at': result.recorded_at,
+        'title': (', '.join(str(t) for t in tests) if isinstance(tests, list) else str(tests or ''))[:255],
+        'status': result.abnormal_flag,
+        'details': {'lab_order_id': order.pk},
+    }
+
+
+def _radiology_result_entry(result):
+    order = result.radiology_order
+    return {
+        'patient_id': order.visit.patient_id,
+        'visit_id': order.visit_id,
+        'occurred_at': result.reported_at,
+        'title': f"{order.imaging_type} {order.body_part}".strip()[:255],
+        'status': result.finding_flag,
+        'details': {'radiology_order_id': order.pk, 'image_count': result.image_count},
+    }
+
+
+def _prescription_entry(prescription):
+    return {
+        'patient_id': prescription.visit.patient_id,
+        'visit_id': prescription.visit_id,
+        'occurred_at': prescription.created_at,
+        'title': (prescription.drug or '')[:255],
+        'status': prescription.status,
+        'details': {
+            'dosage': prescription.dosage,
+            'frequency': prescription.frequency,
+            'duration': prescription.duration,
+            'dispensed': prescription.dispensed,
+        },
+    }
+
+
+def _appointment_entry(appointment):
+    return {
+        'patient_id': appointment.patient_id,
+        'visit_id': appointment.visit_id,
+        'occurred_at': appointment.appointment_date,
+        'title': 'Appointment',
+        'status': appointment.status,
+        'details': {
+            'reason': (appointment.reason or '')[:200],
+            'doctor_id': appointment.doctor_id,
+        },
+    }
+
+
+# record_type -> (model label, related rows to join when rebuilding, builder)
+RECORD_TYPES = {
+    'visit': ('visits.Visit', [], _visit_entry),
+    'consultation': ('consultations.Consultation', ['visit'], _consultation_entry),
+    'lab_result': ('laboratory.LabResult', ['lab_order__visit'], _lab_result_entry),
+    'radiology_result': ('radiology.RadiologyResult', ['radiology_order__visit'], _radiology_result_entry),
+    'prescription': ('pharmacy.Prescription', ['visit'], _prescription_entry),
+    'appointment': ('appointments.Appointment', [], _appointment_entry),
+}
+
+
+def _upsert(entry_model, entries):
+    entry_model.objects.bulk_create(
+        entries,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['record_type', 'record_id'],
+        update_fields=UPSERT_FIELDS,
+    )
+
+
+def build_entry(entry_model, record_type, instance):
+    """Unsaved PatientHistoryEntry for a source row (None if it has no patient)."""
+    fields = RECORD_TYPES[record_type][2](instance)
+    if not fields['patient_id'] or fields['occurred_at'] is None:
+        return None
+    return entry_model(record_type=record_type, record_id=instance.pk, **fields)
+
+
+def index_record(record_type, instance):
+    """Insert or refresh the history entry for one record (a single upsert)."""
+    from .history_models import PatientHistoryEntry
+
+    try:
+        # Savepoint: on PostgreSQL a failed statement would otherwise abort
+        # the caller's transaction
+        with transaction.atomic():
+            entry = build_entry(PatientHistoryEntry, record_type, instance)
+            if entry is not None:
+                _upsert(PatientHistoryEntry, [entry])
+    except Exception as e:
+        # The index is derived data; never break the clinical write
+        logger.error("Error indexing %s %s into patient history: %s", record_type, instance.pk, e)
+
+
+def remove_record(record_type, record_id):
+    """Tombstone the history entry for a deleted record."""
+    from .history_models import PatientHistoryEntry
+
+    PatientHistoryEntry.objects.filter(record_type=record_type, record_id=record_id).update(
+        is_deleted=True, updated_at=timezone.now()
+    )
+
+
+def rebuild_patient_history(get_model=None, patient_ids=None, chunk_size=2000):
+    """
+    (Re)index every record, optionally only for some patients.
+
+    get_model defaults to the app registry; migrations pass apps.get_model.
+    Returns the number of entries written.
+    """
+    if get_model is None:
+        from django.apps import apps
+        get_model = apps.get_model
+
+    entry_model = get_model('patients', 'PatientHistoryEntry')
+    written = 0
+    for record_type, (label, related, _) in RECORD_TYPES.items():
+        model = get_model(*label.split('.'))
+        queryset = model.objects.select_related(*related).order_by('pk')
+        if patient_ids is not None:
+            patient_path = '__'.join((related[0].split('__') if related else []) + ['patient_id'])
+            queryset = queryset.filter(**{f"{patient_path}__in": patient_ids})
+
+        batch = []
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            entry = build_entry(entry_model, record_type, instance)
+            if entry is not None:
+                batch.append(entry)
+            if len(batch) >= chunk_size:
+                _upsert(entry_model, batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            _upsert(entry_model, batch)
+            written += len(batch)
+    return written
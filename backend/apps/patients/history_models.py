@@ -0,0 +1,192 @@
+"""
+Per-patient medical history index.
+
+One row per clinical record (visit, consultation, lab result, radiology
+result, prescription, appointment) carrying just enough to render a history
+list. The patient portal reads a patient's whole history as a single indexed,
+date-ordered stream from this table instead of querying six record tables.
+
+Rows are maintained by the timeline signals (apps.visits.timeline_signals)
+and can be rebuilt with `python manage.py rebuild_patient_history`.
+"""
+from django.db import models
+
+
+class PatientHistoryEntry(models.Model):
+    """
+    Denormalized pointer to one record in a patient's medical history.
+
+    Deleted records are kept as tombstones (is_deleted=True) so clients
+    syncing incrementally with ?since= learn about removals.
+    """
+
+    RECORD_TYPE_CHOICES = [
+        ('visit', 'Visit'),
+        ('consultation', 'Consultation'),
+        ('lab_result', 'Lab Result'),
+        ('radiology_result', 'Radiology Result'),
+        ('prescription', 'Prescription'),
+        ('appointment', 'Appointment'),
+    ]
+
+    patient = models.ForeignKey(
+        'patients.Patient',
+        on_delete=models.CASCADE,
+        related_name='history_entries',
+        help_text="Patient this record belongs to"
+    )
+
+    record_type = models.CharField(
+        max_length=30,
+        choices=RECORD_TYPE_CHOICES,
+        help_text="Type of the source record"
+    )
+
+    record_id = models.PositiveBigIntegerField(
+        help_text="Primary key of the source record"
+    )
+
+    visit_id = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Visit the record belongs to (if any)"
+    )
+
+    occurred_at = models.DateTimeField(
+        help_text="Clinical date of the record (stream sort key)"
+    )
+
+    title = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Short display title (e.g. test names, drug)"
+    )
+
+    status = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="Status or flag of the source record"
+    )
+
+    details = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Small summary fields for list display"
+    )
+
+    is_deleted = models.BooleanField(
+        default=False,
+        help_text="Source record was deleted (tombstone for incremental sync)"
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Last time this entry changed (incremental sync key)"
+    )
+
+    class Meta:
+        db_table = 'patient_history_entries'
+        ordering = ['-occurred_at', '-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['record_type', 'record_id'],
+                name='patient_history_record_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['patient', '-occurred_at', '-id'], name='patient_history_stream_idx'),
+            models.Index(fields=['patient', 'updated_at', 'id'], name='patient_history_sync_idx'),
+        ]
+        verbose_name = 'Patient History Entry'
+        verbose_name_plural = 'Patient History Entries'
+
+    def __str__(self):
+        return f"{self.get_record_type_display()} #{self.record_id} for patient {self.patient_id}"
+
+
+class MedicalHistorySegment(models.Model):
+    """
+    One appended block of a patient's free-text medical history.
+
+    Clinical workflows (consultations, nursing notes, medication
+    administration, sample collection) append a segment instead of
+    rewriting a text column on the patient row. The full text is the
+    segments' content joined in id order, assembled and cached by
+    apps.patients.medical_history. A 'correction' segment records an edit
+    of earlier text instead: its content replaces the history between
+    correction_start and correction_end as assembled up to that point.
+    """
+
+    SOURCE_CHOICES = [
+        ('legacy', 'Legacy Text'),
+        ('registration', 'Registration'),
+        ('edit', 'Manual Edit'),
+        ('correction', 'Correction'),
+        ('consultation', 'Consultation'),
+        ('nursing_note', 'Nursing Note'),
+        ('medication_administration', 'Medication Administration'),
+        ('lab_sample_collection', 'Lab Sample Collection'),
+    ]
+
+    patient = models.ForeignKey(
+        'patients.Patient',
+        on_delete=models.CASCADE,
+        related_name='medical_history_segments',
+        help_text="Patient this history segment belongs to"
+    )
+
+    source = models.CharField(
+        max_length=30,
+        choices=SOURCE_CHOICES,
+        help_text="Workflow that appended the segment"
+    )
+
+    source_id = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Primary key of the source record (if any)"
+    )
+
+    visit_id = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Visit the segment was recorded in (if any)"
+    )
+
+    recorded_at = models.DateTimeField(
+        help_text="Clinical time of the segment"
+    )
+
+    content = models.TextField(
+        blank=True,
+        help_text="Formatted history text (PHI)"
+    )
+
+    correction_start = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Correction: offset where the replaced text starts"
+    )
+
+    correction_end = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Correction: offset where the replaced text ends"
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="When the segment was appended"
+    )
+
+    class Meta:
+        db_table = 'patient_medical_history_segments'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['patient', 'id'], name='medical_history_patient_idx'),
+        ]
+        verbose_name = 'Medical History Segment'
+        verbose_name_plural = 'Medical History Segments'
+
+    def __str__(self):
+        return f"{self.get_source_display()} segment for patient {self.patient_id}"
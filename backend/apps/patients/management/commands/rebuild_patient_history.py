@@ -0,0 +1,30 @@
+"""
+Django management command to rebuild the patient medical history index.
+
+The index (PatientHistoryEntry) is kept current by the timeline signals; run
+this after bulk imports or raw SQL changes that bypassed them.
+
+Usage:
+    python manage.py rebuild_patient_history
+    python manage.py rebuild_patient_history --patient 12 --patient 40
+"""
+from django.core.management.base import BaseCommand
+
+from apps.patients.history_index import rebuild_patient_history
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-patient medical history index used by the patient portal'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--patient',
+            type=int,
+            action='append',
+            dest='patient_ids',
+            help='Only reindex this patient (database id); may be repeated',
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_patient_history(patient_ids=options['patient_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {written} history entries'))
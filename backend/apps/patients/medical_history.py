@@ -0,0 +1,186 @@
+"""
+Segmented patient medical history (MedicalHistorySegment).
+
+The free-text medical history used to be one TextField on the patient row
+that every consultation and nursing record appended to, so the row (and
+every query joining patients) grew with the patient's age. History is now
+stored as append-only segments; the full text is assembled on demand and
+cached under the patient's latest segment id, so appending a segment makes
+a new cache key instead of invalidating the old one. Edits of earlier text
+are appended as correction segments; segments are never rewritten.
+
+Usage:
+    append_medical_history(patient, text, source='consultation', source_id=c.pk, visit_id=v.pk)
+    render_medical_history(patient.pk)          # full text, cached
+    render_medical_histories([1, 2, 3])         # {patient pk: text}, for lists
+    set_medical_history(patient, text)          # API edits of the whole text
+"""
+import os
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from .history_models import MedicalHistorySegment
+
+CACHE_TIMEOUT = 15 * 60
+CACHE_KEY = 'patient_medical_history:{patient_id}:{segment_id}'
+
+SEPARATOR = '=' * 60
+
+# Block header written by the consultation and nursing workflows:
+#   \n====\n[NURSING NOTE - ]Visit #12 - 2024-05-01 09:30\n====
+BLOCK_HEADER = re.compile(
+    r'\n' + SEPARATOR + r'\n'
+    r'(?:(?P<kind>NURSING NOTE|MEDICATION ADMINISTRATION|LAB SAMPLE COLLECTION) - )?'
+    r'Visit #(?P<visit_id>\d+) - (?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2})\n' + SEPARATOR
+)
+
+BLOCK_SOURCES = {
+    None: 'consultation',
+    'NURSING NOTE': 'nursing_note',
+    'MEDICATION ADMINISTRATION': 'medication_administration',
+    'LAB SAMPLE COLLECTION': 'lab_sample_collection',
+}
+
+
+def append_medical_history(patient, content, source, source_id=None, visit_id=None, recorded_at=None):
+    """Append one segment to the patient's medical history; returns it (or None if content is empty)."""
+    if not content:
+        return None
+    return MedicalHistorySegment.objects.create(
+        patient_id=patient.pk,
+        source=source,
+        source_id=source_id,
+        visit_id=visit_id,
+        recorded_at=recorded_at or timezone.now(),
+        content=content,
+    )
+
+
+def set_medical_history(patient, text):
+    """
+    Make the patient's history read `text` (PATCH of the whole field).
+
+    Text that extends the current history is appended as an 'edit' segment.
+    Otherwise a 'correction' segment replaces the span between the common
+    prefix and the common suffix of the old and new text, so the earlier
+    segments (and what they said) are kept.
+    """
+    text = text or ''
+    current = render_medical_history(patient.pk) or ''
+    if text == current:
+        return
+    start = len(os.path.commonprefix([current, text]))
+    if start == len(current):
+        append_medical_history(patient, text[start:], source='edit')
+        return
+    tail = min(len(current), len(text)) - start
+    suffix = len(os.path.commonprefix([current[::-1][:tail], text[::-1][:tail]]))
+    MedicalHistorySegment.objects.create(
+        patient_id=patient.pk,
+        source='correction',
+        recorded_at=timezone.now(),
+        content=text[start:len(text) - suffix],
+        correction_start=start,
+        correction_end=len(current) - suffix,
+    )
+
+
+def assemble_medical_history(segments):
+    """Full text from (content, correction_start, correction_end) tuples in id order."""
+    text = ''
+    for content, correction_start, correction_end in segments:
+        if correction_start is None:
+            text += content
+        else:
+            text = text[:correction_start] + content + text[correction_end:]
+    return text
+
+
+def render_medical_history(patient_id):
+    """Full history text for one patient, or None if it has no segments."""
+    return render_medical_histories([patient_id])[patient_id]
+
+
+def render_medical_histories(patient_ids):
+    """
+    {patient pk: full history text or None} in at most two queries.
+
+    The latest segment id per patient comes from the (patient, id) index;
+    only patients whose text is not cached under that id load their segments.
+    """
+    patient_ids = list(dict.fromkeys(patient_ids))
+    latest = dict(
+        MedicalHistorySegment.objects.filter(patient_id__in=patient_ids)
+        .order_by()
+        .values('patient_id')
+        .annotate(latest=Max('id'))
+        .values_list('patient_id', 'latest')
+    )
+    keys = {
+        patient_id: CACHE_KEY.format(patient_id=patient_id, segment_id=segment_id)
+        for patient_id, segment_id in latest.items()
+    }
+    cached = cache.get_many(keys.values()) if keys else {}
+    rendered = {patient_id: None for patient_id in patient_ids}
+    missing = []
+    for patient_id, key in keys.items():
+        if key in cached:
+            rendered[patient_id] = cached[key]
+        else:
+            missing.append(patient_id)
+
+    if missing:
+        parts = {patient_id: [] for patient_id in missing}
+        segments = (
+            MedicalHistorySegment.objects.filter(patient_id__in=missing)
+            .order_by('patient_id', 'id')
+            .values_list('patient_id', 'id', 'content', 'correction_start', 'correction_end')
+        )
+        for patient_id, segment_id, *segment in segments:
+            # Segments appended since the latest-id query belong to the next cache key
+            if segment_id <= latest[patient_id]:
+                parts[patient_id].append(segment)
+        fresh = {}
+        for patient_id, patient_segments in parts.items():
+            rendered[patient_id] = assemble_medical_history(patient_segments)
+            fresh[keys[patient_id]] = rendered[patient_id]
+        cache.set_many(fresh, CACHE_TIMEOUT)
+    return rendered
+
+
+def split_medical_history(text, fallback_time):
+    """
+    Split a legacy medical_history blob into segment dicts, losslessly.
+
+    Each workflow block becomes its own segment (source, visit and time
+    parsed from its header); text before the first block, typically the
+    registration summary, becomes a 'legacy' segment at fallback_time.
+    Joining the contents in order gives back the original text.
+    """
+    if not text:
+        return []
+    matches = list(BLOCK_HEADER.finditer(text))
+    segments = []
+    prefix_end = matches[0].start() if matches else len(text)
+    if prefix_end:
+        segments.append({
+            'source': 'legacy',
+            'visit_id': None,
+            'recorded_at': fallback_time,
+            'content': text[:prefix_end],
+        })
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        recorded_at = datetime.strptime(match['timestamp'], '%Y-%m-%d %H:%M').replace(tzinfo=dt_timezone.utc)
+        segments.append({
+            'source': BLOCK_SOURCES[match['kind']],
+            'visit_id': int(match['visit_id']),
+            'recorded_at': recorded_at,
+            'content': text[match.start():end],
+        })
+    return segments
+
@@ -0,0 +1,170 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of the entry builders in apps.patients.history_index as of this
+# migration, so later changes to the live module don't alter the backfill.
+
+def _visit_entry(visit):
+    return {
+        'patient_id': visit.patient_id,
+        'visit_id': visit.pk,
+        'occurred_at': visit.created_at,
+        'title': f"{visit.visit_type or 'Visit'} visit".title(),
+        'status': visit.status,
+        'details': {
+            'visit_type': visit.visit_type,
+            'payment_status': visit.payment_status,
+            'chief_complaint': (visit.chief_complaint or '')[:200],
+        },
+    }
+
+
+def _consultation_entry(consultation):
+    return {
+        'patient_id': consultation.visit.patient_id,
+        'visit_id': consultation.visit_id,
+        'occurred_at': consultation.created_at,
+        'title': 'Consultation',
+        'status': consultation.status,
+        'details': {
+            'diagnosis': (consultation.diagnosis or '')[:200],
+            'doctor_id': consultation.created_by_id,
+        },
+    }
+
+
+def _lab_result_entry(result):
+    order = result.lab_order
+    tests = order.tests_requested
+    return {
+        'patient_id': order.visit.patient_id,
+        'visit_id': order.visit_id,
+        'occurred_at': result.recorded_at,
+        'title': (', '.join(str(t) for t in tests) if isinstance(tests, list) else str(tests or ''))[:255],
+        'status': result.abnormal_flag,
+        'details': {'lab_order_id': order.pk},
+    }
+
+
+def _radiology_result_entry(result):
+    order = result.radiology_order
+    return {
+        'patient_id': order.visit.patient_id,
+        'visit_id': order.visit_id,
+        'occurred_at': result.reported_at,
+        'title': f"{order.imaging_type} {order.body_part}".strip()[:255],
+        'status': result.finding_flag,
+        'details': {'radiology_order_id': order.pk, 'image_count': result.image_count},
+    }
+
+
+def _prescription_entry(prescription):
+    return {
+        'patient_id': prescription.visit.patient_id,
+        'visit_id': prescription.visit_id,
+        'occurred_at': prescription.created_at,
+        'title': (prescription.drug or '')[:255],
+        'status': prescription.status,
+        'details': {
+            'dosage': prescription.dosage,
+            'frequency': prescription.frequency,
+            'duration': prescription.duration,
+            'dispensed': prescription.dispensed,
+        },
+    }
+
+
+def _appointment_entry(appointment):
+    return {
+        'patient_id': appointment.patient_id,
+        'visit_id': appointment.visit_id,
+        'occurred_at': appointment.appointment_date,
+        'title': 'Appointment',
+        'status': appointment.status,
+        'details': {
+            'reason': (appointment.reason or '')[:200],
+            'doctor_id': appointment.doctor_id,
+        },
+    }
+
+
+RECORD_TYPES = [
+    ('visit', 'visits', 'Visit', [], _visit_entry),
+    ('consultation', 'consultations', 'Consultation', ['visit'], _consultation_entry),
+    ('lab_result', 'laboratory', 'LabResult', ['lab_order__visit'], _lab_result_entry),
+    ('radiology_result', 'radiology', 'RadiologyResult', ['radiology_order__visit'], _radiology_result_entry),
+    ('prescription', 'pharmacy', 'Prescription', ['visit'], _prescription_entry),
+    ('appointment', 'appointments', 'Appointment', [], _appointment_entry),
+]
+CHUNK_SIZE = 2000
+
+
+def backfill_history(apps, schema_editor):
+    PatientHistoryEntry = apps.get_model('patients', 'PatientHistoryEntry')
+
+    def upsert(entries):
+        PatientHistoryEntry.objects.bulk_create(
+            entries,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['record_type', 'record_id'],
+            update_fields=['patient', 'visit_id', 'occurred_at', 'title', 'status', 'details', 'is_deleted',
+                           'updated_at'],
+        )
+
+    for record_type, app_label, model_name, related, builder in RECORD_TYPES:
+        model = apps.get_model(app_label, model_name)
+        batch = []
+        for instance in model.objects.select_related(*related).order_by('pk').iterator(chunk_size=CHUNK_SIZE):
+            fields = builder(instance)
+            if fields['patient_id'] and fields['occurred_at'] is not None:
+                batch.append(PatientHistoryEntry(record_type=record_type, record_id=instance.pk, **fields))
+            if len(batch) >= CHUNK_SIZE:
+                upsert(batch)
+                batch = []
+        if batch:
+            upsert(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0010_remove_patient_patients_nationa_health_idx_and_more'),
+        ('visits', '0008_service_area'),
+        ('consultations', '0005_alter_consultation_visit'),
+        ('laboratory', '0006_alter_labresult_lab_order'),
+        ('radiology', '0012_radiologyrequest_finding_flag'),
+        ('pharmacy', '0009_rename_eprescrip_patient_6a8c0d_idx_eprescripti_patient_bda39a_idx_and_more'),
+        ('appointments', '0002_service_area'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientHistoryEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_type', models.CharField(choices=[('visit', 'Visit'), ('consultation', 'Consultation'), ('lab_result', 'Lab Result'), ('radiology_result', 'Radiology Result'), ('prescription', 'Prescription'), ('appointment', 'Appointment')], help_text='Type of the source record', max_length=30)),
+                ('record_id', models.PositiveBigIntegerField(help_text='Primary key of the source record')),
+                ('visit_id', models.PositiveBigIntegerField(blank=True, help_text='Visit the record belongs to (if any)', null=True)),
+                ('occurred_at', models.DateTimeField(help_text='Clinical date of the record (stream sort key)')),
+                ('title', models.CharField(blank=True, help_text='Short display title (e.g. test names, drug)', max_length=255)),
+                ('status', models.CharField(blank=True, help_text='Status or flag of the source record', max_length=50)),
+                ('details', models.JSONField(blank=True, default=dict, help_text='Small summary fields for list display')),
+                ('is_deleted', models.BooleanField(default=False, help_text='Source record was deleted (tombstone for incremental sync)')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Last time this entry changed (incremental sync key)')),
+                ('patient', models.ForeignKey(help_text='Patient this record belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='history_entries', to='patients.patient')),
+            ],
+            options={
+                'verbose_name': 'Patient History Entry',
+                'verbose_name_plural': 'Patient History Entries',
+                'db_table': 'patient_history_entries',
+                'ordering': ['-occurred_at', '-id'],
+                'indexes': [models.Index(fields=['patient', '-occurred_at', '-id'], name='patient_history_stream_idx'), models.Index(fields=['patient', 'updated_at', 'id'], name='patient_history_sync_idx')],
+                'constraints': [models.UniqueConstraint(fields=('record_type', 'record_id'), name='patient_history_record_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:33
+
+import re
+from datetime import datetime, timezone as dt_timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+CHUNK_SIZE = 500
+
+SEPARATOR = '=' * 60
+
+# Block header written by the consultation and nursing workflows
+BLOCK_HEADER = re.compile(
+    r'\n' + SEPARATOR + r'\n'
+    r'(?:(?P<kind>NURSING NOTE|MEDICATION ADMINISTRATION|LAB SAMPLE COLLECTION) - )?'
+    r'Visit #(?P<visit_id>\d+) - (?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2})\n' + SEPARATOR
+)
+
+BLOCK_SOURCES = {
+    None: 'consultation',
+    'NURSING NOTE': 'nursing_note',
+    'MEDICATION ADMINISTRATION': 'medication_administration',
+    'LAB SAMPLE COLLECTION': 'lab_sample_collection',
+}
+
+
+def split_text(text, fallback_time):
+    """Segment dicts of a medical_history blob, one per workflow block; joined they give back the text."""
+    matches = list(BLOCK_HEADER.finditer(text))
+    segments = []
+    prefix_end = matches[0].start() if matches else len(text)
+    if prefix_end:
+        segments.append({'source': 'legacy', 'visit_id': None, 'recorded_at': fallback_time,
+                         'content': text[:prefix_end]})
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        recorded_at = datetime.strptime(match['timestamp'], '%Y-%m-%d %H:%M').replace(tzinfo=dt_timezone.utc)
+        segments.append({'source': BLOCK_SOURCES[match['kind']], 'visit_id': int(match['visit_id']),
+                         'recorded_at': recorded_at, 'content': text[match.start():end]})
+    return segments
+
+
+def split_medical_history(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    MedicalHistorySegment = apps.get_model('patients', 'MedicalHistorySegment')
+    patients = (
+        Patient.objects.exclude(medical_history__isnull=True)
+        .exclude(medical_history='')
+        .order_by('pk')
+        .values_list('pk', 'medical_history', 'created_at')
+    )
+    batch = []
+    for patient_id, text, created_at in patients.iterator(chunk_size=CHUNK_SIZE):
+        for segment in split_text(text, created_at):
+            batch.append(MedicalHistorySegment(patient_id=patient_id, **segment))
+        if len(batch) >= CHUNK_SIZE:
+            MedicalHistorySegment.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        MedicalHistorySegment.objects.bulk_create(batch)
+
+
+def join_medical_history(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    MedicalHistorySegment = apps.get_model('patients', 'MedicalHistorySegment')
+    parts = {}
+    segments = MedicalHistorySegment.objects.order_by('patient_id', 'id').values_list('patient_id', 'content')
+    for patient_id, content in segments:
+        parts.setdefault(patient_id, []).append(content)
+    for patient_id, contents in parts.items():
+        Patient.objects.filter(pk=patient_id).update(medical_history=''.join(contents))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0011_patient_history_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedicalHistorySegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('legacy', 'Legacy Text'), ('registration', 'Registration'), ('edit', 'Manual Edit'), ('consultation', 'Consultation'), ('nursing_note', 'Nursing Note'), ('medication_administration', 'Medication Administration'), ('lab_sample_collection', 'Lab Sample Collection')], help_text='Workflow that appended the segment', max_length=30)),
+                ('source_id', models.PositiveBigIntegerField(blank=True, help_text='Primary key of the source record (if any)', null=True)),
+                ('visit_id', models.PositiveBigIntegerField(blank=True, help_text='Visit the segment was recorded in (if any)', null=True)),
+                ('recorded_at', models.DateTimeField(help_text='Clinical time of the segment')),
+                ('content', models.TextField(help_text='Formatted history text (PHI)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the segment was appended')),
+                ('patient', models.ForeignKey(help_text='Patient this history segment belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='medical_history_segments', to='patients.patient')),
+            ],
+            options={
+                'verbose_name': 'Medical History Segment',
+                'verbose_name_plural': 'Medical History Segments',
+                'db_table': 'patient_medical_history_segments',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['patient', 'id'], name='medical_history_patient_idx')],
+            },
+        ),
+        migrations.RunPython(split_medical_history, join_medical_history),
+        migrations.RemoveField(
+            model_name='patient',
+            name='medical_history',
+        ),
+    ]
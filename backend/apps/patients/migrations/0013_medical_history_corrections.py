@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:23
+
+from django.db import migrations, models
+
+
+def fold_corrections(apps, schema_editor):
+    """Before the correction columns go: rewrite corrected histories as one plain segment each."""
+    MedicalHistorySegment = apps.get_model('patients', 'MedicalHistorySegment')
+    corrected = MedicalHistorySegment.objects.filter(source='correction').values('patient_id').distinct()
+    for patient_id in corrected.values_list('patient_id', flat=True):
+        segments = MedicalHistorySegment.objects.filter(patient_id=patient_id).order_by('id')
+        text = ''
+        for segment in segments:
+            if segment.correction_start is None:
+                text += segment.content
+            else:
+                text = text[:segment.correction_start] + segment.content + text[segment.correction_end:]
+        first = segments[0]
+        segments.exclude(pk=first.pk).delete()
+        first.source, first.content = 'legacy', text
+        first.save(update_fields=['source', 'content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0012_medical_history_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalhistorysegment',
+            name='correction_end',
+            field=models.PositiveIntegerField(blank=True, help_text='Correction: offset where the replaced text ends', null=True),
+        ),
+        migrations.AddField(
+            model_name='medicalhistorysegment',
+            name='correction_start',
+            field=models.PositiveIntegerField(blank=True, help_text='Correction: offset where the replaced text starts', null=True),
+        ),
+        migrations.AlterField(
+            model_name='medicalhistorysegment',
+            name='content',
+            field=models.TextField(blank=True, help_text='Formatted history text (PHI)'),
+        ),
+        migrations.AlterField(
+            model_name='medicalhistorysegment',
+            name='source',
+            field=models.CharField(choices=[('legacy', 'Legacy Text'), ('registration', 'Registration'), ('edit', 'Manual Edit'), ('correction', 'Correction'), ('consultation', 'Consultation'), ('nursing_note', 'Nursing Note'), ('medication_administration', 'Medication Administration'), ('lab_sample_collection', 'Lab Sample Collection')], help_text='Workflow that appended the segment', max_length=30),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, fold_corrections),
+    ]
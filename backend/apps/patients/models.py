@@ -150,12 +150,6 @@ class Patient(models.Model):
         help_text="Known allergies (PHI)"
     )
     
-    medical_history = models.TextField(
-        blank=True,
-        null=True,
-        help_text="Medical history summary (PHI)"
-    )
-    
     # Soft delete
     is_active = models.BooleanField(
         default=True,
@@ -268,6 +262,18 @@ class Patient(models.Model):
         parts.append(self.last_name)
         return ' '.join(parts)
     
+    @property
+    def medical_history(self):
+        """
+        Full medical history text, assembled from MedicalHistorySegment rows.
+        
+        Read-only; append with apps.patients.medical_history.append_medical_history().
+        """
+        from .medical_history import render_medical_history
+        if not self.pk:
+            return None
+        return render_medical_history(self.pk)
+    
     def get_age(self):
         """Calculate patient age from date of birth."""
         if not self.date_of_birth:
@@ -329,3 +335,7 @@ class Patient(models.Model):
             # Re-raise validation errors
             raise
         super().save(*args, **kwargs)
+
+
+# Import history models to ensure they're registered
+from .history_models import MedicalHistorySegment, PatientHistoryEntry
@@ -2,12 +2,18 @@
 National Health ID verification (Nigeria-ready stub).
 
 verify_national_health_id(id_number, name, dob) -> valid: bool, message: str
-Stub: simulate NIN/NHIA validation; in production integrate with official API.
+Stub: simulate NIN/NHIA validation unless NHID_API_URL is configured, in which
+case the lookup is sent through the pooled outbound client (core.http_client).
 """
 import logging
 from typing import Tuple
+
+import requests
+from django.conf import settings
 from django.utils import timezone
 
+from core.http_client import get_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,6 +42,30 @@ def verify_national_health_id(
     # Stub: accept if ID looks like 11 digits (NIN style) or alphanumeric
     if len(id_number) < 8:
         return False, "Invalid ID format."
+    api_url = getattr(settings, 'NHID_API_URL', '')
+    if api_url:
+        return _verify_via_api(api_url, id_number, name, dob)
     # Simulate success for stub (production: call NIN/NHIA API)
     logger.info("NHID verify stub: id=%s name=%s dob=%s", id_number[:4] + "***", name[:3] + "***", dob)
     return True, "Verification successful (stub)."
+
+
+def _verify_via_api(api_url, id_number, name, dob) -> Tuple[bool, str]:
+    """
+    POST the lookup to the configured verification API.
+
+    Expects a JSON reply with "valid" (bool) and optional "message".
+    """
+    try:
+        response = get_client('nhid').post(
+            api_url,
+            json={'id_number': id_number, 'name': name, 'dob': str(dob) if dob else None},
+            headers={'Authorization': f"Bearer {getattr(settings, 'NHID_API_KEY', '')}"},
+        )
+        response.raise_for_status()
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning("NHID verification unavailable: %s", e)
+        return False, "Verification service unavailable. Please try again later."
+    valid = bool(data.get('valid'))
+    return valid, data.get('message') or ("Verification successful." if valid else "ID could not be verified.")
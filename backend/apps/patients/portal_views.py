@@ -11,18 +11,21 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied, NotFound
+from rest_framework.exceptions import PermissionDenied, NotFound, ValidationError
 from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 
-from .models import Patient
+from .models import Patient, PatientHistoryEntry
 from apps.visits.models import Visit
-from apps.consultations.models import Consultation
 from apps.appointments.models import Appointment
 from apps.laboratory.models import LabOrder, LabResult
 from apps.radiology.models import RadiologyOrder, RadiologyResult
 from apps.pharmacy.models import Prescription
 from core.audit import AuditLog
+from core.pagination import KeysetPagination
 
 
 def log_patient_portal_action(
@@ -68,7 +71,7 @@ def log_patient_portal_action(
         user_agent=user_agent,
         metadata=metadata or {}
     )
-    audit_log.save()
+    audit_log.record()
     return audit_log
 
 
@@ -114,6 +117,12 @@ def get_patient_from_user(user):
     return patient
 
 
+class PatientHistoryPagination(KeysetPagination):
+    """Newest-first cursor pagination over the patient history index."""
+    ordering = ('-occurred_at', '-id')
+    max_page_size = 200
+
+
 class PatientPortalViewSet(viewsets.ViewSet):
     """
     Patient Portal ViewSet - Read-only access to patient's own records.
@@ -351,58 +360,62 @@ class PatientPortalViewSet(viewsets.ViewSet):
             )
     
     @action(detail=False, methods=['get'], url_path='medical-history')
+    @method_decorator(gzip_page)
     def medical_history(self, request):
         """
-        Get patient's comprehensive medical history.
+        Get patient's comprehensive medical history as one merged stream.
         
         GET /api/v1/patient-portal/medical-history/
         
+        Visits, consultations, lab results, radiology results, prescriptions
+        and appointments, newest first, read from the per-patient history
+        index in a single query per page.
+        
+        Query params:
+            cursor: follow `next` to page through the history
+            page_size: entries per page (default 50, max 200)
+            type: comma-separated record types to include (e.g. lab_result,prescription)
+            since: ISO timestamp; return only entries changed after it, oldest
+                change first, including deleted records (is_deleted=true)
+        
         Returns:
         {
-            "patient": {...},
-            "visits": [...],
-            "consultations": [...],
-            "lab_results": [...],
-            "radiology_results": [...],
-            "prescriptions": [...],
-            "appointments": [...]
+            "next": "...?cursor=..." | null,
+            "results": [{"record_type": "lab_result", "record_id": 12, ...}, ...]
         }
         """
         patient = get_patient_from_user(request.user)
         
-        # Get all related data
-        visits = Visit.objects.filter(patient=patient).select_related('patient', 'closed_by').order_by('-created_at')
-        consultations = Consultation.objects.filter(visit__patient=patient).select_related('visit', 'created_by').order_by('-created_at')
-        lab_results = LabResult.objects.filter(lab_order__visit__patient=patient).select_related('lab_order', 'recorded_by').order_by('-recorded_at')
-        radiology_results = RadiologyResult.objects.filter(radiology_order__visit__patient=patient).select_related('radiology_order', 'reported_by').order_by('-reported_at')
-        # Note: 'drug' is a CharField, not a ForeignKey, so it can't be in select_related
-        prescriptions = Prescription.objects.filter(visit__patient=patient).select_related('visit', 'prescribed_by').order_by('-created_at')
-        # Note: Appointment model only has 'appointment_date', not 'appointment_time'
-        appointments = Appointment.objects.filter(patient=patient).select_related('patient', 'doctor', 'visit').order_by('-appointment_date')
+        entries = PatientHistoryEntry.objects.filter(patient=patient)
         
-        # Audit log
-        log_patient_portal_action(
-            user=request.user,
-            action='view_medical_history',
-            patient_id=patient.id,
-            request=request,
-        )
+        record_types = [t for t in request.query_params.get('type', '').split(',') if t]
+        if record_types:
+            entries = entries.filter(record_type__in=record_types)
         
-        # Serialize all data
-        from .serializers import PatientSerializer
-        from apps.visits.serializers import VisitReadSerializer
-        from apps.consultations.serializers import ConsultationSerializer
-        from apps.laboratory.serializers import LabResultSerializer
-        from apps.radiology.serializers import RadiologyResultSerializer
-        from apps.pharmacy.serializers import PrescriptionSerializer
-        from apps.appointments.serializers import AppointmentSerializer
+        paginator = PatientHistoryPagination()
+        since = request.query_params.get('since')
+        if since:
+            since_dt = parse_datetime(since)
+            if since_dt is None:
+                raise ValidationError({'since': 'Expected an ISO 8601 timestamp.'})
+            if timezone.is_naive(since_dt):
+                since_dt = timezone.make_aware(since_dt)
+            entries = entries.filter(updated_at__gt=since_dt)
+            paginator.ordering = ('updated_at', 'id')
+        else:
+            entries = entries.filter(is_deleted=False)
+        
+        page = paginator.paginate_queryset(entries, request, view=self)
+        
+        # Audit log (first page only, so paging through history is one access)
+        if not request.query_params.get(paginator.cursor_query_param):
+            log_patient_portal_action(
+                user=request.user,
+                action='view_medical_history',
+                patient_id=patient.id,
+                request=request,
+                metadata={'since': since} if since else None,
+            )
         
-        return Response({
-            'patient': PatientSerializer(patient).data,
-            'visits': VisitReadSerializer(visits, many=True).data,
-            'consultations': ConsultationSerializer(consultations, many=True).data,
-            'lab_results': LabResultReadSerializer(lab_results, many=True).data,
-            'radiology_results': RadiologyResultSerializer(radiology_results, many=True).data,
-            'prescriptions': PrescriptionSerializer(prescriptions, many=True).data,
-            'appointments': AppointmentSerializer(appointments, many=True).data,
-        })
+        from .serializers import PatientHistoryEntrySerializer
+        return paginator.get_paginated_response(PatientHistoryEntrySerializer(page, many=True).data)
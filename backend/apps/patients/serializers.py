@@ -6,20 +6,94 @@ Per EMR Rules:
 - All fields are PHI - must be protected
 - Data minimization: Only return necessary fields
 """
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Patient
 
+from core.batch_serializers import BatchAnnotationMixin, BatchListSerializer
+from .medical_history import append_medical_history, render_medical_histories, set_medical_history
+from .models import Patient, PatientHistoryEntry
 
-class PatientSerializer(serializers.ModelSerializer):
+
+def _latest_active_policies():
+    from apps.billing.bill_models import InsurancePolicy
+    return InsurancePolicy.objects.filter(is_active=True).order_by('-created_at')
+
+
+def _policy_is_current(policy, today):
+    """Insurance is valid from valid_from until valid_to (open-ended if None)."""
+    return policy.valid_from <= today and (policy.valid_to is None or policy.valid_to >= today)
+
+
+def patient_has_active_insurance(patient):
+    """Whether the patient's latest active insurance policy is currently valid."""
+    policy = _latest_active_policies().filter(patient=patient).first()
+    return policy is not None and _policy_is_current(policy, timezone.now().date())
+
+
+def active_insurance_annotation():
+    """Exists() expression equivalent to patient_has_active_insurance, for annotating patients."""
+    today = timezone.now().date()
+    latest = _latest_active_policies().filter(patient=OuterRef(OuterRef('pk'))).values('pk')[:1]
+    return Exists(
+        _latest_active_policies().filter(
+            Q(valid_to__isnull=True) | Q(valid_to__gte=today),
+            pk=Subquery(latest),
+            valid_from__lte=today,
+        )
+    )
+
+
+def active_insurance_by_patient(patients):
+    """{patient pk: has active insurance} for a list of patients, in one query."""
+    today = timezone.now().date()
+    latest = {}
+    for policy in _latest_active_policies().filter(patient__in=[patient.pk for patient in patients]):
+        latest.setdefault(policy.patient_id, policy)
+    return {
+        patient.pk: patient.pk in latest and _policy_is_current(latest[patient.pk], today)
+        for patient in patients
+    }
+
+
+def medical_history_by_patient(patients):
+    """{patient pk: assembled medical history text} for a list of patients."""
+    return render_medical_histories([patient.pk for patient in patients])
+
+
+class MedicalHistoryField(serializers.CharField):
+    """
+    Patient medical history text, stored as MedicalHistorySegment rows.
+    
+    Reads go through the parent's batch values so lists assemble every
+    patient's history in one pass; writes are applied by PatientSerializer.
+    """
+    
+    def get_attribute(self, instance):
+        return self.parent.batch_value(instance, 'medical_history', lambda obj: obj.medical_history)
+
+
+class PatientSerializer(BatchAnnotationMixin, serializers.ModelSerializer):
     """
     Base serializer for Patient.
     
     All fields are PHI and must be protected.
+    
+    has_active_insurance is computed for a whole list at once: list views
+    annotate it via annotate_queryset(), otherwise many=True prefetches it.
+    medical_history is assembled from history segments the same way.
     """
     
+    batch_annotations = {'has_active_insurance': active_insurance_annotation}
+    batch_prefetches = {
+        'has_active_insurance': active_insurance_by_patient,
+        'medical_history': medical_history_by_patient,
+    }
+    
     full_name = serializers.SerializerMethodField()
     age = serializers.SerializerMethodField()
     has_active_insurance = serializers.SerializerMethodField()
+    medical_history = MedicalHistoryField(required=False, allow_blank=True, allow_null=True)
     
     class Meta:
         model = Patient
@@ -68,6 +142,7 @@ class PatientSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
+        list_serializer_class = BatchListSerializer
     
     def get_full_name(self, obj):
         """Get patient's full name."""
@@ -79,23 +154,23 @@ class PatientSerializer(serializers.ModelSerializer):
     
     def get_has_active_insurance(self, obj):
         """Check if patient has active insurance policy."""
-        from apps.billing.bill_models import InsurancePolicy
-        from django.utils import timezone
-        
-        active_insurance = InsurancePolicy.objects.filter(
-            patient=obj,
-            is_active=True
-        ).first()
-        
-        if not active_insurance:
-            return False
-        
-        # Check if insurance is still valid (valid_to is None or in the future)
-        today = timezone.now().date()
-        return (
-            active_insurance.valid_from <= today and
-            (active_insurance.valid_to is None or active_insurance.valid_to >= today)
-        )
+        return self.batch_value(obj, 'has_active_insurance', patient_has_active_insurance)
+    
+    def create(self, validated_data):
+        """Create the patient; initial medical history becomes its first segment."""
+        medical_history = validated_data.pop('medical_history', None)
+        patient = super().create(validated_data)
+        append_medical_history(patient, medical_history, source='registration')
+        return patient
+    
+    def update(self, instance, validated_data):
+        """Update the patient; a medical_history value is applied to its segments."""
+        has_history = 'medical_history' in validated_data
+        medical_history = validated_data.pop('medical_history', None)
+        instance = super().update(instance, validated_data)
+        if has_history:
+            set_medical_history(instance, medical_history)
+        return instance
 
 
 class PatientCreateSerializer(PatientSerializer):
@@ -594,3 +669,27 @@ class PatientSearchSerializer(serializers.ModelSerializer):
     
     def get_age(self, obj):
         return obj.get_age()
+
+
+class PatientHistoryEntrySerializer(serializers.ModelSerializer):
+    """
+    One item of the patient portal medical history stream.
+    
+    Clients fetch the full record via record_type/record_id when needed.
+    """
+    
+    class Meta:
+        model = PatientHistoryEntry
+        fields = [
+            'id',
+            'record_type',
+            'record_id',
+            'visit_id',
+            'occurred_at',
+            'title',
+            'status',
+            'details',
+            'is_deleted',
+            'updated_at',
+        ]
+        read_only_fields = fields
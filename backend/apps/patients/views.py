@@ -31,6 +31,7 @@ from .serializers import (
 )
 from .permissions import CanRegisterPatient, CanSearchPatient, CanDeletePatient
 from core.audit import AuditLog
+from core.batch_serializers import BatchAnnotatedViewMixin
 
 
 class PatientPagination(PageNumberPagination):
@@ -39,7 +40,7 @@ class PatientPagination(PageNumberPagination):
     max_page_size = 200
 
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(BatchAnnotatedViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for Patient management.
     
@@ -74,7 +74,7 @@ def log_dispense_action(
         user_agent=user_agent,
         metadata=metadata or {}
     )
-    audit_log.save()
+    audit_log.record()
     return audit_log
 
 
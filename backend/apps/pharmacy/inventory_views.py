@@ -26,6 +26,7 @@ from .serializers import (
 )
 from .permissions import CanManageDrugs
 from core.audit import AuditLog
+from core.catalog_sync import CatalogSyncMixin
 
 
 def log_inventory_action(
@@ -54,7 +55,7 @@ def log_inventory_action(
             ip_address = request.META.get('REMOTE_ADDR')
         user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
     
-    AuditLog.objects.create(
+    AuditLog(
         user=user,
         user_role=user_role,
         action=f'inventory.{action}',
@@ -63,10 +64,10 @@ def log_inventory_action(
         ip_address=ip_address,
         user_agent=user_agent,
         metadata=metadata or {}
-    )
+    ).record()
 
 
-class DrugInventoryViewSet(viewsets.ModelViewSet):
+class DrugInventoryViewSet(CatalogSyncMixin, viewsets.ModelViewSet):
     """
     ViewSet for Drug Inventory management.
     
@@ -81,7 +82,10 @@ class DrugInventoryViewSet(viewsets.ModelViewSet):
         'drug', 'last_restocked_by'
     )
     permission_classes = [CanManageDrugs]
-    pagination_class = None  # Unified drug/inventory page needs the full catalog for local matching.
+    pagination_class = None  # Unified drug/inventory page keeps a local copy: snapshot, then ?updated_since= deltas.
+    catalog_name = 'drug_inventory'
+    # Rows embed the drug's name and code
+    sync_timestamp_fields = ('updated_at', 'drug__updated_at')
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
@@ -24,13 +24,14 @@ Optional Columns:
 """
 import csv
 import os
-from decimal import Decimal, InvalidOperation
+from decimal import Decimal
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
 
 from apps.pharmacy.models import Drug, DrugInventory
+from apps.pharmacy.signals import sync_drugs_to_service_catalog
+from core.tabular_import import CaseInsensitiveBulkUpsert, TabularFrame
 
 User = get_user_model()
 
@@ -41,9 +42,34 @@ except ImportError:
     PANDAS_AVAILABLE = False
 
 
+DRUG_FIELDS = [
+    'name', 'generic_name', 'drug_code', 'drug_class', 'dosage_forms', 'common_dosages',
+    'cost_price', 'sales_price', 'description', 'is_active',
+]
+
+
+class DrugUpsert(CaseInsensitiveBulkUpsert):
+    """Match drugs by name (case-insensitive), falling back to drug_code."""
+
+    def match(self, records):
+        matches = super().match(records)
+        codes = {values['drug_code'] for (_, values), drug in zip(records, matches) if drug is None and values['drug_code']}
+        by_code = {}
+        codes = list(codes)
+        for start in range(0, len(codes), self.batch_size):
+            for drug in Drug.objects.filter(drug_code__in=codes[start:start + self.batch_size]):
+                by_code[drug.drug_code] = drug
+        return [
+            drug or by_code.get(values['drug_code'])
+            for (_, values), drug in zip(records, matches)
+        ]
+
+
 class Command(BaseCommand):
     help = 'Import drugs into Drug Catalog from CSV or Excel file'
 
+    BATCH_SIZE = 1000
+
     FIELD_MAPPINGS = {
         'name': ['name', 'drug name', 'drug_name', 'product'],
         'generic_name': ['generic name', 'generic_name', 'generic', 'active_ingredient'],
@@ -160,137 +186,87 @@ class Command(BaseCommand):
         df.columns = df.columns.astype(str).str.strip().str.lower()
         return df.to_dict('records')
 
-    def _normalize_field(self, row):
-        out = {}
-        for raw_key, value in row.items():
-            key = str(raw_key).strip().lower()
-            for our_key, aliases in self.FIELD_MAPPINGS.items():
-                if key == our_key or key in aliases:
-                    out[our_key] = value if value is None else str(value).strip()
-                    break
-        return out
-
-    def _parse_decimal(self, value, default=None):
-        if value is None or value == '':
-            return default
-        try:
-            s = str(value).strip().replace(',', '')
-            return Decimal(s) if s else default
-        except (InvalidOperation, ValueError):
-            return default
-
-    def _parse_bool(self, value, default=True):
-        if value is None or value == '':
-            return default
-        v = str(value).strip().lower()
-        if v in ('true', '1', 'yes', 'y', 't'):
-            return True
-        if v in ('false', '0', 'no', 'n', 'f'):
-            return False
-        return default
-
     def _import_drugs(self, data, dry_run, update_existing, with_inventory, user):
-        stats = {'total': len(data), 'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
-
+        """
+        Validate the rows column by column and upsert them in bulk.
+
+        Drugs match an existing row by name (case-insensitive), then by
+        drug_code. Their ServiceCatalog entries are reconciled in one pass.
+        """
+        stats = {'total': len(data), 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': [],
+                 'collisions': []}
+        frame = TabularFrame(data, self.FIELD_MAPPINGS)
+
+        name = frame.text('name')
+        cost_price, _ = frame.decimal('cost_price')
+        sales_price, _ = frame.decimal('sales_price')
+        sales_price = sales_price.where(sales_price.notna(), cost_price)
+        drug_code = frame.text('drug_code')
+        frame.reject(name == '', "Missing drug name")
+
+        records = frame.records({
+            'name': name,
+            'generic_name': frame.text('generic_name'),
+            'drug_code': drug_code.mask(drug_code == '', None),
+            'drug_class': frame.text('drug_class'),
+            'dosage_forms': frame.text('dosage_forms'),
+            'common_dosages': frame.text('common_dosages'),
+            'cost_price': cost_price,
+            'sales_price': sales_price,
+            'description': frame.text('description'),
+            'is_active': frame.boolean('is_active', default=True),
+        })
+        for _, values in records:
+            values['created_by'] = user
+
+        upsert = DrugUpsert(
+            Drug, key='name', fields=DRUG_FIELDS, unique_fields=['name', 'drug_code'], batch_size=self.BATCH_SIZE,
+        )
         with transaction.atomic():
-            for idx, row in enumerate(data, start=1):
-                try:
-                    r = self._normalize_field(row)
-                    name = (r.get('name') or '').strip()
-                    if not name:
-                        stats['errors'].append(f"Row {idx}: Missing drug name")
-                        stats['skipped'] += 1
-                        continue
-
-                    cost_price = self._parse_decimal(r.get('cost_price'))
-                    sales_price = self._parse_decimal(r.get('sales_price'))
-                    if sales_price is None and cost_price is not None:
-                        sales_price = cost_price
-
-                    drug_code = (r.get('drug_code') or '').strip() or None
-                    generic_name = (r.get('generic_name') or '').strip()
-                    drug_class = (r.get('drug_class') or '').strip()
-                    dosage_forms = (r.get('dosage_forms') or '').strip()
-                    common_dosages = (r.get('common_dosages') or '').strip()
-                    description = (r.get('description') or '').strip()
-                    is_active = self._parse_bool(r.get('is_active'), True)
-
-                    existing = Drug.objects.filter(name__iexact=name).first()
-                    if not existing and drug_code:
-                        existing = Drug.objects.filter(drug_code=drug_code).first()
-
-                    drug_data = {
-                        'name': name,
-                        'generic_name': generic_name,
-                        'drug_code': drug_code,
-                        'drug_class': drug_class,
-                        'dosage_forms': dosage_forms,
-                        'common_dosages': common_dosages,
-                        'cost_price': cost_price,
-                        'sales_price': sales_price,
-                        'description': description,
-                        'is_active': is_active,
-                        'created_by': user,
-                    }
-
-                    if existing:
-                        if update_existing:
-                            if not dry_run:
-                                for k, v in drug_data.items():
-                                    if k != 'created_by':
-                                        setattr(existing, k, v)
-                                try:
-                                    existing.full_clean()
-                                    existing.save()
-                                except ValidationError as e:
-                                    stats['errors'].append(f"Row {idx}: {e}")
-                                    stats['skipped'] += 1
-                                    continue
-                            stats['updated'] += 1
-                            self.stdout.write(f"  Updated: {name} - N{sales_price or 0:,.2f}")
-                            drug = existing
-                        else:
-                            stats['skipped'] += 1
-                            self.stdout.write(self.style.WARNING(f"  Skipped (exists): {name}"))
-                            drug = None
-                    else:
-                        if not dry_run:
-                            try:
-                                drug = Drug.objects.create(**drug_data)
-                            except ValidationError as e:
-                                stats['errors'].append(f"Row {idx}: {e}")
-                                stats['skipped'] += 1
-                                continue
-                        else:
-                            drug = None
-                        stats['created'] += 1
-                        self.stdout.write(f"  Created: {name} - N{sales_price or 0:,.2f}")
-
-                    # Create inventory if requested and we have stock data
-                    if drug and with_inventory and not dry_run:
-                        stock = self._parse_decimal(r.get('current_stock'), 0)
-                        reorder = self._parse_decimal(r.get('reorder_level'), 0)
-                        unit = (r.get('unit') or 'units').strip()
-
-                        if not DrugInventory.objects.filter(drug=drug).exists():
-                            DrugInventory.objects.create(
-                                drug=drug,
-                                current_stock=stock,
-                                reorder_level=reorder,
-                                unit=unit or 'units',
-                            )
-                            self.stdout.write(f"      + Inventory: {stock} {unit}")
-
-                except Exception as e:
-                    stats['errors'].append(f"Row {idx}: {str(e)}")
-                    stats['skipped'] += 1
-                    self.stdout.write(self.style.ERROR(f"  Error row {idx}: {e}"))
-
-            if dry_run:
-                transaction.set_rollback(True)
-
+            result = upsert.run(records, update_existing=update_existing, dry_run=dry_run)
+            if not dry_run:
+                changed_ids = [drug.pk for drug in upsert.created + upsert.updated]
+                if changed_ids:
+                    synced = sync_drugs_to_service_catalog(changed_ids, batch_size=self.BATCH_SIZE)
+                    stats['collisions'] = synced['collisions']
+                if with_inventory:
+                    stats['inventory_created'] = self._create_inventory(frame, upsert.instances)
+
+        stats.update({key: value for key, value in result.items() if key not in ('skipped', 'errors')})
+        stats['skipped'] = frame.error_count + result['skipped']
+        stats['errors'] = frame.errors() + result['errors']
         return stats
 
+    def _create_inventory(self, frame, instances):
+        """Bulk-create missing DrugInventory rows from the stock columns."""
+        stock, _ = frame.decimal('current_stock')
+        reorder, _ = frame.decimal('reorder_level')
+        unit = frame.text('unit', default='units')
+        row_index = {number: index for index, number in frame.row_numbers.items()}
+
+        drug_ids = [drug.pk for drug in instances.values()]
+        has_inventory = set()
+        for start in range(0, len(drug_ids), self.BATCH_SIZE):
+            has_inventory.update(
+                DrugInventory.objects.filter(drug_id__in=drug_ids[start:start + self.BATCH_SIZE])
+                .values_list('drug_id', flat=True)
+            )
+
+        inventory = []
+        for row_number, drug in instances.items():
+            if drug.pk in has_inventory:
+                continue
+            has_inventory.add(drug.pk)
+            index = row_index[row_number]
+            inventory.append(DrugInventory(
+                drug=drug,
+                current_stock=stock[index] if stock[index] is not None else Decimal('0'),
+                reorder_level=reorder[index] if reorder[index] is not None else Decimal('0'),
+                unit=unit[index],
+            ))
+        DrugInventory.objects.bulk_create(inventory, batch_size=self.BATCH_SIZE)
+        return len(inventory)
+
     def _print_summary(self, stats, dry_run):
         self.stdout.write("\n" + "=" * 50)
         self.stdout.write(self.style.SUCCESS("Import Summary"))
@@ -298,10 +274,26 @@ class Command(BaseCommand):
         self.stdout.write(f"Total: {stats['total']}")
         self.stdout.write(self.style.SUCCESS(f"Created: {stats['created']}"))
         self.stdout.write(self.style.SUCCESS(f"Updated: {stats['updated']}"))
+        if stats.get('unchanged'):
+            self.stdout.write(f"Unchanged: {stats['unchanged']}")
+        if stats.get('inventory_created'):
+            self.stdout.write(self.style.SUCCESS(f"Inventory records created: {stats['inventory_created']}"))
         self.stdout.write(self.style.WARNING(f"Skipped: {stats['skipped']}"))
         for e in stats['errors'][:15]:
             self.stdout.write(self.style.ERROR(f"  - {e}"))
         if len(stats['errors']) > 15:
             self.stdout.write(self.style.ERROR(f"  ... +{len(stats['errors']) - 15} more"))
+        if stats['collisions']:
+            self.stdout.write(self.style.WARNING(f"Service code collisions: {len(stats['collisions'])}"))
+            for message in stats['collisions'][:15]:
+                self.stdout.write(self.style.WARNING(f"  - {message}"))
         if dry_run:
+            self._print_diff(stats.get('diff', {}))
             self.stdout.write(self.style.WARNING("\nDry run. Run without --dry-run to apply."))
+
+    def _print_diff(self, diff):
+        for row in diff.get('create', []):
+            self.stdout.write(f"  Would create (row {row['row']}): {row['name']}")
+        for row in diff.get('update', []):
+            changes = ', '.join(f"{field}: {old} -> {new}" for field, (old, new) in row['changes'].items())
+            self.stdout.write(f"  Would update (row {row['row']}): {row['name']} ({changes})")
@@ -14,6 +14,7 @@ from django.db import transaction
 
 from apps.billing.service_catalog_models import ServiceCatalog
 from apps.pharmacy.models import Drug, DrugInventory
+from apps.pharmacy.signals import suspend_service_catalog_sync
 
 
 User = get_user_model()
@@ -80,33 +81,35 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("DRY RUN - no database changes will be saved"))
 
         with transaction.atomic():
-            for service in queryset.iterator(chunk_size=500):
-                try:
-                    drug, created = self._sync_service(
-                        service,
-                        user=user,
-                        update_existing=update_existing,
-                        dry_run=dry_run,
-                    )
-                    if created:
-                        stats["created"] += 1
-                        self.stdout.write(f"  Create Drug: {service.name} ({self._drug_code_for_service(service)})")
-                    elif drug:
-                        stats["matched"] += 1
-                        if update_existing:
-                            stats["updated"] += 1
-                            self.stdout.write(f"  Update Drug: {drug.name} ({drug.drug_code or 'no code'})")
-                    else:
+            # Drug saves below reconcile their ServiceCatalog rows in one pass at the end
+            with suspend_service_catalog_sync():
+                for service in queryset.iterator(chunk_size=500):
+                    try:
+                        drug, created = self._sync_service(
+                            service,
+                            user=user,
+                            update_existing=update_existing,
+                            dry_run=dry_run,
+                        )
+                        if created:
+                            stats["created"] += 1
+                            self.stdout.write(f"  Create Drug: {service.name} ({self._drug_code_for_service(service)})")
+                        elif drug:
+                            stats["matched"] += 1
+                            if update_existing:
+                                stats["updated"] += 1
+                                self.stdout.write(f"  Update Drug: {drug.name} ({drug.drug_code or 'no code'})")
+                        else:
+                            stats["skipped"] += 1
+                            continue
+
+                        if create_inventory and drug:
+                            inventory_created = self._ensure_inventory(drug, dry_run=dry_run)
+                            if inventory_created:
+                                stats["inventory_created"] += 1
+                    except Exception as exc:  # pylint: disable=broad-exception-caught
                         stats["skipped"] += 1
-                        continue
-
-                    if create_inventory and drug:
-                        inventory_created = self._ensure_inventory(drug, dry_run=dry_run)
-                        if inventory_created:
-                            stats["inventory_created"] += 1
-                except Exception as exc:  # pylint: disable=broad-exception-caught
-                    stats["skipped"] += 1
-                    stats["errors"].append(f"{service.service_code}: {exc}")
+                        stats["errors"].append(f"{service.service_code}: {exc}")
 
             if dry_run:
                 transaction.set_rollback(True)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0009_rename_eprescrip_patient_6a8c0d_idx_eprescripti_patient_bda39a_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='drug',
+            index=models.Index(fields=['updated_at'], name='drugs_updated_68ab16_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='druginventory',
+            index=models.Index(fields=['updated_at'], name='drug_invent_updated_60e125_idx'),
+        ),
+    ]
@@ -122,6 +122,7 @@ class Drug(models.Model):
             models.Index(fields=['drug_code']),
             models.Index(fields=['is_active']),
             models.Index(fields=['created_by']),
+            models.Index(fields=['updated_at']),
         ]
         verbose_name = 'Drug'
         verbose_name_plural = 'Drugs'
@@ -262,6 +263,7 @@ class DrugInventory(models.Model):
             models.Index(fields=['drug']),
             models.Index(fields=['current_stock']),
             models.Index(fields=['reorder_level']),
+            models.Index(fields=['updated_at']),
         ]
         verbose_name = 'Drug Inventory'
         verbose_name_plural = 'Drug Inventories'
@@ -412,9 +414,10 @@ class StockMovement(models.Model):
                 from django.utils import timezone
                 self.inventory.last_restocked_at = timezone.now()
                 self.inventory.last_restocked_by = self.created_by
-                self.inventory.save(update_fields=['current_stock', 'last_restocked_at', 'last_restocked_by'])
+                self.inventory.save(update_fields=['current_stock', 'last_restocked_at', 'last_restocked_by', 'updated_at'])
             else:
-                self.inventory.save(update_fields=['current_stock'])
+                # updated_at drives catalog deltas (core.catalog_sync)
+                self.inventory.save(update_fields=['current_stock', 'updated_at'])
         
         super().save(*args, **kwargs)
 
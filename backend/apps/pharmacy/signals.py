@@ -4,11 +4,19 @@ Signals for Drug model to automatically sync with ServiceCatalog.
 When a Drug is created or updated, automatically create/update
 a corresponding ServiceCatalog entry so the drug appears in
 the Service Catalog for ordering.
+
+Bulk operations (formulary imports) should wrap their writes in
+suspend_service_catalog_sync(): saves inside the block only record the drug
+id, and the affected drugs are reconciled afterwards by
+sync_drugs_to_service_catalog() with a few bulk queries.
 """
+import contextvars
 import logging
+from contextlib import contextmanager
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from decimal import Decimal
 
 from .models import Drug
@@ -16,6 +24,12 @@ from apps.billing.service_catalog_models import ServiceCatalog
 
 logger = logging.getLogger(__name__)
 
+# Drug ids saved while sync is suspended (None when not suspended)
+_suspended_drug_ids = contextvars.ContextVar('service_catalog_sync_suspended', default=None)
+
+# Fields the sync owns on a drug's ServiceCatalog entry
+SYNCED_FIELDS = ['service_code', 'name', 'amount', 'description', 'is_active', 'updated_at']
+
 
 def generate_drug_service_code(drug: Drug) -> str:
     """
@@ -43,31 +57,14 @@ def generate_drug_service_code(drug: Drug) -> str:
             return f"DRUG-{sanitized_name}"
 
 
-def create_service_catalog_from_drug(drug: Drug) -> ServiceCatalog:
+def drug_service_values(drug: Drug) -> dict:
     """
-    Create a ServiceCatalog entry from a Drug.
+    ServiceCatalog field values derived from a Drug.
     
-    Args:
-        drug: Drug instance
-        
-    Returns:
-        ServiceCatalog instance
+    amount is None when the drug has neither a sales nor a cost price.
     """
-    # Generate service code
-    service_code = generate_drug_service_code(drug)
-    
-    # Ensure uniqueness - if code exists, append drug ID
-    original_code = service_code
-    counter = 1
-    while ServiceCatalog.objects.filter(service_code=service_code).exclude(
-        # Exclude the service catalog that might be linked to this drug
-        # We'll use a metadata field or description to track the link
-    ).exists():
-        service_code = f"{original_code}-{counter}"
-        counter += 1
-    
-    # Use sales_price if available, otherwise use cost_price, otherwise default to 0
-    amount = Decimal('0.00')
+    # Use sales_price if available, otherwise use cost_price
+    amount = None
     if drug.sales_price:
         amount = drug.sales_price
     elif drug.cost_price:
@@ -87,15 +84,33 @@ def create_service_catalog_from_drug(drug: Drug) -> ServiceCatalog:
     if drug.description:
         description_parts.append(drug.description)
     
-    description = "\n".join(description_parts) if description_parts else ""
-    
-    # Create ServiceCatalog entry
-    service_catalog = ServiceCatalog.objects.create(
+    return {
+        'name': drug.name,
+        'amount': amount,
+        'description': "\n".join(description_parts) if description_parts else "",
+        'is_active': drug.is_active,
+    }
+
+
+def unique_service_code(service_code: str, taken_codes: set) -> str:
+    """First of CODE, CODE-1, CODE-2, ... not in taken_codes."""
+    candidate = service_code
+    counter = 1
+    while candidate in taken_codes:
+        candidate = f"{service_code}-{counter}"
+        counter += 1
+    return candidate
+
+
+def build_service_catalog_for_drug(drug: Drug, service_code: str) -> ServiceCatalog:
+    """Unsaved ServiceCatalog entry for a Drug."""
+    values = drug_service_values(drug)
+    return ServiceCatalog(
         department='PHARMACY',
         service_code=service_code,
-        name=drug.name,
-        amount=amount,
-        description=description,
+        name=values['name'],
+        amount=values['amount'] or Decimal('0.00'),
+        description=values['description'],
         category='DRUG',
         workflow_type='DRUG_DISPENSE',
         requires_visit=True,
@@ -103,8 +118,47 @@ def create_service_catalog_from_drug(drug: Drug) -> ServiceCatalog:
         auto_bill=True,
         bill_timing='AFTER',  # Bill after dispensing
         allowed_roles=['DOCTOR', 'NURSE'],  # Default roles for drug ordering
-        is_active=drug.is_active,
+        is_active=values['is_active'],
     )
+
+
+def apply_drug_to_service_catalog(drug: Drug, service_catalog: ServiceCatalog) -> bool:
+    """
+    Copy the synced fields from a Drug onto its ServiceCatalog entry (unsaved).
+    
+    The service code is not touched. Returns True if anything changed.
+    """
+    values = drug_service_values(drug)
+    if values['amount'] is None:
+        values.pop('amount')
+    changed = False
+    for field, value in values.items():
+        if getattr(service_catalog, field) != value:
+            setattr(service_catalog, field, value)
+            changed = True
+    return changed
+
+
+def create_service_catalog_from_drug(drug: Drug) -> ServiceCatalog:
+    """
+    Create a ServiceCatalog entry from a Drug.
+    
+    Args:
+        drug: Drug instance
+        
+    Returns:
+        ServiceCatalog instance
+    """
+    # Ensure uniqueness - if code exists, append a suffix (one query for all candidates)
+    original_code = generate_drug_service_code(drug)
+    taken_codes = set(
+        ServiceCatalog.objects.filter(service_code__startswith=original_code)
+        .values_list('service_code', flat=True)
+    )
+    service_code = unique_service_code(original_code, taken_codes)
+    
+    service_catalog = build_service_catalog_for_drug(drug, service_code)
+    service_catalog.save()
     
     logger.info(f"Created ServiceCatalog entry {service_code} for drug {drug.name}")
     return service_catalog
@@ -118,30 +172,7 @@ def update_service_catalog_from_drug(drug: Drug, service_catalog: ServiceCatalog
         drug: Drug instance
         service_catalog: ServiceCatalog instance to update
     """
-    # Update basic fields
-    service_catalog.name = drug.name
-    service_catalog.is_active = drug.is_active
-    
-    # Update amount (use sales_price if available)
-    if drug.sales_price:
-        service_catalog.amount = drug.sales_price
-    elif drug.cost_price:
-        service_catalog.amount = drug.cost_price
-    
-    # Update description
-    description_parts = []
-    if drug.generic_name:
-        description_parts.append(f"Generic: {drug.generic_name}")
-    if drug.drug_class:
-        description_parts.append(f"Class: {drug.drug_class}")
-    if drug.dosage_forms:
-        description_parts.append(f"Dosage Forms: {drug.dosage_forms}")
-    if drug.common_dosages:
-        description_parts.append(f"Common Dosages: {drug.common_dosages}")
-    if drug.description:
-        description_parts.append(drug.description)
-    
-    service_catalog.description = "\n".join(description_parts) if description_parts else ""
+    apply_drug_to_service_catalog(drug, service_catalog)
     
     # Update service_code if drug_code changed
     new_service_code = generate_drug_service_code(drug)
@@ -154,6 +185,120 @@ def update_service_catalog_from_drug(drug: Drug, service_catalog: ServiceCatalog
     logger.info(f"Updated ServiceCatalog entry {service_catalog.service_code} for drug {drug.name}")
 
 
+def sync_drugs_to_service_catalog(drug_ids=None, batch_size=500) -> dict:
+    """
+    Reconcile Drug rows with their ServiceCatalog entries in one pass.
+    
+    Matching follows the signal handler (service code, then name). Existing
+    pharmacy entries and all taken service codes are loaded once, code
+    collisions are resolved in memory (and reported), and the changes are
+    written with bulk_create/bulk_update. Rows are validated with full_clean
+    except for code uniqueness, which the in-memory code set guarantees.
+    
+    Args:
+        drug_ids: Only reconcile these drugs (default: every drug)
+        batch_size: Rows per query/write batch
+    
+    Returns:
+        dict with created, updated, unchanged counts, errors and collisions
+    """
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': [], 'collisions': []}
+    
+    by_code = {}
+    by_name = {}
+    for service in ServiceCatalog.objects.filter(department='PHARMACY', category='DRUG').order_by('service_code'):
+        by_code[service.service_code] = service
+        by_name.setdefault(service.name, service)
+    taken_codes = set(ServiceCatalog.objects.values_list('service_code', flat=True))
+    
+    if drug_ids is None:
+        drugs = Drug.objects.order_by('pk').iterator(chunk_size=batch_size)
+    else:
+        ids = sorted(drug_ids)
+        drugs = (
+            drug
+            for start in range(0, len(ids), batch_size)
+            for drug in Drug.objects.filter(pk__in=ids[start:start + batch_size]).order_by('pk')
+        )
+    
+    to_create = []
+    to_update = {}
+    now = timezone.now()
+    for drug in drugs:
+        service_code = generate_drug_service_code(drug)
+        service = by_code.get(service_code) or by_name.get(drug.name)
+        try:
+            if service is None:
+                service = build_service_catalog_for_drug(drug, unique_service_code(service_code, taken_codes))
+                service.full_clean(validate_unique=False)
+                if service.service_code != service_code:
+                    message = f"{drug.name}: service code {service_code} is taken, using {service.service_code}"
+                    logger.warning(message)
+                    stats['collisions'].append(message)
+                to_create.append(service)
+                taken_codes.add(service.service_code)
+                by_code[service.service_code] = service
+                by_name.setdefault(service.name, service)
+                continue
+            
+            changed = apply_drug_to_service_catalog(drug, service)
+            if service_code != service.service_code and service_code not in taken_codes:
+                taken_codes.discard(service.service_code)
+                taken_codes.add(service_code)
+                by_code[service_code] = service
+                service.service_code = service_code
+                changed = True
+            if not changed:
+                stats['unchanged'] += 1
+                continue
+            service.full_clean(validate_unique=False)
+            if service.pk is not None:
+                service.updated_at = now
+                to_update[service.pk] = service
+        except ValidationError as e:
+            stats['errors'].append(f"{drug.name}: {e}")
+    
+    ServiceCatalog.objects.bulk_create(to_create, batch_size=batch_size)
+    ServiceCatalog.objects.bulk_update(list(to_update.values()), SYNCED_FIELDS, batch_size=batch_size)
+    stats['created'] = len(to_create)
+    stats['updated'] = len(to_update)
+    
+    logger.info(
+        f"Synced drugs to ServiceCatalog: {stats['created']} created, {stats['updated']} updated, "
+        f"{stats['unchanged']} unchanged, {len(stats['errors'])} errors, "
+        f"{len(stats['collisions'])} code collisions"
+    )
+    return stats
+
+
+@contextmanager
+def suspend_service_catalog_sync(sync_on_exit=True):
+    """
+    Defer Drug -> ServiceCatalog sync during a bulk operation.
+    
+    Drugs saved inside the block are reconciled in one pass when it exits
+    without an exception. Nested blocks join the outermost one.
+    
+    Usage:
+        with suspend_service_catalog_sync():
+            for row in rows:
+                Drug.objects.create(...)
+    """
+    pending = _suspended_drug_ids.get()
+    if pending is not None:
+        yield pending
+        return
+    
+    pending = set()
+    token = _suspended_drug_ids.set(pending)
+    try:
+        yield pending
+    finally:
+        _suspended_drug_ids.reset(token)
+    if sync_on_exit and pending:
+        sync_drugs_to_service_catalog(pending)
+
+
 @receiver(post_save, sender=Drug)
 def sync_drug_to_service_catalog(sender, instance, created, **kwargs):
     """
@@ -166,6 +311,12 @@ def sync_drug_to_service_catalog(sender, instance, created, **kwargs):
     if kwargs.get('raw', False):
         return
     
+    # Bulk operation in progress - reconciled when it finishes
+    pending = _suspended_drug_ids.get()
+    if pending is not None:
+        pending.add(instance.pk)
+        return
+    
     try:
         # Try to find existing service catalog linked to this drug
         # We'll identify it by matching service_code pattern or name
@@ -230,19 +381,15 @@ def deactivate_service_catalog_on_drug_delete(sender, instance, **kwargs):
     we deactivate it.
     """
     try:
-        service_code_pattern = generate_drug_service_code(instance)
-        
         # Find and deactivate matching service catalog entries
-        services = ServiceCatalog.objects.filter(
+        deactivated = ServiceCatalog.objects.filter(
             name=instance.name,
             department='PHARMACY',
-            category='DRUG'
-        )
-        
-        for service in services:
-            service.is_active = False
-            service.save(update_fields=['is_active'])
-            logger.info(f"Deactivated ServiceCatalog entry {service.service_code} for deleted drug {instance.name}")
+            category='DRUG',
+            is_active=True,
+        ).update(is_active=False, updated_at=timezone.now())
+        if deactivated:
+            logger.info(f"Deactivated {deactivated} ServiceCatalog entries for deleted drug {instance.name}")
             
     except Exception as e:
         logger.error(
@@ -38,6 +38,7 @@ from apps.consultations.models import Consultation
 from core.permissions import IsVisitOpen, IsPaymentCleared, IsVisitAccessible
 from .permissions import IsDoctor, CanViewPrescription, CanDispensePrescription, CanManageDrugs
 from core.audit import AuditLog
+from core.catalog_sync import CatalogSyncMixin
 
 
 class PrescriptionWorklistView(APIView):
@@ -148,7 +149,7 @@ def log_prescription_action(
         user_agent=user_agent,
         metadata=metadata or {}
     )
-    audit_log.save()
+    audit_log.record()
     return audit_log
 
 
@@ -429,7 +430,7 @@ class PrescriptionViewSet(viewsets.ModelViewSet):
         )
 
 
-class DrugViewSet(viewsets.ModelViewSet):
+class DrugViewSet(CatalogSyncMixin, viewsets.ModelViewSet):
     """
     ViewSet for Drug catalog management - Pharmacist only.
     
@@ -443,7 +444,10 @@ class DrugViewSet(viewsets.ModelViewSet):
     
     queryset = Drug.objects.all().select_related('created_by').prefetch_related('inventory')
     permission_classes = [CanManageDrugs]
-    pagination_class = None  # Disable pagination for drug catalog (typically small dataset)
+    pagination_class = None  # Full snapshot; clients then sync with ?updated_since= (CatalogSyncMixin)
+    catalog_name = 'drugs'
+    # Rows embed stock from DrugInventory
+    sync_timestamp_fields = ('updated_at', 'inventory__updated_at')
     
     def get_serializer_class(self):
         """
@@ -481,7 +485,7 @@ class DrugViewSet(viewsets.ModelViewSet):
         # Audit log
         user_role = getattr(self.request.user, 'role', None) or getattr(self.request.user, 'get_role', lambda: 'UNKNOWN')()
         
-        AuditLog.objects.create(
+        AuditLog(
             user=self.request.user,
             user_role=user_role,
             action='drug.create',
@@ -493,7 +497,7 @@ class DrugViewSet(viewsets.ModelViewSet):
                 'drug_name': drug.name,
                 'drug_code': drug.drug_code or '',
             }
-        )
+        ).record()
         
         return drug
     
@@ -506,7 +510,7 @@ class DrugViewSet(viewsets.ModelViewSet):
         # Audit log
         user_role = getattr(self.request.user, 'role', None) or getattr(self.request.user, 'get_role', lambda: 'UNKNOWN')()
         
-        AuditLog.objects.create(
+        AuditLog(
             user=self.request.user,
             user_role=user_role,
             action='drug.update',
@@ -518,7 +522,7 @@ class DrugViewSet(viewsets.ModelViewSet):
                 'drug_name': drug.name,
                 'drug_code': drug.drug_code or '',
             }
-        )
+        ).record()
         
         return drug
     
@@ -534,7 +538,7 @@ class DrugViewSet(viewsets.ModelViewSet):
         # Audit log
         user_role = getattr(self.request.user, 'role', None) or getattr(self.request.user, 'get_role', lambda: 'UNKNOWN')()
         
-        AuditLog.objects.create(
+        AuditLog(
             user=self.request.user,
             user_role=user_role,
             action='drug.delete',
@@ -546,7 +550,7 @@ class DrugViewSet(viewsets.ModelViewSet):
                 'drug_name': instance.name,
                 'drug_code': instance.drug_code or '',
             }
-        )
+        ).record()
     
     def _get_client_ip(self):
         """Get client IP address from request."""
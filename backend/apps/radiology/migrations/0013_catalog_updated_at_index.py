@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('radiology', '0012_radiologyrequest_finding_flag'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='radiologystudytype',
+            index=models.Index(fields=['updated_at'], name='radiology_s_updated_d95362_idx'),
+        ),
+    ]
@@ -124,6 +124,7 @@ class RadiologyStudyType(models.Model):
             models.Index(fields=['category']),
             models.Index(fields=['is_active']),
             models.Index(fields=['study_name']),
+            models.Index(fields=['updated_at']),
         ]
         verbose_name = 'Radiology Study Type'
         verbose_name_plural = 'Radiology Study Types'
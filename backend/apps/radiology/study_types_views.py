@@ -13,6 +13,7 @@ from .study_types_serializers import (
 )
 from .study_types_permissions import CanManageRadiologyStudyTypes, CanViewRadiologyStudyTypes
 from core.audit import AuditLog
+from core.catalog_sync import CatalogSyncMixin
 
 
 def log_radiology_study_type_action(
@@ -58,11 +59,11 @@ def log_radiology_study_type_action(
         user_agent=user_agent,
         metadata=metadata or {}
     )
-    audit_log.save()
+    audit_log.record()
     return audit_log
 
 
-class RadiologyStudyTypeViewSet(viewsets.ModelViewSet):
+class RadiologyStudyTypeViewSet(CatalogSyncMixin, viewsets.ModelViewSet):
     """
     ViewSet for Radiology Study Types Catalog management.
     
@@ -74,7 +75,8 @@ class RadiologyStudyTypeViewSet(viewsets.ModelViewSet):
     """
     
     queryset = RadiologyStudyType.objects.all().select_related('created_by')
-    pagination_class = None  # Disable pagination for catalog
+    pagination_class = None  # Full snapshot; clients then sync with ?updated_since= (CatalogSyncMixin)
+    catalog_name = 'radiology_study_types'
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_service_area'),
+        ('patients', '0012_medical_history_segments'),
+        ('telemedicine', '0002_add_transcription_fields'),
+        ('visits', '0008_service_area'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='telemedicinesession',
+            index=models.Index(fields=['doctor', '-scheduled_start', '-id'], name='telemed_doctor_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='telemedicinesession',
+            index=models.Index(fields=['patient', '-scheduled_start', '-id'], name='telemed_patient_sched_idx'),
+        ),
+    ]
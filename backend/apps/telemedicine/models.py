@@ -190,6 +190,9 @@ class TelemedicineSession(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['twilio_room_sid']),
             models.Index(fields=['scheduled_start']),
+            # Per-doctor and per-patient session lists, newest first (keyset pagination)
+            models.Index(fields=['doctor', '-scheduled_start', '-id'], name='telemed_doctor_sched_idx'),
+            models.Index(fields=['patient', '-scheduled_start', '-id'], name='telemed_patient_sched_idx'),
         ]
         verbose_name = 'Telemedicine Session'
         verbose_name_plural = 'Telemedicine Sessions'
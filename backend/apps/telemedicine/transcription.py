@@ -92,20 +92,19 @@ def _transcribe_with_openai_whisper(recording_url, api_key, auth=None):
     Call OpenAI Whisper API. Downloads recording from URL (use auth=(sid, token) for Twilio).
     """
     try:
-        import requests
+        from core.http_client import get_client, openai_client
         # Download recording (Twilio URLs need Basic auth: Account SID, Auth Token)
-        resp = requests.get(recording_url, timeout=60, auth=auth)
+        resp = get_client('twilio').get(recording_url, timeout=60, auth=auth)
         resp.raise_for_status()
         audio_file = resp.content
 
-        import openai
-        client = openai.OpenAI(api_key=api_key)
         # Whisper accepts file-like object or path
         import io
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=io.BytesIO(audio_file),
-        )
+        with get_client('openai').track():
+            transcript = openai_client(api_key).audio.transcriptions.create(
+                model="whisper-1",
+                file=io.BytesIO(audio_file),
+            )
         return transcript.text if getattr(transcript, 'text', None) else str(transcript)
     except ImportError:
         logger.warning("openai or requests not installed; cannot run Whisper transcription")
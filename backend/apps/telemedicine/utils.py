@@ -9,15 +9,13 @@ Per EMR Rules:
 import logging
 from django.conf import settings
 
+from core.lazy_imports import module_available
+
 logger = logging.getLogger(__name__)
 
-# Optional Twilio imports
-try:
-    from twilio.jwt.access_token import AccessToken
-    from twilio.jwt.access_token.grants import VideoGrant
-    TWILIO_AVAILABLE = True
-except ImportError:
-    TWILIO_AVAILABLE = False
+# Optional Twilio dependency, imported where it is used
+TWILIO_AVAILABLE = module_available('twilio')
+if not TWILIO_AVAILABLE:
     logger.warning("Twilio package not installed. Telemedicine features will be limited.")
 
 
@@ -36,6 +34,9 @@ def generate_twilio_access_token(user, room_name=None, room_sid=None):
     if not TWILIO_AVAILABLE:
         raise ImportError("twilio package not installed. Install with: pip install twilio")
     
+    from twilio.jwt.access_token import AccessToken
+    from twilio.jwt.access_token.grants import VideoGrant
+    
     try:
         account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
         api_key = getattr(settings, 'TWILIO_API_KEY', None)
@@ -91,7 +92,7 @@ def create_twilio_room(room_name, max_participants=2, record_participants_on_con
         raise ImportError("twilio package not installed. Install with: pip install twilio")
     
     try:
-        from twilio.rest import Client
+        from core.http_client import twilio_client
         
         account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
         auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
@@ -105,7 +106,7 @@ def create_twilio_room(room_name, max_participants=2, record_participants_on_con
         # Log credential info for debugging (masked)
         logger.info(f"Creating Twilio room with Account SID: {account_sid[:8]}...{account_sid[-4:] if account_sid else 'None'}, recording={record_participants_on_connect}")
         
-        client = Client(account_sid, auth_token)
+        client = twilio_client(account_sid, auth_token)
         
         # Create room
         # Note: 'go' room type is deprecated. Use 'group' for new accounts (post Oct 2024)
@@ -155,7 +156,7 @@ def end_twilio_room(room_sid):
         raise ImportError("twilio package not installed. Install with: pip install twilio")
     
     try:
-        from twilio.rest import Client
+        from core.http_client import twilio_client
         from twilio.base.exceptions import TwilioRestException
         
         account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
@@ -164,7 +165,7 @@ def end_twilio_room(room_sid):
         if not all([account_sid, auth_token]):
             raise ValueError("Twilio credentials not configured")
         
-        client = Client(account_sid, auth_token)
+        client = twilio_client(account_sid, auth_token)
         
         try:
             # Update room to completed
@@ -205,7 +206,7 @@ def get_room_recordings(room_sid):
         raise ImportError("twilio package not installed. Install with: pip install twilio")
     
     try:
-        from twilio.rest import Client
+        from core.http_client import twilio_client
         
         account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
         auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
@@ -213,7 +214,7 @@ def get_room_recordings(room_sid):
         if not all([account_sid, auth_token]):
             raise ValueError("Twilio credentials not configured")
         
-        client = Client(account_sid, auth_token)
+        client = twilio_client(account_sid, auth_token)
         
         # Prefer Rooms API: room.recordings.list() (per Twilio docs)
         try:
@@ -18,6 +18,7 @@ from rest_framework.exceptions import (
     NotFound,
 )
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.shortcuts import get_object_or_404
 from django.http import StreamingHttpResponse
 from django.conf import settings
@@ -45,6 +46,7 @@ from .video_services import get_video_service
 from apps.visits.models import Visit
 from apps.appointments.models import Appointment
 from core.audit import AuditLog
+from core.pagination import OptInKeysetPagination
 
 
 def log_telemedicine_action(
@@ -73,6 +75,12 @@ def log_telemedicine_action(
     )
 
 
+class TelemedicineSessionPagination(OptInKeysetPagination):
+    """Latest-scheduled-first keyset pagination over telemedicine sessions."""
+    ordering = ('-scheduled_start', '-id')
+    max_page_size = 200
+
+
 class TelemedicineSessionViewSet(viewsets.ModelViewSet):
     """
     ViewSet for Telemedicine Sessions.
@@ -94,7 +102,8 @@ class TelemedicineSessionViewSet(viewsets.ModelViewSet):
     
     serializer_class = TelemedicineSessionSerializer
     permission_classes = [CanManageTelemedicine]
-    pagination_class = None  # Disable pagination for telemedicine sessions
+    # Array unless the client sends ?page_size= or ?cursor= (see OptInKeysetPagination)
+    pagination_class = TelemedicineSessionPagination
     
     def get_permissions(self):
         """
@@ -125,7 +134,12 @@ class TelemedicineSessionViewSet(viewsets.ModelViewSet):
         return TelemedicineSessionSerializer
     
     def get_queryset(self):
-        """Filter sessions based on user role."""
+        """
+        Filter sessions based on user role and query parameters.
+        
+        Filters: visit_id, patient (database id), status (comma-separated),
+        scheduled_from / scheduled_to (ISO datetimes on scheduled_start).
+        """
         user = self.request.user
         user_role = getattr(user, 'role', None) or \
                    getattr(user, 'get_role', lambda: None)()
@@ -135,20 +149,37 @@ class TelemedicineSessionViewSet(viewsets.ModelViewSet):
         # Doctors see their own sessions
         if user_role == 'DOCTOR':
             queryset = queryset.filter(doctor=user)
-        # Patients see sessions for their visits
+        # Patients see sessions for their visits (joined, not looked up first)
         elif user_role == 'PATIENT':
-            try:
-                from apps.patients.models import Patient
-                patient = Patient.objects.get(user=user, is_active=True)
-                queryset = queryset.filter(patient=patient)
-            except Patient.DoesNotExist:
-                queryset = queryset.none()
+            queryset = queryset.filter(patient__user=user, patient__is_active=True)
+        
+        params = self.request.query_params
         
         # Filter by visit if provided
-        visit_id = self.request.query_params.get('visit_id')
+        visit_id = params.get('visit_id')
         if visit_id:
+            if not visit_id.isdigit():
+                raise DRFValidationError({'visit_id': 'Must be a visit id.'})
             queryset = queryset.filter(visit_id=visit_id)
         
+        patient_id = params.get('patient')
+        if patient_id:
+            if not patient_id.isdigit():
+                raise DRFValidationError({'patient': 'Must be a patient id.'})
+            queryset = queryset.filter(patient_id=patient_id)
+        
+        statuses = [value for value in params.get('status', '').split(',') if value]
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
+        
+        for param, lookup in (('scheduled_from', 'scheduled_start__gte'), ('scheduled_to', 'scheduled_start__lte')):
+            value = params.get(param)
+            if value:
+                moment = parse_datetime(value)
+                if moment is None:
+                    raise DRFValidationError({param: 'Must be an ISO 8601 datetime.'})
+                queryset = queryset.filter(**{lookup: moment})
+        
         return queryset
     
     def perform_create(self, serializer):
@@ -629,6 +660,7 @@ class TelemedicineSessionViewSet(viewsets.ModelViewSet):
             raise NotFound("No recording available for this session.")
         try:
             import requests
+            from core.http_client import get_client
             account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
             auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
             if not account_sid or not auth_token:
@@ -638,7 +670,8 @@ class TelemedicineSessionViewSet(viewsets.ModelViewSet):
                 f"https://video.twilio.com/v1/Recordings/{session.recording_sid}/Media"
             )
             # Do not follow redirects so we can handle 302 (Location) or 200 (JSON)
-            media_resp = requests.get(
+            twilio_http = get_client('twilio')
+            media_resp = twilio_http.get(
                 media_resource_url, auth=auth, timeout=30, allow_redirects=False
             )
             redirect_to = None
@@ -663,7 +696,7 @@ class TelemedicineSessionViewSet(viewsets.ModelViewSet):
                     "Recording media not ready yet. Try again in a minute."
                 )
             # Stream from the media URL (temporary; no auth needed)
-            stream_resp = requests.get(redirect_to, timeout=120, stream=True)
+            stream_resp = twilio_http.get(redirect_to, timeout=120, stream=True)
             stream_resp.raise_for_status()
             content_type = stream_resp.headers.get(
                 "Content-Type", "application/octet-stream"
@@ -13,4 +13,5 @@ class VisitsConfig(AppConfig):
     def ready(self):
         """Import signals when app is ready."""
         import apps.visits.timeline_signals  # noqa
+        import apps.visits.visit_summary_signals  # noqa
 
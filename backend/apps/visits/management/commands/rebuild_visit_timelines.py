@@ -0,0 +1,48 @@
+"""
+Django management command to backfill visit timelines.
+
+Timeline events are written by signals, so visits imported in bulk (legacy
+LIFEWAY/LMC migration, raw SQL) have none. This creates the missing events
+from the visits' existing rows; events that already exist are skipped, so it
+is safe to re-run.
+
+Usage:
+    python manage.py rebuild_visit_timelines
+    python manage.py rebuild_visit_timelines --legacy-prefix LIFEWAYLEG
+    python manage.py rebuild_visit_timelines --visit 12 --visit 40
+"""
+from django.core.management.base import BaseCommand
+
+from apps.visits.timeline_events import rebuild_visit_timelines
+
+
+class Command(BaseCommand):
+    help = 'Create missing timeline events for existing visits (e.g. migrated legacy visits)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--visit',
+            type=int,
+            action='append',
+            dest='visit_ids',
+            help='Only rebuild this visit (database id); may be repeated',
+        )
+        parser.add_argument(
+            '--legacy-prefix',
+            default='',
+            help='Only rebuild visits of patients whose patient_id starts with this prefix',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows read and events inserted per batch (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        created = rebuild_visit_timelines(
+            visit_ids=options['visit_ids'],
+            patient_id_prefix=options['legacy_prefix'].strip() or None,
+            chunk_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Created {created} timeline events'))
@@ -7,14 +7,21 @@ Per EMR Rules:
 - Doctor: Can close visits
 """
 from rest_framework import serializers
+
+from core.batch_serializers import BatchAnnotationMixin, BatchListSerializer
 from .models import Visit
 
 
-class VisitSerializer(serializers.ModelSerializer):
+class VisitSerializer(BatchAnnotationMixin, serializers.ModelSerializer):
     """
     Base serializer for Visit.
+    
+    Method fields follow patient and assigned_doctor; lists load both
+    relations once (batch_related) instead of once per visit.
     """
     
+    batch_related = ('patient', 'assigned_doctor')
+    
     patient_name = serializers.SerializerMethodField()
     patient_id = serializers.SerializerMethodField()
     assigned_doctor_name = serializers.SerializerMethodField()
@@ -51,6 +58,7 @@ class VisitSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
+        list_serializer_class = BatchListSerializer
     
     def get_patient_name(self, obj):
         """Get patient's full name."""
@@ -0,0 +1,352 @@
+"""
+Construction and insertion of visit timeline events.
+
+deduplication_key (visit_id:event_type[:source_id]) is unique in the table,
+so writers never look for an existing event first: events are inserted with
+bulk_create(ignore_conflicts=True) (INSERT ... ON CONFLICT DO NOTHING) and a
+duplicate is simply not written. Inside a transaction, events are held and
+written in one insert when it commits; events queued in a savepoint that
+rolls back are dropped with it.
+
+The builders turn a source row into event fields. The timeline signals and
+the backfill (rebuild_visit_timelines) share them, so backfilled events read
+exactly like live ones.
+
+Usage:
+    queue_timeline_event(build_source_event('LAB_ORDERED', lab_order))
+    rebuild_visit_timelines(patient_id_prefix='LIFEWAYLEG')
+"""
+import logging
+import threading
+import weakref
+from collections import namedtuple
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .timeline_models import TimelineEvent
+from .visit_summary import invalidate_visit_summary
+
+logger = logging.getLogger(__name__)
+
+
+def build_timeline_event(
+    visit_id,
+    event_type,
+    description,
+    actor=None,
+    source_type=None,
+    source_id=None,
+    metadata=None,
+    timestamp=None
+):
+    """Unsaved TimelineEvent with its deduplication key and actor role filled in."""
+    source_part = f":{source_id}" if source_id else ""
+    return TimelineEvent(
+        visit_id=visit_id,
+        event_type=event_type,
+        timestamp=timestamp or timezone.now(),
+        actor=actor,
+        actor_role=getattr(actor, 'role', '') if actor else '',
+        description=description,
+        source_type=source_type or '',
+        source_id=source_id,
+        metadata=metadata or {},
+        deduplication_key=f"{visit_id}:{event_type}{source_part}",
+    )
+
+
+def _full_name(user):
+    return user.get_full_name() if user else 'System'
+
+
+def _service_name(line_item):
+    return line_item.service_catalog.name if line_item.service_catalog else line_item.source_service_name
+
+
+def _visit_created(visit):
+    return {
+        'visit_id': visit.pk,
+        'description': f"Visit #{visit.pk} created for {visit.patient.get_full_name()}",
+        'actor': getattr(visit, 'created_by', None),
+        'source_type': 'visit',
+        'source_id': visit.pk,
+        'metadata': {
+            'visit_type': visit.visit_type,
+            'payment_type': visit.payment_type,
+        },
+        'timestamp': visit.created_at,
+    }
+
+
+def _consultation_started(consultation):
+    return {
+        'visit_id': consultation.visit_id,
+        'description': f"Consultation started by {_full_name(consultation.created_by)}",
+        'actor': consultation.created_by,
+        'source_type': 'consultation',
+        'source_id': consultation.pk,
+        'metadata': {'status': consultation.status},
+        'timestamp': consultation.created_at,
+    }
+
+
+def _consultation_closed(consultation):
+    return {
+        'visit_id': consultation.visit_id,
+        'description': f"Consultation closed by {_full_name(consultation.created_by)}",
+        'actor': consultation.created_by,
+        'source_type': 'consultation',
+        'source_id': consultation.pk,
+        'timestamp': consultation.updated_at,
+    }
+
+
+def _lab_ordered(lab_order):
+    tests = lab_order.tests_requested
+    tests = ', '.join(tests) if isinstance(tests, list) else str(tests)
+    return {
+        'visit_id': lab_order.visit_id,
+        'description': f"Lab order placed: {tests}",
+        'actor': lab_order.ordered_by,
+        'source_type': 'lab_order',
+        'source_id': lab_order.pk,
+        'metadata': {'tests_requested': lab_order.tests_requested},
+        'timestamp': lab_order.created_at,
+    }
+
+
+def _lab_result_posted(lab_result):
+    lab_order = lab_result.lab_order
+    return {
+        'visit_id': lab_order.visit_id,
+        'description': f"Lab result posted for {lab_order.tests_requested}",
+        'actor': lab_result.recorded_by,
+        'source_type': 'lab_result',
+        'source_id': lab_result.pk,
+        'metadata': {'abnormal_flag': lab_result.abnormal_flag},
+        'timestamp': lab_result.recorded_at,
+    }
+
+
+def _radiology_ordered(request):
+    return {
+        'visit_id': request.visit_id,
+        'description': f"Radiology study ordered: {request.study_type}",
+        'actor': request.ordered_by,
+        'source_type': 'radiology_request',
+        'source_id': request.pk,
+        'metadata': {'study_type': request.study_type},
+        'timestamp': request.created_at,
+    }
+
+
+def _radiology_report_posted(request):
+    return {
+        'visit_id': request.visit_id,
+        'description': f"Radiology report posted for {request.study_type}",
+        'actor': request.reported_by,
+        'source_type': 'radiology_request',
+        'source_id': request.pk,
+        'metadata': {
+            'study_type': request.study_type,
+            'report_date': str(request.report_date) if request.report_date else None,
+        },
+        'timestamp': request.report_date or request.updated_at,
+    }
+
+
+def _drug_dispensed(prescription):
+    return {
+        'visit_id': prescription.visit_id,
+        'description': f"Drug dispensed: {prescription.drug} (Qty: {prescription.quantity})",
+        'actor': prescription.dispensed_by,
+        'source_type': 'prescription',
+        'source_id': prescription.pk,
+        'metadata': {
+            'drug': prescription.drug,
+            'quantity': prescription.quantity,
+        },
+        'timestamp': prescription.dispensed_date or prescription.updated_at,
+    }
+
+
+def _payment_confirmed(line_item):
+    service_name = _service_name(line_item)
+    return {
+        'visit_id': line_item.visit_id,
+        'description': f"Payment confirmed: {service_name} - ₦{line_item.amount_paid:,.2f}",
+        'actor': line_item.created_by,
+        'source_type': 'billing_line_item',
+        'source_id': line_item.pk,
+        'metadata': {
+            'service_name': service_name,
+            'amount': str(line_item.amount_paid),
+            'payment_method': line_item.payment_method,
+        },
+        'timestamp': line_item.paid_at or line_item.updated_at,
+    }
+
+
+def _service_selected(line_item):
+    service_name = _service_name(line_item)
+    return {
+        'visit_id': line_item.visit_id,
+        'description': f"Service selected: {service_name} - ₦{line_item.amount:,.2f}",
+        'actor': line_item.created_by,
+        'source_type': 'billing_line_item',
+        'source_id': line_item.pk,
+        'metadata': {
+            'service_name': service_name,
+            'service_code': line_item.source_service_code,
+            'amount': str(line_item.amount),
+        },
+        'timestamp': line_item.created_at,
+    }
+
+
+def _procedure_ordered(task):
+    return {
+        'visit_id': task.visit_id,
+        'description': f"Procedure ordered: {task.procedure_name}",
+        'actor': task.ordered_by,
+        'source_type': 'procedure_task',
+        'source_id': task.pk,
+        'metadata': {'procedure_name': task.procedure_name},
+        'timestamp': task.created_at,
+    }
+
+
+def _procedure_completed(task):
+    return {
+        'visit_id': task.visit_id,
+        'description': f"Procedure completed: {task.procedure_name}",
+        'actor': task.executed_by,
+        'source_type': 'procedure_task',
+        'source_id': task.pk,
+        'metadata': {'procedure_name': task.procedure_name},
+        'timestamp': task.execution_date or task.updated_at,
+    }
+
+
+EventSource = namedtuple('EventSource', 'model visit_path condition related build')
+
+# event_type -> where its source rows live (for the backfill) and how to build the event.
+# condition selects the rows the event applies to; related is joined when backfilling.
+EVENT_SOURCES = {
+    'VISIT_CREATED': EventSource('visits.Visit', '', {}, ['patient'], _visit_created),
+    'CONSULTATION_STARTED': EventSource(
+        'consultations.Consultation', 'visit', {}, ['created_by'], _consultation_started),
+    'CONSULTATION_CLOSED': EventSource(
+        'consultations.Consultation', 'visit', {'status': 'CLOSED'}, ['created_by'], _consultation_closed),
+    'LAB_ORDERED': EventSource('laboratory.LabOrder', 'visit', {}, ['ordered_by'], _lab_ordered),
+    'LAB_RESULT_POSTED': EventSource(
+        'laboratory.LabResult', 'lab_order__visit', {}, ['lab_order', 'recorded_by'], _lab_result_posted),
+    'RADIOLOGY_ORDERED': EventSource(
+        'radiology.RadiologyRequest', 'visit', {}, ['ordered_by'], _radiology_ordered),
+    'RADIOLOGY_REPORT_POSTED': EventSource(
+        'radiology.RadiologyRequest', 'visit', {'report__gt': ''}, ['reported_by'], _radiology_report_posted),
+    'DRUG_DISPENSED': EventSource(
+        'pharmacy.Prescription', 'visit', {'dispensed': True}, ['dispensed_by'], _drug_dispensed),
+    'PAYMENT_CONFIRMED': EventSource(
+        'billing.BillingLineItem', 'visit', {'bill_status': 'PAID'}, ['service_catalog', 'created_by'],
+        _payment_confirmed),
+    'SERVICE_SELECTED': EventSource(
+        'billing.BillingLineItem', 'visit', {}, ['service_catalog', 'created_by'], _service_selected),
+    'PROCEDURE_ORDERED': EventSource(
+        'clinical.ProcedureTask', 'visit', {}, ['ordered_by'], _procedure_ordered),
+    'PROCEDURE_COMPLETED': EventSource(
+        'clinical.ProcedureTask', 'visit', {'status': 'COMPLETED'}, ['executed_by'], _procedure_completed),
+}
+
+
+def build_source_event(event_type, instance):
+    """Unsaved TimelineEvent of event_type for its source row."""
+    return build_timeline_event(event_type=event_type, **EVENT_SOURCES[event_type].build(instance))
+
+
+def _write(events):
+    try:
+        TimelineEvent.objects.bulk_create(events, ignore_conflicts=True)
+    except DatabaseError as e:
+        # The timeline is derived data; never break the clinical write
+        logger.error("Error writing %d timeline event(s): %s", len(events), e)
+        return
+    # bulk_create sends no post_save
+    invalidate_visit_summary({event.visit_id for event in events}, 'timeline')
+
+
+class _PendingEvents(list):
+    """On-commit callback writing the events queued at one savepoint level."""
+
+    written = False
+
+    def __call__(self):
+        self.written = True
+        _write(self)
+
+
+# (connection alias, savepoint ids) -> pending batch, per thread. The values are
+# weak: Django holds the only strong reference, so a batch whose savepoint rolls
+# back is discarded with its on-commit callback and drops out of here as well.
+_pending = threading.local()
+
+
+def _pending_batches():
+    batches = getattr(_pending, 'batches', None)
+    if batches is None:
+        batches = _pending.batches = weakref.WeakValueDictionary()
+    return batches
+
+
+def queue_timeline_event(event):
+    """
+    Insert event, skipping it if its deduplication key already exists.
+
+    Outside a transaction the insert happens now; inside one, the event
+    joins the batch written when the current savepoint level commits.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _write([event])
+        return
+    batches = _pending_batches()
+    key = (connection.alias, tuple(connection.savepoint_ids))
+    batch = batches.get(key)
+    if batch is None or batch.written:
+        batch = batches[key] = _PendingEvents()
+        transaction.on_commit(batch)
+    batch.append(event)
+
+
+def rebuild_visit_timelines(visit_ids=None, patient_id_prefix=None, chunk_size=2000):
+    """
+    Create the timeline events missing for existing rows (e.g. migrated legacy visits).
+
+    Existing events are left untouched. Returns the number of events created.
+    """
+    from django.apps import apps
+
+    before = TimelineEvent.objects.count()
+    for event_type, source in EVENT_SOURCES.items():
+        queryset = (
+            apps.get_model(source.model).objects
+            .filter(**source.condition)
+            .select_related(*source.related)
+            .order_by('pk')
+        )
+        visit_prefix = f"{source.visit_path}__" if source.visit_path else ''
+        if visit_ids is not None:
+            queryset = queryset.filter(**{f"{visit_prefix}pk__in": visit_ids})
+        if patient_id_prefix:
+            queryset = queryset.filter(**{f"{visit_prefix}patient__patient_id__startswith": patient_id_prefix})
+
+        batch = []
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            batch.append(build_source_event(event_type, instance))
+            if len(batch) >= chunk_size:
+                TimelineEvent.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            TimelineEvent.objects.bulk_create(batch, ignore_conflicts=True)
+    return TimelineEvent.objects.count() - before
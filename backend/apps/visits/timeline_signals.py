@@ -2,27 +2,35 @@
 Django signals for auto-logging timeline events.
 
 This module automatically creates timeline events when significant
-actions occur in the EMR system.
+actions occur in the EMR system. Events are built and written by
+timeline_events (one insert-or-ignore per transaction).
 """
-import logging
-import threading
-from django.db.models.signals import post_save, post_init
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
 
-from .timeline_models import TimelineEvent
+from .timeline_events import build_source_event, build_timeline_event, queue_timeline_event
 from .models import Visit
 from apps.consultations.models import Consultation
-
-# Thread-local storage to prevent recursion in post_init signals
-_thread_local = threading.local()
 from apps.laboratory.models import LabOrder, LabResult
-from apps.radiology.models import RadiologyRequest
+from apps.radiology.models import RadiologyRequest, RadiologyResult
+from apps.appointments.models import Appointment
 from apps.pharmacy.models import Prescription
 from apps.billing.billing_line_item_models import BillingLineItem
+from apps.billing.domain_events import billing_line_items_paid
 from apps.clinical.procedure_models import ProcedureTask
+from apps.patients.history_index import index_record, remove_record
+
 
-logger = logging.getLogger(__name__)
+def _stored_value(model, instance, field):
+    """
+    Value of field as currently stored for instance (None for new rows).
+    
+    Read in pre_save, so change detection costs one query per save instead
+    of one per instance loaded (as the former post_init receivers did).
+    """
+    if instance.pk is None:
+        return None
+    return model.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
 
 
 def create_timeline_event(
@@ -49,40 +57,25 @@ def create_timeline_event(
         timestamp: When the event occurred (defaults to now)
     
     Returns:
-        TimelineEvent instance or None if duplicate
+        The queued TimelineEvent. It is inserted when the current
+        transaction commits (immediately outside one) and skipped if an
+        event with the same deduplication key already exists.
     """
-    if timestamp is None:
-        timestamp = timezone.now()
-    
-    # Generate deduplication key
-    source_part = f":{source_id}" if source_id else ""
-    deduplication_key = f"{visit.id}:{event_type}{source_part}"
-    
-    # Check for existing event
-    if TimelineEvent.objects.filter(deduplication_key=deduplication_key).exists():
-        logger.debug(f"Timeline event already exists: {deduplication_key}")
-        return None
-    
-    try:
-        actor_role = getattr(actor, 'role', '') if actor else ''
-        
-        event = TimelineEvent.objects.create(
-            visit=visit,
-            event_type=event_type,
-            timestamp=timestamp,
-            actor=actor,
-            actor_role=actor_role,
-            description=description,
-            source_type=source_type,
-            source_id=source_id,
-            metadata=metadata or {},
-            deduplication_key=deduplication_key
-        )
-        logger.info(f"Created timeline event: {event_type} for visit {visit.id}")
-        return event
-    except Exception as e:
-        logger.error(f"Error creating timeline event: {e}")
-        return None
+    event = build_timeline_event(
+        visit.id, event_type, description,
+        actor=actor,
+        source_type=source_type,
+        source_id=source_id,
+        metadata=metadata,
+        timestamp=timestamp,
+    )
+    queue_timeline_event(event)
+    return event
+
+
+def log_source_event(event_type, instance):
+    """Queue the timeline event of event_type for its source row (see EVENT_SOURCES)."""
+    queue_timeline_event(build_source_event(event_type, instance))
 
 
 # Visit signals
@@ -90,18 +83,7 @@ def create_timeline_event(
 def log_visit_created(sender, instance, created, **kwargs):
     """Log when a visit is created."""
     if created:
-        create_timeline_event(
-            visit=instance,
-            event_type='VISIT_CREATED',
-            description=f"Visit #{instance.id} created for {instance.patient.get_full_name()}",
-            actor=getattr(instance, 'created_by', None),
-            source_type='visit',
-            source_id=instance.id,
-            metadata={
-                'visit_type': instance.visit_type,
-                'payment_type': instance.payment_type,
-            }
-        )
+        log_source_event('VISIT_CREATED', instance)
 
 
 # Consultation signals
@@ -109,53 +91,18 @@ def log_visit_created(sender, instance, created, **kwargs):
 def log_consultation_events(sender, instance, created, **kwargs):
     """Log consultation started/closed events."""
     if created:
-        create_timeline_event(
-            visit=instance.visit,
-            event_type='CONSULTATION_STARTED',
-            description=f"Consultation started by {instance.created_by.get_full_name() if instance.created_by else 'System'}",
-            actor=instance.created_by,
-            source_type='consultation',
-            source_id=instance.id,
-            metadata={
-                'status': instance.status,
-            }
-        )
+        log_source_event('CONSULTATION_STARTED', instance)
     else:
         # Check if status changed to CLOSED
         if hasattr(instance, '_previous_status'):
             if instance._previous_status != 'CLOSED' and instance.status == 'CLOSED':
-                create_timeline_event(
-                    visit=instance.visit,
-                    event_type='CONSULTATION_CLOSED',
-                    description=f"Consultation closed by {instance.created_by.get_full_name() if instance.created_by else 'System'}",
-                    actor=instance.created_by,
-                    source_type='consultation',
-                    source_id=instance.id,
-                )
+                log_source_event('CONSULTATION_CLOSED', instance)
 
 
-@receiver(post_init, sender=Consultation)
+@receiver(pre_save, sender=Consultation)
 def store_previous_consultation_status(sender, instance, **kwargs):
-    """Store previous status to detect status changes."""
-    # Prevent recursion: if we're already fetching an old instance, skip
-    if getattr(_thread_local, 'fetching_consultation_status', False):
-        instance._previous_status = None
-        return
-    
-    if instance.pk:
-        try:
-            # Set flag to prevent recursion
-            _thread_local.fetching_consultation_status = True
-            # Use only() to fetch only the status field, avoiding full model initialization
-            old_instance = Consultation.objects.only('status').get(pk=instance.pk)
-            instance._previous_status = old_instance.status
-        except Consultation.DoesNotExist:
-            instance._previous_status = None
-        finally:
-            # Always clear the flag
-            _thread_local.fetching_consultation_status = False
-    else:
-        instance._previous_status = None
+    """Store the stored status before saving, to detect status changes."""
+    instance._previous_status = _stored_value(Consultation, instance, 'status')
 
 
 # Lab Order signals
@@ -163,36 +110,14 @@ def store_previous_consultation_status(sender, instance, **kwargs):
 def log_lab_ordered(sender, instance, created, **kwargs):
     """Log when a lab order is created."""
     if created:
-        tests = ', '.join(instance.tests_requested) if isinstance(instance.tests_requested, list) else str(instance.tests_requested)
-        create_timeline_event(
-            visit=instance.visit,
-            event_type='LAB_ORDERED',
-            description=f"Lab order placed: {tests}",
-            actor=instance.ordered_by,
-            source_type='lab_order',
-            source_id=instance.id,
-            metadata={
-                'tests_requested': instance.tests_requested,
-            }
-        )
+        log_source_event('LAB_ORDERED', instance)
 
 
 @receiver(post_save, sender=LabResult)
 def log_lab_result_posted(sender, instance, created, **kwargs):
     """Log when a lab result is posted."""
     if created:
-        lab_order = instance.lab_order
-        create_timeline_event(
-            visit=lab_order.visit,
-            event_type='LAB_RESULT_POSTED',
-            description=f"Lab result posted for {lab_order.tests_requested}",
-            actor=instance.recorded_by,
-            source_type='lab_result',
-            source_id=instance.id,
-            metadata={
-                'abnormal_flag': instance.abnormal_flag,
-            }
-        )
+        log_source_event('LAB_RESULT_POSTED', instance)
 
 
 # Radiology signals
@@ -200,17 +125,7 @@ def log_lab_result_posted(sender, instance, created, **kwargs):
 def log_radiology_ordered(sender, instance, created, **kwargs):
     """Log when a radiology order is created."""
     if created:
-        create_timeline_event(
-            visit=instance.visit,
-            event_type='RADIOLOGY_ORDERED',
-            description=f"Radiology study ordered: {instance.study_type}",
-            actor=instance.ordered_by,
-            source_type='radiology_request',
-            source_id=instance.id,
-            metadata={
-                'study_type': instance.study_type,
-            }
-        )
+        log_source_event('RADIOLOGY_ORDERED', instance)
 
 
 @receiver(post_save, sender=RadiologyRequest)
@@ -219,41 +134,13 @@ def log_radiology_report_posted(sender, instance, created, **kwargs):
     if not created and instance.report:
         # Check if report was just added
         if hasattr(instance, '_previous_report') and not instance._previous_report:
-            create_timeline_event(
-                visit=instance.visit,
-                event_type='RADIOLOGY_REPORT_POSTED',
-                description=f"Radiology report posted for {instance.study_type}",
-                actor=instance.reported_by,
-                source_type='radiology_request',
-                source_id=instance.id,
-                metadata={
-                    'study_type': instance.study_type,
-                    'report_date': str(instance.report_date) if instance.report_date else None,
-                }
-            )
-
-
-@receiver(post_init, sender=RadiologyRequest)
+            log_source_event('RADIOLOGY_REPORT_POSTED', instance)
+
+
+@receiver(pre_save, sender=RadiologyRequest)
 def store_previous_radiology_report(sender, instance, **kwargs):
-    """Store previous report to detect when report is added."""
-    # Prevent recursion: if we're already fetching an old instance, skip
-    if getattr(_thread_local, 'fetching_radiology_report', False):
-        instance._previous_report = None
-        return
-    
-    if instance.pk:
-        try:
-            # Set flag to prevent recursion
-            _thread_local.fetching_radiology_report = True
-            old_instance = RadiologyRequest.objects.only('report').get(pk=instance.pk)
-            instance._previous_report = old_instance.report
-        except RadiologyRequest.DoesNotExist:
-            instance._previous_report = None
-        finally:
-            # Always clear the flag
-            _thread_local.fetching_radiology_report = False
-    else:
-        instance._previous_report = None
+    """Store the stored report before saving, to detect when a report is added."""
+    instance._previous_report = _stored_value(RadiologyRequest, instance, 'report')
 
 
 # Prescription signals
@@ -263,41 +150,13 @@ def log_drug_dispensed(sender, instance, created, **kwargs):
     if not created and instance.dispensed:
         # Check if drug was just dispensed
         if hasattr(instance, '_previous_dispensed') and not instance._previous_dispensed:
-            create_timeline_event(
-                visit=instance.visit,
-                event_type='DRUG_DISPENSED',
-                description=f"Drug dispensed: {instance.drug} (Qty: {instance.quantity})",
-                actor=instance.dispensed_by,
-                source_type='prescription',
-                source_id=instance.id,
-                metadata={
-                    'drug': instance.drug,
-                    'quantity': instance.quantity,
-                }
-            )
-
-
-@receiver(post_init, sender=Prescription)
+            log_source_event('DRUG_DISPENSED', instance)
+
+
+@receiver(pre_save, sender=Prescription)
 def store_previous_dispensed_status(sender, instance, **kwargs):
-    """Store previous dispensed status to detect when drug is dispensed."""
-    # Prevent recursion: if we're already fetching an old instance, skip
-    if getattr(_thread_local, 'fetching_prescription_dispensed', False):
-        instance._previous_dispensed = False
-        return
-    
-    if instance.pk:
-        try:
-            # Set flag to prevent recursion
-            _thread_local.fetching_prescription_dispensed = True
-            old_instance = Prescription.objects.only('dispensed').get(pk=instance.pk)
-            instance._previous_dispensed = old_instance.dispensed
-        except Prescription.DoesNotExist:
-            instance._previous_dispensed = False
-        finally:
-            # Always clear the flag
-            _thread_local.fetching_prescription_dispensed = False
-    else:
-        instance._previous_dispensed = False
+    """Store the stored dispensed flag before saving, to detect when a drug is dispensed."""
+    instance._previous_dispensed = _stored_value(Prescription, instance, 'dispensed') or False
 
 
 # Billing signals
@@ -307,43 +166,22 @@ def log_payment_confirmed(sender, instance, created, **kwargs):
     if not created and instance.bill_status == 'PAID':
         # Check if status just changed to PAID
         if hasattr(instance, '_previous_bill_status') and instance._previous_bill_status != 'PAID':
-            service_name = instance.service_catalog.name if instance.service_catalog else instance.source_service_name
-            create_timeline_event(
-                visit=instance.visit,
-                event_type='PAYMENT_CONFIRMED',
-                description=f"Payment confirmed: {service_name} - ₦{instance.amount_paid:,.2f}",
-                actor=instance.created_by,
-                source_type='billing_line_item',
-                source_id=instance.id,
-                metadata={
-                    'service_name': service_name,
-                    'amount': str(instance.amount_paid),
-                    'payment_method': instance.payment_method,
-                }
-            )
-
-
-@receiver(post_init, sender=BillingLineItem)
+            log_source_event('PAYMENT_CONFIRMED', instance)
+
+
+@receiver(pre_save, sender=BillingLineItem)
 def store_previous_bill_status(sender, instance, **kwargs):
-    """Store previous bill status to detect when payment is confirmed."""
-    # Prevent recursion: if we're already fetching an old instance, skip
-    if getattr(_thread_local, 'fetching_billing_status', False):
-        instance._previous_bill_status = None
-        return
-    
-    if instance.pk:
-        try:
-            # Set flag to prevent recursion
-            _thread_local.fetching_billing_status = True
-            old_instance = BillingLineItem.objects.only('bill_status').get(pk=instance.pk)
-            instance._previous_bill_status = old_instance.bill_status
-        except BillingLineItem.DoesNotExist:
-            instance._previous_bill_status = None
-        finally:
-            # Always clear the flag
-            _thread_local.fetching_billing_status = False
-    else:
-        instance._previous_bill_status = None
+    """Store the stored bill status before saving, to detect when payment is confirmed."""
+    # Read once per save by BillingLineItem.save() (shared with its validation)
+    stored = instance.get_stored_state()
+    instance._previous_bill_status = stored['bill_status'] if stored else None
+
+
+@receiver(billing_line_items_paid)
+def log_payments_confirmed(sender, items, **kwargs):
+    """Log payment confirmations of a batch payment (bulk_update sends no post_save)."""
+    for item in items:
+        log_source_event('PAYMENT_CONFIRMED', item)
 
 
 # Service Catalog selection (via BillingLineItem creation)
@@ -351,20 +189,7 @@ def store_previous_bill_status(sender, instance, **kwargs):
 def log_service_selected(sender, instance, created, **kwargs):
     """Log when a service is selected from catalog."""
     if created:
-        service_name = instance.service_catalog.name if instance.service_catalog else instance.source_service_name
-        create_timeline_event(
-            visit=instance.visit,
-            event_type='SERVICE_SELECTED',
-            description=f"Service selected: {service_name} - ₦{instance.amount:,.2f}",
-            actor=instance.created_by,
-            source_type='billing_line_item',
-            source_id=instance.id,
-            metadata={
-                'service_name': service_name,
-                'service_code': instance.source_service_code,
-                'amount': str(instance.amount),
-            }
-        )
+        log_source_event('SERVICE_SELECTED', instance)
 
 
 # Procedure signals
@@ -372,17 +197,7 @@ def log_service_selected(sender, instance, created, **kwargs):
 def log_procedure_ordered(sender, instance, created, **kwargs):
     """Log when a procedure is ordered."""
     if created:
-        create_timeline_event(
-            visit=instance.visit,
-            event_type='PROCEDURE_ORDERED',
-            description=f"Procedure ordered: {instance.procedure_name}",
-            actor=instance.ordered_by,
-            source_type='procedure_task',
-            source_id=instance.id,
-            metadata={
-                'procedure_name': instance.procedure_name,
-            }
-        )
+        log_source_event('PROCEDURE_ORDERED', instance)
 
 
 @receiver(post_save, sender=ProcedureTask)
@@ -391,38 +206,39 @@ def log_procedure_completed(sender, instance, created, **kwargs):
     if not created and instance.status == ProcedureTask.Status.COMPLETED:
         # Check if status just changed to COMPLETED
         if hasattr(instance, '_previous_status') and instance._previous_status != ProcedureTask.Status.COMPLETED:
-            create_timeline_event(
-                visit=instance.visit,
-                event_type='PROCEDURE_COMPLETED',
-                description=f"Procedure completed: {instance.procedure_name}",
-                actor=instance.executed_by,
-                source_type='procedure_task',
-                source_id=instance.id,
-                metadata={
-                    'procedure_name': instance.procedure_name,
-                }
-            )
-
-
-@receiver(post_init, sender=ProcedureTask)
+            log_source_event('PROCEDURE_COMPLETED', instance)
+
+
+@receiver(pre_save, sender=ProcedureTask)
 def store_previous_procedure_status(sender, instance, **kwargs):
-    """Store previous procedure status to detect when procedure is completed."""
-    # Prevent recursion: if we're already fetching an old instance, skip
-    if getattr(_thread_local, 'fetching_procedure_status', False):
-        instance._previous_status = None
+    """Store the stored procedure status before saving, to detect completion."""
+    instance._previous_status = _stored_value(ProcedureTask, instance, 'status')
+
+
+
+# Patient history index (patient portal medical history stream)
+HISTORY_SENDERS = {
+    Visit: 'visit',
+    Consultation: 'consultation',
+    LabResult: 'lab_result',
+    RadiologyResult: 'radiology_result',
+    Prescription: 'prescription',
+    Appointment: 'appointment',
+}
+
+
+def index_patient_history(sender, instance, **kwargs):
+    """Keep the record's PatientHistoryEntry in step with every save."""
+    if kwargs.get('raw'):
         return
-    
-    if instance.pk:
-        try:
-            # Set flag to prevent recursion
-            _thread_local.fetching_procedure_status = True
-            old_instance = ProcedureTask.objects.only('status').get(pk=instance.pk)
-            instance._previous_status = old_instance.status
-        except ProcedureTask.DoesNotExist:
-            instance._previous_status = None
-        finally:
-            # Always clear the flag
-            _thread_local.fetching_procedure_status = False
-    else:
-        instance._previous_status = None
+    index_record(HISTORY_SENDERS[sender], instance)
+
+
+def remove_patient_history(sender, instance, **kwargs):
+    """Tombstone the record's PatientHistoryEntry when it is deleted."""
+    remove_record(HISTORY_SENDERS[sender], instance.pk)
+
 
+for _sender in HISTORY_SENDERS:
+    post_save.connect(index_patient_history, sender=_sender, dispatch_uid=f'patient_history_index_{_sender.__name__}')
+    post_delete.connect(remove_patient_history, sender=_sender, dispatch_uid=f'patient_history_remove_{_sender.__name__}')
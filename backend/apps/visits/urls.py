@@ -4,6 +4,7 @@ URL configuration for Visit API.
 Endpoint patterns:
 - /api/v1/visits/ - Visit CRUD
 - /api/v1/visits/{id}/close/ - Close visit (Doctor only)
+- /api/v1/visits/{id}/summary/ - Clinical summary of the visit (Doctor only)
 
 Visit-scoped endpoints:
 - /api/v1/visits/{visit_id}/consultation/ - Consultation
@@ -17,6 +17,8 @@ from rest_framework.exceptions import (
     ValidationError as DRFValidationError,
 )
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from django.core.exceptions import ValidationError as DjangoValidationError
 
 from .models import Visit
@@ -29,6 +31,8 @@ from apps.consultations.models import Consultation
 from apps.patients.models import Patient
 from core.permissions import IsDoctor
 from core.audit import AuditLog
+from core.batch_serializers import BatchAnnotatedViewMixin
+from .visit_summary import SECTIONS, build_visit_summary, summary_etag
 
 
 def log_visit_action(
@@ -74,11 +78,11 @@ def log_visit_action(
         user_agent=user_agent,
         metadata=metadata or {}
     )
-    audit_log.save()
+    audit_log.record()
     return audit_log
 
 
-class VisitViewSet(viewsets.ModelViewSet):
+class VisitViewSet(BatchAnnotatedViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for Visit management.
     
@@ -111,11 +115,11 @@ class VisitViewSet(viewsets.ModelViewSet):
         """
         Return appropriate permissions based on action.
         
-        - Close: Doctor only
+        - Close, Summary: Doctor only
         - Create: Receptionist (or authenticated for now)
         - Other actions: Authenticated users
         """
-        if self.action == 'close':
+        if self.action in ['close', 'summary']:
             permission_classes = [IsDoctor]
         else:
             # Default permissions for other actions
@@ -431,6 +435,72 @@ class VisitViewSet(viewsets.ModelViewSet):
                 'payment_type': visit.payment_type,
             })
     
+    @action(detail=True, methods=['get'], url_path='summary')
+    def summary(self, request, pk=None):
+        """
+        Clinical summary of a visit in one request (doctor workstation).
+        
+        Query parameters:
+        - include: Comma-separated sections (default: all). One of
+          visit, consultation, vitals, lab_orders, radiology, prescriptions,
+          nursing_notes, alerts, timeline, admission, billing.
+        - etags: Comma-separated section:etag pairs the client already has;
+          those sections come back as {"etag", "not_modified": true}.
+        
+        Response:
+            {"visit_id": 12, "sections": {"vitals": {"etag": "...", "data": [...]}, ...}}
+        
+        The ETag header covers every included section; If-None-Match
+        returns 304 while none of them changed. See visit_summary.
+        """
+        include = request.query_params.get('include')
+        sections = [name.strip() for name in include.split(',') if name.strip()] if include else list(SECTIONS)
+        unknown = [name for name in sections if name not in SECTIONS]
+        if unknown:
+            raise DRFValidationError({
+                'include': f"Unknown section(s): {', '.join(unknown)}. "
+                           f"Valid sections: {', '.join(SECTIONS)}"
+            })
+        sections = list(dict.fromkeys(sections))
+        
+        client_etags = {}
+        for pair in (request.query_params.get('etags') or '').split(','):
+            section, _, etag = pair.partition(':')
+            if etag:
+                client_etags[section.strip()] = '"%s"' % etag.strip().strip('"')
+        
+        visit = self.get_object()
+        summary = build_visit_summary(visit, sections)
+        etag = summary_etag(summary)
+        
+        user_role = getattr(request.user, 'role', None) or \
+                   getattr(request.user, 'get_role', lambda: None)()
+        AuditLog.log(
+            user=request.user,
+            role=user_role,
+            action="VISIT_SUMMARY_READ",
+            visit_id=visit.id,
+            resource_type="visit",
+            resource_id=visit.id,
+            request=request,
+            metadata={'sections': sections}
+        )
+        
+        if etag in {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            payload = {}
+            for section, entry in summary.items():
+                if client_etags.get(section) == entry['etag']:
+                    payload[section] = {'etag': entry['etag'], 'not_modified': True}
+                else:
+                    payload[section] = entry
+            response = Response({'visit_id': visit.id, 'sections': payload})
+        response['ETag'] = etag
+        # Clinical data: the browser may keep it but must revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
     @action(detail=True, methods=['post'], url_path='close')
     def close(self, request, pk=None):
         """
@@ -0,0 +1,250 @@
+"""
+Consolidated clinical summary of a visit (GET /api/v1/visits/{id}/summary/).
+
+Opening a visit in the doctor workstation used to cost a dozen requests
+(consultation, vitals, labs, radiology, prescriptions, nursing notes,
+alerts, timeline, admission, billing), each repeating the visit lookup
+middleware and payment guard. The summary assembles the same sections,
+with the same serializers, in one request:
+
+- Each section is loaded with a fixed number of queries, whatever the
+  number of rows.
+- ?include=vitals,lab_orders selects sections (default: all).
+- Each section carries an ETag derived from its content; the response
+  ETag covers every included section, so If-None-Match yields 304.
+- Sections are cached for SUMMARY_CACHE_TIMEOUT seconds under a per-visit
+  section version. The version is bumped by the post_save/post_delete
+  signals of the section's models (see SECTION_MODELS) and by the billing
+  and timeline batch writers, so a change is visible on the next request.
+
+Usage:
+    build_visit_summary(visit, ['consultation', 'vitals'])
+    invalidate_visit_summary(visit.pk, 'vitals')
+"""
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+
+SUMMARY_CACHE_TIMEOUT = 30
+# Versions outlive the sections they key; a lost version only costs a rebuild
+VERSION_CACHE_TIMEOUT = 24 * 60 * 60
+
+SECTION_CACHE_KEY = 'visit_summary:{visit_id}:{section}:{version}'
+VERSION_CACHE_KEY = 'visit_summary_version:{visit_id}:{section}'
+
+
+def _visit(visit):
+    from .serializers import VisitReadSerializer
+    return VisitReadSerializer(visit).data
+
+
+def _consultation(visit):
+    from apps.consultations.diagnosis_models import DiagnosisCode
+    from apps.consultations.models import Consultation
+    from apps.consultations.serializers import ConsultationWithCodesSerializer
+
+    consultation = (
+        Consultation.objects.filter(visit_id=visit.pk)
+        .select_related('created_by')
+        .prefetch_related(Prefetch(
+            'diagnosis_codes', queryset=DiagnosisCode.objects.select_related('created_by')
+        ))
+        .first()
+    )
+    return ConsultationWithCodesSerializer(consultation).data if consultation else None
+
+
+def _vitals(visit):
+    from apps.clinical.models import VitalSigns
+    from apps.clinical.serializers import VitalSignsSerializer
+
+    vitals = VitalSigns.objects.filter(visit_id=visit.pk).select_related('recorded_by').order_by('-recorded_at')
+    return VitalSignsSerializer(vitals, many=True).data
+
+
+def _lab_orders(visit):
+    from apps.laboratory.models import LabOrder
+    from apps.laboratory.serializers import LabOrderReadSerializer
+
+    # Results are embedded in their orders
+    orders = LabOrder.objects.filter(visit_id=visit.pk).select_related('ordered_by', 'result').order_by('-created_at')
+    return LabOrderReadSerializer(orders, many=True).data
+
+
+def _radiology(visit):
+    from apps.radiology.models import RadiologyRequest
+    from apps.radiology.serializers import RadiologyRequestReadSerializer
+
+    requests = (
+        RadiologyRequest.objects.filter(visit_id=visit.pk)
+        .select_related('consultation', 'ordered_by', 'reported_by')
+        .order_by('-created_at')
+    )
+    return RadiologyRequestReadSerializer(requests, many=True).data
+
+
+def _prescriptions(visit):
+    from apps.pharmacy.models import Prescription
+    from apps.pharmacy.serializers import PrescriptionReadSerializer
+
+    prescriptions = (
+        Prescription.objects.filter(visit_id=visit.pk)
+        .select_related('consultation', 'prescribed_by', 'dispensed_by')
+        .order_by('-created_at')
+    )
+    return PrescriptionReadSerializer(prescriptions, many=True).data
+
+
+def _nursing_notes(visit):
+    from apps.nursing.models import NursingNote
+    from apps.nursing.serializers import NursingNoteSerializer
+
+    notes = NursingNote.objects.filter(visit_id=visit.pk).select_related('visit', 'recorded_by').order_by('-recorded_at')
+    return NursingNoteSerializer(notes, many=True).data
+
+
+def _alerts(visit):
+    from apps.clinical.models import ClinicalAlert
+    from apps.clinical.serializers import ClinicalAlertSerializer
+
+    # Unresolved alerts, as the alerts endpoint lists by default
+    alerts = ClinicalAlert.objects.filter(visit_id=visit.pk, is_resolved=False).select_related('acknowledged_by')
+    return ClinicalAlertSerializer(alerts, many=True).data
+
+
+def _timeline(visit):
+    from .timeline_models import TimelineEvent
+    from .timeline_serializers import TimelineEventSerializer
+
+    events = TimelineEvent.objects.filter(visit_id=visit.pk).select_related('actor', 'visit').order_by('timestamp')
+    return TimelineEventSerializer(events, many=True).data
+
+
+def _admission(visit):
+    from apps.discharges.admission_models import Admission
+    from apps.discharges.admission_serializers import AdmissionSerializer
+
+    admission = (
+        Admission.objects.filter(visit_id=visit.pk)
+        .select_related('visit__patient', 'ward', 'bed', 'admitting_doctor')
+        .order_by('-pk')
+        .first()
+    )
+    return AdmissionSerializer(admission).data if admission else None
+
+
+def _billing(visit):
+    from apps.billing.billing_service import BillingService
+    return BillingService.compute_billing_summary(visit).to_dict()
+
+
+SECTIONS = {
+    'visit': _visit,
+    'consultation': _consultation,
+    'vitals': _vitals,
+    'lab_orders': _lab_orders,
+    'radiology': _radiology,
+    'prescriptions': _prescriptions,
+    'nursing_notes': _nursing_notes,
+    'alerts': _alerts,
+    'timeline': _timeline,
+    'admission': _admission,
+    'billing': _billing,
+}
+
+# section -> {model label: attribute path to the row's visit id}
+# Timeline events are bulk-inserted, so timeline_events invalidates them itself.
+SECTION_MODELS = {
+    'visit': {'visits.Visit': 'pk'},
+    'consultation': {
+        'consultations.Consultation': 'visit_id',
+        'consultations.DiagnosisCode': 'consultation.visit_id',
+    },
+    'vitals': {'clinical.VitalSigns': 'visit_id'},
+    'lab_orders': {'laboratory.LabOrder': 'visit_id', 'laboratory.LabResult': 'lab_order.visit_id'},
+    'radiology': {'radiology.RadiologyRequest': 'visit_id'},
+    'prescriptions': {'pharmacy.Prescription': 'visit_id'},
+    'nursing_notes': {'nursing.NursingNote': 'visit_id'},
+    'alerts': {'clinical.ClinicalAlert': 'visit_id'},
+    'admission': {'discharges.Admission': 'visit_id'},
+    'billing': {
+        'billing.BillingLineItem': 'visit_id',
+        'billing.VisitCharge': 'visit_id',
+        'billing.Payment': 'visit_id',
+        'billing.VisitInsurance': 'visit_id',
+        'wallet.WalletTransaction': 'visit_id',
+    },
+}
+
+
+def section_etag(data):
+    """Quoted ETag of a section's content; equal content shares an ETag."""
+    payload = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return '"%s"' % hashlib.sha1(payload.encode()).hexdigest()[:20]
+
+
+def _bump_versions(visit_ids, section):
+    cache.set_many(
+        {VERSION_CACHE_KEY.format(visit_id=visit_id, section=section): uuid.uuid4().hex[:12]
+         for visit_id in visit_ids},
+        VERSION_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_visit_summary(visit_ids, section):
+    """
+    Make the next summary of these visits rebuild `section`.
+
+    Bumped now and again when the transaction commits, so a summary built
+    concurrently from pre-commit data is not cached under the new version.
+    """
+    if not isinstance(visit_ids, (list, set, tuple)):
+        visit_ids = [visit_ids]
+    visit_ids = {visit_id for visit_id in visit_ids if visit_id}
+    if not visit_ids:
+        return
+    _bump_versions(visit_ids, section)
+    transaction.on_commit(lambda: _bump_versions(visit_ids, section))
+
+
+def build_visit_summary(visit, sections):
+    """
+    {section: {'data': ..., 'etag': ...}} for the given section names.
+
+    Two cache round trips (versions, then sections) plus the queries of the
+    sections that are not cached.
+    """
+    version_keys = {section: VERSION_CACHE_KEY.format(visit_id=visit.pk, section=section) for section in sections}
+    versions = cache.get_many(version_keys.values())
+    section_keys = {
+        section: SECTION_CACHE_KEY.format(
+            visit_id=visit.pk, section=section, version=versions.get(version_keys[section], '0')
+        )
+        for section in sections
+    }
+    cached = cache.get_many(section_keys.values())
+
+    summary = {}
+    fresh = {}
+    for section in sections:
+        entry = cached.get(section_keys[section])
+        if entry is None:
+            # Round-trip through JSON so cached and fresh entries look alike
+            data = json.loads(json.dumps(SECTIONS[section](visit), cls=DjangoJSONEncoder))
+            entry = {'data': data, 'etag': section_etag(data)}
+            fresh[section_keys[section]] = entry
+        summary[section] = entry
+    if fresh:
+        cache.set_many(fresh, SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def summary_etag(summary):
+    """Quoted ETag covering every section of a summary."""
+    raw = ''.join(f"{section}={entry['etag']};" for section, entry in summary.items())
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()[:20]
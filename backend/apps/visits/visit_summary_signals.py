@@ -0,0 +1,41 @@
+"""
+Signal handlers invalidating cached visit summary sections (see visit_summary).
+"""
+import logging
+from functools import partial
+
+from django.db.models.signals import post_delete, post_save
+
+from .visit_summary import SECTION_MODELS, invalidate_visit_summary
+
+logger = logging.getLogger(__name__)
+
+
+def _visit_id(instance, path):
+    value = instance
+    for attribute in path.split('.'):
+        value = getattr(value, attribute, None)
+        if value is None:
+            return None
+    return value
+
+
+def invalidate_section(sender, instance, section, visit_path, **kwargs):
+    try:
+        invalidate_visit_summary(_visit_id(instance, visit_path), section)
+    except Exception as e:
+        # A stale section expires with its short TTL; never break the write
+        logger.error("Error invalidating %s summary of %s %s: %s", section, sender.__name__, instance.pk, e)
+
+
+for section, models in SECTION_MODELS.items():
+    for label, visit_path in models.items():
+        handler = partial(invalidate_section, section=section, visit_path=visit_path)
+        for signal in (post_save, post_delete):
+            signal.connect(
+                handler,
+                sender=label,  # resolved lazily; some models register late
+                weak=False,
+                dispatch_uid=f'visit_summary:{section}:{label}:{signal is post_save}',
+            )
+
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0012_medical_history_segments'),
+        ('wallet', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallet',
+            index=models.Index(fields=['balance'], name='wallets_balance_06b896_idx'),
+        ),
+    ]
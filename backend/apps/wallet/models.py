@@ -60,6 +60,8 @@ class Wallet(models.Model):
         indexes = [
             models.Index(fields=['patient']),
             models.Index(fields=['is_active']),
+            # Balance-range filter on the receptionist wallet list
+            models.Index(fields=['balance']),
         ]
         verbose_name = 'Wallet'
         verbose_name_plural = 'Wallets'
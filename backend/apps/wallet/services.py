@@ -3,12 +3,13 @@ Payment gateway services for wallet transactions.
 
 Supports multiple payment channels including Paystack.
 """
-import requests
 from decimal import Decimal
 from typing import Dict, Any, Optional
 from django.conf import settings
 from django.core.exceptions import ValidationError
 
+from core.http_client import get_client
+
 
 class PaystackService:
     """
@@ -21,6 +22,8 @@ class PaystackService:
         self.secret_key = getattr(settings, 'PAYSTACK_SECRET_KEY', '')
         self.public_key = getattr(settings, 'PAYSTACK_PUBLIC_KEY', '')
         self.base_url = 'https://api.paystack.co'
+        # Shared keep-alive session (connection pool, retries, circuit breaker)
+        self.http = get_client('paystack')
         
         if not self.secret_key:
             raise ValueError("PAYSTACK_SECRET_KEY must be set in settings")
@@ -66,7 +69,7 @@ class PaystackService:
         if callback_url:
             payload['callback_url'] = callback_url
         
-        response = requests.post(
+        response = self.http.post(
             f'{self.base_url}/transaction/initialize',
             json=payload,
             headers=self._get_headers()
@@ -85,7 +88,7 @@ class PaystackService:
         Returns:
             Transaction details
         """
-        response = requests.get(
+        response = self.http.get(
             f'{self.base_url}/transaction/verify/{reference}',
             headers=self._get_headers()
         )
@@ -122,7 +125,7 @@ class PaystackService:
             'currency': currency
         }
         
-        response = requests.post(
+        response = self.http.post(
             f'{self.base_url}/transferrecipient',
             json=payload,
             headers=self._get_headers()
@@ -159,7 +162,7 @@ class PaystackService:
             'reason': reason
         }
         
-        response = requests.post(
+        response = self.http.post(
             f'{self.base_url}/transfer',
             json=payload,
             headers=self._get_headers()
@@ -5,9 +5,11 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 import uuid
 
 from .models import Wallet, WalletTransaction, PaymentChannel
@@ -23,6 +25,13 @@ from apps.patients.models import Patient
 from apps.visits.models import Visit
 from apps.billing.models import Payment
 from core.audit import AuditLog
+from core.pagination import OptInKeysetPagination
+
+
+class WalletPagination(OptInKeysetPagination):
+    """Newest-first keyset pagination over wallets."""
+    ordering = ('-id',)
+    max_page_size = 200
 
 
 class WalletViewSet(viewsets.ReadOnlyModelViewSet):
@@ -36,25 +45,59 @@ class WalletViewSet(viewsets.ReadOnlyModelViewSet):
     """
     serializer_class = WalletSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = None  # Disable pagination - patients only have one wallet, receptionists may need pagination but frontend expects array
+    # Array unless the client sends ?page_size= or ?cursor= (see OptInKeysetPagination)
+    pagination_class = WalletPagination
     
     def get_queryset(self):
-        """Filter wallets based on user role."""
+        """
+        Filter wallets based on user role and query parameters.
+        
+        Receptionists can narrow the list server-side:
+        - patient: patient database id
+        - search: prefix of the patient's ID, first or last name, or phone
+        - min_balance / max_balance: inclusive balance range
+        - is_active: true/false
+        """
         user_role = getattr(self.request.user, 'role', None)
+        queryset = Wallet.objects.select_related('patient')
         
         if user_role == 'PATIENT':
-            # Patients can only see their own wallet
-            try:
-                patient = Patient.objects.get(user=self.request.user)
-                return Wallet.objects.filter(patient=patient)
-            except Patient.DoesNotExist:
-                return Wallet.objects.none()
-        elif user_role == 'RECEPTIONIST':
-            # Receptionists can see all wallets
-            return Wallet.objects.all()
-        else:
+            # Patients can only see their own wallet (joined, not looked up first)
+            return queryset.filter(patient__user=self.request.user)
+        elif user_role != 'RECEPTIONIST':
             # Other roles cannot access wallets
             return Wallet.objects.none()
+        
+        # Receptionists can see all wallets
+        params = self.request.query_params
+        patient_id = params.get('patient')
+        if patient_id:
+            if not patient_id.isdigit():
+                raise DRFValidationError({'patient': 'Must be a patient id.'})
+            queryset = queryset.filter(patient_id=patient_id)
+        
+        search = params.get('search', '').strip()
+        if search:
+            queryset = queryset.filter(
+                Q(patient__patient_id__startswith=search.upper())
+                | Q(patient__last_name__istartswith=search)
+                | Q(patient__first_name__istartswith=search)
+                | Q(patient__phone__startswith=search)
+            )
+        
+        for param, lookup in (('min_balance', 'balance__gte'), ('max_balance', 'balance__lte')):
+            value = params.get(param)
+            if value:
+                try:
+                    queryset = queryset.filter(**{lookup: Decimal(value)})
+                except InvalidOperation:
+                    raise DRFValidationError({param: 'Must be a number.'})
+        
+        is_active = params.get('is_active')
+        if is_active in ('true', 'false'):
+            queryset = queryset.filter(is_active=is_active == 'true')
+        
+        return queryset
     
     def list(self, request, *args, **kwargs):
         """
@@ -64,7 +107,8 @@ class WalletViewSet(viewsets.ReadOnlyModelViewSet):
         """
         user_role = getattr(request.user, 'role', None)
         
-        if user_role == 'PATIENT':
+        # Once the wallet exists, one cheap check replaces the lookups below
+        if user_role == 'PATIENT' and not self.get_queryset().exists():
             # Ensure Patient record exists (create if missing)
             try:
                 patient = Patient.objects.get(user=request.user)
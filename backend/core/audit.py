@@ -8,6 +8,8 @@ from django.db import models
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
+from .audit_buffer import enqueue_audit_entry
+
 User = get_user_model()
 
 
@@ -76,6 +78,10 @@ class AuditLog(models.Model):
             models.Index(fields=['visit_id', 'timestamp']),
             models.Index(fields=['action', 'timestamp']),
             models.Index(fields=['resource_type', 'resource_id']),
+            # Keyset pagination / export order
+            models.Index(fields=['timestamp', 'id'], name='audit_logs_ts_id_idx'),
+            # Prefix filters (action LIKE 'consultation.%') on PostgreSQL
+            models.Index(fields=['action'], name='audit_logs_action_prefix_idx', opclasses=['varchar_pattern_ops']),
         ]
         verbose_name = 'Audit Log'
         verbose_name_plural = 'Audit Logs'
@@ -89,6 +95,17 @@ class AuditLog(models.Model):
             raise ValueError("Audit logs are append-only and cannot be modified.")
         super().save(*args, **kwargs)
     
+    def record(self):
+        """
+        Persist this new entry through the per-request audit buffer.
+        
+        Inside a request the row is written in bulk after the response is sent
+        (see core.audit_buffer); elsewhere it is saved immediately.
+        """
+        if self.pk:
+            raise ValueError("Audit logs are append-only and cannot be modified.")
+        return enqueue_audit_entry(self)
+    
     def delete(self, *args, **kwargs):
         """Prevent deletion - audit logs are immutable."""
         raise ValueError("Audit logs cannot be deleted.")
@@ -111,6 +128,18 @@ class AuditLog(models.Model):
         Returns:
             AuditLog instance
         """
+        audit_log = cls.build(user, role, action, visit_id, resource_type, resource_id, request, metadata)
+        audit_log.record()
+        return audit_log
+    
+    @classmethod
+    def build(cls, user, role, action, visit_id, resource_type=None, resource_id=None, request=None, metadata=None):
+        """
+        Unsaved audit log entry with the same arguments as log().
+        
+        For bulk operations that write their entries with
+        core.audit_buffer.write_entries.
+        """
         ip_address = None
         user_agent = ''
         if request:
@@ -121,7 +150,7 @@ class AuditLog(models.Model):
                 ip_address = request.META.get('REMOTE_ADDR')
             user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
         
-        audit_log = cls(
+        return cls(
             user=user,
             user_role=role,
             action=action,
@@ -132,8 +161,6 @@ class AuditLog(models.Model):
             user_agent=user_agent,
             metadata=metadata or {}
         )
-        audit_log.save()
-        return audit_log
 
 
 def log_consultation_action(
@@ -183,7 +210,7 @@ def log_consultation_action(
         user_agent=user_agent,
         metadata=metadata or {}
     )
-    audit_log.save()
+    audit_log.record()
     return audit_log
 
 
@@ -275,5 +302,5 @@ def log_nurse_action(
         user_agent=user_agent,
         metadata=safe_metadata
     )
-    audit_log.save()
+    audit_log.record()
     return audit_log
@@ -0,0 +1,227 @@
+"""
+Write-behind buffer for audit log entries.
+
+Audit helpers (AuditLog.log, log_consultation_action, log_nurse_action and the
+per-app log_*_action functions) hand their entries to enqueue_audit_entry()
+instead of saving them one row at a time. While a request is being served
+(see core.middleware.audit_buffer.AuditBufferMiddleware) entries are collected
+per request and written with a single bulk_create after the response has been
+sent. Outside a request (management commands, cron jobs, shell) entries are
+written immediately, exactly as before.
+
+JSON fields are encoded with DjangoJSONEncoder, so metadata holding Decimals,
+dates or UUIDs is stored rather than failing the batch. If the bulk write
+still fails, entries are retried one row at a time and only the rows that
+fail are appended to a JSON-lines spool file so nothing is lost;
+`python manage.py replay_audit_spool` re-inserts them.
+"""
+import contextvars
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_active_buffer = contextvars.ContextVar('audit_buffer', default=None)
+
+
+def _emr_setting(name, default):
+    return getattr(settings, 'EMR_SETTINGS', {}).get(name, default)
+
+
+def get_spool_dir():
+    """Directory holding audit entries that could not be written to the database."""
+    return getattr(settings, 'AUDIT_SPOOL_DIR', None) or os.path.join(settings.LOGS_DIR, 'audit_spool')
+
+
+class AuditBuffer:
+    """
+    Collects unsaved audit entries (AuditLog, LoginAuditLog, ...) for one unit of work.
+
+    Entries are grouped by model so each model gets one bulk_create per flush.
+    The buffer flushes early once it holds max_entries rows, which bounds memory
+    for bulk endpoints that log thousands of actions in one request.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or _emr_setting('AUDIT_LOG_BUFFER_MAX_ENTRIES', 500)
+        self._entries = OrderedDict()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, entry):
+        self._entries.setdefault(type(entry), []).append(entry)
+        self._count += 1
+        if self._count >= self.max_entries:
+            self.flush()
+
+    def flush(self):
+        """Write all pending entries. Never raises; failures go to the spool."""
+        pending, self._entries, self._count = self._entries, OrderedDict(), 0
+        for model, entries in pending.items():
+            write_entries(model, entries)
+
+
+def encode_json_fields(entry):
+    """Re-encode JSON field values with DjangoJSONEncoder (Decimal, date, UUID -> JSON types)."""
+    for field in entry._meta.concrete_fields:
+        if isinstance(field, models.JSONField):
+            value = getattr(entry, field.attname)
+            if value is not None:
+                setattr(entry, field.attname, json.loads(json.dumps(value, cls=DjangoJSONEncoder)))
+    return entry
+
+
+def write_entries(model, entries):
+    """
+    Bulk insert entries for one model.
+
+    If the bulk insert fails, entries are inserted one at a time so a single
+    bad row does not take the batch down; only the rows that still fail are
+    spooled to disk. Returns the number of rows written to the database.
+    """
+    if not entries:
+        return 0
+    try:
+        for entry in entries:
+            encode_json_fields(entry)
+        with transaction.atomic():
+            model.objects.bulk_create(entries, batch_size=500)
+        return len(entries)
+    except Exception as e:
+        logger.error(
+            "Audit flush of %d %s entries failed, retrying row by row: %s",
+            len(entries), model._meta.label, e,
+        )
+
+    written = 0
+    failed = []
+    for entry in entries:
+        entry.pk = None
+        try:
+            encode_json_fields(entry)
+            with transaction.atomic():
+                entry.save(force_insert=True)
+            written += 1
+        except Exception as e:
+            logger.error("Audit entry %s (%s) could not be written: %s",
+                         model._meta.label, getattr(entry, 'action', None), e)
+            failed.append(entry)
+    if failed:
+        spool_entries(failed)
+    return written
+
+
+def spool_entries(entries):
+    """Append entries to today's spool file (one serialized batch per line)."""
+    spool_dir = get_spool_dir()
+    try:
+        os.makedirs(spool_dir, exist_ok=True)
+        for entry in entries:
+            # Spooled rows get fresh ids on replay
+            entry.pk = None
+        line = serializers.serialize('json', entries)
+        path = os.path.join(spool_dir, f"audit-{timezone.now():%Y%m%d}-{os.getpid()}.jsonl")
+        with open(path, 'a', encoding='utf-8') as fh:
+            fh.write(line.replace('\n', ' ') + '\n')
+            fh.flush()
+            os.fsync(fh.fileno())
+    except Exception:
+        # Last resort: the entries must at least reach the error log
+        logger.exception(
+            "Could not spool %d audit entries: %s",
+            len(entries),
+            json.dumps([{'model': e._meta.label, 'action': getattr(e, 'action', None)} for e in entries]),
+        )
+
+
+def enqueue_audit_entry(entry):
+    """
+    Persist an unsaved audit entry through the active buffer.
+
+    Saves immediately when no buffer is active or buffering is disabled.
+    Returns the entry (its pk is only set once the buffer has been flushed).
+    """
+    buffer = _active_buffer.get()
+    if buffer is None or not _emr_setting('AUDIT_LOG_BUFFERED', True):
+        encode_json_fields(entry).save()
+        return entry
+    buffer.add(entry)
+    return entry
+
+
+def activate_buffer():
+    """Start buffering audit entries in the current context. Returns (buffer, token)."""
+    buffer = AuditBuffer()
+    return buffer, _active_buffer.set(buffer)
+
+
+def deactivate_buffer(token):
+    _active_buffer.reset(token)
+
+
+class buffered_audit_entries:
+    """
+    Context manager that buffers audit entries for a block and flushes on exit.
+
+    Useful for management commands and bulk operations:
+
+        with buffered_audit_entries():
+            for patient in patients:
+                AuditLog.log(...)
+    """
+
+    def __enter__(self):
+        self.buffer, self._token = activate_buffer()
+        return self.buffer
+
+    def __exit__(self, exc_type, exc, tb):
+        deactivate_buffer(self._token)
+        self.buffer.flush()
+        return False
+
+
+def replay_spool_file(path):
+    """
+    Re-insert spooled entries from one spool file.
+
+    The file is moved aside first so concurrent flushes start a new file.
+    Batches that still fail are written to a fresh spool file.
+    Returns (written, failed).
+    """
+    processing_path = f"{path}.replaying"
+    os.replace(path, processing_path)
+    written = failed = 0
+    remaining = []
+    with open(processing_path, encoding='utf-8') as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            objects = [obj.object for obj in serializers.deserialize('json', line)]
+            if not objects:
+                continue
+            try:
+                with transaction.atomic():
+                    type(objects[0]).objects.bulk_create(objects, batch_size=500)
+                written += len(objects)
+            except Exception as e:
+                logger.error("Replay of spooled audit batch from %s failed: %s", path, e)
+                failed += len(objects)
+                remaining.append(line)
+    if remaining:
+        retry_path = os.path.join(os.path.dirname(path), f"audit-retry-{uuid.uuid4().hex}.jsonl")
+        with open(retry_path, 'w', encoding='utf-8') as fh:
+            fh.write('\n'.join(remaining) + '\n')
+    os.replace(processing_path, f"{path}.replayed")
+    return written, failed
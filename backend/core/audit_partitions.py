@@ -0,0 +1,245 @@
+"""
+Monthly range partitioning for the audit_logs table (PostgreSQL only).
+
+Layout after migration core.0002:
+- audit_logs                 partitioned parent, PARTITION BY RANGE ("timestamp")
+- audit_logs_legacy          rows written before partitioning (MINVALUE .. next month)
+- audit_logs_yYYYYmMM        one partition per calendar month
+- audit_logs_default         catch-all for rows outside any monthly partition
+
+Old partitions are exported to compressed files and detached with
+`manage.py archive_audit_partitions`; future partitions are created ahead of
+time with `manage.py ensure_audit_partitions` (run monthly from cron).
+On other database backends every helper is a no-op.
+"""
+import datetime
+import logging
+import re
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'audit_logs'
+LEGACY_PARTITION = 'audit_logs_legacy'
+DEFAULT_PARTITION = 'audit_logs_default'
+ID_SEQUENCE = 'audit_logs_partitioned_id_seq'
+
+_MONTH_PARTITION_RE = re.compile(r'^audit_logs_y(\d{4})m(\d{2})$')
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor == 'postgresql'
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn=None):
+    conn = conn or connection
+    if not is_supported(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [PARENT_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def convert_to_partitioned(conn, model, users_table):
+    """
+    Turn the plain audit_logs table into a monthly-partitioned table.
+
+    The existing table is kept as-is (no row copy) and attached as the
+    audit_logs_legacy partition covering everything up to the start of the
+    month after its newest row (or after today, whichever is later).
+    Index names on the parent match the Django-managed names so later
+    migrations keep working. model is the (historical) AuditLog model.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [PARENT_TABLE, f'{PARENT_TABLE}_pkey'],
+        )
+        legacy_index_defs = dict(cursor.fetchall())
+        legacy_indexes = list(legacy_index_defs)
+        cursor.execute(
+            "SELECT conname FROM pg_constraint c JOIN pg_class t ON t.oid = c.conrelid "
+            "WHERE t.relname = %s AND c.contype = 'p'",
+            [PARENT_TABLE],
+        )
+        pk_constraint = cursor.fetchone()[0]
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1, MAX("timestamp") FROM "{PARENT_TABLE}"')
+        next_id, newest = cursor.fetchone()
+        newest_day = max(newest.date(), datetime.date.today()) if newest else datetime.date.today()
+        first_month = add_months(month_start(newest_day), 1)
+
+        cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" RENAME TO "{LEGACY_PARTITION}"')
+        for index in legacy_indexes:
+            cursor.execute(f'ALTER INDEX "{index}" RENAME TO "{index[:50]}_legacy"')
+        cursor.execute(f'ALTER TABLE "{LEGACY_PARTITION}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute(f'ALTER TABLE "{LEGACY_PARTITION}" ALTER COLUMN id DROP DEFAULT')
+        # A partitioned table's primary key must include the partition key
+        cursor.execute(f'ALTER TABLE "{LEGACY_PARTITION}" DROP CONSTRAINT "{pk_constraint}"')
+        cursor.execute(f'ALTER TABLE "{LEGACY_PARTITION}" ADD PRIMARY KEY (id, "timestamp")')
+
+        cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS "{ID_SEQUENCE}" START WITH {int(next_id)}')
+        cursor.execute(
+            f'CREATE TABLE "{PARENT_TABLE}" '
+            f'(LIKE "{LEGACY_PARTITION}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(
+            f'ALTER TABLE "{PARENT_TABLE}" ALTER COLUMN id SET DEFAULT nextval(\'"{ID_SEQUENCE}"\')'
+        )
+        cursor.execute(f'ALTER SEQUENCE "{ID_SEQUENCE}" OWNED BY "{PARENT_TABLE}".id')
+        cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" ADD PRIMARY KEY (id, "timestamp")')
+        cursor.execute(
+            f'ALTER TABLE "{PARENT_TABLE}" ADD CONSTRAINT "{PARENT_TABLE}_user_id_fk" '
+            f'FOREIGN KEY (user_id) REFERENCES "{users_table}" (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        for statement in _parent_index_sql(model, legacy_index_defs):
+            cursor.execute(statement)
+
+        cursor.execute(
+            f'ALTER TABLE "{PARENT_TABLE}" ATTACH PARTITION "{LEGACY_PARTITION}" '
+            f'FOR VALUES FROM (MINVALUE) TO (%s)',
+            [first_month.isoformat()],
+        )
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{PARENT_TABLE}" DEFAULT')
+
+
+def _meta_index_sql(model, index):
+    """CREATE INDEX on the parent for a Meta index, with its name, column order and opclasses."""
+    columns = []
+    for position, (field_name, order) in enumerate(index.fields_orders):
+        column = '"%s"' % model._meta.get_field(field_name).column
+        if position < len(index.opclasses):
+            column += f' {index.opclasses[position]}'
+        if order:
+            column += f' {order}'
+        columns.append(column)
+    return f'CREATE INDEX "{index.name}" ON "{PARENT_TABLE}" ({", ".join(columns)})'
+
+
+def _parent_index_sql(model, legacy_index_defs):
+    """
+    CREATE INDEX statements reproducing the model's indexes on the parent.
+
+    Indexes declared in Meta.indexes are built from model._meta.indexes.
+    Field-level indexes (db_index, foreign keys) were named by the schema
+    editor when the table was created; their definitions are taken from the
+    table before it became the legacy partition (indexdef refers to the
+    table by name, which the parent now has).
+    """
+    meta_names = set()
+    statements = []
+    for index in model._meta.indexes:
+        meta_names.add(index.name)
+        statements.append(_meta_index_sql(model, index))
+    for name, definition in legacy_index_defs.items():
+        if name not in meta_names and not definition.startswith('CREATE UNIQUE'):
+            statements.append(definition)
+    return statements
+
+
+def ensure_month_partitions(conn=None, months_ahead=3, today=None):
+    """
+    Create monthly partitions from the current month up to months_ahead.
+
+    Returns the names of partitions that were created.
+    """
+    conn = conn or connection
+    if not is_partitioned(conn):
+        return []
+    current = month_start(today or datetime.date.today())
+    last = add_months(current, months_ahead)
+    # Months still covered by the legacy partition must not get their own table
+    month = max(current, legacy_upper_bound(conn) or current)
+    existing = set(list_partitions(conn))
+    created = []
+    with conn.cursor() as cursor:
+        while month <= last:
+            name = partition_name(month)
+            if name not in existing:
+                cursor.execute(
+                    f'CREATE TABLE "{name}" PARTITION OF "{PARENT_TABLE}" FOR VALUES FROM (%s) TO (%s)',
+                    [month.isoformat(), add_months(month, 1).isoformat()],
+                )
+                created.append(name)
+            month = add_months(month, 1)
+    if created:
+        logger.info("Created audit log partitions: %s", ', '.join(created))
+    return created
+
+
+def list_partitions(conn=None):
+    """Names of all partitions attached to audit_logs."""
+    conn = conn or connection
+    if not is_partitioned(conn):
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s ORDER BY child.relname",
+            [PARENT_TABLE],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def partitions_before(cutoff, conn=None):
+    """
+    Partitions whose rows all fall before cutoff (a first-of-month date).
+
+    The legacy partition qualifies once cutoff is on or after its upper bound.
+    """
+    result = []
+    for name in list_partitions(conn):
+        match = _MONTH_PARTITION_RE.match(name)
+        if match:
+            month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+            if add_months(month, 1) <= cutoff:
+                result.append(name)
+        elif name == LEGACY_PARTITION:
+            upper = legacy_upper_bound(conn)
+            if upper and upper <= cutoff:
+                result.append(name)
+    return result
+
+
+def legacy_upper_bound(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_class c WHERE c.relname = %s",
+            [LEGACY_PARTITION],
+        )
+        row = cursor.fetchone()
+    if not row or not row[0]:
+        return None
+    match = re.search(r"TO \('(\d{4})-(\d{2})-(\d{2})", row[0])
+    if not match:
+        return None
+    return datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+
+def detach_and_drop(name, conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{name}"')
+        cursor.execute(f'DROP TABLE "{name}"')
+    logger.info("Dropped archived audit log partition %s", name)
@@ -7,14 +7,51 @@ Per EMR Rules:
 - Admin-only access (or specific role-based access)
 - Visit-scoped filtering available
 """
+import csv
+import json
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from .audit import AuditLog
 from .audit_serializers import AuditLogSerializer
+from .pagination import KeysetPagination
+
+
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('timestamp', 'timestamp'),
+    ('user', 'user_id'),
+    ('user_username', 'user__username'),
+    ('user_role', 'user_role'),
+    ('action', 'action'),
+    ('visit_id', 'visit_id'),
+    ('resource_type', 'resource_type'),
+    ('resource_id', 'resource_id'),
+    ('ip_address', 'ip_address'),
+    ('user_agent', 'user_agent'),
+    ('metadata', 'metadata'),
+]
+
+
+class AuditLogKeysetPagination(KeysetPagination):
+    """Newest-first keyset pagination backed by the (timestamp, id) index."""
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for streaming csv.writer output."""
+    
+    def write(self, value):
+        return value
 
 
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
@@ -28,45 +65,82 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     - Admin or specific roles only
     - Visit-scoped filtering
     - Action-based filtering
+    
+    Pagination:
+    - Default: keyset pagination on (timestamp, id); follow `next` (cursor=...)
+      to page. Cost per page is constant however deep the client pages.
+    - Legacy: passing `page` switches to page-number pagination with a total
+      count, for the existing audit log screen.
     """
     
-    queryset = AuditLog.objects.all().select_related('user').order_by('-timestamp')
+    queryset = AuditLog.objects.all().select_related('user').order_by('-timestamp', '-id')
     permission_classes = [IsAuthenticated]
     serializer_class = AuditLogSerializer
     
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if 'page' in self.request.query_params:
+                self._paginator = PageNumberPagination()
+            else:
+                self._paginator = AuditLogKeysetPagination()
+        return self._paginator
+    
+    def _get_user_role(self):
+        return getattr(self.request.user, 'role', None) or \
+            getattr(self.request.user, 'get_role', lambda: None)()
+    
     def get_queryset(self):
-        """Filter audit logs based on query parameters."""
+        """
+        Filter audit logs based on query parameters.
+        
+        All filters are equality or prefix matches so they can use the
+        audit_logs indexes; substring search on action is not supported.
+        """
         queryset = super().get_queryset()
+        params = self.request.query_params
         
         # Filter by visit_id if provided
-        visit_id = self.request.query_params.get('visit_id', None)
+        visit_id = params.get('visit_id', None)
         if visit_id:
             queryset = queryset.filter(visit_id=visit_id)
         
         # Filter by user if provided
-        user_id = self.request.query_params.get('user', None)
+        user_id = params.get('user', None)
         if user_id:
             queryset = queryset.filter(user_id=user_id)
         
-        # Filter by action if provided
-        action = self.request.query_params.get('action', None)
+        # Filter by action: exact match, or prefix match (e.g. 'consultation.')
+        action = params.get('action', None)
         if action:
-            queryset = queryset.filter(action__icontains=action)
+            queryset = queryset.filter(action=action)
+        action_prefix = params.get('action_prefix', None)
+        if action_prefix:
+            queryset = queryset.filter(action__startswith=action_prefix)
         
-        # Filter by resource_type if provided
-        resource_type = self.request.query_params.get('resource_type', None)
+        # Filter by resource_type (and resource_id) if provided
+        resource_type = params.get('resource_type', None)
         if resource_type:
             queryset = queryset.filter(resource_type=resource_type)
+            resource_id = params.get('resource_id', None)
+            if resource_id:
+                queryset = queryset.filter(resource_id=resource_id)
         
         # Filter by date range if provided
-        date_from = self.request.query_params.get('date_from', None)
+        date_from = params.get('date_from', None)
         if date_from:
             queryset = queryset.filter(timestamp__gte=date_from)
         
-        date_to = self.request.query_params.get('date_to', None)
+        date_to = params.get('date_to', None)
         if date_to:
             queryset = queryset.filter(timestamp__lte=date_to)
         
+        # If not admin, filter to user's own logs or visit-scoped logs they have access to
+        if self._get_user_role() not in ['ADMIN', 'DOCTOR']:  # Adjust roles as needed
+            queryset = queryset.filter(
+                Q(user=self.request.user) | Q(visit_id__isnull=False)
+            )
+        
         return queryset
     
     def list(self, request, *args, **kwargs):
@@ -76,34 +150,76 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         Query parameters:
         - visit_id: Filter by visit ID
         - user: Filter by user ID
-        - action: Filter by action (partial match)
-        - resource_type: Filter by resource type
+        - action: Filter by exact action (e.g. 'consultation.create')
+        - action_prefix: Filter by action prefix (e.g. 'consultation.')
+        - resource_type / resource_id: Filter by resource
         - date_from: Filter from date (YYYY-MM-DD)
         - date_to: Filter to date (YYYY-MM-DD)
-        - page: Page number
+        - cursor: Opaque cursor from the previous response's `next`
         - page_size: Page size
+        - page: Use page-number pagination instead of cursors
+        """
+        return super().list(request, *args, **kwargs)
+    
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Stream matching audit logs as CSV or NDJSON.
+        
+        GET /api/v1/audit-logs/export/?output=csv|ndjson&<list filters>
+        
+        Rows are read with a server-side iterator and written as they are
+        produced, so memory use stays flat for exports of millions of rows.
+        Admin only.
         """
-        # Check if user has permission to view audit logs
-        # For now, allow authenticated users (can be restricted further)
-        user_role = getattr(request.user, 'role', None) or \
-                   getattr(request.user, 'get_role', lambda: None)()
+        if self._get_user_role() != 'ADMIN':
+            raise PermissionDenied("Only administrators can export audit logs.")
         
-        # Only allow admin or specific roles (adjust as needed)
-        # For now, allow all authenticated users to view their own audit logs
-        # and visit-scoped audit logs
+        output = request.query_params.get('output', 'csv').lower()
+        if output not in ('csv', 'ndjson'):
+            raise ValidationError({'output': "Must be 'csv' or 'ndjson'."})
         
-        queryset = self.get_queryset()
+        rows = (
+            self.get_queryset()
+            .select_related(None)
+            .order_by('timestamp', 'id')
+            .values_list(*[source for _, source in EXPORT_COLUMNS])
+            .iterator(chunk_size=2000)
+        )
+        headers = [name for name, _ in EXPORT_COLUMNS]
         
-        # If not admin, filter to user's own logs or visit-scoped logs they have access to
-        if user_role not in ['ADMIN', 'DOCTOR']:  # Adjust roles as needed
-            queryset = queryset.filter(
-                Q(user=request.user) | Q(visit_id__isnull=False)
-            )
+        if output == 'csv':
+            content = self._stream_csv(headers, rows)
+            content_type = 'text/csv'
+        else:
+            content = self._stream_ndjson(headers, rows)
+            content_type = 'application/x-ndjson'
         
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        AuditLog.log(
+            user=request.user,
+            role=self._get_user_role(),
+            action='AUDIT_LOG_EXPORTED',
+            visit_id=None,
+            resource_type='audit_log',
+            request=request,
+            metadata={'output': output, 'filters': {k: v for k, v in request.query_params.items() if k != 'output'}},
+        )
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"audit-logs-{timezone.now():%Y%m%d-%H%M%S}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @staticmethod
+    def _stream_csv(headers, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(headers)
+        for row in rows:
+            row = list(row)
+            row[-1] = json.dumps(row[-1], cls=DjangoJSONEncoder) if row[-1] else ''
+            yield writer.writerow(row)
+    
+    @staticmethod
+    def _stream_ndjson(headers, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
@@ -0,0 +1,119 @@
+"""
+Batch annotations for serializer method fields.
+
+A SerializerMethodField that runs a query per object turns a 100-row list
+into 100+ queries. Serializers using BatchAnnotationMixin declare that work
+once for the whole list instead, in one of two forms:
+
+- batch_annotations: {name: factory()} returning a query expression (e.g. an
+  Exists() subquery). List views apply them with
+  Serializer.annotate_queryset(queryset), so the values arrive with the rows.
+- batch_prefetches: {name: function(objects)} returning {pk: value} for a page
+  of objects. BatchListSerializer runs each function once per list, for rows
+  that were not annotated (e.g. a plain list passed to many=True).
+
+batch_related lists foreign keys that method fields follow; they are loaded
+with one query per relation unless the queryset already select_related them.
+
+Method fields read the precomputed value with batch_value(obj, name, compute),
+which falls back to compute(obj) when serializing a single object.
+
+Usage:
+    class PatientSerializer(BatchAnnotationMixin, serializers.ModelSerializer):
+        batch_annotations = {'has_active_insurance': active_insurance_exists}
+
+        class Meta:
+            model = Patient
+            list_serializer_class = BatchListSerializer
+
+        def get_has_active_insurance(self, obj):
+            return self.batch_value(obj, 'has_active_insurance', patient_has_active_insurance)
+
+    queryset = PatientSerializer.annotate_queryset(Patient.objects.all())
+
+ViewSets get the annotations on list/retrieve by mixing in
+BatchAnnotatedViewMixin.
+"""
+from django.db import models
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+
+ANNOTATION_PREFIX = '_batch_'
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """ListSerializer that lets its child precompute batch values for the whole list."""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        objects = list(iterable)
+        self.child.prepare_batch(objects)
+        try:
+            return [self.child.to_representation(item) for item in objects]
+        finally:
+            self.child.clear_batch()
+
+
+class BatchAnnotationMixin:
+    """
+    Serializer mixin for method fields backed by per-list batch values.
+
+    Set Meta.list_serializer_class = BatchListSerializer so many=True
+    serializers prepare the batch before rendering their rows.
+    """
+
+    batch_annotations = {}
+    batch_prefetches = {}
+    batch_related = ()
+
+    @classmethod
+    def annotate_queryset(cls, queryset):
+        """Queryset with every batch annotation (and batch_related join) applied."""
+        annotations = {
+            f'{ANNOTATION_PREFIX}{name}': factory() for name, factory in cls.batch_annotations.items()
+        }
+        if cls.batch_related:
+            queryset = queryset.select_related(*cls.batch_related)
+        return queryset.annotate(**annotations) if annotations else queryset
+
+    def prepare_batch(self, objects):
+        """Load batch_related relations and run batch_prefetches for objects missing annotations."""
+        if self.batch_related and objects:
+            prefetch_related_objects(objects, *self.batch_related)
+        self._batch_values = {}
+        for name, prefetch in self.batch_prefetches.items():
+            pending = [obj for obj in objects if not hasattr(obj, f'{ANNOTATION_PREFIX}{name}')]
+            if pending:
+                self._batch_values[name] = prefetch(pending)
+
+    def clear_batch(self):
+        self._batch_values = {}
+
+    def batch_value(self, obj, name, compute):
+        """Annotated or prefetched value of name for obj, else compute(obj)."""
+        attribute = f'{ANNOTATION_PREFIX}{name}'
+        if hasattr(obj, attribute):
+            return getattr(obj, attribute)
+        values = getattr(self, '_batch_values', {}).get(name)
+        if values is not None and obj.pk in values:
+            return values[obj.pk]
+        return compute(obj)
+
+
+class BatchAnnotatedViewMixin:
+    """
+    GenericAPIView mixin applying the serializer's batch annotations.
+
+    Hooks filter_queryset(), which list() and get_object() both call, so the
+    view's own get_queryset() stays untouched. Only read actions are
+    annotated; writes may change what an annotation reports.
+    """
+
+    batch_annotated_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if getattr(self, 'action', None) in self.batch_annotated_actions and hasattr(serializer_class, 'annotate_queryset'):
+            queryset = serializer_class.annotate_queryset(queryset)
+        return queryset
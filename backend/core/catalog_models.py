@@ -0,0 +1,59 @@
+"""
+Tombstones for hard-deleted catalog rows (see core.catalog_sync).
+
+A client holding a local copy of a catalog learns about new and edited
+rows from their updated_at; a deleted row leaves nothing to compare, so a
+post_delete receiver records its id here for ?updated_since= deltas.
+"""
+from django.apps import apps
+from django.db import models
+from django.db.models.signals import post_delete
+from django.utils import timezone
+
+# Catalog name (as used in deltas and cache keys) -> model label
+SYNCED_CATALOGS = {
+    'drugs': 'pharmacy.Drug',
+    'drug_inventory': 'pharmacy.DrugInventory',
+    'lab_test_catalog': 'laboratory.LabTestCatalog',
+    'radiology_study_types': 'radiology.RadiologyStudyType',
+}
+
+# Rows of another catalog that embed the deleted row: (model label, FK attname).
+# DrugSerializer shows stock from DrugInventory, so deleting an inventory
+# record changes the drug's row too.
+CATALOG_DEPENDENTS = {
+    'pharmacy.DrugInventory': ('pharmacy.Drug', 'drug_id'),
+}
+
+
+class CatalogTombstone(models.Model):
+    """Id of a catalog row that was deleted, and when."""
+
+    catalog = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'catalog_tombstones'
+        indexes = [
+            models.Index(fields=['catalog', 'deleted_at'], name='catalog_tombstone_since_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.catalog} #{self.object_id} deleted at {self.deleted_at}"
+
+
+def record_catalog_tombstone(sender, instance, **kwargs):
+    """post_delete receiver for every synced catalog model."""
+    label = sender._meta.label
+    catalog = next(name for name, model_label in SYNCED_CATALOGS.items() if model_label == label)
+    now = timezone.now()
+    CatalogTombstone.objects.create(catalog=catalog, object_id=instance.pk, deleted_at=now)
+    if label in CATALOG_DEPENDENTS:
+        dependent_label, attname = CATALOG_DEPENDENTS[label]
+        dependent = apps.get_model(dependent_label)
+        dependent.objects.filter(pk=getattr(instance, attname)).update(updated_at=now)
+
+
+for _catalog, _label in SYNCED_CATALOGS.items():
+    post_delete.connect(record_catalog_tombstone, sender=_label, dispatch_uid=f'catalog_tombstone:{_catalog}')
@@ -0,0 +1,134 @@
+"""
+Delta sync for reference catalogs (drugs, drug inventory, lab tests, radiology study types).
+
+Catalog list endpoints return the whole table because pages match against a
+local copy. CatalogSyncMixin lets the client keep that copy instead of
+re-downloading it:
+
+1. First load - GET /api/v1/drugs/ returns the full list (the snapshot),
+   gzip-compressed and cached server-side per catalog version. The
+   response carries X-Catalog-Version, X-Catalog-Synced-At and an ETag.
+2. Later loads - GET /api/v1/drugs/?updated_since=<X-Catalog-Synced-At>
+   returns {"results": [changed rows], "deleted": [ids], ...}; deleted
+   ids come from CatalogTombstone and from rows that no longer match the
+   request's filters (e.g. a drug deactivated under ?is_active=true).
+3. Either request with If-None-Match: <ETag> gets 304 while the catalog is
+   unchanged.
+
+The version is derived from the latest updated_at (indexed), the row count
+and the latest tombstone, so checking it costs two small queries.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
+from django.views.decorators.gzip import gzip_page
+from rest_framework import status
+from rest_framework.response import Response
+
+from .catalog_models import CatalogTombstone
+
+# Rows saved by transactions still open when the client's previous sync ran
+# can carry an older updated_at; re-sending that window is harmless.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+SNAPSHOT_CACHE_TIMEOUT = 10 * 60
+SNAPSHOT_CACHE_KEY = 'catalog_snapshot:{catalog}:{version}:{query}'
+
+UPDATED_SINCE_PARAM = 'updated_since'
+
+
+def catalog_version(queryset, catalog, timestamp_fields=('updated_at',)):
+    """Opaque version of a catalog table; changes whenever a row is added, edited or deleted."""
+    aggregates = {f'latest_{index}': Max(field) for index, field in enumerate(timestamp_fields)}
+    state = queryset.order_by().aggregate(rows=Count('pk', distinct=True), **aggregates)
+    state['tombstone'] = CatalogTombstone.objects.filter(catalog=catalog).aggregate(latest=Max('id'))['latest']
+    raw = '|'.join(f'{key}={state[key]}' for key in sorted(state))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class CatalogSyncMixin:
+    """
+    ViewSet mixin adding snapshots, ?updated_since= deltas and version headers to list().
+
+    Set catalog_name to the CatalogTombstone catalog (see SYNCED_CATALOGS)
+    and sync_timestamp_fields to every updated_at the serialized row
+    depends on. Place it before ModelViewSet in the bases so a subclass's
+    own list() (audit logging) still runs first.
+    """
+    catalog_name = None
+    sync_timestamp_fields = ('updated_at',)
+
+    @method_decorator(gzip_page)
+    def list(self, request, *args, **kwargs):
+        synced_at = timezone.now()
+        version = catalog_version(self.queryset.model._default_manager.all(), self.catalog_name,
+                                  self.sync_timestamp_fields)
+        etag = f'"{version}"'
+
+        if etag in {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif UPDATED_SINCE_PARAM in request.query_params:
+            since = parse_datetime(request.query_params[UPDATED_SINCE_PARAM])
+            if since is None:
+                return Response(
+                    {'error': f'{UPDATED_SINCE_PARAM} must be an ISO 8601 datetime'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            response = Response(self.get_catalog_delta(since, version, synced_at))
+        else:
+            response = Response(self.get_catalog_snapshot(request, version, *args, **kwargs))
+
+        response['ETag'] = etag
+        response['X-Catalog-Version'] = version
+        response['X-Catalog-Synced-At'] = synced_at.isoformat()
+        # Browsers may keep the snapshot but must revalidate it with the ETag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_catalog_snapshot(self, request, version, *args, **kwargs):
+        """Full (filtered) list, serialized once per catalog version and query."""
+        query = hashlib.md5(
+            '&'.join(f'{key}={value}' for key, value in sorted(request.query_params.items())).encode('utf-8')
+        ).hexdigest()
+        key = SNAPSHOT_CACHE_KEY.format(catalog=self.catalog_name, version=version, query=query)
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, SNAPSHOT_CACHE_TIMEOUT)
+        return data
+
+    def get_catalog_delta(self, since, version, synced_at):
+        """Rows changed since `since`, plus ids the client should drop."""
+        window = since - SYNC_OVERLAP
+        changed = Q()
+        for field in self.sync_timestamp_fields:
+            changed |= Q(**{f'{field}__gte': window})
+
+        rows = list(self.filter_queryset(self.get_queryset()).filter(changed))
+        kept = {row.pk for row in rows}
+        # Changed rows the request's filters now exclude are gone from the client's view
+        left = set(
+            self.queryset.model._default_manager.filter(changed).values_list('pk', flat=True)
+        ) - kept
+        deleted = set(
+            CatalogTombstone.objects.filter(catalog=self.catalog_name, deleted_at__gte=window)
+            .values_list('object_id', flat=True)
+        ) - kept
+
+        return {
+            'catalog': self.catalog_name,
+            'version': version,
+            'updated_since': since.isoformat(),
+            'synced_at': synced_at.isoformat(),
+            'results': self.get_serializer(rows, many=True).data,
+            'deleted': sorted(left | deleted),
+        }
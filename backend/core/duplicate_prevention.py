@@ -129,6 +129,110 @@ def check_patient_duplicate(first_name, last_name, date_of_birth=None, phone=Non
     return None
 
 
+def _normalize_patient_keys(fields):
+    """Normalized duplicate keys for one prospective patient (as in check_patient_duplicate)."""
+    first_name = (fields.get('first_name') or '').strip().upper()
+    last_name = (fields.get('last_name') or '').strip().upper()
+    date_of_birth = fields.get('date_of_birth')
+    return [
+        ('national_id', (fields.get('national_id') or '').strip() or None),
+        ('phone', (fields.get('phone') or '').strip() or None),
+        ('email', (fields.get('email') or '').strip().lower() or None),
+        ('name_dob', (first_name, last_name, date_of_birth) if date_of_birth else None),
+    ]
+
+
+def _duplicate_message(rule, value, owner):
+    if rule == 'national_id':
+        return f"A patient with National ID {value} already exists: {owner}"
+    if rule == 'phone':
+        return f"A patient with phone number {value} already exists: {owner}"
+    if rule == 'email':
+        return f"A patient with email {value} already exists: {owner}"
+    first_name, last_name, date_of_birth = value
+    return (
+        f"A patient with name {first_name} {last_name} and date of birth "
+        f"{date_of_birth} already exists: {owner}"
+    )
+
+
+def find_patient_duplicates(candidates, seen=None, batch_size=500):
+    """
+    Set-wise check_patient_duplicate for many prospective patients.
+
+    Applies the same rules in the same order (national ID, phone, email,
+    name + date of birth, against active patients), but with one IN query per
+    rule and batch instead of up to four queries per patient. A candidate is
+    also a duplicate of an earlier candidate, or of any key already in `seen`,
+    which lets chunked imports carry state from one chunk to the next.
+
+    Args:
+        candidates: List of (label, fields) pairs; label is the
+            candidate's import row number (used in messages) and fields
+            holds the check_patient_duplicate keyword arguments
+        seen: Optional dict updated in place with the keys of every
+            non-duplicate candidate
+        batch_size: Maximum values per IN query
+
+    Returns:
+        dict: {label: message} for every duplicate candidate
+    """
+    from django.db.models.functions import Upper
+    from apps.patients.models import Patient
+
+    seen = {} if seen is None else seen
+    keyed = []
+    for label, fields in candidates:
+        if not (fields.get('first_name') or '').strip() or not (fields.get('last_name') or '').strip():
+            keyed.append((label, []))
+            continue
+        keyed.append((label, [(rule, value) for rule, value in _normalize_patient_keys(fields) if value]))
+
+    wanted = {'national_id': set(), 'phone': set(), 'email': set(), 'name_dob': set()}
+    for _, keys in keyed:
+        for rule, value in keys:
+            wanted[rule].add(value)
+
+    existing = {}
+    active = Patient.objects.filter(is_active=True).only(
+        'first_name', 'middle_name', 'last_name', 'patient_id', 'national_id', 'phone', 'email', 'date_of_birth'
+    )
+    for rule in ('national_id', 'phone', 'email'):
+        values = list(wanted[rule])
+        for start in range(0, len(values), batch_size):
+            for patient in active.filter(**{f'{rule}__in': values[start:start + batch_size]}):
+                existing.setdefault((rule, getattr(patient, rule)), patient)
+    names = list(wanted['name_dob'])
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        queryset = active.annotate(
+            _first_upper=Upper('first_name'), _last_upper=Upper('last_name')
+        ).filter(
+            _last_upper__in={last for _, last, _ in batch},
+            date_of_birth__in={dob for _, _, dob in batch},
+        )
+        for patient in queryset:
+            key = ('name_dob', (patient._first_upper, patient._last_upper, patient.date_of_birth))
+            existing.setdefault(key, patient)
+
+    duplicates = {}
+    for label, keys in keyed:
+        for rule, value in keys:
+            patient = existing.get((rule, value))
+            if patient is not None:
+                owner = f"{patient.get_full_name()} (ID: {patient.patient_id})"
+                duplicates[label] = _duplicate_message(rule, value, owner)
+                break
+            if (rule, value) in seen:
+                owner = f"row {seen[(rule, value)]} of this import"
+                duplicates[label] = _duplicate_message(rule, value, owner)
+                break
+        else:
+            for key in keys:
+                seen[key] = label
+    return duplicates
+
+
 def check_visit_duplicate(patient, visit_type, visit_date=None, exclude_id=None):
     """
     Check if a duplicate visit exists for the same patient.
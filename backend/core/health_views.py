@@ -10,10 +10,15 @@ from rest_framework import status
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 from django.db import connection
+from django.http import HttpResponse
 from django.core.cache import cache
 from django.utils import timezone
 import os
 
+from .http_client import http_metrics
+from .permissions import IsStaffOrAdminRole
+from .request_metrics import render_prometheus
+
 
 @extend_schema(responses={200: OpenApiTypes.OBJECT})
 @api_view(['GET'])
@@ -42,6 +47,8 @@ def health_detailed(request):
     - Cache connectivity
     - Application status
     
+    Also reports outbound provider latency and circuit state (informational).
+    
     Returns 200 if all checks pass, 503 if any check fails.
     """
     checks = {
@@ -79,6 +86,8 @@ def health_detailed(request):
         'status': 'healthy' if all_healthy else 'unhealthy',
         'timestamp': timezone.now().isoformat(),
         'checks': checks,
+        # External providers do not affect status; open circuits show which are failing
+        'outbound': http_metrics(),
     }
     
     if errors:
@@ -113,3 +122,16 @@ def health_info(request):
         info['cors_origins'] = getattr(settings, 'CORS_ALLOWED_ORIGINS', [])
     
     return Response(info, status=status.HTTP_200_OK)
+
+
+@extend_schema(responses={200: OpenApiTypes.STR})
+@api_view(['GET'])
+@permission_classes([IsStaffOrAdminRole])
+def metrics(request):
+    """
+    Request and outbound provider metrics in Prometheus text format (admin only).
+    
+    Per-route request counts, latency, response size, DB queries/time and
+    cache hits for this worker process (see core.request_metrics).
+    """
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
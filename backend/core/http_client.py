@@ -0,0 +1,354 @@
+"""
+Pooled outbound HTTP clients for third-party providers.
+
+Every external integration (Paystack, Termii, Twilio, OpenAI, Anthropic,
+NHID) goes through one long-lived ProviderClient per provider and process:
+
+- a requests.Session with its own connection pool, so calls reuse
+  keep-alive TCP/TLS connections instead of handshaking every time;
+- retries with exponential backoff for connection errors and 429/5xx
+  responses on idempotent methods (POSTs that move money are never replayed);
+- a circuit breaker that fails fast once a provider keeps failing, and lets a
+  trial call through after a cool-down;
+- per-provider latency and error counters (http_metrics()).
+
+SDK clients (openai, anthropic, twilio) hold their own pools; they are cached
+per credential with sdk_client() and their calls wrapped in
+ProviderClient.track() for the breaker and metrics.
+
+Usage:
+    response = get_client('paystack').get(f'/transaction/verify/{reference}', headers=headers)
+
+    with get_client('openai').track():
+        openai_client(api_key).chat.completions.create(...)
+
+Settings (EMR_SETTINGS['OUTBOUND_HTTP']) override the per-provider defaults
+in PROVIDER_DEFAULTS, e.g. {'paystack': {'timeout': 20}}.
+"""
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'timeout': 30,
+    'retries': 2,
+    'backoff_factor': 0.3,
+    'pool_size': 10,
+    'failure_threshold': 5,
+    'reset_timeout': 30,
+    'slow_call_ms': 2000,
+}
+
+PROVIDER_DEFAULTS = {
+    'paystack': {'base_url': 'https://api.paystack.co'},
+    'termii': {'base_url': 'https://api.termii.com'},
+    'twilio': {'timeout': 60},
+    'openai': {'timeout': 120, 'slow_call_ms': 15000},
+    'anthropic': {'timeout': 120, 'slow_call_ms': 15000},
+    'nhid': {'timeout': 15},
+}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+def sdk_error_status(exc):
+    """HTTP status carried by an SDK exception, or None for connection errors and timeouts."""
+    for attr in ('status_code', 'status', 'http_status'):
+        status = getattr(exc, attr, None)
+        if isinstance(status, int):
+            return status
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    CLOSED: calls go through. After failure_threshold consecutive failures the
+    circuit OPENs and calls fail fast for reset_timeout seconds, then one trial
+    call is allowed (HALF_OPEN); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Whether a call may go out now."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+class LatencyStats:
+    """Call count, errors and latency for one provider."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = None
+
+    def record(self, elapsed_ms, error=False):
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.last_ms = elapsed_ms
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'avg_ms': round(self.total_ms / self.calls, 1) if self.calls else None,
+                'max_ms': round(self.max_ms, 1),
+                'last_ms': round(self.last_ms, 1) if self.last_ms is not None else None,
+            }
+
+
+class ProviderClient:
+    """Long-lived, pooled HTTP client for one external provider."""
+
+    def __init__(self, name, base_url='', timeout=30, retries=2, backoff_factor=0.3, pool_size=10,
+                 failure_threshold=5, reset_timeout=30, slow_call_ms=2000):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.slow_call_ms = slow_call_ms
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.stats = LatencyStats()
+        self._sdk_clients = {}
+        self._sdk_lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def url(self, path):
+        if path.startswith(('http://', 'https://')) or not self.base_url:
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            self.stats.record_rejected()
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open); try again shortly")
+
+    def _finish(self, started, failed):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats.record(elapsed_ms, error=failed)
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if elapsed_ms >= self.slow_call_ms:
+            logger.warning("Slow %s call: %.0f ms", self.name, elapsed_ms)
+        return elapsed_ms
+
+    def request(self, method, path, **kwargs):
+        """
+        Send a request through the pooled session.
+
+        Connection errors, timeouts and 5xx responses count as failures for
+        the circuit breaker; 4xx responses are the caller's to handle.
+        Raises CircuitOpenError (a requests ConnectionError) while the
+        circuit is open.
+        """
+        self._check_circuit()
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except requests.exceptions.RequestException:
+            self._finish(started, failed=True)
+            raise
+        elapsed_ms = self._finish(started, failed=response.status_code >= 500)
+        logger.debug("%s %s %s -> %s in %.0f ms", self.name, method, path, response.status_code, elapsed_ms)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    @contextmanager
+    def track(self):
+        """
+        Circuit breaker and latency metrics around an SDK call.
+
+        As with request(), connection errors, timeouts and 5xx errors count as
+        failures; an SDK exception carrying a status below 500 (an invalid
+        number, a bad request) is the caller's to handle and keeps the
+        circuit closed.
+        """
+        self._check_circuit()
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            status = sdk_error_status(exc)
+            self._finish(started, failed=status is None or status >= 500)
+            raise
+        self._finish(started, failed=False)
+
+    def sdk_client(self, credential, factory):
+        """
+        Cached SDK client for this provider and credential.
+
+        factory() builds the client on first use; later calls with the same
+        credential reuse it (and its connection pool).
+        """
+        key = hashlib.sha256(str(credential).encode()).hexdigest()
+        with self._sdk_lock:
+            client = self._sdk_clients.get(key)
+            if client is None:
+                client = self._sdk_clients[key] = factory()
+            return client
+
+    def close(self):
+        self.session.close()
+        with self._sdk_lock:
+            self._sdk_clients.clear()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def provider_config(name):
+    """Effective settings for a provider (defaults, then EMR_SETTINGS overrides)."""
+    overrides = getattr(settings, 'EMR_SETTINGS', {}).get('OUTBOUND_HTTP', {})
+    return {**DEFAULTS, **PROVIDER_DEFAULTS.get(name, {}), **overrides.get(name, {})}
+
+
+def get_client(name, **overrides):
+    """
+    Shared ProviderClient for a provider.
+
+    Overrides (e.g. base_url from settings) apply when the client is first
+    created in this process.
+    """
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = ProviderClient(name, **{**provider_config(name), **overrides})
+        return client
+
+
+def reset_clients():
+    """Close and forget every client (tests, or after forking a worker)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def http_metrics():
+    """{provider: call stats plus circuit state} for every client used in this process."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.name: {**client.stats.snapshot(), 'circuit': client.breaker.state} for client in clients}
+
+
+def openai_client(api_key):
+    """Cached openai.OpenAI client for api_key (raises ImportError if openai is missing)."""
+    from openai import OpenAI
+    return get_client('openai').sdk_client(api_key, lambda: OpenAI(api_key=api_key))
+
+
+def anthropic_client(api_key):
+    """Cached anthropic.Anthropic client for api_key (raises ImportError if anthropic is missing)."""
+    import anthropic
+    return get_client('anthropic').sdk_client(api_key, lambda: anthropic.Anthropic(api_key=api_key))
+
+
+def twilio_client(account_sid, auth_token):
+    """Cached twilio Client with a pooled HTTP session (raises ImportError if twilio is missing)."""
+    from twilio.http.http_client import TwilioHttpClient
+    from twilio.rest import Client
+
+    config = provider_config('twilio')
+    return get_client('twilio').sdk_client(
+        (account_sid, auth_token),
+        lambda: Client(
+            account_sid,
+            auth_token,
+            http_client=TwilioHttpClient(pool_connections=True, timeout=config['timeout'], max_retries=config['retries']),
+        ),
+    )
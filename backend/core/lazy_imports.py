@@ -0,0 +1,66 @@
+"""
+Deferred imports for heavy optional libraries.
+
+pandas, WeasyPrint, openai, anthropic and twilio each take tens to hundreds
+of milliseconds to import. Modules reached from INSTALLED_APPS or the URL
+conf must not import them at module level, or every gunicorn worker and
+manage.py command pays for them. Bind them lazily instead:
+
+    pd = lazy_import('pandas')       # nothing imported yet
+    frame = pd.read_csv(upload)      # pandas imported here, once per process
+
+and check availability without importing:
+
+    TWILIO_AVAILABLE = module_available('twilio')
+
+HEAVY_MODULES lists the libraries tests/performance/test_startup_time.py
+keeps out of django.setup() and URL loading; `manage.py profile_startup`
+shows where import time goes.
+"""
+import importlib
+import importlib.util
+import threading
+from functools import lru_cache
+
+HEAVY_MODULES = ('pandas', 'numpy', 'weasyprint', 'openai', 'anthropic', 'twilio', 'qrcode')
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Proxy for module `name`; raises ImportError on first use if it is missing."""
+    return LazyModule(name)
+
+
+@lru_cache(maxsize=None)
+def module_available(name):
+    """Whether `name` can be imported, found without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
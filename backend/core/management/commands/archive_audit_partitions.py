@@ -0,0 +1,140 @@
+"""
+Archive old audit_logs partitions to compressed files (PostgreSQL only).
+
+Each partition older than the cutoff is exported to
+BACKUP_DIR/audit_archive/<partition>.ndjson.gz (one JSON object per row) with a
+<partition>.ndjson.gz.sha256 file next to it, holding the digest of the
+compressed file (check with: sha256sum -c <partition>.ndjson.gz.sha256).
+With --drop the partition is detached and dropped only after the archive has
+been read back: its digest must match the checksum file and it must hold as
+many rows as the partition. Without --drop the command only exports.
+
+Usage:
+    python manage.py archive_audit_partitions --keep-months 24
+    python manage.py archive_audit_partitions --keep-months 24 --drop
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from core import audit_partitions
+
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes, as sha256sum prints it."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Export audit_logs partitions older than --keep-months to gzip files, optionally dropping them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months',
+            type=int,
+            default=24,
+            help='Months of audit history to keep in the database (default: 24)',
+        )
+        parser.add_argument(
+            '--output-dir',
+            default=None,
+            help='Archive directory (default: BACKUP_DIR/audit_archive)',
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Detach and drop each partition after a verified export',
+        )
+
+    def handle(self, *args, **options):
+        if not audit_partitions.is_partitioned():
+            raise CommandError("audit_logs is not partitioned (requires PostgreSQL).")
+        if options['keep_months'] < 1:
+            raise CommandError("--keep-months must be at least 1.")
+
+        cutoff = audit_partitions.add_months(
+            audit_partitions.month_start(datetime.date.today()), -options['keep_months']
+        )
+        output_dir = options['output_dir'] or os.path.join(settings.BACKUP_DIR, 'audit_archive')
+        os.makedirs(output_dir, exist_ok=True)
+
+        partitions = audit_partitions.partitions_before(cutoff)
+        if not partitions:
+            self.stdout.write(self.style.SUCCESS(f"No audit log partitions older than {cutoff}."))
+            return
+
+        for name in partitions:
+            path = os.path.join(output_dir, f"{name}.ndjson.gz")
+            exported = self._archive(name, path)
+            self.stdout.write(f"  - {name}: {exported} rows -> {path}")
+
+            if options['drop']:
+                self._verify(name, path)
+                audit_partitions.detach_and_drop(name)
+                self.stdout.write(f"    dropped {name}")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(partitions)} partition(s)."))
+
+    def _archive(self, name, path):
+        """Export a partition to path and write path.sha256. Returns the rows exported."""
+        exported = self._export(name, path)
+        expected = self._count(name)
+        if exported != expected:
+            raise CommandError(
+                f"Export of {name} wrote {exported} rows but the partition holds {expected}; aborting."
+            )
+        with open(f"{path}.sha256", 'w', encoding='utf-8') as fh:
+            fh.write(f"{file_sha256(path)}  {os.path.basename(path)}\n")
+        return exported
+
+    def _verify(self, name, path):
+        """Read the archive back before its partition is dropped; raise CommandError if it does not match."""
+        with open(f"{path}.sha256", encoding='utf-8') as fh:
+            recorded = fh.read().split()[0]
+        if file_sha256(path) != recorded:
+            raise CommandError(f"{path} does not match its checksum file; not dropping {name}.")
+        rows = 0
+        try:
+            with gzip.open(path, 'rb') as fh:
+                for line in fh:
+                    json.loads(line)
+                    rows += 1
+        except (OSError, EOFError, ValueError) as e:
+            raise CommandError(f"{path} cannot be read back ({e}); not dropping {name}.")
+        expected = self._count(name)
+        if rows != expected:
+            raise CommandError(
+                f"{path} holds {rows} rows but {name} holds {expected}; not dropping {name}."
+            )
+
+    def _count(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM "{name}"')
+            return cursor.fetchone()[0]
+
+    def _export(self, name, path):
+        """Stream a partition to gzip NDJSON with a server-side cursor. Returns the rows written."""
+        rows = 0
+        with connection.chunked_cursor() as cursor, gzip.open(path, 'wb') as fh:
+            cursor.execute(f'SELECT * FROM "{name}" ORDER BY "timestamp", id')
+            columns = [col[0] for col in cursor.description]
+            while True:
+                batch = cursor.fetchmany(5000)
+                if not batch:
+                    break
+                for row in batch:
+                    line = (json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n').encode('utf-8')
+                    fh.write(line)
+                    rows += 1
+        return rows
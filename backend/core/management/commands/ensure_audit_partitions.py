@@ -0,0 +1,39 @@
+"""
+Create upcoming monthly partitions for the audit_logs table (PostgreSQL only).
+
+Run monthly from cron so inserts never fall into the default partition.
+
+Usage:
+    python manage.py ensure_audit_partitions
+    python manage.py ensure_audit_partitions --months-ahead 6
+"""
+from django.core.management.base import BaseCommand
+
+from core import audit_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create monthly audit_logs partitions for the coming months (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help='Number of future months to create partitions for (default: 3)',
+        )
+
+    def handle(self, *args, **options):
+        if not audit_partitions.is_partitioned():
+            self.stdout.write(self.style.WARNING(
+                "audit_logs is not partitioned (requires PostgreSQL); nothing to do."
+            ))
+            return
+
+        created = audit_partitions.ensure_month_partitions(months_ahead=options['months_ahead'])
+        if created:
+            for name in created:
+                self.stdout.write(f"  - created {name}")
+            self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partition(s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All audit log partitions already exist."))
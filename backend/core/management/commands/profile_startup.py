@@ -0,0 +1,74 @@
+"""
+Report where Django startup time goes, per app and per imported module.
+
+Boots the project in a fresh interpreter under `python -X importtime` and
+prints django.setup() and URL-loading time, each app's import and ready()
+cost, and the costliest library imports with the module that triggered them.
+Heavy libraries should show up only behind core.lazy_imports.
+
+Usage:
+    python manage.py profile_startup
+    python manage.py profile_startup --top 40 --no-urls
+    python manage.py profile_startup --json > startup.json
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.lazy_imports import HEAVY_MODULES
+from core.startup_profile import profile_startup
+
+
+class Command(BaseCommand):
+    help = 'Profile import and ready() time of django.setup() and URL loading, per app and per module'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Number of packages and imports to list (default: 20)',
+        )
+        parser.add_argument(
+            '--no-urls',
+            action='store_true',
+            help='Profile django.setup() only, without loading the URL conf',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the full report as JSON',
+        )
+
+    def handle(self, *args, **options):
+        report = profile_startup(include_urls=not options['no_urls'], top=options['top'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        phases = report['phases']
+        self.stdout.write(f"django.setup(): {phases['setup_ms']:.0f} ms")
+        if phases['urls_ms'] is not None:
+            self.stdout.write(f"URL conf:       {phases['urls_ms']:.0f} ms")
+        self.stdout.write(f"Total import time: {report['import_ms']:.0f} ms\n")
+
+        self.stdout.write(f"{'App':<42} {'own':>8} {'incl.':>8} {'ready()':>8}")
+        for name, values in report['apps'].items():
+            self.stdout.write(
+                f"{name:<42} {values['own_ms']:>8.1f} {values['inclusive_ms']:>8.1f} {values['ready_ms']:>8.1f}"
+            )
+
+        self.stdout.write(f"\n{'Package':<42} {'ms':>8}")
+        for name, ms in report['packages'].items():
+            self.stdout.write(f"{name:<42} {ms:>8.1f}")
+
+        self.stdout.write(f"\n{'Import (cumulative)':<42} {'ms':>8}  imported by")
+        for entry in report['entry_points']:
+            self.stdout.write(f"{entry['module']:<42} {entry['cumulative_ms']:>8.1f}  {entry['imported_by']}")
+
+        loaded = [name for name in HEAVY_MODULES if name in report['loaded_modules']]
+        if loaded:
+            self.stdout.write(self.style.WARNING(f"\nHeavy modules imported at startup: {', '.join(loaded)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("\nNo heavy optional modules imported at startup."))
@@ -0,0 +1,37 @@
+"""
+Re-insert audit entries that were spooled to disk after a failed buffer flush.
+
+Usage:
+    python manage.py replay_audit_spool
+"""
+import glob
+import os
+
+from django.core.management.base import BaseCommand
+
+from core.audit_buffer import get_spool_dir, replay_spool_file
+
+
+class Command(BaseCommand):
+    help = 'Replay audit log entries spooled to disk by the audit write-behind buffer'
+
+    def handle(self, *args, **options):
+        spool_dir = get_spool_dir()
+        files = sorted(glob.glob(os.path.join(spool_dir, 'audit-*.jsonl')))
+        if not files:
+            self.stdout.write(self.style.SUCCESS(f"No spooled audit entries in {spool_dir}."))
+            return
+
+        total_written = total_failed = 0
+        for path in files:
+            written, failed = replay_spool_file(path)
+            total_written += written
+            total_failed += failed
+            self.stdout.write(f"  - {os.path.basename(path)}: {written} replayed, {failed} failed")
+
+        if total_failed:
+            self.stdout.write(self.style.WARNING(
+                f"Replayed {total_written} entries; {total_failed} still spooled."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Replayed {total_written} entries."))
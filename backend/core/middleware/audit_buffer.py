@@ -0,0 +1,68 @@
+"""
+Middleware that batches audit log writes per request.
+
+Audit entries created while the view runs are held in a core.audit_buffer.AuditBuffer
+and written with one bulk_create once the response has been sent to the client,
+so audit logging no longer adds a synchronous INSERT per action to request latency.
+
+The flush is hooked to the request_finished signal, which Django sends from
+response.close() once the server has delivered the body. The server closes
+the response on the thread that served it (ASGI runs it thread-sensitively),
+so pending flushes are kept per thread.
+"""
+import logging
+import threading
+
+from django.core.signals import request_finished
+
+from core.audit_buffer import activate_buffer, deactivate_buffer
+
+logger = logging.getLogger(__name__)
+
+_pending = threading.local()
+
+
+def _pending_flushes():
+    flushes = getattr(_pending, 'flushes', None)
+    if flushes is None:
+        flushes = _pending.flushes = []
+    return flushes
+
+
+def flush_pending_buffers(**kwargs):
+    """Flush the audit buffers of responses closed on this thread."""
+    flushes = _pending_flushes()
+    while flushes:
+        flushes.pop(0)()
+
+
+request_finished.connect(flush_pending_buffers, dispatch_uid='audit_buffer.flush_pending_buffers')
+
+
+class AuditBufferMiddleware:
+    """
+    Activate an audit buffer for the request and flush it when the response closes.
+
+    Should sit early in MIDDLEWARE so audit entries written by other middleware
+    (e.g. the payment guard) are buffered as well.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # A previous response on this thread that was never closed
+        flush_pending_buffers()
+
+        buffer, token = activate_buffer()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            deactivate_buffer(token)
+            buffer.flush()
+            raise
+        deactivate_buffer(token)
+
+        if len(buffer):
+            _pending_flushes().append(buffer.flush)
+        return response
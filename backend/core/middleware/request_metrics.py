@@ -0,0 +1,115 @@
+"""
+Middleware recording per-route request metrics (core.request_metrics).
+
+Every request is timed and counted by status; a sampled fraction
+(EMR_SETTINGS['REQUEST_METRICS']['SAMPLE_RATE']) also records DB query
+count, DB time and cache hits/misses. Unsampled requests cost two clock
+reads and one locked histogram update.
+
+A request carrying the opt-in header (default X-Debug-Queries: 1) and the
+bearer token of a staff/admin user is always sampled and gets its DB work
+back in the response: X-Query-Count, X-Query-Time-Ms and X-Slow-Queries
+(JSON list of [ms, sql] for the slowest statements). From anyone else the
+header is ignored, so it cannot be used to force sampling.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.request_metrics import (
+    RequestSample,
+    activate_sample,
+    deactivate_sample,
+    metrics_config,
+    registry,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_SQL_LENGTH = 300
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.route or match.view_name or 'unmatched'
+
+
+def _token_user(request):
+    """User of the request's bearer token, if valid (DRF authenticates only later, in the view)."""
+    from core.jwt_auth import RoleAwareJWTAuthentication
+
+    try:
+        result = RoleAwareJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def _can_dump_queries(user):
+    if user is None or not user.is_authenticated:
+        return False
+    if getattr(user, 'is_staff', False):
+        return True
+    role = getattr(user, 'role', None) or getattr(user, 'get_role', lambda: None)()
+    return role == 'ADMIN'
+
+
+class RequestMetricsMiddleware:
+    """
+    Time requests and record them per (method, route).
+
+    Should sit first in MIDDLEWARE so the wall time includes every other
+    middleware. The debug header is checked against the bearer token before
+    the view runs; that costs a user lookup only on requests sending it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = metrics_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        dump_requested = bool(
+            config['QUERY_DUMP_HEADER'] and request.headers.get(config['QUERY_DUMP_HEADER'])
+            and _can_dump_queries(_token_user(request))
+        )
+        sample = None
+        if dump_requested or random.random() < config['SAMPLE_RATE']:
+            sample = RequestSample(keep_queries=dump_requested)
+
+        started = time.perf_counter()
+        if sample is None:
+            response = self.get_response(request)
+        else:
+            token = activate_sample(sample)
+            try:
+                with ExitStack() as stack:
+                    for alias in connections:
+                        stack.enter_context(connections[alias].execute_wrapper(sample))
+                    response = self.get_response(request)
+            finally:
+                deactivate_sample(token)
+        duration = time.perf_counter() - started
+
+        size = None if response.streaming else len(response.content)
+        try:
+            registry.record(request.method, _route(request), response.status_code, duration, size, sample)
+        except Exception as e:
+            # Metrics must never break a request
+            logger.error(f"Failed to record request metrics: {e}")
+
+        if dump_requested:
+            slowest = [(ms, sql[:MAX_SQL_LENGTH]) for ms, sql in sample.slowest(config['QUERY_DUMP_LIMIT'])]
+            response['X-Query-Count'] = str(sample.queries)
+            response['X-Query-Time-Ms'] = f"{sample.db_seconds * 1000:.2f}"
+            response['X-Slow-Queries'] = json.dumps(slowest)
+        return response
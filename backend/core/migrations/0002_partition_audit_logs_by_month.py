@@ -0,0 +1,33 @@
+# Data migration: convert audit_logs to a monthly range-partitioned table on PostgreSQL.
+# Existing rows stay in place as the audit_logs_legacy partition. Other backends are untouched.
+
+from django.conf import settings
+from django.db import migrations
+
+from core import audit_partitions
+
+
+def partition_audit_logs(apps, schema_editor):
+    connection = schema_editor.connection
+    if not audit_partitions.is_supported(connection) or audit_partitions.is_partitioned(connection):
+        return
+    AuditLog = apps.get_model('core', 'AuditLog')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    audit_partitions.convert_to_partitioned(connection, AuditLog, User._meta.db_table)
+    audit_partitions.ensure_month_partitions(connection)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_audit_logs, noop),
+    ]
@@ -0,0 +1,4 @@
+"""
+Models of the core app that live outside core.audit.
+"""
+from .catalog_models import CatalogTombstone  # noqa: F401
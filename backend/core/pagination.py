@@ -0,0 +1,159 @@
+"""
+Keyset (cursor) pagination for large, append-mostly tables.
+
+Offset pagination (`?page=N`) makes the database walk and discard every row
+before the requested page, so deep pages get slower as a table grows.
+KeysetPagination instead remembers the sort key of the last row served and
+asks for rows strictly after it, which an index on the ordering columns can
+answer directly no matter how deep the client pages.
+
+The cursor is an opaque, URL-safe token; clients only ever follow `next`.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over a unique composite ordering.
+
+    Subclasses set `ordering` to a tuple of field names (prefix with '-' for
+    descending); the last field must be unique (normally 'id') so the order is
+    total. The response shape is {"next": url|null, "results": [...]}.
+    """
+
+    ordering = ('-id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.build_position_filter(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.next_position = self.get_position(self.page[-1]) if self.has_next else None
+        return self.page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    # Cursor encoding -----------------------------------------------------
+
+    @property
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def get_position(self, obj):
+        """Sort-key values of a row (model instance or values() dict)."""
+        if isinstance(obj, dict):
+            return [obj[name] for name, _ in self._fields]
+        return [getattr(obj, self.model._meta.get_field(name).attname) for name, _ in self._fields]
+
+    def encode_cursor(self, position):
+        payload = []
+        for value in position:
+            payload.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self._fields, values)
+            ]
+        except (TypeError, ValueError, UnicodeDecodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def build_position_filter(self, position):
+        """
+        Rows strictly after `position` in sort order.
+
+        Expands the row comparison (a, b, c) > (x, y, z) into
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z), and adds a
+        bound on the leading column so the index range scan starts at the cursor.
+        """
+        fields = self._fields
+        condition = Q()
+        for i, (name, descending) in enumerate(fields):
+            clause = Q(**{f"{name}__{'lt' if descending else 'gt'}": position[i]})
+            for j, (prev_name, _) in enumerate(fields[:i]):
+                clause &= Q(**{prev_name: position[j]})
+            condition |= clause
+        leading, descending = fields[0]
+        return Q(**{f"{leading}__{'lte' if descending else 'gte'}": position[0]}) & condition
+
+
+class OptInKeysetPagination(KeysetPagination):
+    """
+    KeysetPagination for list endpoints whose clients expect a plain array.
+
+    Requests without ?page_size= or ?cursor= keep the array response
+    (compatibility mode); clients that send either get the {"next", "results"}
+    envelope and can page progressively. Filter the list server-side so the
+    array stays small for callers that have not moved over.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -10,6 +10,23 @@ from functools import wraps
 import time
 
 
+def increment_counter(key, timeout):
+    """
+    Atomically increment a shared cache counter and return the new value.
+
+    cache.add() only creates the key if it is missing, and incr() is atomic on
+    Redis/Memcached (and lock-protected in LocMemCache), so concurrent workers
+    never lose increments the way a get() followed by set() can.
+    """
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key expired between add() and incr()
+        cache.add(key, 1, timeout)
+        return 1
+
+
 class RateLimiter:
     """
     Simple rate limiter using cache.
@@ -35,24 +52,19 @@ class RateLimiter:
         minute_key = f'rate_limit:minute:{identifier}:{now.minute}'
         hour_key = f'rate_limit:hour:{identifier}:{now.hour}'
         
-        # Get current counts
-        minute_count = cache.get(minute_key, 0)
-        hour_count = cache.get(hour_key, 0)
-        
-        # Check limits
-        if minute_count >= self.requests_per_minute:
+        # Count this request first, then check: increments are atomic, so
+        # concurrent requests can't all read the same count and slip through
+        minute_count = increment_counter(minute_key, 60)
+        if minute_count > self.requests_per_minute:
             return False, 0, 60 - now.second
         
-        if hour_count >= self.requests_per_hour:
+        hour_count = increment_counter(hour_key, 3600)
+        if hour_count > self.requests_per_hour:
             return False, 0, 3600 - (now.minute * 60 + now.second)
         
-        # Increment counters
-        cache.set(minute_key, minute_count + 1, 60)
-        cache.set(hour_key, hour_count + 1, 3600)
-        
         remaining = min(
-            self.requests_per_minute - minute_count - 1,
-            self.requests_per_hour - hour_count - 1
+            self.requests_per_minute - minute_count,
+            self.requests_per_hour - hour_count
         )
         
         return True, remaining, 0
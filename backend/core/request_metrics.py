@@ -0,0 +1,237 @@
+"""
+In-process request metrics: per-route histograms in Prometheus text format.
+
+RequestMetricsMiddleware times every request. For a sampled fraction
+(EMR_SETTINGS['REQUEST_METRICS']['SAMPLE_RATE']) it also counts DB queries
+and DB time through a connection execute_wrapper, and cache hits/misses
+through the instrumented cache backends in core.cache_backends. Everything
+is keyed by (method, route pattern), so cardinality stays bounded by the
+URL conf.
+
+Counters live in this process only; with several gunicorn workers each
+worker reports its own series and Prometheus sums them by instance. The
+admin-only /api/v1/metrics/ endpoint renders them with render_prometheus(),
+together with the outbound provider stats from core.http_client.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from .http_client import http_metrics
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.1,
+    'QUERY_DUMP_HEADER': 'X-Debug-Queries',
+    'QUERY_DUMP_LIMIT': 5,
+}
+
+_active_sample = ContextVar('request_metrics_sample', default=None)
+
+
+def metrics_config():
+    """Effective settings (DEFAULTS, then EMR_SETTINGS['REQUEST_METRICS'])."""
+    return {**DEFAULTS, **getattr(settings, 'EMR_SETTINGS', {}).get('REQUEST_METRICS', {})}
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics: value <= le)."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(le, cumulative count)] including '+Inf'."""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class RequestSample:
+    """DB and cache work of one sampled request; also a connection execute_wrapper."""
+
+    def __init__(self, keep_queries=False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.statements = [] if keep_queries else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            if self.statements is not None:
+                self.statements.append((elapsed, sql))
+
+    def slowest(self, limit):
+        """[(milliseconds, sql)] of the slowest recorded statements."""
+        ranked = sorted(self.statements or (), key=lambda item: item[0], reverse=True)[:limit]
+        return [(round(elapsed * 1000, 2), sql) for elapsed, sql in ranked]
+
+
+def activate_sample(sample):
+    return _active_sample.set(sample)
+
+
+def deactivate_sample(token):
+    _active_sample.reset(token)
+
+
+def record_cache_access(hits=0, misses=0):
+    """Called by the instrumented cache backends; a no-op outside sampled requests."""
+    sample = _active_sample.get()
+    if sample is not None:
+        sample.cache_hits += hits
+        sample.cache_misses += misses
+
+
+class RouteSeries:
+    __slots__ = ('statuses', 'duration', 'size', 'sampled', 'queries', 'db_seconds', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.statuses = {}
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.sampled = 0
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = Histogram(DURATION_BUCKETS)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class MetricsRegistry:
+    """Thread-safe per-(method, route) series for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, method, route, status, duration, size=None, sample=None):
+        with self._lock:
+            series = self._series.get((method, route))
+            if series is None:
+                series = self._series[(method, route)] = RouteSeries()
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            series.duration.observe(duration)
+            if size is not None:
+                series.size.observe(size)
+            if sample is not None:
+                series.sampled += 1
+                series.queries.observe(sample.queries)
+                series.db_seconds.observe(sample.db_seconds)
+                series.cache_hits += sample.cache_hits
+                series.cache_misses += sample.cache_misses
+
+    def series(self, method, route):
+        """The RouteSeries for (method, route), or None if no request was recorded."""
+        with self._lock:
+            return self._series.get((method, route))
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """Prometheus text exposition (format 0.0.4) of every series."""
+        lines = []
+        with self._lock:
+            items = sorted(self._series.items())
+
+            def header(name, kind, help_text):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            header('emr_http_requests_total', 'counter', 'Requests by route, method and status.')
+            for (method, route), series in items:
+                for status, count in sorted(series.statuses.items()):
+                    lines.append(f'emr_http_requests_total{{{_labels(method, route)},status="{status}"}} {count}')
+
+            for name, attribute, help_text in (
+                ('emr_http_request_duration_seconds', 'duration', 'Wall time per request.'),
+                ('emr_http_response_size_bytes', 'size', 'Response body size (non-streaming responses).'),
+                ('emr_http_request_db_queries', 'queries', 'DB queries per sampled request.'),
+                ('emr_http_request_db_seconds', 'db_seconds', 'DB time per sampled request.'),
+            ):
+                header(name, 'histogram', help_text)
+                for (method, route), series in items:
+                    histogram = getattr(series, attribute)
+                    if not histogram.count:
+                        continue
+                    labels = _labels(method, route)
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+            for name, attribute, help_text in (
+                ('emr_http_sampled_requests_total', 'sampled', 'Requests sampled for DB and cache metrics.'),
+                ('emr_http_cache_hits_total', 'cache_hits', 'Cache hits in sampled requests.'),
+                ('emr_http_cache_misses_total', 'cache_misses', 'Cache misses in sampled requests.'),
+            ):
+                header(name, 'counter', help_text)
+                for (method, route), series in items:
+                    lines.append(f'{name}{{{_labels(method, route)}}} {getattr(series, attribute)}')
+
+        lines.extend(_outbound_lines())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(method, route):
+    return f'method="{_escape(method)}",route="{_escape(route)}"'
+
+
+def _outbound_lines():
+    """Outbound provider stats (core.http_client) as Prometheus series."""
+    providers = sorted(http_metrics().items())
+    lines = []
+    for name, key, kind, help_text in (
+        ('emr_outbound_calls_total', 'calls', 'counter', 'Calls to external providers.'),
+        ('emr_outbound_errors_total', 'errors', 'counter', 'Failed calls to external providers.'),
+        ('emr_outbound_rejected_total', 'rejected', 'counter', 'Calls refused by an open circuit.'),
+        ('emr_outbound_latency_avg_ms', 'avg_ms', 'gauge', 'Average provider call latency.'),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for provider, stats in providers:
+            lines.append(f'{name}{{provider="{_escape(provider)}"}} {stats[key] or 0}')
+    lines.append("# HELP emr_outbound_circuit_open Whether the provider circuit is open (1) or not (0).")
+    lines.append("# TYPE emr_outbound_circuit_open gauge")
+    for provider, stats in providers:
+        lines.append(f'emr_outbound_circuit_open{{provider="{_escape(provider)}"}} {int(stats["circuit"] == "OPEN")}')
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+def render_prometheus():
+    return registry.render()
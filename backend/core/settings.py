@@ -81,8 +81,10 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'core.middleware.request_metrics.RequestMetricsMiddleware',  # Per-route timing, sampled DB/cache metrics
     'django.middleware.security.SecurityMiddleware',
     'core.middleware.request_sanitizer.RequestSanitizerMiddleware',  # Reject path traversal / null bytes early
+    'core.middleware.audit_buffer.AuditBufferMiddleware',  # Batch audit log writes, flushed after the response
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware (must be early, before CommonMiddleware)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -133,7 +135,7 @@ if os.environ.get('SECURE_PROXY_SSL_HEADER') == 'X-Forwarded-Proto':
 # Cache Configuration
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.InstrumentedLocMemCache',  # LocMemCache reporting hits/misses
         'LOCATION': 'unique-snowflake',
     }
 }
@@ -141,7 +143,7 @@ CACHES = {
 # In production, use Redis:
 # CACHES = {
 #     'default': {
-#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#         'BACKEND': 'core.cache_backends.InstrumentedRedisCache',
 #         'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
 #     }
 # }
@@ -267,6 +269,27 @@ EMR_SETTINGS = {
     # Audit logging
     'ENABLE_AUDIT_LOGGING': True,
     'AUDIT_LOG_RETENTION_DAYS': 2555,  # 7 years for HIPAA compliance
+    'AUDIT_LOG_BUFFERED': os.environ.get('AUDIT_LOG_BUFFERED', 'True') == 'True',  # Write-behind per request
+    'AUDIT_LOG_BUFFER_MAX_ENTRIES': 500,  # Flush early once a request has buffered this many entries
+    
+    # Receipt/invoice numbering
+    'DOCUMENT_NUMBER_BLOCK_SIZE': int(os.environ.get('DOCUMENT_NUMBER_BLOCK_SIZE', '20')),  # Numbers reserved per worker
+    
+    # Outbound provider HTTP (core.http_client): per-provider overrides of timeout, retries,
+    # pool_size, failure_threshold, reset_timeout, e.g. {'paystack': {'timeout': 20}}
+    'OUTBOUND_HTTP': {},
+    
+    # Request metrics (core.request_metrics), exposed at /api/v1/metrics/ for admins.
+    # Every request is timed; SAMPLE_RATE of them also record DB queries/time and cache hits.
+    'REQUEST_METRICS': {
+        'ENABLED': os.environ.get('REQUEST_METRICS_ENABLED', 'True') == 'True',
+        'SAMPLE_RATE': float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', '0.1')),
+        'QUERY_DUMP_HEADER': 'X-Debug-Queries',  # Staff/admin opt-in: slowest queries in response headers
+        'QUERY_DUMP_LIMIT': 5,
+    },
+    
+    # Fraction of lock evaluations (apps.core.lock_system) logged at DEBUG
+    'LOCK_EVALUATION_LOG_SAMPLE_RATE': float(os.environ.get('LOCK_EVALUATION_LOG_SAMPLE_RATE', '0.01')),
 }
 
 # CORS Configuration
@@ -385,6 +408,13 @@ SERVER_EMAIL = DEFAULT_FROM_EMAIL
 SMS_ENABLED = os.environ.get('SMS_ENABLED', 'False') == 'True'
 SMS_PROVIDER = os.environ.get('SMS_PROVIDER', 'console')  # 'console' | 'twilio' | 'termii'
 
+# Appointment reminder dispatch (send_whatsapp_reminders / send_appointment_reminders)
+REMINDER_DISPATCH_WORKERS = int(os.environ.get('REMINDER_DISPATCH_WORKERS', '8'))
+REMINDER_PROVIDER_RATES = {  # Max messages per second per provider
+    'whatsapp': float(os.environ.get('REMINDER_WHATSAPP_RATE', '10')),
+    'email': float(os.environ.get('REMINDER_EMAIL_RATE', '5')),
+}
+
 # Twilio Configuration (if using Twilio)
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', '')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', '')
@@ -401,10 +431,16 @@ TWILIO_API_KEY = os.environ.get('TWILIO_API_KEY', '')
 TWILIO_API_SECRET = os.environ.get('TWILIO_API_SECRET', '')
 TWILIO_RECORDING_ENABLED = os.environ.get('TWILIO_RECORDING_ENABLED', 'False') == 'True'
 
+# National Health ID verification (NIN/NHIA); verification is stubbed until NHID_API_URL is set
+NHID_API_URL = os.environ.get('NHID_API_URL', '')
+NHID_API_KEY = os.environ.get('NHID_API_KEY', '')
+
 # Paystack Configuration
 PAYSTACK_SECRET_KEY = os.environ.get('PAYSTACK_SECRET_KEY', '')
 PAYSTACK_PUBLIC_KEY = os.environ.get('PAYSTACK_PUBLIC_KEY', '')
 PAYSTACK_CALLBACK_URL = os.environ.get('PAYSTACK_CALLBACK_URL', 'http://localhost:3001/wallet/callback')
+# Concurrent verify calls in process_paystack_events / reconcile_paystack_payments
+PAYSTACK_VERIFY_WORKERS = int(os.environ.get('PAYSTACK_VERIFY_WORKERS', '8'))
 
 # Public SPA origin for email links, telemedicine redirects, patient portal URLs (no /api path)
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
@@ -448,6 +484,9 @@ RADIOLOGY_STORAGE = os.environ.get('RADIOLOGY_STORAGE', None)
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
 os.makedirs(LOGS_DIR, exist_ok=True)
 
+# Audit entries that could not be flushed to the database (replay with manage.py replay_audit_spool)
+AUDIT_SPOOL_DIR = os.environ.get('AUDIT_SPOOL_DIR', os.path.join(LOGS_DIR, 'audit_spool'))
+
 def _build_file_log_handler(filename: str, level: str = 'INFO') -> dict:
     """Use plain FileHandler on Windows/dev to avoid log rotation file-lock errors."""
     path = os.path.join(LOGS_DIR, filename)
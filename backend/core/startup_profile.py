@@ -0,0 +1,219 @@
+"""
+Startup-time profiling: where django.setup() and URL loading spend their time.
+
+profile_startup() boots Django in a fresh interpreter under
+`python -X importtime`, timing each AppConfig.ready() on the way, and folds
+the import trace into:
+
+- phases: wall time of django.setup() and of loading the URL conf;
+- apps: per INSTALLED_APPS entry, the import time of its own modules, the
+  time including libraries it was first to import, and its ready() time;
+- packages: import time per top-level package;
+- entry_points: the costliest imports of a package from outside it, with the
+  module that triggered them (what to defer with core.lazy_imports).
+
+framework_baseline_ms() times django.setup() with only the third-party apps
+installed, the machine's own floor to compare the project's boot against.
+
+Used by `manage.py profile_startup`.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$')
+
+# Runs in the child interpreter; prints one JSON line to stdout.
+BOOT_SCRIPT = '''
+import json, sys, time
+from django.apps import config as app_config
+
+ready_ms = {}
+_create = app_config.AppConfig.create.__func__
+
+def _timed_create(cls, entry):
+    app = _create(cls, entry)
+    ready = app.ready
+    def timed_ready():
+        started = time.perf_counter()
+        ready()
+        ready_ms[app.name] = (time.perf_counter() - started) * 1000
+    app.ready = timed_ready
+    return app
+
+app_config.AppConfig.create = classmethod(_timed_create)
+
+started = time.perf_counter()
+import django
+django.setup()
+setup_ms = (time.perf_counter() - started) * 1000
+
+urls_ms = None
+if sys.argv[1] == 'urls':
+    started = time.perf_counter()
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    urls_ms = (time.perf_counter() - started) * 1000
+
+print(json.dumps({'setup_ms': setup_ms, 'urls_ms': urls_ms, 'ready_ms': ready_ms, 'modules': sorted(sys.modules)}))
+'''
+
+
+# Runs in the child interpreter: django.setup() with the given INSTALLED_APPS only.
+BASELINE_SCRIPT = '''
+import json, sys, time
+
+started = time.perf_counter()
+import django
+from django.conf import settings
+settings.configure(INSTALLED_APPS=json.loads(sys.argv[1]), SECRET_KEY='startup-baseline')
+django.setup()
+print(json.dumps({'setup_ms': (time.perf_counter() - started) * 1000}))
+'''
+
+
+def parse_importtime(trace):
+    """
+    Rows of a -X importtime trace as dicts (name, self_us, cumulative_us, parent).
+
+    The trace lists each module after the modules it imported, indented one
+    level deeper; parent is the module whose import pulled this one in.
+    """
+    rows = []
+    for line in trace.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append({
+                'name': match.group(4),
+                'self_us': int(match.group(1)),
+                'cumulative_us': int(match.group(2)),
+                'depth': len(match.group(3)),
+                'parent': None,
+            })
+    # Walking backwards, every module comes after its parent
+    stack = []
+    for row in reversed(rows):
+        while stack and stack[-1]['depth'] >= row['depth']:
+            stack.pop()
+        row['parent'] = stack[-1]['name'] if stack else None
+        stack.append(row)
+    return rows
+
+
+def _owner(name, app_names):
+    for app_name in app_names:
+        if name == app_name or name.startswith(app_name + '.'):
+            return app_name
+    return None
+
+
+def summarize(rows, app_names, ready_ms, top=20):
+    """Fold parsed import rows into per-app, per-package and entry-point totals (milliseconds)."""
+    # Longest names first, so 'django.contrib.auth' wins over 'django'
+    app_names = sorted(app_names, key=len, reverse=True)
+    by_name = {row['name']: row for row in rows}
+
+    per_app = {name: {'own_ms': 0.0, 'inclusive_ms': 0.0, 'ready_ms': round(ready_ms.get(name, 0.0), 1)} for name in app_names}
+    packages = defaultdict(float)
+    for row in rows:
+        self_ms = row['self_us'] / 1000
+        packages[row['name'].split('.')[0]] += self_ms
+        owner = _owner(row['name'], app_names)
+        if owner:
+            per_app[owner]['own_ms'] += self_ms
+        # Inclusive: charge the module to the nearest app on its import chain
+        current = row
+        while current is not None and owner is None:
+            current = by_name.get(current['parent'])
+            if current is not None:
+                owner = _owner(current['name'], app_names)
+        if owner:
+            per_app[owner]['inclusive_ms'] += self_ms
+
+    entry_points = [
+        {
+            'module': row['name'],
+            'cumulative_ms': round(row['cumulative_us'] / 1000, 1),
+            'imported_by': row['parent'],
+        }
+        for row in rows
+        if row['parent'] and row['parent'].split('.')[0] != row['name'].split('.')[0]
+    ]
+    entry_points.sort(key=lambda entry: entry['cumulative_ms'], reverse=True)
+
+    for values in per_app.values():
+        values['own_ms'] = round(values['own_ms'], 1)
+        values['inclusive_ms'] = round(values['inclusive_ms'], 1)
+    return {
+        'apps': dict(sorted(per_app.items(), key=lambda item: item[1]['inclusive_ms'] + item[1]['ready_ms'], reverse=True)),
+        'packages': dict(sorted(((k, round(v, 1)) for k, v in packages.items()), key=lambda item: item[1], reverse=True)[:top]),
+        'entry_points': entry_points[:top],
+        'import_ms': round(sum(row['self_us'] for row in rows) / 1000, 1),
+    }
+
+
+def profile_startup(include_urls=True, top=20, python=None):
+    """Boot Django in a child interpreter and return the startup report (see module docstring)."""
+    # Directory holding the settings package, so the child can import it from anywhere
+    settings_file = Path(sys.modules[settings.SETTINGS_MODULE].__file__).resolve()
+    project_dir = str(settings_file.parents[settings.SETTINGS_MODULE.count('.')])
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+        'PYTHONPATH': os.pathsep.join(filter(None, [project_dir, os.environ.get('PYTHONPATH')])),
+    }
+    completed = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT, 'urls' if include_urls else 'setup'],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=project_dir,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Django failed to boot for profiling:\n{completed.stderr[-2000:]}")
+    boot = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    rows = parse_importtime(completed.stderr)
+    report = summarize(rows, [app.name for app in apps.get_app_configs()], boot['ready_ms'], top=top)
+    report['phases'] = {
+        'setup_ms': round(boot['setup_ms'], 1),
+        'urls_ms': round(boot['urls_ms'], 1) if boot['urls_ms'] is not None else None,
+    }
+    report['loaded_modules'] = boot['modules']
+    return report
+
+
+def framework_baseline_ms(runs=3, python=None):
+    """
+    Best-of-`runs` django.setup() time (ms) with only the third-party INSTALLED_APPS.
+
+    Booting Django, DRF and the other libraries without any project app is
+    what the project's own boot should be judged against on the same machine.
+    """
+    settings_file = Path(sys.modules[settings.SETTINGS_MODULE].__file__).resolve()
+    project_dir = settings_file.parents[settings.SETTINGS_MODULE.count('.')]
+    framework_apps = [
+        app.name for app in apps.get_app_configs()
+        if not Path(app.path).resolve().is_relative_to(project_dir)
+    ]
+    timings = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [python or sys.executable, '-c', BASELINE_SCRIPT, json.dumps(framework_apps)],
+            capture_output=True,
+            text=True,
+            env={key: value for key, value in os.environ.items() if key != 'DJANGO_SETTINGS_MODULE'},
+            check=False,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Django failed to boot for the baseline:\n{completed.stderr[-2000:]}")
+        timings.append(json.loads(completed.stdout.strip().splitlines()[-1])['setup_ms'])
+    return round(min(timings), 1)
@@ -0,0 +1,318 @@
+"""
+Column-wise validation and bulk upsert for tabular (CSV/Excel/JSON) imports.
+
+Importers load the file into a TabularFrame, validate whole columns at once
+(each row keeps its first error), and pass the surviving rows to BulkUpsert.
+BulkUpsert prefetches the matching rows with a few IN queries and writes with
+bulk_create/bulk_update in batches. A dry run skips the writes and returns a
+diff of what would change.
+
+Usage:
+    frame = TabularFrame(rows, FIELD_MAPPINGS)
+    code = frame.text('service_code')
+    frame.reject(code == '', "Missing 'service_code'")
+    ...
+    upsert = BulkUpsert(ServiceCatalog, key='service_code', fields=SERVICE_FIELDS)
+    stats = upsert.run(frame.records({'service_code': code, ...}), update_existing=True)
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from core.lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
+
+TRUE_VALUES = {'true', '1', 'yes', 'y', 't'}
+FALSE_VALUES = {'false', '0', 'no', 'n', 'f'}
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _report_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'pk'):
+        return value.pk
+    return value
+
+
+class TabularFrame:
+    """
+    Imported rows as a DataFrame with canonical column names and per-row errors.
+
+    field_mappings maps each canonical field to its accepted header aliases;
+    unknown columns are dropped and missing ones read as empty.
+    """
+
+    def __init__(self, data, field_mappings, first_row=1):
+        df = data.copy() if isinstance(data, pd.DataFrame) else pd.DataFrame.from_records(list(data))
+        aliases = {}
+        for field, names in field_mappings.items():
+            aliases.setdefault(field, field)
+            for name in names:
+                aliases.setdefault(name, field)
+        renamed = {}
+        for column in df.columns:
+            field = aliases.get(str(column).strip().lower())
+            if field and field not in renamed.values():
+                renamed[column] = field
+        self.df = df[list(renamed)].rename(columns=renamed).reset_index(drop=True)
+        self.row_numbers = pd.Series(range(first_row, first_row + len(self.df)), index=self.df.index)
+        self._errors = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def has_column(self, field):
+        return field in self.df.columns
+
+    def text(self, field, upper=False, default=''):
+        """Column as stripped strings ('' for missing cells)."""
+        if field not in self.df.columns:
+            return pd.Series(default, index=self.df.index, dtype=object)
+        column = self.df[field]
+        values = column.where(column.notna(), '').astype(str).str.strip()
+        if upper:
+            values = values.str.upper()
+        return values.mask(values == '', default) if default else values
+
+    def decimal(self, field, thousands_separator=True):
+        """
+        Column parsed as Decimal.
+
+        Returns (values, invalid): values is None where the cell is empty or
+        invalid, invalid marks non-empty cells that are not numbers.
+        """
+        raw = self.text(field)
+        cleaned = raw.str.replace(',', '', regex=False) if thousands_separator else raw
+        numeric = pd.to_numeric(cleaned, errors='coerce')
+        numeric = numeric.mask(numeric.abs() == float('inf'))
+        invalid = numeric.isna() & (raw != '')
+        values = pd.Series([None] * len(self.df), index=self.df.index, dtype=object)
+        valid = numeric.notna()
+        values[valid] = cleaned[valid].map(Decimal)
+        return values, invalid
+
+    def boolean(self, field, default=None):
+        """Column parsed as booleans (default for empty or unrecognised cells)."""
+        lowered = self.text(field).str.lower()
+        values = pd.Series([default] * len(self.df), index=self.df.index, dtype=object)
+        values[lowered.isin(TRUE_VALUES)] = True
+        values[lowered.isin(FALSE_VALUES)] = False
+        return values
+
+    def reject(self, mask, message):
+        """
+        Mark rows where mask is True as invalid (a row keeps its first error).
+
+        message is a string or a Series of per-row messages.
+        """
+        for index in mask[mask].index:
+            if index not in self._errors:
+                self._errors[index] = message if isinstance(message, str) else message[index]
+
+    @property
+    def valid(self):
+        return ~self.df.index.isin(list(self._errors))
+
+    @property
+    def error_count(self):
+        return len(self._errors)
+
+    def errors(self):
+        """Error messages in row order ("Row N: ...")."""
+        return [f"Row {self.row_numbers[index]}: {self._errors[index]}" for index in sorted(self._errors)]
+
+    def records(self, columns, where=None):
+        """
+        (row_number, values) for every valid row (optionally only where a mask is True).
+
+        columns maps model field names to Series (or scalars) built from this frame.
+        """
+        selected = self.valid if where is None else self.valid & where.to_numpy(dtype=bool)
+        table = pd.DataFrame(dict(columns), index=self.df.index)[selected]
+        table = table.astype(object).where(table.notna(), None)
+        numbers = self.row_numbers[selected].tolist()
+        return list(zip(numbers, table.to_dict('records')))
+
+
+class BulkUpsert:
+    """
+    Create or update model rows from import records, matched on a key field.
+
+    Rows whose key (or another unique field) repeats an earlier row in the same
+    file are skipped, as are rows that would take a unique value already used
+    by a different row. Every instance passes model.full_clean() before writing,
+    so field limits (max_length, max_digits, choices) are per-row errors rather
+    than a failed bulk write. Unique fields are checked in bulk, against the
+    file and the table, instead.
+    """
+
+    def __init__(self, model, key, fields, unique_fields=None, batch_size=1000, diff_limit=200):
+        self.model = model
+        self.key = key
+        self.fields = list(fields)
+        self.unique_fields = list(unique_fields or [key])
+        self.batch_size = batch_size
+        self.diff_limit = diff_limit
+        self.auto_now_fields = [
+            f.name for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)
+        ]
+        # row_number -> saved (or, in a dry run, unsaved) instance for every row matched or created
+        self.instances = {}
+        self.created = []
+        self.updated = []
+
+    def normalize_key(self, value):
+        """Form of the key used for matching (override for case-insensitive keys)."""
+        return value
+
+    def validate(self, instance):
+        """Row validation; unique fields were already checked against the file and the table."""
+        instance.full_clean(exclude=self.unique_fields, validate_unique=False)
+
+    def fetch_existing(self, keys):
+        """Existing rows by normalized key, fetched in IN-query batches."""
+        existing = {}
+        for chunk in _chunks(list(keys), self.batch_size):
+            for instance in self.model.objects.filter(**{f'{self.key}__in': chunk}):
+                existing[self.normalize_key(getattr(instance, self.key))] = instance
+        return existing
+
+    def match(self, records):
+        """Existing instance (or None) for each record."""
+        keys = {self.normalize_key(values[self.key]) for _, values in records}
+        existing = self.fetch_existing(keys)
+        return [existing.get(self.normalize_key(values[self.key])) for _, values in records]
+
+    def _taken_values(self, records):
+        """Existing pk for every unique value used in the file."""
+        taken = {}
+        for field in self.unique_fields:
+            values = {values[field] for _, values in records if values.get(field) not in (None, '')}
+            taken[field] = {}
+            for chunk in _chunks(list(values), self.batch_size):
+                rows = self.model.objects.filter(**{f'{field}__in': chunk}).values_list(field, 'pk')
+                taken[field].update(rows)
+        return taken
+
+    def run(self, records, update_existing=False, dry_run=False):
+        """
+        Upsert (row_number, values) records.
+
+        Returns stats: created, updated, unchanged, skipped, errors and, for
+        dry runs, diff ({'create': [...], 'update': [...]}).
+        """
+        stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': []}
+        diff = {'create': [], 'update': []}
+        matches = self.match(records)
+        taken = self._taken_values(records)
+        seen = {field: {} for field in self.unique_fields}
+        # Changed field set -> instances, so each UPDATE only sets what changed
+        update_groups = {}
+        now = timezone.now()
+
+        for (row_number, values), instance in zip(records, matches):
+            duplicate = None
+            for field in self.unique_fields:
+                value = values.get(field)
+                if value in (None, ''):
+                    continue
+                seen_key = self.normalize_key(value) if field == self.key else value
+                if seen_key in seen[field]:
+                    duplicate = f"Duplicate {field} '{value}' (also in row {seen[field][seen_key]})"
+                    break
+                owner = taken[field].get(value)
+                if owner is not None and (instance is None or owner != instance.pk):
+                    duplicate = f"{field} '{value}' is already used by another record"
+                    break
+            if duplicate:
+                stats['errors'].append(f"Row {row_number}: {duplicate}")
+                stats['skipped'] += 1
+                continue
+            for field in self.unique_fields:
+                value = values.get(field)
+                if value not in (None, ''):
+                    seen[field][self.normalize_key(value) if field == self.key else value] = row_number
+
+            if instance is None:
+                instance = self.model(**values)
+                try:
+                    self.validate(instance)
+                except ValidationError as e:
+                    stats['errors'].append(f"Row {row_number}: Validation error: {e}")
+                    stats['skipped'] += 1
+                    continue
+                self.created.append(instance)
+                self.instances[row_number] = instance
+                if len(diff['create']) < self.diff_limit:
+                    diff['create'].append({'row': row_number, self.key: values[self.key]})
+                continue
+
+            if not update_existing:
+                stats['skipped'] += 1
+                continue
+
+            changes = {}
+            for field in self.fields:
+                if field not in values:
+                    continue
+                old = getattr(instance, field)
+                if old != values[field]:
+                    changes[field] = [_report_value(old), _report_value(values[field])]
+                    setattr(instance, field, values[field])
+            self.instances[row_number] = instance
+            if not changes:
+                stats['unchanged'] += 1
+                continue
+            try:
+                self.validate(instance)
+            except ValidationError as e:
+                stats['errors'].append(f"Row {row_number}: Validation error: {e}")
+                stats['skipped'] += 1
+                self.instances.pop(row_number)
+                continue
+            for field in self.auto_now_fields:
+                setattr(instance, field, now)
+            self.updated.append(instance)
+            update_groups.setdefault(tuple(changes) + tuple(self.auto_now_fields), []).append(instance)
+            if len(diff['update']) < self.diff_limit:
+                diff['update'].append({'row': row_number, self.key: values[self.key], 'changes': changes})
+
+        if not dry_run:
+            self.model.objects.bulk_create(self.created, batch_size=self.batch_size)
+            for fields, instances in update_groups.items():
+                # INSERT ... ON CONFLICT (pk) DO UPDATE is far cheaper than bulk_update's CASE WHEN
+                self.model.objects.bulk_create(
+                    instances,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=[self.model._meta.pk.name],
+                    update_fields=list(fields),
+                )
+        else:
+            stats['diff'] = diff
+        stats['created'] = len(self.created)
+        stats['updated'] = len(self.updated)
+        return stats
+
+
+class CaseInsensitiveBulkUpsert(BulkUpsert):
+    """BulkUpsert matching the key case-insensitively (like key__iexact)."""
+
+    def normalize_key(self, value):
+        return value.lower() if isinstance(value, str) else value
+
+    def fetch_existing(self, keys):
+        existing = {}
+        for chunk in _chunks(list(keys), self.batch_size):
+            queryset = self.model.objects.annotate(_import_key=Lower(self.key)).filter(_import_key__in=chunk)
+            for instance in queryset:
+                existing[self.normalize_key(getattr(instance, self.key))] = instance
+        return existing
@@ -92,6 +92,8 @@ urlpatterns = [
         path('payments/', include('apps.billing.paystack_payment_urls')),
         # Explainable Lock System
         path('locks/', include('apps.core.lock_urls')),
+        # Offline sync (batched queued actions + delta since cursor)
+        path('offline/', include('apps.offline.urls')),
         # IVF Treatment Module (specialized, role-restricted)
         path('ivf/', include('apps.ivf.urls')),
         # Antenatal Clinic Management
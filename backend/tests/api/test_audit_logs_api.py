@@ -0,0 +1,111 @@
+"""
+API tests for the audit log listing (keyset pagination) and streaming export.
+"""
+import json
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.audit import AuditLog
+
+
+@pytest.fixture
+def admin_user():
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    user = User(username='auditadmin', email='auditadmin@test.com', role='ADMIN')
+    user.set_password('testpass123')
+    user.save()
+    return user
+
+
+@pytest.fixture
+def admin_client(admin_user):
+    client = APIClient()
+    client.force_authenticate(user=admin_user)
+    return client
+
+
+@pytest.fixture
+def audit_entries(admin_user):
+    now = timezone.now()
+    entries = []
+    for i in range(25):
+        entries.append(AuditLog(
+            user=admin_user,
+            user_role='ADMIN',
+            action='consultation.create' if i % 2 else 'lab_order.create',
+            visit_id=i,
+            resource_type='test',
+            # Pairs share a timestamp so the id tie-breaker is exercised
+            timestamp=now - timedelta(minutes=i // 2),
+        ))
+    return AuditLog.objects.bulk_create(entries)
+
+
+@pytest.mark.django_db
+class TestAuditLogKeysetPagination:
+
+    def test_cursor_walk_returns_every_row_once_in_order(self, admin_client, audit_entries):
+        seen = []
+        url = '/api/v1/audit-logs/?resource_type=test&page_size=4'
+        while url:
+            response = admin_client.get(url)
+            assert response.status_code == 200
+            assert 'count' not in response.data
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        expected = list(
+            AuditLog.objects.filter(resource_type='test')
+            .order_by('-timestamp', '-id').values_list('id', flat=True)
+        )
+        assert seen == expected
+
+    def test_invalid_cursor_is_404(self, admin_client, audit_entries):
+        response = admin_client.get('/api/v1/audit-logs/?cursor=not-a-cursor')
+        assert response.status_code == 404
+
+    def test_page_parameter_keeps_page_number_pagination(self, admin_client, audit_entries):
+        response = admin_client.get('/api/v1/audit-logs/?resource_type=test&page=1')
+        assert response.status_code == 200
+        assert response.data['count'] == 25
+
+    def test_action_exact_and_prefix_filters(self, admin_client, audit_entries):
+        exact = admin_client.get('/api/v1/audit-logs/?resource_type=test&action=consultation.create&page_size=100')
+        assert len(exact.data['results']) == 12
+
+        prefix = admin_client.get('/api/v1/audit-logs/?resource_type=test&action_prefix=lab_&page_size=100')
+        assert len(prefix.data['results']) == 13
+
+        partial = admin_client.get('/api/v1/audit-logs/?resource_type=test&action=consultation&page_size=100')
+        assert partial.data['results'] == []
+
+
+@pytest.mark.django_db
+class TestAuditLogExport:
+
+    def test_csv_export_streams_all_rows(self, admin_client, audit_entries):
+        response = admin_client.get('/api/v1/audit-logs/export/?resource_type=test')
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'text/csv'
+        lines = b''.join(response.streaming_content).decode().strip().splitlines()
+        assert lines[0].startswith('id,timestamp,user,')
+        assert len(lines) == 26
+
+    def test_ndjson_export(self, admin_client, audit_entries):
+        response = admin_client.get('/api/v1/audit-logs/export/?resource_type=test&output=ndjson&action=lab_order.create')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert len(rows) == 13
+        assert {row['action'] for row in rows} == {'lab_order.create'}
+        # Oldest first
+        assert rows[0]['timestamp'] <= rows[-1]['timestamp']
+
+    def test_export_requires_admin(self, doctor_token, audit_entries):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {doctor_token}')
+        response = client.get('/api/v1/audit-logs/export/')
+        assert response.status_code == 403
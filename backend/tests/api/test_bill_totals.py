@@ -0,0 +1,152 @@
+"""
+Tests for incrementally maintained Bill totals (deltas, bulk add_items, drift verification).
+"""
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.billing.bill_models import Bill, BillItem
+from apps.billing.bill_totals_service import BillTotalsService
+from apps.billing.models import VisitCharge
+from core.audit import AuditLog
+
+
+@pytest.fixture
+def bill(open_visit_with_payment):
+    return Bill.objects.create(visit=open_visit_with_payment)
+
+
+ORDER = [
+    {'department': 'LAB', 'service_name': 'Full Blood Count', 'amount': Decimal('3500.00')},
+    {'department': 'LAB', 'service_name': 'Malaria Parasite', 'amount': Decimal('1500.00')},
+    {'department': 'RADIOLOGY', 'service_name': 'Chest X-Ray', 'amount': Decimal('8000.00')},
+    {'department': 'PHARMACY', 'service_name': 'Paracetamol', 'amount': Decimal('500.00')},
+]
+
+
+@pytest.mark.django_db
+class TestIncrementalTotals:
+
+    def test_add_items_writes_in_bulk_without_re_summing(self, bill, receptionist_user):
+        VisitCharge.objects.create(visit=bill.visit, category='LAB', description='Full Blood Count',
+                                   amount=Decimal('3500.00'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            items = bill.add_items(ORDER, created_by=receptionist_user)
+
+        assert [item.service_name for item in items] == [entry['service_name'] for entry in ORDER]
+        assert all(item.pk for item in items)
+        sql = [q['sql'] for q in ctx.captured_queries]
+        assert len([q for q in sql if q.startswith('INSERT') and '"bill_items"' in q]) == 1
+        assert not [q for q in sql if 'SUM(' in q and ('"bill_items"' in q or '"bill_payments"' in q)]
+
+        bill.refresh_from_db()
+        assert (bill.total_amount, bill.outstanding_balance, bill.status) == (
+            Decimal('13500.00'), Decimal('13500.00'), 'UNPAID')
+        # The pre-existing identical charge is not duplicated
+        assert sorted(VisitCharge.objects.filter(visit=bill.visit).values_list('description', flat=True)) == [
+            'Chest X-Ray', 'Full Blood Count', 'Malaria Parasite', 'Paracetamol',
+        ]
+        assert VisitCharge.objects.get(description='Paracetamol').category == 'DRUG'
+
+    def test_each_item_is_audited(self, bill, receptionist_user):
+        items = bill.add_items(ORDER, created_by=receptionist_user)
+        bill.add_item('LAB', 'Urinalysis', Decimal('1200.00'), created_by=receptionist_user)
+
+        entries = AuditLog.objects.filter(action='BILL_ITEM_CREATED')
+        assert sorted(entries.values_list('resource_id', flat=True)) == sorted(
+            BillItem.objects.values_list('pk', flat=True))
+        entry = entries.get(resource_id=items[0].pk)
+        assert (entry.user_id, entry.visit_id, entry.resource_type) == (
+            receptionist_user.pk, bill.visit_id, 'bill_item')
+        assert entry.metadata['service_name'] == 'Full Blood Count'
+
+    def test_items_and_payments_move_totals_and_status(self, bill, receptionist_user):
+        bill.add_item('CONSULTATION', 'Consultation', Decimal('5000.00'), created_by=receptionist_user)
+        bill.add_payment(Decimal('2000.00'), 'CASH', processed_by=receptionist_user)
+        assert (bill.amount_paid, bill.outstanding_balance, bill.status) == (
+            Decimal('2000.00'), Decimal('3000.00'), 'PARTIALLY_PAID')
+
+        bill.add_payment(Decimal('3000.00'), 'POS', processed_by=receptionist_user)
+        assert (bill.outstanding_balance, bill.status) == (Decimal('0.00'), 'PAID')
+
+        # A later item reopens the balance
+        item = bill.add_item('LAB', 'Urinalysis', Decimal('1200.00'), created_by=receptionist_user)
+        assert (bill.total_amount, bill.status) == (Decimal('6200.00'), 'PARTIALLY_PAID')
+
+        item.amount = Decimal('1000.00')
+        item.save()
+        bill.refresh_from_db()
+        assert (bill.total_amount, bill.outstanding_balance) == (Decimal('6000.00'), Decimal('1000.00'))
+        assert BillTotalsService.find_drift() == []
+
+    def test_invalid_item_adds_nothing(self, bill):
+        with pytest.raises(ValidationError):
+            bill.add_items(ORDER[:1] + [{'department': 'LAB', 'service_name': 'Free', 'amount': Decimal('0')}])
+
+        assert not BillItem.objects.exists()
+        bill.refresh_from_db()
+        assert bill.total_amount == Decimal('0.00')
+
+
+@pytest.mark.django_db
+class TestTotalsDrift:
+
+    def test_drift_is_reported_and_repaired(self, bill, receptionist_user):
+        bill.add_items(ORDER, created_by=receptionist_user)
+        bill.add_payment(Decimal('500.00'), 'CASH', processed_by=receptionist_user)
+        other = Bill.objects.create(visit=bill.visit.__class__.objects.create(
+            patient=bill.visit.patient, status='OPEN', payment_status='PAID'))
+        assert BillTotalsService.find_drift() == []
+
+        # Written behind the model's back
+        BillItem.objects.filter(service_name='Paracetamol').update(amount=Decimal('700.00'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            drift = BillTotalsService.find_drift()
+        assert len(ctx.captured_queries) == 1
+        assert drift == [{'bill_id': bill.pk, 'fields': {
+            'total_amount': {'stored': Decimal('13500.00'), 'expected': Decimal('13700.00')},
+            'outstanding_balance': {'stored': Decimal('13000.00'), 'expected': Decimal('13200.00')},
+        }}]
+
+        out = StringIO()
+        call_command('verify_bill_totals', stdout=out)
+        assert 'Run with --fix' in out.getvalue()
+        call_command('verify_bill_totals', fix=True, stdout=out)
+        assert 'Repaired 1 bill(s)' in out.getvalue()
+
+        bill.refresh_from_db()
+        assert (bill.total_amount, bill.outstanding_balance) == (Decimal('13700.00'), Decimal('13200.00'))
+        assert BillTotalsService.find_drift() == []
+        assert BillTotalsService.find_drift([other.pk]) == []
+
+    def test_visit_payment_endpoint_leaves_no_drift(self, bill, receptionist_user, receptionist_token):
+        bill.add_item('CONSULTATION', 'Consultation', Decimal('5000.00'), created_by=receptionist_user)
+        bill.add_payment(Decimal('1000.00'), 'CASH', processed_by=receptionist_user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {receptionist_token}")
+
+        response = client.post(f'/api/v1/visits/{bill.visit_id}/billing/payments/',
+                               {'amount': '2000.00', 'payment_method': 'CASH'}, format='json')
+        assert response.status_code == 201, response.data
+
+        bill.refresh_from_db()
+        assert (bill.total_amount, bill.amount_paid) == (Decimal('5000.00'), Decimal('1000.00'))
+
+        # A visit billed only through visit charges gets an empty Bill
+        visit = bill.visit.__class__.objects.create(patient=bill.visit.patient, status='OPEN',
+                                                    payment_status='UNPAID')
+        VisitCharge.objects.create(visit=visit, category='CONSULTATION', description='Consultation',
+                                   amount=Decimal('5000.00'))
+        response = client.post(f'/api/v1/visits/{visit.pk}/billing/payments/',
+                               {'amount': '2000.00', 'payment_method': 'CASH'}, format='json')
+        assert response.status_code == 201, response.data
+        assert Bill.objects.get(visit=visit).total_amount == Decimal('0.00')
+        assert BillTotalsService.find_drift() == []
@@ -0,0 +1,238 @@
+"""
+Tests for the batched offline sync protocol (/api/v1/offline/sync/).
+"""
+import gzip
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.clinical.models import ClinicalAlert, VitalSigns
+from apps.consultations.models import Consultation
+from apps.nursing.models import MedicationAdministration, NursingNote
+from apps.offline.models import OfflineDraft, SyncLog, SyncQueue
+
+SYNC_URL = '/api/v1/offline/sync/'
+
+
+@pytest.fixture
+def nurse_user():
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    user = User(username='sync_nurse', email='sync_nurse@test.com', role='NURSE')
+    user.set_password('testpass123')
+    user.save()
+    return user
+
+
+@pytest.fixture
+def prescription(consultation, doctor_user):
+    from apps.pharmacy.models import Prescription
+    return Prescription.objects.create(
+        visit=consultation.visit,
+        consultation=consultation,
+        drug='Amoxicillin',
+        dosage='500mg',
+        prescribed_by=doctor_user,
+        status='PENDING',
+    )
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def vitals(key, visit, **data):
+    return {
+        'idempotency_key': key,
+        'action_type': 'RECORD_VITALS',
+        'visit_id': visit.pk,
+        'data': {'temperature': '37.0', 'pulse': 80, **data},
+    }
+
+
+def nursing_note(key, visit, content='Resting comfortably'):
+    return {
+        'idempotency_key': key,
+        'action_type': 'CREATE_NURSING_NOTE',
+        'visit_id': visit.pk,
+        'data': {'note_type': 'GENERAL', 'note_content': content},
+    }
+
+
+@pytest.mark.django_db
+class TestSyncActions:
+
+    def test_applies_batch_and_replays_idempotently(self, nurse_user, open_visit_with_payment, prescription):
+        visit = open_visit_with_payment
+        body = {
+            'device_id': 'ward-3-tablet',
+            'actions': [
+                vitals('v-1', visit, temperature='39.5'),
+                nursing_note('n-1', visit),
+                {
+                    'idempotency_key': 'm-1',
+                    'action_type': 'ADMINISTER_MEDICATION',
+                    'visit_id': visit.pk,
+                    'data': {'prescription': prescription.pk, 'dose_administered': '500mg', 'route': 'ORAL'},
+                },
+            ],
+        }
+        client = client_for(nurse_user)
+
+        response = client.post(SYNC_URL, body, format='json')
+
+        assert response.status_code == 200, response.data
+        results = response.data['results']
+        assert [r['status'] for r in results] == ['applied'] * 3
+        assert [r['resource_type'] for r in results] == ['vital_signs', 'nursing_note', 'medication_administration']
+        assert VitalSigns.objects.filter(visit=visit).count() == 1
+        assert ClinicalAlert.objects.filter(visit=visit, related_resource_type='vital_signs').exists()
+        assert SyncQueue.objects.filter(created_by=nurse_user, status='SYNCED').count() == 3
+        assert SyncLog.objects.filter(user=nurse_user, device_id='ward-3-tablet').exists()
+
+        # The tablet lost the response and sends the same queue again
+        again = client.post(SYNC_URL, body, format='json')
+        assert [r['status'] for r in again.data['results']] == ['duplicate'] * 3
+        assert [r['resource_id'] for r in again.data['results']] == [r['resource_id'] for r in results]
+        assert VitalSigns.objects.filter(visit=visit).count() == 1
+        assert NursingNote.objects.filter(visit=visit).count() == 1
+        assert MedicationAdministration.objects.filter(visit=visit).count() == 1
+
+    def test_rejected_action_does_not_sink_its_visit_and_can_be_retried(self, nurse_user, open_visit_with_payment):
+        visit = open_visit_with_payment
+        client = client_for(nurse_user)
+        body = {'actions': [
+            vitals('v-1', visit, systolic_bp=80, diastolic_bp=120),
+            nursing_note('n-1', visit),
+            {'idempotency_key': 'x-1', 'action_type': 'TELEPORT', 'visit_id': visit.pk, 'data': {}},
+            vitals('v-2', visit=type('Missing', (), {'pk': 999999})),
+        ]}
+
+        results = client.post(SYNC_URL, body, format='json').data['results']
+
+        assert [(r['status'], r.get('reason')) for r in results] == [
+            ('rejected', 'invalid'),
+            ('applied', None),
+            ('rejected', 'unknown_action_type'),
+            ('rejected', 'visit_not_found'),
+        ]
+        assert NursingNote.objects.filter(visit=visit).count() == 1
+        failed = SyncQueue.objects.get(created_by=nurse_user, idempotency_key='v-1')
+        assert failed.status == 'FAILED'
+
+        # The corrected action is re-sent under the same key
+        retry = client.post(SYNC_URL, {'actions': [vitals('v-1', visit, systolic_bp=120, diastolic_bp=80)]}, format='json')
+        assert retry.data['results'][0]['status'] == 'applied'
+        failed.refresh_from_db()
+        assert (failed.status, failed.retry_count) == ('SYNCED', 1)
+
+    def test_closed_visit_and_wrong_role_are_reported(self, nurse_user, doctor_user, closed_visit_with_payment,
+                                                      open_visit_with_payment):
+        client = client_for(nurse_user)
+        body = {'actions': [
+            vitals('v-closed', closed_visit_with_payment),
+            {
+                'idempotency_key': 'c-1', 'action_type': 'SAVE_CONSULTATION_DRAFT',
+                'visit_id': open_visit_with_payment.pk, 'data': {'history': 'Cough'},
+            },
+        ]}
+
+        results = client.post(SYNC_URL, body, format='json').data['results']
+
+        assert [(r['status'], r['reason']) for r in results] == [('conflict', 'visit_closed'), ('rejected', 'forbidden')]
+        assert not VitalSigns.objects.exists()
+        assert not Consultation.objects.filter(visit=open_visit_with_payment).exists()
+
+    def test_consultation_draft_conflict_keeps_the_draft(self, doctor_user, consultation):
+        visit = consultation.visit
+        client = client_for(doctor_user)
+        draft = {
+            'idempotency_key': 'c-1', 'action_type': 'SAVE_CONSULTATION_DRAFT', 'visit_id': visit.pk,
+            'base_updated_at': consultation.updated_at.isoformat(),
+            'data': {'examination': 'Chest clear'},
+        }
+
+        applied = client.post(SYNC_URL, {'actions': [draft]}, format='json').data['results'][0]
+        assert applied['status'] == 'applied'
+        consultation.refresh_from_db()
+        assert consultation.examination == 'Chest clear'
+
+        # A second offline edit based on the old version now conflicts
+        stale = {**draft, 'idempotency_key': 'c-2', 'data': {'examination': 'Wheeze'}}
+        conflict = client.post(SYNC_URL, {'actions': [stale]}, format='json').data['results'][0]
+
+        assert (conflict['status'], conflict['reason']) == ('conflict', 'consultation_modified')
+        assert conflict['server']['examination'] == 'Chest clear'
+        parked = OfflineDraft.objects.get(pk=conflict['draft_id'])
+        assert (parked.resource_type, parked.draft_data, parked.synced) == ('CONSULTATION', {'examination': 'Wheeze'}, False)
+        consultation.refresh_from_db()
+        assert consultation.examination == 'Chest clear'
+
+
+@pytest.mark.django_db
+class TestSyncDelta:
+
+    def test_first_sync_returns_everything_then_only_changes(self, nurse_user, doctor_user, open_visit_with_payment):
+        visit = open_visit_with_payment
+        VitalSigns.objects.create(visit=visit, recorded_by=doctor_user, pulse=72)
+        client = client_for(nurse_user)
+
+        first = client.post(SYNC_URL, {'visit_ids': [visit.pk]}, format='json')
+
+        assert first.status_code == 200
+        assert [row['pulse'] for row in first.data['changes']['vital_signs']] == [72]
+        assert first.data['changes']['visits'][0]['status'] == 'OPEN'
+
+        # A later cursor (past the overlap window) skips what the client already has
+        cursor = '2999-01-01T00:00:00+00:00'
+        later = client.post(SYNC_URL, {'visit_ids': [visit.pk], 'cursor': cursor}, format='json')
+        assert later.data['changes']['vital_signs'] == []
+        assert later.data['cursor'] < cursor
+
+        assert client.post(SYNC_URL, {'cursor': 'yesterday'}, format='json').status_code == 400
+
+    def test_one_request_costs_queries_per_visit_not_per_round_trip(self, nurse_user, open_visit_with_payment):
+        client = client_for(nurse_user)
+        body = {'actions': [nursing_note(f'n-{i}', open_visit_with_payment, f'Round {i}') for i in range(20)]}
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(SYNC_URL, body, format='json')
+
+        assert [r['status'] for r in response.data['results']] == ['applied'] * 20
+        # Per note: savepoint pair, full_clean FK checks and the insert; the queue is one bulk insert
+        assert len(ctx.captured_queries) < 20 * 6
+
+
+@pytest.mark.django_db
+class TestSyncTransport:
+
+    def test_gzip_request_and_response(self, nurse_user, open_visit_with_payment):
+        client = client_for(nurse_user)
+        body = gzip.compress(json.dumps({'actions': [nursing_note('n-1', open_visit_with_payment)]}).encode())
+
+        response = client.post(
+            SYNC_URL, body, content_type='application/json',
+            HTTP_CONTENT_ENCODING='gzip', HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        assert response.status_code == 200
+        assert response['Content-Encoding'] == 'gzip'
+        payload = json.loads(gzip.decompress(response.content))
+        assert payload['results'][0]['status'] == 'applied'
+
+        broken = client.post(SYNC_URL, b'not gzip', content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+        assert broken.status_code == 400
+
+    def test_rejects_malformed_batches_and_other_roles(self, nurse_user, receptionist_user, open_visit_with_payment):
+        client = client_for(nurse_user)
+        missing_key = {'actions': [{'action_type': 'RECORD_VITALS', 'visit_id': open_visit_with_payment.pk}]}
+        duplicate = {'actions': [vitals('same', open_visit_with_payment), vitals('same', open_visit_with_payment)]}
+
+        assert client.post(SYNC_URL, missing_key, format='json').status_code == 400
+        assert client.post(SYNC_URL, duplicate, format='json').status_code == 400
+        assert client_for(receptionist_user).post(SYNC_URL, {'actions': []}, format='json').status_code == 403
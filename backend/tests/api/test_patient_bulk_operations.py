@@ -0,0 +1,161 @@
+"""
+API tests for chunked patient import and streaming patient export.
+"""
+import csv
+import io
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.patients import bulk_operations
+from apps.patients.bulk_operations import import_patients_from_csv, iter_patients_csv
+from apps.patients.models import Patient
+from apps.wallet.models import Wallet
+from core.audit import AuditLog
+
+BULK_URL = '/api/v1/patients/bulk/'
+HEADER = 'first_name,last_name,middle_name,date_of_birth,gender,phone,email,address,national_id\n'
+
+
+def patient_csv(count, start=0):
+    lines = [
+        f'First{i},Last{i},,1990-01-{i % 28 + 1:02d},female,080{i:08d},p{i}@example.com,,NIN{i:07d}\n'
+        for i in range(start, start + count)
+    ]
+    return HEADER + ''.join(lines)
+
+
+@pytest.fixture
+def receptionist_client(receptionist_user):
+    client = APIClient()
+    client.force_authenticate(user=receptionist_user)
+    return client
+
+
+@pytest.mark.django_db
+class TestPatientBulkImport:
+
+    def test_import_creates_patients_wallets_and_audit_entries(self, receptionist_user):
+        Patient.objects.create(first_name='Old', last_name='Record', patient_id='LMC000041')
+        progress = []
+
+        result = import_patients_from_csv(
+            patient_csv(5), receptionist_user, chunk_size=2, progress_callback=lambda r: progress.append(r['total']),
+        )
+
+        assert (result['imported'], result['failed'], result['total']) == (5, 0, 5)
+        assert progress == [2, 4, 5]
+        ids = list(Patient.objects.filter(first_name__startswith='First').order_by('pk').values_list('patient_id', flat=True))
+        assert ids == ['LMC000042', 'LMC000043', 'LMC000044', 'LMC000045', 'LMC000046']
+        assert Wallet.objects.filter(patient__first_name__startswith='First').count() == 5
+        assert AuditLog.objects.filter(action='PATIENT_BULK_IMPORT').count() == 5
+        assert Patient.objects.get(national_id='NIN0000001').gender == 'FEMALE'
+
+    def test_duplicates_follow_check_patient_duplicate_rules(self, receptionist_user):
+        Patient.objects.create(
+            first_name='Ada', last_name='Obi', patient_id='LMC000001', phone='08011111111', national_id='NIN-A',
+        )
+        Patient.objects.create(
+            first_name='Archived', last_name='Person', patient_id='LMC000002', national_id='NIN-X', is_active=False,
+        )
+        csv_content = HEADER + ''.join([
+            'Bola,Ade,,,,08011111111,,,\n',             # phone of an active patient
+            'ada,OBI,,,,,,,NIN-A\n',                     # national ID of an active patient
+            'Chi,Eze,,1985-05-05,,,chi@example.com,,\n',
+            'Dayo,Ola,,,,,CHI@example.com,,\n',          # same email as row 4 (lowercased)
+            'CHI,eze,,1985-05-05,,,,,\n',                # same name and DOB as row 4
+            'Efe,Uche,,,,,,,NIN-X\n',                    # national ID held by an archived patient
+            ',Nameless,,,,,,,\n',
+            'Fola,Bad,,not-a-date,,,,,\n',
+        ])
+
+        result = import_patients_from_csv(csv_content, receptionist_user)
+
+        assert result['imported'] == 1
+        errors = {error['row']: error['error'] for error in result['errors']}
+        assert errors[2] == 'A patient with phone number 08011111111 already exists: Ada Obi (ID: LMC000001)'
+        assert errors[3] == 'A patient with National ID NIN-A already exists: Ada Obi (ID: LMC000001)'
+        assert errors[5] == 'A patient with email chi@example.com already exists: row 4 of this import'
+        assert errors[6].startswith('A patient with name CHI EZE and date of birth 1985-05-05 already exists: row 4')
+        assert errors[7] == 'National ID NIN-X belongs to archived patient LMC000002'
+        assert errors[8] == 'first_name and last_name are required'
+        assert errors[9].startswith('date_of_birth:')
+
+    def test_benchmark_query_count_is_per_chunk(self, receptionist_user):
+        rows = 2000
+        with CaptureQueriesContext(connection) as ctx:
+            result = import_patients_from_csv(patient_csv(rows), receptionist_user, chunk_size=500)
+
+        assert result['imported'] == rows
+        assert Wallet.objects.count() == rows
+        # Lookups and inserts per chunk, not per row (SQLite caps rows per INSERT)
+        assert len(ctx.captured_queries) < rows // 10
+
+    def test_chunk_is_renumbered_after_concurrent_registration(self, receptionist_user, monkeypatch):
+        next_number = bulk_operations._next_patient_number
+        stale = iter([1])
+        # The first chunk write sees the registry before a registration took LMC000001
+        monkeypatch.setattr(bulk_operations, '_next_patient_number', lambda: next(stale, None) or next_number())
+        Patient.objects.create(patient_id='LMC000001', first_name='Walk', last_name='In', gender='FEMALE')
+
+        result = import_patients_from_csv(patient_csv(3), receptionist_user)
+
+        assert (result['imported'], result['failed']) == (3, 0)
+        assert sorted(Patient.objects.values_list('patient_id', flat=True)) == [
+            'LMC000001', 'LMC000002', 'LMC000003', 'LMC000004',
+        ]
+
+    def test_chunk_that_keeps_colliding_fails_its_rows(self, receptionist_user, monkeypatch):
+        Patient.objects.create(patient_id='LMC000001', first_name='Walk', last_name='In', gender='FEMALE')
+        monkeypatch.setattr(bulk_operations, '_next_patient_number', lambda: 1)
+
+        result = import_patients_from_csv(patient_csv(2), receptionist_user)
+
+        assert (result['imported'], result['failed']) == (0, 2)
+        assert result['errors'][0]['error'].startswith('Could not save patient:')
+        assert Patient.objects.count() == 1
+
+    def test_import_endpoint_accepts_file_upload(self, receptionist_client):
+        upload = io.BytesIO(patient_csv(3).encode('utf-8'))
+        upload.name = 'patients.csv'
+
+        response = receptionist_client.post(f'{BULK_URL}import-csv/', {'file': upload}, format='multipart')
+
+        assert response.status_code == 200
+        assert response.data['imported'] == 3
+
+
+@pytest.mark.django_db
+class TestPatientBulkExport:
+
+    def test_csv_export_streams_in_chunks(self, receptionist_user):
+        import_patients_from_csv(patient_csv(7), receptionist_user)
+
+        chunks = list(iter_patients_csv(Patient.objects.order_by('pk'), chunk_size=3))
+
+        assert len(chunks) == 3
+        rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+        assert len(rows) == 7
+        assert rows[0]['national_id'] == 'NIN0000000'
+        assert rows[0]['middle_name'] == ''
+
+    def test_export_endpoints_stream_filtered_patients(self, receptionist_client, receptionist_user):
+        import_patients_from_csv(patient_csv(4), receptionist_user)
+        Patient.objects.filter(national_id='NIN0000003').update(is_active=False)
+
+        response = receptionist_client.get(f'{BULK_URL}export-csv/', {'is_active': 'true'})
+        assert response.status_code == 200
+        assert response.streaming
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert [row['first_name'] for row in rows] == ['First0', 'First1', 'First2']
+
+        response = receptionist_client.get(f'{BULK_URL}export-json/', {'search': 'First1'})
+        assert response.streaming
+        data = json.loads(b''.join(response.streaming_content))
+        assert [(p['first_name'], p['date_of_birth']) for p in data] == [('First1', '1990-01-02')]
+
+        response = receptionist_client.get(f'{BULK_URL}export-json/', {'search': 'nobody'})
+        assert json.loads(b''.join(response.streaming_content)) == []
@@ -0,0 +1,121 @@
+"""
+API tests for the patient portal medical history stream.
+"""
+import importlib
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.patients.history_index import rebuild_patient_history
+from apps.patients.models import PatientHistoryEntry
+
+HISTORY_URL = '/api/v1/patient-portal/medical-history/'
+
+
+@pytest.fixture
+def portal_client(verified_patient):
+    client = APIClient()
+    client.force_authenticate(user=verified_patient.user)
+    return client
+
+
+@pytest.fixture
+def patient_records(verified_patient, doctor_user, receptionist_user, lab_tech_user):
+    from apps.appointments.models import Appointment
+    from apps.consultations.models import Consultation
+    from apps.laboratory.models import LabOrder, LabResult
+    from apps.visits.models import Visit
+
+    visit = Visit.objects.create(patient=verified_patient, status='OPEN', payment_status='PAID')
+    consultation = Consultation.objects.create(visit=visit, created_by=doctor_user, diagnosis='Malaria')
+    lab_order = LabOrder.objects.create(
+        visit=visit,
+        consultation=consultation,
+        ordered_by=doctor_user,
+        tests_requested=['CBC'],
+    )
+    LabResult.objects.create(lab_order=lab_order, result_data='Normal', recorded_by=lab_tech_user)
+    Appointment.objects.create(
+        patient=verified_patient,
+        doctor=doctor_user,
+        created_by=receptionist_user,
+        appointment_date=timezone.now() + timedelta(days=7),
+    )
+    return visit
+
+
+@pytest.mark.django_db
+class TestPatientHistoryStream:
+
+    def test_signals_maintain_index(self, verified_patient, patient_records):
+        types = set(
+            PatientHistoryEntry.objects.filter(patient=verified_patient).values_list('record_type', flat=True)
+        )
+        assert types == {'visit', 'consultation', 'lab_result', 'appointment'}
+
+    def test_merged_stream_is_date_ordered_and_paginated(self, portal_client, patient_records):
+        seen = []
+        url = f'{HISTORY_URL}?page_size=2'
+        while url:
+            response = portal_client.get(url)
+            assert response.status_code == 200
+            seen.extend(response.data['results'])
+            url = response.data['next']
+
+        assert len(seen) == 4
+        dates = [row['occurred_at'] for row in seen]
+        assert dates == sorted(dates, reverse=True)
+        # Future appointment first
+        assert seen[0]['record_type'] == 'appointment'
+
+    def test_single_history_query_per_page(self, portal_client, patient_records):
+        with CaptureQueriesContext(connection) as ctx:
+            portal_client.get(f'{HISTORY_URL}?page_size=10')
+        history_queries = [q for q in ctx.captured_queries if 'patient_history_entries' in q['sql']]
+        assert len(history_queries) == 1
+
+    def test_type_filter(self, portal_client, patient_records):
+        response = portal_client.get(f'{HISTORY_URL}?type=lab_result')
+        assert [row['title'] for row in response.data['results']] == ['CBC']
+
+    def test_since_returns_changes_and_tombstones(self, portal_client, patient_records):
+        from apps.appointments.models import Appointment
+        watermark = timezone.now()
+        Appointment.objects.get(visit=None, patient=patient_records.patient).delete()
+
+        response = portal_client.get(HISTORY_URL, {'since': watermark.isoformat()})
+        assert response.status_code == 200
+        assert [(row['record_type'], row['is_deleted']) for row in response.data['results']] == [
+            ('appointment', True),
+        ]
+
+        full = portal_client.get(HISTORY_URL)
+        assert 'appointment' not in {row['record_type'] for row in full.data['results']}
+
+    def test_invalid_since_is_400(self, portal_client, patient_records):
+        response = portal_client.get(HISTORY_URL, {'since': 'yesterday'})
+        assert response.status_code == 400
+
+    def test_response_gzipped_when_accepted(self, portal_client, patient_records):
+        response = portal_client.get(f'{HISTORY_URL}?page_size=200', HTTP_ACCEPT_ENCODING='gzip')
+        assert response.status_code == 200
+        assert response['Content-Encoding'] == 'gzip'
+
+    def test_rebuild_recreates_entries(self, verified_patient, patient_records):
+        PatientHistoryEntry.objects.all().delete()
+        assert rebuild_patient_history(patient_ids=[verified_patient.id]) == 4
+        assert PatientHistoryEntry.objects.filter(patient=verified_patient).count() == 4
+
+    def test_backfill_migration_indexes_existing_records(self, verified_patient, patient_records):
+        from django.apps import apps
+        migration = importlib.import_module('apps.patients.migrations.0011_patient_history_entries')
+
+        PatientHistoryEntry.objects.all().delete()
+        migration.backfill_history(apps, None)
+        assert sorted(PatientHistoryEntry.objects.values_list('record_type', flat=True)) == [
+            'appointment', 'consultation', 'lab_result', 'visit',
+        ]
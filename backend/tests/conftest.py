@@ -10,6 +10,13 @@ Fixtures provide:
 import pytest
 
 
+@pytest.fixture(autouse=True, scope='session')
+def audit_spool_dir(tmp_path_factory):
+    """Audit entries spooled during tests go to a temp dir, not the repository's logs/."""
+    from django.conf import settings
+    settings.AUDIT_SPOOL_DIR = str(tmp_path_factory.mktemp('audit_spool'))
+
+
 @pytest.fixture
 def patient():
     """Create a patient for testing."""
@@ -0,0 +1,146 @@
+"""
+Tests for the audit log write-behind buffer.
+"""
+import glob
+import hashlib
+import os
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.core.management.base import CommandError
+from django.db import connection, models
+from django.test.utils import CaptureQueriesContext
+
+from core.audit import AuditLog
+from core.audit_buffer import buffered_audit_entries, replay_spool_file
+from core.audit_partitions import _meta_index_sql, _parent_index_sql
+from core.management.commands.archive_audit_partitions import Command as ArchiveCommand
+
+
+@pytest.mark.django_db
+class TestAuditBuffer:
+    """Audit entries are batched per unit of work."""
+
+    def test_entries_saved_immediately_without_buffer(self, doctor_user):
+        AuditLog.log(doctor_user, 'DOCTOR', 'test.immediate', visit_id=None)
+        assert AuditLog.objects.filter(action='test.immediate').count() == 1
+
+    def test_buffered_entries_written_in_one_insert(self, doctor_user):
+        with CaptureQueriesContext(connection) as ctx:
+            with buffered_audit_entries() as buffer:
+                for i in range(20):
+                    AuditLog.log(doctor_user, 'DOCTOR', 'test.buffered', visit_id=i)
+                assert len(buffer) == 20
+                assert AuditLog.objects.filter(action='test.buffered').count() == 0
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "audit_logs"')]
+        assert len(inserts) == 1
+        assert AuditLog.objects.filter(action='test.buffered').count() == 20
+
+    def test_request_entries_flushed_after_response(self, doctor_user, rf):
+        from django.http import HttpResponse
+        from core.middleware.audit_buffer import AuditBufferMiddleware
+
+        def view(request):
+            AuditLog.log(doctor_user, 'DOCTOR', 'test.request', visit_id=1)
+            AuditLog.log(doctor_user, 'DOCTOR', 'test.request', visit_id=2)
+            return HttpResponse('ok')
+
+        response = AuditBufferMiddleware(view)(rf.get('/'))
+        assert AuditLog.objects.filter(action='test.request').count() == 0
+        response.close()
+        assert AuditLog.objects.filter(action='test.request').count() == 2
+
+    def test_json_metadata_and_bad_rows_do_not_fail_the_batch(self, doctor_user, tmp_path, settings):
+        settings.AUDIT_SPOOL_DIR = str(tmp_path)
+        with buffered_audit_entries():
+            AuditLog.log(doctor_user, 'DOCTOR', 'test.decimal', visit_id=1, metadata={'amount': Decimal('12.50')})
+            AuditLog.log(doctor_user, 'DOCTOR', 'test.decimal', visit_id=2)
+        assert AuditLog.objects.get(action='test.decimal', visit_id=1).metadata == {'amount': '12.50'}
+
+        with buffered_audit_entries():
+            AuditLog.log(doctor_user, 'DOCTOR', 'test.row_by_row', visit_id=3)
+            AuditLog.log(doctor_user, 'DOCTOR', None, visit_id=4)  # NOT NULL violation
+            AuditLog.log(doctor_user, 'DOCTOR', 'test.row_by_row', visit_id=5)
+        assert sorted(AuditLog.objects.filter(action='test.row_by_row').values_list('visit_id', flat=True)) == [3, 5]
+        assert len(glob.glob(os.path.join(str(tmp_path), 'audit-*.jsonl'))) == 1
+
+    def test_failed_flush_is_spooled_and_replayed(self, doctor_user, tmp_path, settings):
+        settings.AUDIT_SPOOL_DIR = str(tmp_path)
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=Exception('db down')), \
+                mock.patch.object(AuditLog, 'save', side_effect=Exception('db down')):
+            with buffered_audit_entries():
+                AuditLog.log(doctor_user, 'DOCTOR', 'test.spooled', visit_id=7, metadata={'k': 'v'})
+        assert AuditLog.objects.filter(action='test.spooled').count() == 0
+
+        files = glob.glob(os.path.join(str(tmp_path), 'audit-*.jsonl'))
+        assert len(files) == 1
+        written, failed = replay_spool_file(files[0])
+        assert (written, failed) == (1, 0)
+
+        entry = AuditLog.objects.get(action='test.spooled')
+        assert entry.visit_id == 7
+        assert entry.metadata == {'k': 'v'}
+
+
+class TestPartitionIndexes:
+
+    def test_parent_indexes_follow_the_model(self):
+        legacy = {
+            'audit_logs_timestamp_5f6ae1f0': 'CREATE INDEX audit_logs_timestamp_5f6ae1f0 ON public.audit_logs '
+                                             'USING btree ("timestamp")',
+            'audit_logs_ts_id_idx': 'CREATE INDEX audit_logs_ts_id_idx ON public.audit_logs USING btree (...)',
+        }
+        statements = _parent_index_sql(AuditLog, legacy)
+
+        assert legacy['audit_logs_timestamp_5f6ae1f0'] in statements
+        assert legacy['audit_logs_ts_id_idx'] not in statements
+        assert len(statements) == len(AuditLog._meta.indexes) + 1
+        assert ('CREATE INDEX "audit_logs_action_prefix_idx" ON "audit_logs" ("action" varchar_pattern_ops)'
+                in statements)
+
+    def test_meta_index_keeps_descending_order(self):
+        index = models.Index(fields=['action', '-timestamp'], name='audit_logs_action_recent_idx')
+        assert _meta_index_sql(AuditLog, index) == (
+            'CREATE INDEX "audit_logs_action_recent_idx" ON "audit_logs" ("action", "timestamp" DESC)'
+        )
+
+
+@pytest.mark.django_db
+class TestPartitionArchive:
+    """Archives are checksummed as written and read back before a drop."""
+
+    def test_checksum_matches_the_file_on_disk(self, doctor_user, tmp_path):
+        for i in range(3):
+            AuditLog.log(doctor_user, 'DOCTOR', 'test.archived', visit_id=i)
+        path = str(tmp_path / 'audit_logs.ndjson.gz')
+
+        assert ArchiveCommand()._archive('audit_logs', path) == AuditLog.objects.count()
+
+        with open(f'{path}.sha256', encoding='utf-8') as fh:
+            digest, filename = fh.read().split()
+        with open(path, 'rb') as fh:
+            assert digest == hashlib.sha256(fh.read()).hexdigest()
+        assert filename == 'audit_logs.ndjson.gz'
+
+    def test_drop_check_rejects_a_changed_archive(self, doctor_user, tmp_path):
+        AuditLog.log(doctor_user, 'DOCTOR', 'test.archived', visit_id=None)
+        path = str(tmp_path / 'audit_logs.ndjson.gz')
+        command = ArchiveCommand()
+        command._archive('audit_logs', path)
+        command._verify('audit_logs', path)
+
+        with open(path, 'ab') as fh:
+            fh.write(b'\0')
+        with pytest.raises(CommandError):
+            command._verify('audit_logs', path)
+
+    def test_drop_check_rejects_a_short_archive(self, doctor_user, tmp_path):
+        AuditLog.log(doctor_user, 'DOCTOR', 'test.archived', visit_id=None)
+        path = str(tmp_path / 'audit_logs.ndjson.gz')
+        command = ArchiveCommand()
+        command._archive('audit_logs', path)
+
+        AuditLog.log(doctor_user, 'DOCTOR', 'test.archived', visit_id=None)
+        with pytest.raises(CommandError):
+            command._verify('audit_logs', path)
@@ -0,0 +1,110 @@
+"""
+Tests for the BillingLineItem payment write path (payment-only validation, batched allocation).
+"""
+from decimal import Decimal
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.billing.billing_line_item_models import BillingLineItem
+from apps.billing.billing_line_item_service import allocate_payment_to_line_items, apply_payments_to_line_items
+from apps.billing.domain_events import billing_line_items_paid
+from apps.billing.service_catalog_models import ServiceCatalog
+from apps.visits.models import Visit
+from apps.visits.timeline_models import TimelineEvent
+
+
+@pytest.fixture
+def line_items(open_visit_with_payment, receptionist_user):
+    items = []
+    for i, amount in enumerate(['1000.00', '2500.00', '4000.00']):
+        service = ServiceCatalog.objects.create(
+            service_code=f'PROC-{i}', name=f'Procedure {i}', department='PROCEDURE', category='PROCEDURE',
+            workflow_type='PROCEDURE', amount=Decimal(amount), bill_timing='AFTER', allowed_roles=['DOCTOR'],
+        )
+        items.append(BillingLineItem.objects.create(
+            service_catalog=service, visit=open_visit_with_payment, amount=Decimal(amount),
+            created_by=receptionist_user,
+        ))
+    return items
+
+
+@pytest.fixture
+def paid_batches():
+    batches = []
+
+    def collect(sender, items, **kwargs):
+        batches.append([item.pk for item in items])
+
+    billing_line_items_paid.connect(collect)
+    yield batches
+    billing_line_items_paid.disconnect(collect)
+
+
+def sql_touching(ctx, table):
+    return [q['sql'] for q in ctx.captured_queries if f'"{table}"' in q['sql']]
+
+
+@pytest.mark.django_db
+class TestPaymentSave:
+
+    def test_payment_save_validates_without_foreign_key_lookups(self, line_items):
+        item = BillingLineItem.objects.get(pk=line_items[1].pk)
+
+        with CaptureQueriesContext(connection) as ctx:
+            item.apply_payment(Decimal('1000.00'), 'CASH')
+
+        # One read of the stored state (shared by validation and both status trackers), one update
+        assert len(ctx.captured_queries) == 2
+        assert not sql_touching(ctx, 'service_catalog') and not sql_touching(ctx, 'users')
+        item.refresh_from_db()
+        assert (item.bill_status, item.outstanding_amount) == ('PARTIALLY_PAID', Decimal('1500.00'))
+
+    def test_payment_invariants_still_hold(self, line_items, open_visit_with_payment):
+        paid = line_items[0]
+        paid.apply_payment(Decimal('1000.00'), 'CASH')
+        paid.payment_method = 'WALLET'
+        with pytest.raises(ValidationError) as excinfo:
+            paid.save(update_fields=['payment_method'])
+        assert 'payment_method' in excinfo.value.message_dict
+
+        Visit.objects.filter(pk=open_visit_with_payment.pk).update(status='CLOSED')
+        with pytest.raises(ValidationError):
+            BillingLineItem.objects.get(pk=line_items[1].pk).apply_payment(Decimal('10.00'), 'CASH')
+
+
+@pytest.mark.django_db
+class TestBatchPayment:
+
+    def test_allocation_is_one_read_one_update_and_one_event_batch(self, line_items, paid_batches,
+                                                                    django_capture_on_commit_callbacks):
+        visit = line_items[0].visit
+
+        with CaptureQueriesContext(connection) as ctx:
+            with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+                updated = allocate_payment_to_line_items(visit, Decimal('4000.00'), 'CASH')
+
+        assert [item.pk for item in updated] == [item.pk for item in line_items[:3]]
+        line_item_sql = sql_touching(ctx, 'billing_line_items')
+        assert len([q for q in line_item_sql if q.startswith('UPDATE')]) == 1
+        assert len([q for q in line_item_sql if q.startswith('SELECT')]) == 1
+
+        assert paid_batches == [[line_items[0].pk, line_items[1].pk]]
+        statuses = dict(BillingLineItem.objects.values_list('pk', 'bill_status'))
+        assert [statuses[item.pk] for item in line_items] == ['PAID', 'PAID', 'PARTIALLY_PAID']
+        assert BillingLineItem.objects.get(pk=line_items[2].pk).outstanding_amount == Decimal('3500.00')
+        assert set(TimelineEvent.objects.filter(event_type='PAYMENT_CONFIRMED').values_list('source_id', flat=True)) == {
+            line_items[0].pk, line_items[1].pk,
+        }
+
+    def test_invalid_batch_changes_nothing(self, line_items, paid_batches, receptionist_user):
+        with pytest.raises(ValidationError):
+            apply_payments_to_line_items(
+                [(line_items[0], Decimal('1000.00')), (line_items[1], Decimal('9999.00'))],
+                'CASH', modified_by=receptionist_user,
+            )
+
+        assert not BillingLineItem.objects.exclude(bill_status='PENDING').exists()
+        assert paid_batches == []
@@ -0,0 +1,158 @@
+"""
+Tests for catalog delta sync (snapshots, ?updated_since=, tombstones, version headers).
+"""
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.laboratory.catalog_models import LabTestCatalog
+from apps.pharmacy.models import Drug, DrugInventory, StockMovement
+from core.catalog_models import CatalogTombstone
+
+DRUGS_URL = '/api/v1/drugs/'
+INVENTORY_URL = '/api/v1/inventory/'
+LAB_CATALOG_URL = '/api/v1/laboratory/lab-tests/'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Rolled-back test transactions reuse SQLite ids, and with them the versions
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def drugs(pharmacist_user):
+    created = [
+        Drug.objects.create(name=f'Drug {i}', drug_code=f'DRG{i:03d}', created_by=pharmacist_user)
+        for i in range(5)
+    ]
+    for drug in created[:3]:
+        DrugInventory.objects.create(drug=drug, current_stock=10, reorder_level=2)
+    return created
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def since(response):
+    """The updated_since a client sends after this response, as if a minute had passed."""
+    synced_at = timezone.datetime.fromisoformat(response['X-Catalog-Synced-At'])
+    return (synced_at + timedelta(minutes=1)).isoformat()
+
+
+@pytest.mark.django_db
+class TestCatalogSnapshot:
+
+    def test_snapshot_is_versioned_cached_and_revalidated(self, doctor_user, drugs):
+        client = client_for(doctor_user)
+
+        first = client.get(DRUGS_URL)
+
+        assert first.status_code == 200
+        assert len(first.data) == 5
+        version = first['X-Catalog-Version']
+        assert first['ETag'] == f'"{version}"'
+        assert 'no-cache' in first['Cache-Control'] and 'private' in first['Cache-Control']
+
+        with CaptureQueriesContext(connection) as ctx:
+            again = client.get(DRUGS_URL)
+        # Version check only (rows + tombstones); the serialized list comes from the cache
+        assert len(ctx.captured_queries) == 2
+        assert again.data == first.data
+
+        assert client.get(DRUGS_URL, HTTP_IF_NONE_MATCH=f'W/"{version}"').status_code == 304
+
+        drugs[0].name = 'Renamed'
+        drugs[0].save()
+        changed = client.get(DRUGS_URL, HTTP_IF_NONE_MATCH=f'"{version}"')
+        assert changed.status_code == 200
+        assert changed['X-Catalog-Version'] != version
+
+    def test_snapshot_is_gzipped(self, doctor_user, drugs):
+        response = client_for(doctor_user).get(DRUGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert len(json.loads(gzip.decompress(response.content))) == 5
+
+
+@pytest.mark.django_db
+class TestCatalogDelta:
+
+    def test_delta_returns_changes_and_tombstones(self, doctor_user, pharmacist_user, drugs):
+        client = client_for(doctor_user)
+        snapshot = client.get(DRUGS_URL)
+        cursor = since(snapshot)
+
+        assert client.get(DRUGS_URL, {'updated_since': cursor}).data['results'] == []
+
+        future = timezone.now() + timedelta(minutes=2)
+        Drug.objects.filter(pk=drugs[1].pk).update(sales_price=99, updated_at=future)
+        delta = client.get(DRUGS_URL, {'updated_since': cursor})
+
+        assert [row['id'] for row in delta.data['results']] == [drugs[1].pk]
+        assert delta.data['deleted'] == []
+        assert delta.data['version'] == delta['X-Catalog-Version'] != snapshot['X-Catalog-Version']
+
+        # Age the fixture rows past the overlap window
+        Drug.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        DrugInventory.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        inventory_id = DrugInventory.objects.get(drug=drugs[2]).pk
+        DrugInventory.objects.get(pk=inventory_id).delete()
+        assert CatalogTombstone.objects.filter(catalog='drug_inventory', object_id=inventory_id).exists()
+        recent = (timezone.now() - timedelta(seconds=1)).isoformat()
+        inventory_delta = client.get(INVENTORY_URL, {'updated_since': recent})
+        assert inventory_delta.data['deleted'] == [inventory_id]
+        # The drug row embeds stock, so it is re-sent too
+        drug_delta = client.get(DRUGS_URL, {'updated_since': recent})
+        assert [row['id'] for row in drug_delta.data['results']] == [drugs[2].pk]
+        assert drug_delta.data['results'][0]['current_stock'] is None
+
+    def test_stock_movement_reaches_inventory_and_drug_deltas(self, doctor_user, pharmacist_user, drugs):
+        client = client_for(doctor_user)
+        before = (timezone.now() - timedelta(seconds=1)).isoformat()
+        inventory = DrugInventory.objects.get(drug=drugs[0])
+        DrugInventory.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        Drug.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        StockMovement.objects.create(inventory=inventory, movement_type='OUT', quantity=-3, created_by=pharmacist_user)
+
+        inventory_rows = client.get(INVENTORY_URL, {'updated_since': before}).data['results']
+        assert [(row['id'], float(row['current_stock'])) for row in inventory_rows] == [(inventory.pk, 7.0)]
+        drug_rows = client.get(DRUGS_URL, {'updated_since': before}).data['results']
+        assert [row['id'] for row in drug_rows] == [drugs[0].pk]
+
+    def test_rows_leaving_a_filter_are_reported_deleted(self, doctor_user):
+        client = client_for(doctor_user)
+        test = LabTestCatalog.objects.create(
+            test_code='CBC', test_name='Full Blood Count', category='HEMATOLOGY',
+            reference_range_text='See report', created_by=doctor_user,
+        )
+        recent = (timezone.now() - timedelta(seconds=1)).isoformat()
+
+        test.is_active = False
+        test.save()
+        delta = client.get(LAB_CATALOG_URL, {'updated_since': recent, 'is_active': 'true'})
+
+        assert delta.data['results'] == []
+        assert delta.data['deleted'] == [test.pk]
+
+        test_id = test.pk
+        test.delete()
+        assert client.get(LAB_CATALOG_URL, {'updated_since': recent}).data['deleted'] == [test_id]
+
+    def test_invalid_updated_since(self, doctor_user):
+        response = client_for(doctor_user).get(DRUGS_URL, {'updated_since': 'last week'})
+
+        assert response.status_code == 400
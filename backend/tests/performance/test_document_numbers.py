@@ -0,0 +1,110 @@
+"""
+Tests for block-based receipt/invoice number allocation.
+"""
+import threading
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.billing.document_numbers import DocumentNumberAllocator, audit_document_numbers
+from apps.billing.invoice_receipt_models import (
+    DocumentNumberBlock,
+    DocumentNumberSequence,
+    InvoiceReceipt,
+)
+from apps.visits.models import Visit
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDocumentNumberAllocation:
+
+    def test_numbers_served_from_reserved_block(self):
+        allocator = DocumentNumberAllocator(block_size=10)
+        year = timezone.localdate().year
+
+        assert allocator.next_number('RECEIPT') == f'REC-{year}-0001'
+        with CaptureQueriesContext(connection) as ctx:
+            numbers = [allocator.next_number('RECEIPT') for _ in range(9)]
+        assert len(ctx.captured_queries) == 0
+        assert numbers[-1] == f'REC-{year}-0010'
+
+        allocator.next_number('RECEIPT')
+        blocks = list(DocumentNumberBlock.objects.values_list('first_number', 'last_number'))
+        assert blocks == [(1, 10), (11, 20)]
+
+    def test_workers_get_disjoint_blocks(self):
+        first, second = DocumentNumberAllocator(block_size=5), DocumentNumberAllocator(block_size=5)
+        numbers = []
+        for _ in range(12):
+            numbers.append(first.next_number('INVOICE'))
+            numbers.append(second.next_number('INVOICE'))
+        assert len(set(numbers)) == 24
+        assert DocumentNumberSequence.objects.get(document_type='INVOICE').current_number == 30
+
+    def test_concurrent_receipt_numbers(self):
+        allocator = DocumentNumberAllocator(block_size=50)
+        results, errors = [], []
+
+        def worker():
+            try:
+                for _ in range(100):
+                    results.append(allocator.next_number('RECEIPT'))
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        assert len(results) == 400
+        assert len(set(results)) == 400
+
+    def test_reservation_falls_back_to_row_lock(self, monkeypatch):
+        DocumentNumberSequence.reserve_block('INVOICE', 2026, size=3)
+        monkeypatch.setattr(DocumentNumberSequence, 'RESERVE_CAS_ATTEMPTS', 0)
+
+        assert DocumentNumberSequence.reserve_block('INVOICE', 2026, size=3) == (4, 6)
+        assert DocumentNumberSequence.objects.get(document_type='INVOICE', year=2026).current_number == 6
+
+    def test_default_block_size_matches_settings(self, settings):
+        settings.EMR_SETTINGS = {}
+        assert DocumentNumberAllocator().block_size == 20
+
+    def test_allocation_inside_transaction_reserves_single_numbers(self):
+        from django.db import transaction
+
+        allocator = DocumentNumberAllocator(block_size=10)
+        with transaction.atomic():
+            allocator.next_number('RECEIPT')
+            allocator.next_number('RECEIPT')
+        assert list(DocumentNumberBlock.objects.values_list('first_number', 'last_number')) == [(1, 1), (2, 2)]
+
+    def test_audit_explains_gaps(self, patient, receptionist_user):
+        allocator = DocumentNumberAllocator(block_size=5)
+        year = timezone.localdate().year
+        visit = Visit.objects.create(patient=patient, status='OPEN', payment_status='PAID')
+        for _ in range(3):
+            number = allocator.next_number('RECEIPT')
+            InvoiceReceipt.objects.create(
+                document_type='RECEIPT',
+                document_number=number,
+                visit=visit,
+                document_data={'receipt_number': number},
+                generated_by=receptionist_user,
+            )
+        # Worker restarts with the rest of its block unused
+        allocator.release()
+        allocator.next_number('RECEIPT')
+
+        report = audit_document_numbers('RECEIPT', year)
+        assert report['issued'] == 3
+        assert report['reserved'] == 10
+        assert report['unused_by_worker'] == {allocator.worker: [4, 5, 6, 7, 8, 9, 10]}
+        assert report['unaccounted'] == []
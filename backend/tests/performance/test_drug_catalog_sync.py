@@ -0,0 +1,120 @@
+"""
+Tests for the Drug -> ServiceCatalog sync (per-save signal and bulk engine).
+"""
+import csv
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.billing.service_catalog_models import ServiceCatalog
+from apps.pharmacy.models import Drug
+from apps.pharmacy.signals import suspend_service_catalog_sync, sync_drugs_to_service_catalog
+
+
+def drug_services():
+    return ServiceCatalog.objects.filter(department='PHARMACY', category='DRUG')
+
+
+@pytest.mark.django_db
+class TestDrugCatalogSync:
+
+    def test_signal_creates_entry_with_free_code(self, pharmacist_user):
+        ServiceCatalog.objects.create(
+            department='PHARMACY', service_code='DRUG-PCM', name='Old Paracetamol', amount=Decimal('10.00'),
+            category='DRUG', workflow_type='DRUG_DISPENSE', bill_timing='AFTER', allowed_roles=['DOCTOR'],
+        )
+        ServiceCatalog.objects.create(
+            department='PHARMACY', service_code='DRUG-PCM-1', name='Older Paracetamol', amount=Decimal('10.00'),
+            category='DRUG', workflow_type='DRUG_DISPENSE', bill_timing='AFTER', allowed_roles=['DOCTOR'],
+        )
+        # Matched by code, so the existing entry is updated rather than a new one created
+        Drug.objects.create(name='Paracetamol', drug_code='PCM', sales_price=Decimal('50.00'), created_by=pharmacist_user)
+        service = ServiceCatalog.objects.get(service_code='DRUG-PCM')
+        assert (service.name, service.amount) == ('Paracetamol', Decimal('50.00'))
+
+        Drug.objects.create(name='Amoxicillin', sales_price=Decimal('80.00'), created_by=pharmacist_user)
+        assert drug_services().filter(name='Amoxicillin').count() == 1
+
+    def test_suspended_saves_reconcile_in_one_pass(self, pharmacist_user):
+        with suspend_service_catalog_sync():
+            for i in range(60):
+                Drug.objects.create(
+                    name=f'Drug {i}', drug_code=f'D{i:03d}', sales_price=Decimal('100.00'), created_by=pharmacist_user,
+                )
+            assert not drug_services().exists()
+
+        assert drug_services().count() == 60
+        assert drug_services().get(service_code='DRUG-D007').amount == Decimal('100.00')
+
+    def test_bulk_sync_query_count_is_flat(self, pharmacist_user):
+        with suspend_service_catalog_sync(sync_on_exit=False):
+            for i in range(80):
+                Drug.objects.create(name=f'Drug {i}', sales_price=Decimal('100.00'), created_by=pharmacist_user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            stats = sync_drugs_to_service_catalog()
+        assert stats['created'] == 80
+        assert len(ctx.captured_queries) <= 8
+
+        Drug.objects.filter(name__in=['Drug 1', 'Drug 2']).update(sales_price=Decimal('150.00'))
+        stats = sync_drugs_to_service_catalog()
+        assert (stats['created'], stats['updated'], stats['unchanged']) == (0, 2, 78)
+        assert drug_services().get(name='Drug 1').amount == Decimal('150.00')
+
+    def test_bulk_sync_resolves_code_collisions_in_memory(self, pharmacist_user):
+        ServiceCatalog.objects.create(
+            department='PROCEDURE', service_code='DRUG-X1', name='Not a drug', amount=Decimal('10.00'),
+            category='PROCEDURE', workflow_type='PROCEDURE', bill_timing='BEFORE', allowed_roles=['DOCTOR'],
+        )
+        with suspend_service_catalog_sync():
+            Drug.objects.create(name='Drug X', drug_code='X1', sales_price=Decimal('5.00'), created_by=pharmacist_user)
+            Drug.objects.create(name='Drug X bis', drug_code='x1', sales_price=Decimal('5.00'), created_by=pharmacist_user)
+
+        codes = set(drug_services().values_list('service_code', flat=True))
+        assert codes == {'DRUG-X1-1', 'DRUG-X1-2'}
+
+    def test_bulk_sync_reports_code_collisions(self, pharmacist_user):
+        ServiceCatalog.objects.create(
+            department='PROCEDURE', service_code='DRUG-X1', name='Not a drug', amount=Decimal('10.00'),
+            category='PROCEDURE', workflow_type='PROCEDURE', bill_timing='BEFORE', allowed_roles=['DOCTOR'],
+        )
+        with suspend_service_catalog_sync(sync_on_exit=False):
+            Drug.objects.create(name='Drug X', drug_code='X1', sales_price=Decimal('5.00'), created_by=pharmacist_user)
+
+        stats = sync_drugs_to_service_catalog()
+        assert stats['collisions'] == ['Drug X: service code DRUG-X1 is taken, using DRUG-X1-1']
+
+    def test_bulk_sync_validates_field_limits(self, pharmacist_user):
+        with suspend_service_catalog_sync(sync_on_exit=False):
+            # DRUG-<code> is longer than service_code allows
+            Drug.objects.create(name='Drug Y', drug_code='Y' * 100, sales_price=Decimal('5.00'),
+                                created_by=pharmacist_user)
+            Drug.objects.create(name='Drug Z', sales_price=Decimal('5.00'), created_by=pharmacist_user)
+
+        stats = sync_drugs_to_service_catalog()
+        assert stats['created'] == 1
+        assert len(stats['errors']) == 1 and stats['errors'][0].startswith('Drug Y:')
+
+    def test_bulk_sync_reports_unpriced_drugs(self, pharmacist_user):
+        with suspend_service_catalog_sync(sync_on_exit=False):
+            Drug.objects.create(name='Unpriced', created_by=pharmacist_user)
+        stats = sync_drugs_to_service_catalog()
+        assert stats['created'] == 0
+        assert len(stats['errors']) == 1
+
+    def test_import_command_uses_bulk_sync(self, pharmacist_user, tmp_path):
+        path = tmp_path / 'drugs.csv'
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'drug_code', 'sales_price'])
+            for i in range(40):
+                writer.writerow([f'Imported {i}', f'IMP{i}', '250'])
+
+        call_command('import_drug_catalog', str(path), user=pharmacist_user.username, stdout=StringIO())
+
+        assert Drug.objects.count() == 40
+        assert drug_services().filter(service_code__startswith='DRUG-IMP').count() == 40
@@ -0,0 +1,191 @@
+"""
+Tests for the pooled outbound HTTP client (keep-alive, retries, circuit breaker, metrics).
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from core.http_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderClient,
+    get_client,
+    http_metrics,
+    reset_clients,
+)
+
+
+class ProviderStub(BaseHTTPRequestHandler):
+    """Local provider: /ok answers 200, /flaky fails `failures` times with 503, /down always 503."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        if self.path == '/flaky' and self.server.failures > 0:
+            self.server.failures -= 1
+            return self._reply(503, {'status': False})
+        if self.path == '/down':
+            return self._reply(503, {'status': False})
+        return self._reply(200, {'status': True})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.do_GET()
+
+
+@pytest.fixture
+def provider():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ProviderStub)
+    server.connections = 0
+    server.failures = 0
+    server.hits = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, **kwargs):
+    options = {'backoff_factor': 0, 'failure_threshold': 3, 'reset_timeout': 30}
+    options.update(kwargs)
+    return ProviderClient('stub', base_url=f'http://127.0.0.1:{server.server_port}', **options)
+
+
+class TestProviderClient:
+
+    def test_calls_reuse_one_keep_alive_connection(self, provider):
+        client = make_client(provider)
+        for _ in range(20):
+            assert client.get('/ok').json() == {'status': True}
+
+        assert provider.connections == 1
+        stats = client.stats.snapshot()
+        assert (stats['calls'], stats['errors']) == (20, 0)
+        assert stats['avg_ms'] is not None
+
+    def test_idempotent_requests_retry_with_backoff(self, provider):
+        provider.failures = 2
+        client = make_client(provider, retries=2)
+
+        assert client.get('/flaky').status_code == 200
+        assert provider.hits == ['/flaky'] * 3
+
+    def test_posts_are_not_replayed(self, provider):
+        provider.failures = 1
+        client = make_client(provider, retries=2)
+
+        assert client.post('/flaky', json={'amount': 100}).status_code == 503
+        assert provider.hits == ['/flaky']
+
+    def test_circuit_opens_after_consecutive_failures(self, provider):
+        client = make_client(provider, retries=0)
+        for _ in range(3):
+            assert client.get('/down').status_code == 503
+
+        with pytest.raises(CircuitOpenError):
+            client.get('/ok')
+        # Existing `except requests.RequestException` handlers keep working
+        assert issubclass(CircuitOpenError, requests.exceptions.RequestException)
+        assert client.stats.snapshot()['rejected'] == 1
+        assert len(provider.hits) == 3
+
+    def test_sdk_calls_are_tracked_and_clients_cached(self):
+        client = ProviderClient('sdk', failure_threshold=1)
+        built = []
+        first = client.sdk_client('key-1', lambda: built.append(1) or object())
+        assert client.sdk_client('key-1', lambda: built.append(1) or object()) is first
+        assert len(built) == 1
+
+        with pytest.raises(RuntimeError):
+            with client.track():
+                raise RuntimeError('provider error')
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+    @pytest.mark.parametrize('attr', ['status_code', 'status', 'http_status'])
+    def test_sdk_client_errors_do_not_open_the_circuit(self, attr):
+        client = ProviderClient('sdk', failure_threshold=1)
+
+        class SDKError(Exception):
+            pass
+
+        for status in (400, 404, 429):
+            error = SDKError('invalid request')
+            setattr(error, attr, status)
+            with pytest.raises(SDKError):
+                with client.track():
+                    raise error
+        assert client.breaker.state == CircuitBreaker.CLOSED
+        assert client.stats.snapshot()['errors'] == 0
+
+        error = SDKError('server error')
+        setattr(error, attr, 503)
+        with pytest.raises(SDKError):
+            with client.track():
+                raise error
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+
+class TestCircuitBreaker:
+
+    def test_half_open_allows_a_single_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+
+        now[0] = 10.0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        now[0] = 25.0
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestSharedClients:
+
+    def test_get_client_is_shared_and_reported(self, provider, settings):
+        settings.EMR_SETTINGS = {**settings.EMR_SETTINGS, 'OUTBOUND_HTTP': {'paystack': {'timeout': 5}}}
+        reset_clients()
+        try:
+            client = get_client('paystack', base_url=f'http://127.0.0.1:{provider.server_port}')
+            assert get_client('paystack') is client
+            assert client.timeout == 5
+
+            for _ in range(50):
+                client.get('/ok')
+
+            assert http_metrics()['paystack']['calls'] == 50
+            assert http_metrics()['paystack']['circuit'] == CircuitBreaker.CLOSED
+            # Keep-alive: every call reused the pooled connection
+            assert provider.connections == 1
+        finally:
+            reset_clients()
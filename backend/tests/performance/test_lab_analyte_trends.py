@@ -0,0 +1,170 @@
+"""
+Tests for the structured lab analyte store (posting, text backfill, trend and delta queries).
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.consultations.models import Consultation
+from apps.laboratory.analytes import analyte_definitions, analyte_trends, parse_result_text
+from apps.laboratory.models import LabAnalyteScan, LabAnalyteValue, LabOrder, LabResult, LabTestCatalog
+from apps.laboratory.template_models import LabTestTemplate
+from apps.visits.models import Visit
+
+TRENDS_URL = '/api/v1/laboratory/trends/'
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def analytes(doctor_user):
+    LabTestTemplate.objects.create(name='Antenatal Panel', tests=['Haemoglobin', 'HbA1c', 'Blood Group'],
+                                   created_by=doctor_user)
+    LabTestCatalog.objects.create(test_code='HGB', test_name='Hemoglobin', category='HEMATOLOGY', unit='g/dL',
+                                  reference_range_min=Decimal('11.50'), reference_range_max=Decimal('16.50'),
+                                  created_by=doctor_user)
+    LabTestCatalog.objects.create(test_code='WBC', test_name='WBC Count', category='HEMATOLOGY', unit='/uL',
+                                  reference_range_min=Decimal('4000'), reference_range_max=Decimal('11000'),
+                                  created_by=doctor_user)
+
+
+def lab_order(patient, doctor_user):
+    visit = Visit.objects.create(patient=patient, status='OPEN', payment_status='PAID')
+    consultation = Consultation.objects.create(visit=visit, created_by=doctor_user, history='Antenatal review')
+    return LabOrder.objects.create(visit=visit, consultation=consultation, ordered_by=doctor_user,
+                                   tests_requested=['Antenatal Panel'])
+
+
+def legacy_result(patient, doctor_user, lab_tech_user, text, days_ago):
+    """A stored result from before analytes were recorded."""
+    result = LabResult.objects.create(lab_order=lab_order(patient, doctor_user), result_data=text,
+                                      recorded_by=lab_tech_user)
+    LabResult.objects.filter(pk=result.pk).update(recorded_at=timezone.now() - timedelta(days=days_ago))
+    return result
+
+
+@pytest.mark.django_db
+class TestAnalyteExtraction:
+
+    def test_free_text_is_parsed_against_templates_and_catalog(self, analytes):
+        text = "FBC:\n- Hb: 10.9 g/dL\nWBC = 5,400 /uL; HbA1c 6.8%\nBlood Group: O+\nRemarks: repeat in 4 weeks"
+        parsed = {definition.key: (value, unit) for definition, value, unit in
+                  parse_result_text(text, analyte_definitions())}
+
+        assert parsed == {
+            'hemoglobin': (Decimal('10.9000'), 'g/dL'),
+            'wbc_count': (Decimal('5400.0000'), '/uL'),
+            'hba1c': (Decimal('6.8000'), '%'),
+        }
+
+    def test_posted_result_stores_structured_values(self, analytes, patient, doctor_user, lab_tech_user):
+        order = lab_order(patient, doctor_user)
+        response = client_for(lab_tech_user).post(
+            f'/api/v1/visits/{order.visit_id}/laboratory/results/',
+            {'lab_order': order.pk, 'result_data': 'See analytes', 'abnormal_flag': 'ABNORMAL',
+             'analytes': [{'analyte': 'Haemoglobin', 'value': '10.2', 'unit': 'g/dL'},
+                          {'analyte': 'A1c', 'value': '6.1'}]},
+            format='json',
+        )
+        assert response.status_code == 201, response.data
+
+        assert LabAnalyteScan.objects.filter(lab_result__lab_order=order).exists()
+        values = {value.analyte: value for value in LabAnalyteValue.objects.all()}
+        assert set(values) == {'hemoglobin', 'hba1c'}
+        hemoglobin = values['hemoglobin']
+        assert (hemoglobin.value, hemoglobin.flag, hemoglobin.source) == (Decimal('10.2'), 'LOW', 'STRUCTURED')
+        assert (hemoglobin.patient_id, hemoglobin.visit_id) == (patient.pk, order.visit_id)
+        assert hemoglobin.observed_at == LabResult.objects.get().recorded_at
+        assert values['hba1c'].flag == ''  # No catalog range
+
+        other = lab_order(patient, doctor_user)
+        response = client_for(lab_tech_user).post(
+            f'/api/v1/visits/{other.visit_id}/laboratory/results/',
+            {'lab_order': other.pk, 'result_data': 'x', 'analytes': [{'analyte': 'Unobtainium', 'value': '1'}]},
+            format='json',
+        )
+        assert response.status_code == 400
+        assert not LabResult.objects.filter(lab_order=other).exists()
+
+    def test_posted_text_is_parsed_when_no_values_are_sent(self, analytes, patient, doctor_user, lab_tech_user):
+        order = lab_order(patient, doctor_user)
+        response = client_for(lab_tech_user).post(
+            f'/api/v1/visits/{order.visit_id}/laboratory/results/',
+            {'lab_order': order.pk, 'result_data': 'Hemoglobin: 12.4 g/dL'},
+            format='json',
+        )
+        assert response.status_code == 201
+        value = LabAnalyteValue.objects.get()
+        assert (value.analyte, value.value, value.flag, value.source) == ('hemoglobin', Decimal('12.4'), 'NORMAL',
+                                                                          'PARSED')
+
+
+@pytest.mark.django_db
+class TestAnalyteTrends:
+
+    def test_backfill_then_trend_with_deltas_in_one_indexed_query(self, analytes, patient, doctor_user,
+                                                                  lab_tech_user):
+        for days_ago, text in [(90, 'Hb: 11.0 g/dL\nHbA1c: 7.2 %'), (60, 'Haemoglobin 10.1 g/dL'),
+                               (30, 'Hb: 10.6 g/dL; HbA1c: 6.5 %'), (5, 'Malaria parasite: not seen')]:
+            legacy_result(patient, doctor_user, lab_tech_user, text, days_ago)
+
+        out = StringIO()
+        call_command('backfill_lab_analytes', batch_size=2, stdout=out)
+        assert 'Parsed 4 lab result(s); stored 5 analyte value(s)' in out.getvalue()
+        # Results without numeric analytes are not parsed again
+        out = StringIO()
+        call_command('backfill_lab_analytes', stdout=out)
+        assert 'Parsed 0 lab result(s)' in out.getvalue()
+        assert LabAnalyteValue.objects.count() == 5
+
+        with CaptureQueriesContext(connection) as ctx:
+            series = analyte_trends(patient.pk)
+        assert len(ctx.captured_queries) == 1
+
+        by_analyte = {entry['analyte']: entry for entry in series}
+        hemoglobin = by_analyte['hemoglobin']
+        assert hemoglobin['value'] == [Decimal('11.0'), Decimal('10.1'), Decimal('10.6')]
+        assert hemoglobin['delta'] == [None, Decimal('-0.9'), Decimal('0.5')]
+        assert hemoglobin['flag'] == ['LOW', 'LOW', 'LOW']
+        assert (hemoglobin['latest'], hemoglobin['change']) == (Decimal('10.6'), Decimal('-0.4'))
+        assert hemoglobin['observed_at'] == sorted(hemoglobin['observed_at'])
+        assert by_analyte['hba1c']['delta'] == [None, Decimal('-0.7')]
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + ctx.captured_queries[0]['sql'])
+                plan = str(cursor.fetchall())
+            assert 'lab_analyte_trend_idx' in plan and 'TEMP B-TREE' not in plan
+
+    def test_trend_endpoint(self, analytes, patient, doctor_user, lab_tech_user, receptionist_user):
+        legacy_result(patient, doctor_user, lab_tech_user, 'Hb: 11.8 g/dL\nHbA1c 6.0', 40)
+        legacy_result(patient, doctor_user, lab_tech_user, 'Hb: 12.3 g/dL', 10)
+        call_command('backfill_lab_analytes', stdout=StringIO())
+        client = client_for(doctor_user)
+
+        response = client.get(TRENDS_URL, {'patient': patient.pk, 'analyte': 'Haemoglobin'})
+        assert response.status_code == 200
+        [series] = response.data['series']
+        assert series['analyte'] == 'hemoglobin' and series['delta'] == [None, Decimal('0.5')]
+
+        recent = client.get(TRENDS_URL, {'patient': patient.pk,
+                                         'since': (timezone.now() - timedelta(days=20)).date().isoformat()})
+        assert [entry['count'] for entry in recent.data['series']] == [1]
+        until = client.get(TRENDS_URL, {'patient': patient.pk,
+                                        'until': (timezone.now() - timedelta(days=40)).date().isoformat()})
+        assert sorted(entry['analyte'] for entry in until.data['series']) == ['hba1c', 'hemoglobin']
+
+        assert client.get(TRENDS_URL, {'patient': patient.pk, 'since': 'last week'}).status_code == 400
+        assert client.get(TRENDS_URL).status_code == 400
+        assert client_for(receptionist_user).get(TRENDS_URL, {'patient': patient.pk}).status_code == 403
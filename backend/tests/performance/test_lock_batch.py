@@ -0,0 +1,135 @@
+"""
+Tests for batched lock evaluation (shared LockContext, per-action ETags, /api/v1/locks/batch/).
+"""
+import inspect
+import logging
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.core.lock_system import LockEvaluator, LockReasonCode
+
+BATCH_URL = '/api/v1/locks/batch/'
+
+
+@pytest.fixture
+def screen(consultation, doctor_user):
+    """A consultation screen: one visit, its consultation, a lab order and two radiology requests."""
+    from apps.laboratory.models import LabOrder
+    from apps.radiology.models import RadiologyRequest
+
+    visit = consultation.visit
+    lab_order = LabOrder.objects.create(
+        visit=visit, consultation=consultation, ordered_by=doctor_user, tests_requested=['CBC'],
+    )
+    scans = [
+        RadiologyRequest.objects.create(visit=visit, consultation=consultation, ordered_by=doctor_user)
+        for _ in range(2)
+    ]
+    return {'visit': visit, 'consultation': consultation, 'lab_order': lab_order, 'scans': scans}
+
+
+def screen_actions(screen):
+    return [
+        ('consultation', {}),
+        ('lab_order', {}),
+        ('procedure', {}),
+        ('lab_result_post', {'lab_order_id': screen['lab_order'].pk}),
+        ('radiology_upload', {'radiology_order_id': screen['scans'][0].pk}),
+        ('radiology_report', {'radiology_order_id': screen['scans'][0].pk}),
+        ('radiology_view', {'radiology_order_id': screen['scans'][1].pk}),
+        ('lab_order', {'consultation_id': 999999}),
+    ]
+
+
+@pytest.mark.django_db
+class TestEvaluateBatch:
+
+    def test_batch_matches_single_evaluations(self, screen):
+        shared = {'visit_id': screen['visit'].pk, 'consultation_id': screen['consultation'].pk}
+        actions = screen_actions(screen)
+
+        batched = LockEvaluator.evaluate_batch(actions, shared=shared)
+
+        evaluators = LockEvaluator.action_evaluators()
+        for (action_type, params), result in zip(actions, batched):
+            accepted = inspect.signature(evaluators[action_type]).parameters
+            single_params = {**{k: v for k, v in shared.items() if k in accepted}, **params}
+            single = LockEvaluator.evaluate_action_lock(action_type, **single_params)
+            assert result.to_dict() == single.to_dict(), action_type
+            assert result.etag == single.etag
+        assert batched[-1].reason_code == LockReasonCode.CONSULTATION_NOT_STARTED
+
+    def test_screen_costs_one_query_per_record_type(self, screen):
+        shared = {'visit_id': screen['visit'].pk, 'consultation_id': screen['consultation'].pk}
+
+        with CaptureQueriesContext(connection) as ctx:
+            results = LockEvaluator.evaluate_batch(screen_actions(screen), shared=shared)
+
+        # Lab orders and radiology requests (each joining the visit), then consultations;
+        # the visit itself is already known from those joins
+        assert len(ctx.captured_queries) == 3
+        assert len(results) == 8
+
+    def test_evaluations_are_not_logged_at_info(self, screen, caplog, settings):
+        settings.EMR_SETTINGS = {**settings.EMR_SETTINGS, 'LOCK_EVALUATION_LOG_SAMPLE_RATE': 1.0}
+
+        with caplog.at_level(logging.INFO, logger='apps.core.lock_system'):
+            LockEvaluator.evaluate_action_lock('consultation', visit_id=screen['visit'].pk)
+        assert caplog.records == []
+
+        with caplog.at_level(logging.DEBUG, logger='apps.core.lock_system'):
+            LockEvaluator.evaluate_action_lock('consultation', visit_id=screen['visit'].pk)
+        assert [record.levelno for record in caplog.records] == [logging.DEBUG]
+
+
+@pytest.mark.django_db
+class TestBatchEndpoint:
+
+    def test_one_request_returns_every_lock_with_etags(self, screen, doctor_user):
+        client = APIClient()
+        client.force_authenticate(user=doctor_user)
+        body = {
+            'visit_id': screen['visit'].pk,
+            'consultation_id': screen['consultation'].pk,
+            'actions': [
+                {'key': 'consultation', 'action_type': 'consultation'},
+                {'key': 'lab', 'action_type': 'lab_order'},
+                {'key': 'upload', 'action_type': 'radiology_upload', 'radiology_order_id': screen['scans'][0].pk},
+                {'key': 'bogus', 'action_type': 'teleport'},
+            ],
+        }
+
+        response = client.post(BATCH_URL, body, format='json')
+
+        assert response.status_code == 200
+        results = response.data['results']
+        assert set(results) == {'consultation', 'lab', 'upload', 'bogus'}
+        assert results['lab']['is_locked'] is False
+        assert results['bogus']['is_locked'] is True
+        assert all(result['etag'].startswith('"') for result in results.values())
+
+        # Unchanged locks come back as not_modified, and the whole response as 304
+        for item in body['actions']:
+            item['etag'] = results[item['key']]['etag']
+        again = client.post(BATCH_URL, body, format='json')
+        assert again.data['results']['lab'] == {'etag': results['lab']['etag'], 'not_modified': True}
+        assert client.post(BATCH_URL, body, format='json', HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+        # A lock that changes gets a new ETag and its full result
+        screen['visit'].payment_status = 'UNPAID'
+        screen['visit'].save(update_fields=['payment_status'])
+        changed = client.post(BATCH_URL, body, format='json')
+        assert changed['ETag'] != response['ETag']
+        assert changed.data['results']['lab']['reason_code'] == 'PAYMENT_NOT_CLEARED'
+
+    def test_rejects_malformed_batches(self, doctor_user):
+        client = APIClient()
+        client.force_authenticate(user=doctor_user)
+
+        assert client.post(BATCH_URL, {'actions': []}, format='json').status_code == 400
+        assert client.post(BATCH_URL, {'actions': [{'key': 'x'}]}, format='json').status_code == 400
+        duplicate = [{'action_type': 'consultation'}, {'action_type': 'consultation'}]
+        assert client.post(BATCH_URL, {'actions': duplicate}, format='json').status_code == 400
@@ -0,0 +1,156 @@
+"""
+Tests for the segmented patient medical history (append, cached rendering, legacy split, API).
+"""
+from datetime import datetime, timezone as dt_timezone
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.consultations.views import ConsultationViewSet
+from apps.patients.medical_history import (
+    append_medical_history,
+    render_medical_history,
+    set_medical_history,
+    split_medical_history,
+)
+from apps.patients.models import MedicalHistorySegment, Patient
+from apps.patients.serializers import PatientSerializer
+
+SEPARATOR = '=' * 60
+
+LEGACY_BLOB = (
+    "Hypertension since 2015"
+    f"\n{SEPARATOR}\nVisit #12 - 2024-05-01 09:30\n{SEPARATOR}\n\nDIAGNOSIS:\nMalaria\n\n{SEPARATOR}\n"
+    f"\n{SEPARATOR}\nNURSING NOTE - Visit #12 - 2024-05-01 11:00\n{SEPARATOR}\nNote Type: General\n{SEPARATOR}\n"
+    f"\n{SEPARATOR}\nLAB SAMPLE COLLECTION - Visit #15 - 2024-06-02 08:05\n{SEPARATOR}\nSample Type: Blood\n{SEPARATOR}\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Rolled-back test transactions reuse SQLite ids, and with them the cache keys
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestLegacySplit:
+
+    def test_split_is_lossless_and_parses_headers(self):
+        created_at = datetime(2015, 1, 1, tzinfo=dt_timezone.utc)
+
+        segments = split_medical_history(LEGACY_BLOB, created_at)
+
+        assert ''.join(segment['content'] for segment in segments) == LEGACY_BLOB
+        assert [(s['source'], s['visit_id']) for s in segments] == [
+            ('legacy', None),
+            ('consultation', 12),
+            ('nursing_note', 12),
+            ('lab_sample_collection', 15),
+        ]
+        assert segments[0]['recorded_at'] == created_at
+        assert segments[2]['recorded_at'] == datetime(2024, 5, 1, 11, 0, tzinfo=dt_timezone.utc)
+
+    def test_text_without_blocks_is_one_segment(self):
+        segments = split_medical_history('Asthma', timezone.now())
+
+        assert [(s['source'], s['content']) for s in segments] == [('legacy', 'Asthma')]
+        assert split_medical_history('', timezone.now()) == []
+
+
+@pytest.mark.django_db
+class TestSegmentStore:
+
+    def test_consultation_appends_segment_without_touching_patient_row(self, consultation):
+        visit = consultation.visit
+        patient = visit.patient
+        updated_at = Patient.objects.get(pk=patient.pk).updated_at
+
+        ConsultationViewSet().merge_with_patient_history(consultation, visit)
+        ConsultationViewSet().merge_with_patient_history(consultation, visit)
+
+        segments = list(MedicalHistorySegment.objects.filter(patient=patient))
+        assert [(s.source, s.source_id, s.visit_id) for s in segments] == [
+            ('consultation', consultation.pk, visit.pk),
+        ] * 2
+        assert Patient.objects.get(pk=patient.pk).updated_at == updated_at
+        history = Patient.objects.get(pk=patient.pk).medical_history
+        assert history == segments[0].content * 2
+        assert 'DIAGNOSIS:\nTest diagnosis' in history
+
+    def test_rendered_history_is_cached_per_latest_segment(self, patient):
+        assert render_medical_history(patient.pk) is None
+        append_medical_history(patient, 'first\n', source='registration')
+        assert render_medical_history(patient.pk) == 'first\n'
+
+        with CaptureQueriesContext(connection) as ctx:
+            assert render_medical_history(patient.pk) == 'first\n'
+        # Only the latest segment id is read; the text comes from the cache
+        assert len(ctx.captured_queries) == 1
+
+        append_medical_history(patient, 'second\n', source='edit')
+        assert render_medical_history(patient.pk) == 'first\nsecond\n'
+
+    def test_set_medical_history_appends_or_corrects(self, patient):
+        append_medical_history(patient, 'Asthma.', source='registration')
+
+        set_medical_history(patient, 'Asthma. Penicillin reaction 2020.')
+        assert list(patient.medical_history_segments.values_list('source', 'content')) == [
+            ('registration', 'Asthma.'),
+            ('edit', ' Penicillin reaction 2020.'),
+        ]
+
+        set_medical_history(patient, 'Asthma. Amoxicillin reaction 2021.')
+        assert render_medical_history(patient.pk) == 'Asthma. Amoxicillin reaction 2021.'
+        # Earlier segments are kept; the correction replaces only the changed span
+        assert list(patient.medical_history_segments.values_list(
+            'source', 'content', 'correction_start', 'correction_end')) == [
+            ('registration', 'Asthma.', None, None),
+            ('edit', ' Penicillin reaction 2020.', None, None),
+            ('correction', 'Amoxicillin reaction 2021', 8, 32),
+        ]
+
+        set_medical_history(patient, 'Asthma.')
+        set_medical_history(patient, 'Asthma. Resolved.')
+        assert render_medical_history(patient.pk) == 'Asthma. Resolved.'
+        assert patient.medical_history_segments.count() == 5
+
+    def test_list_assembles_histories_in_bounded_queries(self):
+        patients = []
+        for i in range(20):
+            patient = Patient.objects.create(first_name=f'P{i}', last_name='Segments', patient_id=f'SEG{i:03d}')
+            for n in range(3):
+                append_medical_history(patient, f'{i}:{n};', source='edit')
+            patients.append(patient)
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = PatientSerializer(patients, many=True).data
+        # Insurance, latest segment ids and one segment load for the uncached patients
+        assert len(ctx.captured_queries) == 3
+        assert data[4]['medical_history'] == '4:0;4:1;4:2;'
+
+
+@pytest.mark.django_db
+class TestPatientApi:
+
+    def test_create_and_patch_medical_history(self, receptionist_user):
+        client = APIClient()
+        client.force_authenticate(user=receptionist_user)
+
+        created = client.post('/api/v1/patients/', {
+            'first_name': 'Ada', 'last_name': 'Segment', 'medical_history': 'Diabetes type 2.',
+        }, format='json')
+        assert created.status_code == 201, created.data
+        assert created.data['patient']['medical_history'] == 'Diabetes type 2.'
+        patient_id = created.data['patient']['id']
+
+        patched = client.patch(f'/api/v1/patients/{patient_id}/', {
+            'medical_history': 'Diabetes type 2. On metformin.',
+        }, format='json')
+        assert patched.status_code == 200, patched.data
+        assert client.get(f'/api/v1/patients/{patient_id}/').data['medical_history'] == 'Diabetes type 2. On metformin.'
+        assert MedicalHistorySegment.objects.filter(patient_id=patient_id).count() == 2
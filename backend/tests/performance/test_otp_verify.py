@@ -0,0 +1,99 @@
+"""
+Tests for the OTP verification fast path.
+"""
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.auth_otp.models import LoginAuditLog, LoginOTP
+
+VERIFY_URL = '/api/v1/auth/verify-otp/'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def portal_user(patient_with_user):
+    user = patient_with_user.user
+    user.portal_enabled = True
+    user.save(update_fields=['portal_enabled'])
+    return user
+
+
+@pytest.mark.django_db
+class TestOTPVerification:
+
+    def test_code_is_stored_hashed(self, portal_user):
+        user = portal_user
+        otp = LoginOTP.create_otp(user, 'EMAIL', user.email)
+        stored = LoginOTP.objects.get(pk=otp.pk)
+        assert len(otp.code) == 6
+        assert otp.code not in stored.code_hash
+        assert LoginOTP.find_active(user.email, otp.code).pk == otp.pk
+        assert LoginOTP.find_active('someone@test.com', otp.code) is None
+
+    def test_code_consumed_once(self, portal_user):
+        user = portal_user
+        otp = LoginOTP.create_otp(user, 'EMAIL', user.email)
+        client = APIClient()
+        payload = {'email': user.email, 'otp_code': otp.code}
+
+        first = client.post(VERIFY_URL, payload, format='json')
+        assert first.status_code == 200
+        assert 'access' in first.data
+
+        replay = client.post(VERIFY_URL, payload, format='json')
+        assert replay.status_code == 401
+
+        # A stale instance can't be consumed either
+        assert otp.mark_as_used() is False
+
+    def test_new_otp_invalidates_previous(self, portal_user):
+        user = portal_user
+        old = LoginOTP.create_otp(user, 'EMAIL', user.email)
+        LoginOTP.create_otp(user, 'EMAIL', user.email)
+        assert LoginOTP.find_active(user.email, old.code) is None
+
+    def test_attempts_limited_per_recipient(self, portal_user):
+        user = portal_user
+        otp = LoginOTP.create_otp(user, 'EMAIL', user.email)
+        wrong = '000000' if otp.code != '000000' else '111111'
+        client = APIClient()
+        for _ in range(5):
+            response = client.post(VERIFY_URL, {'email': user.email, 'otp_code': wrong}, format='json')
+            assert response.status_code == 401
+
+        blocked = client.post(VERIFY_URL, {'email': user.email, 'otp_code': otp.code}, format='json')
+        assert blocked.status_code == 429
+
+    def test_failed_token_issue_does_not_burn_the_code(self, portal_user):
+        otp = LoginOTP.create_otp(portal_user, 'EMAIL', portal_user.email)
+        client = APIClient()
+        payload = {'email': portal_user.email, 'otp_code': otp.code}
+
+        with mock.patch('apps.auth_otp.views.RefreshToken.for_user', side_effect=RuntimeError('signing key')):
+            failed = client.post(VERIFY_URL, payload, format='json')
+        assert failed.status_code >= 400
+        assert LoginOTP.objects.filter(pk=otp.pk, is_used=False).exists()
+
+        assert client.post(VERIFY_URL, payload, format='json').status_code == 200
+
+    def test_each_login_is_a_fixed_number_of_queries(self, portal_user):
+        client = APIClient()
+        for _ in range(20):
+            code = LoginOTP.create_otp(portal_user, 'EMAIL', portal_user.email).code
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.post(VERIFY_URL, {'email': portal_user.email, 'otp_code': code}, format='json')
+            assert response.status_code == 200
+            assert len(ctx.captured_queries) <= 10
+        assert LoginAuditLog.objects.filter(action='LOGIN_SUCCESS').count() == 20
+        assert not LoginOTP.objects.filter(is_used=False).exists()
@@ -0,0 +1,267 @@
+"""
+Tests for the stored-event Paystack webhook intake, batched event worker and bulk reconcile.
+"""
+import hashlib
+import hmac
+import io
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.billing.billing_line_item_models import BillingLineItem
+from apps.billing import paystack_event_processing
+from apps.billing.models import Payment, PaymentIntent, PaystackWebhookEvent
+from apps.billing.paystack_event_processing import (
+    MAX_ATTEMPTS,
+    process_paystack_events,
+    reconcile_pending_intents,
+    record_webhook_event,
+)
+from apps.billing.paystack_service import PaystackVisitService
+from apps.billing.service_catalog_models import ServiceCatalog
+from apps.visits.models import Visit
+from core.audit import AuditLog
+
+WEBHOOK_URL = '/api/v1/billing/paystack/webhook/'
+SECRET = 'sk_test_pipeline'
+
+
+class FakePaystack(PaystackVisitService):
+    """Paystack service whose verify call answers from `statuses` ({reference: status}) after `delay` seconds."""
+
+    def __init__(self, statuses=None, delay=0, errors=()):
+        super().__init__()
+        self.statuses = statuses or {}
+        self.delay = delay
+        self.errors = set(errors)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def verify_transaction(self, reference):
+        with self._lock:
+            self.calls.append(reference)
+        time.sleep(self.delay)
+        if reference in self.errors:
+            raise ValidationError("Paystack verification failed: 503 Server Error")
+        visit_id = int(reference.split('-')[1])
+        status = self.statuses.get(reference, 'success')
+        return {
+            'status': True,
+            'data': {
+                'id': hash(reference) % 10 ** 9,
+                'status': status,
+                'gateway_response': 'Successful' if status == 'success' else 'Declined',
+                'metadata': {'visit_id': visit_id},
+                'customer': {'email': 'payer@example.com'},
+            },
+        }
+
+
+def webhook_body(reference, transaction_id=1, event='charge.success'):
+    return {'event': event, 'data': {'id': transaction_id, 'reference': reference, 'status': 'success'}}
+
+
+@pytest.fixture(autouse=True)
+def paystack_secret(settings):
+    settings.PAYSTACK_SECRET_KEY = SECRET
+
+
+@pytest.fixture
+def service():
+    return ServiceCatalog.objects.create(
+        service_code='PSK-CONSULT',
+        name='Consultation',
+        department='CONSULTATION',
+        category='CONSULTATION',
+        workflow_type='GOPD_CONSULT',
+        amount=Decimal('5000.00'),
+        is_active=True,
+        bill_timing='BEFORE',
+        allowed_roles=['DOCTOR'],
+    )
+
+
+def open_intents(patient, receptionist, service, count, age=timedelta(hours=1)):
+    """`count` unpaid visits for the patient, each with an initialized PaymentIntent `age` old."""
+    intents = []
+    for i in range(count):
+        visit = Visit.objects.create(patient=patient, status='OPEN', payment_status='UNPAID')
+        BillingLineItem.objects.create(
+            service_catalog=service, visit=visit, amount=Decimal('5000.00'), created_by=receptionist,
+        )
+        intents.append(PaymentIntent.objects.create(
+            visit=visit,
+            paystack_reference=f'VISIT-{visit.id}-REF{i:04d}',
+            amount=Decimal('5000.00'),
+            status='INITIALIZED',
+            created_by=receptionist,
+        ))
+    PaymentIntent.objects.filter(pk__in=[i.pk for i in intents]).update(created_at=timezone.now() - age)
+    return intents
+
+
+@pytest.mark.django_db
+class TestWebhookIntake:
+
+    def post(self, body, secret=SECRET):
+        payload = json.dumps(body).encode()
+        signature = hmac.new(secret.encode(), payload, hashlib.sha512).hexdigest()
+        return APIClient().post(
+            WEBHOOK_URL, payload, content_type='application/json', HTTP_X_PAYSTACK_SIGNATURE=signature,
+        )
+
+    def test_events_are_stored_once_and_acknowledged(self, monkeypatch):
+        monkeypatch.setattr(PaystackVisitService, 'verify_transaction', lambda *a: pytest.fail('verified inline'))
+
+        first = self.post(webhook_body('VISIT-1-ABC', transaction_id=7))
+        again = self.post(webhook_body('VISIT-1-ABC', transaction_id=7))
+        other = self.post(webhook_body('VISIT-1-ABC', transaction_id=8, event='transfer.success'))
+
+        assert (first.status_code, again.status_code, other.status_code) == (200, 200, 200)
+        assert again.json()['message'] == 'Event already received (idempotent)'
+        events = PaystackWebhookEvent.objects.order_by('pk')
+        assert [(e.event_key, e.status) for e in events] == [
+            ('charge.success:7', 'PENDING'),
+            ('transfer.success:8', 'IGNORED'),
+        ]
+        assert events[0].payload['data']['reference'] == 'VISIT-1-ABC'
+
+    def test_bad_signature_is_rejected_without_storing(self):
+        response = self.post(webhook_body('VISIT-1-ABC'), secret='wrong')
+
+        assert response.status_code == 401
+        assert not PaystackWebhookEvent.objects.exists()
+
+
+@pytest.mark.django_db
+class TestEventWorker:
+
+    def test_batch_coalesces_references_and_applies_payments(self, patient, receptionist_user, service):
+        intents = open_intents(patient, receptionist_user, service, 3)
+        for n, intent in enumerate(intents):
+            record_webhook_event(webhook_body(intent.paystack_reference, transaction_id=n))
+        # A second delivery for the first transaction under a new event id
+        record_webhook_event(webhook_body(intents[0].paystack_reference, transaction_id=99))
+        record_webhook_event(webhook_body('VISIT-999999-UNKNOWN', transaction_id=100))
+        paystack = FakePaystack()
+
+        result = process_paystack_events(service=paystack)
+
+        assert (result.events, result.references, result.verified, result.failed) == (5, 4, 3, 1)
+        assert sorted(paystack.calls) == sorted(i.paystack_reference for i in intents)
+        for intent in intents:
+            intent.refresh_from_db()
+            assert intent.status == 'VERIFIED'
+            assert intent.visit.billing_line_items.get().bill_status == 'PAID'
+        assert Payment.objects.filter(payment_method='PAYSTACK').count() == 3
+        assert Visit.objects.get(pk=intents[0].visit_id).payment_status == 'PAID'
+        statuses = dict(PaystackWebhookEvent.objects.values_list('event_key', 'status'))
+        assert statuses['charge.success:99'] == 'PROCESSED'
+        assert statuses['charge.success:100'] == 'FAILED'
+        assert AuditLog.objects.filter(action='PAYSTACK_WEBHOOK_PROCESSED').count() == 3
+
+        # Replaying a verified reference neither calls Paystack nor pays twice
+        record_webhook_event(webhook_body(intents[0].paystack_reference, transaction_id=101))
+        result = process_paystack_events(service=paystack)
+        assert (result.already_verified, len(paystack.calls)) == (1, 3)
+        assert Payment.objects.filter(payment_method='PAYSTACK').count() == 3
+
+    def test_verification_errors_are_retried_then_failed(self, patient, receptionist_user, service):
+        intent = open_intents(patient, receptionist_user, service, 1)[0]
+        record_webhook_event(webhook_body(intent.paystack_reference))
+        paystack = FakePaystack(errors={intent.paystack_reference})
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            assert process_paystack_events(service=paystack).retried == 1
+            event = PaystackWebhookEvent.objects.get()
+            assert event.attempts == attempt
+            assert event.status == ('FAILED' if attempt == MAX_ATTEMPTS else 'PENDING')
+
+        assert '503' in event.last_error
+        intent.refresh_from_db()
+        assert intent.status == 'INITIALIZED'
+
+    def test_error_applying_one_reference_does_not_stop_the_batch(self, patient, receptionist_user, service,
+                                                                  monkeypatch):
+        intents = open_intents(patient, receptionist_user, service, 3)
+        for n, intent in enumerate(intents):
+            record_webhook_event(webhook_body(intent.paystack_reference, transaction_id=n))
+        broken = intents[1].paystack_reference
+        apply = paystack_event_processing.apply_verification
+
+        def apply_verification(intent, *args, **kwargs):
+            if intent.paystack_reference == broken:
+                raise RuntimeError('database hiccup')
+            return apply(intent, *args, **kwargs)
+
+        monkeypatch.setattr(paystack_event_processing, 'apply_verification', apply_verification)
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            result = process_paystack_events(service=FakePaystack())
+            assert result.retried == 1
+            event = PaystackWebhookEvent.objects.get(reference=broken)
+            assert (event.status, event.last_error) == (
+                'FAILED' if attempt == MAX_ATTEMPTS else 'PENDING', 'database hiccup',
+            )
+        assert PaymentIntent.objects.filter(status='VERIFIED').count() == 2
+        assert not PaystackWebhookEvent.objects.filter(status='PROCESSING').exists()
+
+    def test_abandoned_events_fail_after_max_attempts(self, patient, receptionist_user, service):
+        intents = open_intents(patient, receptionist_user, service, 2)
+        for n, intent in enumerate(intents):
+            record_webhook_event(webhook_body(intent.paystack_reference, transaction_id=n))
+        # Both claimed by workers that died; the first has used up its attempts
+        PaystackWebhookEvent.objects.update(status='PROCESSING', claimed_at=timezone.now() - timedelta(hours=1))
+        PaystackWebhookEvent.objects.filter(reference=intents[0].paystack_reference).update(attempts=MAX_ATTEMPTS)
+        paystack = FakePaystack()
+
+        result = process_paystack_events(service=paystack)
+
+        assert (result.events, paystack.calls) == (1, [intents[1].paystack_reference])
+        event = PaystackWebhookEvent.objects.get(reference=intents[0].paystack_reference)
+        assert event.status == 'FAILED' and 'Abandoned' in event.last_error
+
+    def test_command_drains_all_batches(self, patient, receptionist_user, service, monkeypatch):
+        intents = open_intents(patient, receptionist_user, service, 5)
+        for n, intent in enumerate(intents):
+            record_webhook_event(webhook_body(intent.paystack_reference, transaction_id=n))
+        monkeypatch.setattr('apps.billing.paystack_event_processing.PaystackVisitService', FakePaystack)
+        out = io.StringIO()
+
+        call_command('process_paystack_events', batch_size=2, stdout=out)
+
+        assert 'Processed 5 event(s) in 3 batch(es): verified 5' in out.getvalue()
+
+        assert not PaystackWebhookEvent.objects.exclude(status='PROCESSED').exists()
+        assert PaymentIntent.objects.filter(status='VERIFIED').count() == 5
+
+
+@pytest.mark.django_db
+class TestBulkReconcile:
+
+    def test_pending_intents_are_verified_concurrently(self, patient, receptionist_user, service):
+        intents = open_intents(patient, receptionist_user, service, 20)
+        recent = open_intents(patient, receptionist_user, service, 1, age=timedelta(0))[0]
+        statuses = {intents[0].paystack_reference: 'failed', intents[1].paystack_reference: 'abandoned'}
+        paystack = FakePaystack(statuses=statuses, delay=0.2)
+
+        started = time.perf_counter()
+        result = reconcile_pending_intents(max_workers=10, service=paystack)
+        elapsed = time.perf_counter() - started
+
+        assert (result.references, result.verified, result.failed, result.pending) == (20, 18, 1, 1)
+        assert recent.paystack_reference not in paystack.calls
+        assert AuditLog.objects.filter(action='PAYSTACK_PAYMENT_RECONCILED').count() == 18
+        assert dict(PaymentIntent.objects.values_list('paystack_reference', 'status'))[
+            intents[1].paystack_reference
+        ] == 'INITIALIZED'
+        # 20 calls of 200 ms each, ten at a time (serial verification alone would take 4 s)
+        assert elapsed < 20 * 0.2
@@ -0,0 +1,135 @@
+"""
+Tests for the aggregate-based end-of-day reconciliation and intraday totals.
+"""
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.billing.billing_line_item_models import BillingLineItem
+from apps.billing import reconciliation_signals
+from apps.billing.models import Payment
+from apps.billing.reconciliation_models import DailyPaymentTotal
+from apps.billing.reconciliation_service import ReconciliationService
+from apps.billing.service_catalog_models import ServiceCatalog
+from apps.visits.models import Visit
+
+
+@pytest.fixture
+def service():
+    return ServiceCatalog.objects.create(
+        service_code='RECON-CONSULT',
+        name='Consultation',
+        department='CONSULTATION',
+        category='CONSULTATION',
+        workflow_type='GOPD_CONSULT',
+        amount=Decimal('5000.00'),
+        is_active=True,
+        bill_timing='BEFORE',
+        allowed_roles=['DOCTOR'],
+    )
+
+
+def bill_day(patient, receptionist, service, visit_count, methods=('CASH', 'PAYSTACK', 'INSURANCE')):
+    """Open `visit_count` part-paid visits for the patient, cycling the payment methods."""
+    for i in range(visit_count):
+        visit = Visit.objects.create(patient=patient, status='OPEN', payment_status='PARTIALLY_PAID')
+        BillingLineItem.objects.create(
+            service_catalog=service,
+            visit=visit,
+            amount=Decimal('5000.00'),
+            created_by=receptionist,
+        )
+        Payment.objects.create(
+            visit=visit,
+            amount=Decimal('1000.00'),
+            payment_method=methods[i % len(methods)],
+            status='CLEARED',
+            processed_by=receptionist,
+        )
+
+
+@pytest.mark.django_db
+class TestReconciliationEngine:
+
+    def test_totals_and_details(self, patient, receptionist_user, service):
+        bill_day(patient, receptionist_user, service, 3)
+        reconciliation = ReconciliationService.create_reconciliation(prepared_by_id=receptionist_user.id, close_active_visits=True)
+
+        assert reconciliation.total_cash == Decimal('1000.00')
+        assert reconciliation.total_paystack == Decimal('1000.00')
+        assert reconciliation.total_hmo == Decimal('1000.00')
+        assert reconciliation.total_insurance == Decimal('1000.00')
+        assert reconciliation.total_revenue == Decimal('3000.00')
+        assert reconciliation.total_visits == 3
+        assert reconciliation.active_visits_closed == 3
+        assert reconciliation.outstanding_visits_count == 3
+        assert reconciliation.total_outstanding == Decimal('15000.00')
+
+        details = reconciliation.reconciliation_details
+        assert details['billing']['pending_items'] == 3
+        assert len(details['outstanding']['items']) == 3
+        assert details['payments']['count'] == 3
+        assert {p['payment_method'] for p in details['payments']['items']} == {'CASH', 'PAYSTACK', 'INSURANCE'}
+
+    def test_query_count_independent_of_volume(self, patient, receptionist_user, service):
+        bill_day(patient, receptionist_user, service, 2)
+        reconciliation = ReconciliationService.create_reconciliation(prepared_by_id=receptionist_user.id, close_active_visits=False)
+        with CaptureQueriesContext(connection) as small:
+            ReconciliationService.refresh_reconciliation(reconciliation.pk)
+
+        bill_day(patient, receptionist_user, service, 12)
+        with CaptureQueriesContext(connection) as large:
+            ReconciliationService.refresh_reconciliation(reconciliation.pk)
+
+        # The larger day may have to rewrite drifted intraday rows; nothing per payment
+        assert len(large.captured_queries) <= len(small.captured_queries) + 2
+
+    def test_intraday_totals_follow_payment_events(self, patient, receptionist_user, service):
+        bill_day(patient, receptionist_user, service, 2, methods=('CASH',))
+        totals = ReconciliationService.get_intraday_totals()
+        assert totals['payment_methods']['cash'] == 2000.0
+        assert totals['payment_count'] == 2
+
+        payment = Payment.objects.filter(payment_method='CASH').first()
+        payment.status = 'REFUNDED'
+        payment.save()
+        assert ReconciliationService.get_intraday_totals()['payment_methods']['cash'] == 1000.0
+
+        Payment.objects.filter(payment_method='CASH', status='CLEARED').delete()
+        assert ReconciliationService.get_intraday_totals()['total_revenue'] == 0.0
+
+    def test_failed_delta_rolls_back_only_itself(self, patient, receptionist_user, service):
+        bill_day(patient, receptionist_user, service, 1, methods=('CASH',))
+        payment = Payment.objects.get(payment_method='CASH')
+        apply = reconciliation_signals.apply_payment_delta
+
+        def fail_on_credit(day, method, count_delta, amount_delta):
+            if count_delta > 0:
+                raise DatabaseError('deadlock detected')
+            apply(day, method, count_delta, amount_delta)
+
+        with transaction.atomic():
+            payment.amount = Decimal('1500.00')
+            with mock.patch.object(reconciliation_signals, 'apply_payment_delta', side_effect=fail_on_credit):
+                payment.save()
+            # The caller's transaction is still usable
+            assert Payment.objects.get(pk=payment.pk).amount == Decimal('1500.00')
+
+        # The debit that went through before the failure was rolled back with it
+        row = DailyPaymentTotal.objects.get(date=timezone.localdate(), payment_method='CASH')
+        assert (row.payment_count, row.total_amount) == (1, Decimal('1000.00'))
+
+    def test_reconciliation_repairs_drifted_intraday_totals(self, patient, receptionist_user, service):
+        bill_day(patient, receptionist_user, service, 2, methods=('WALLET',))
+        # Bulk update bypasses signals
+        Payment.objects.filter(payment_method='WALLET').update(amount=Decimal('2500.00'))
+        assert ReconciliationService.get_intraday_totals()['payment_methods']['wallet'] == 2000.0
+
+        reconciliation = ReconciliationService.create_reconciliation(prepared_by_id=receptionist_user.id, close_active_visits=False)
+        assert reconciliation.total_wallet == Decimal('5000.00')
+        row = DailyPaymentTotal.objects.get(date=timezone.localdate(), payment_method='WALLET')
+        assert (row.payment_count, row.total_amount) == (2, Decimal('5000.00'))
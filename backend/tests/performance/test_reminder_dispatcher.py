@@ -0,0 +1,86 @@
+"""
+Tests for the batched appointment reminder dispatcher.
+"""
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.appointments.models import Appointment
+from apps.notifications.models import AppointmentReminder, ReminderDispatchCursor
+from apps.notifications.reminder_dispatcher import ReminderDispatcher
+
+
+def book(patient, doctor, receptionist, count, hours_ahead):
+    """Book `count` appointments for the patient, a minute apart."""
+    return [
+        Appointment.objects.create(
+            patient=patient,
+            doctor=doctor,
+            created_by=receptionist,
+            appointment_date=timezone.now() + timedelta(hours=hours_ahead, minutes=i),
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def patient(patient):
+    # Reminders go out over WhatsApp
+    patient.phone = '08030000001'
+    patient.save(update_fields=['phone'])
+    return patient
+
+
+@pytest.mark.django_db
+class TestReminderDispatcher:
+
+    def test_sends_each_due_reminder_once(self, patient, doctor_user, receptionist_user):
+        book(patient, doctor_user, receptionist_user, 5, hours_ahead=24)
+
+        first = ReminderDispatcher('whatsapp', hours_before=24, max_workers=4).run()
+        assert (first.selected, first.sent, first.failed) == (5, 5, 0)
+        assert AppointmentReminder.objects.filter(hours_before=24, status='SENT').count() == 5
+
+        second = ReminderDispatcher('whatsapp', hours_before=24, max_workers=4).run()
+        assert second.selected == 0
+        assert AppointmentReminder.objects.filter(hours_before=24).count() == 5
+
+    def test_query_count_does_not_grow_with_batch_size(self, patient, doctor_user, receptionist_user):
+        book(patient, doctor_user, receptionist_user, 3, hours_ahead=24)
+        with CaptureQueriesContext(connection) as small:
+            ReminderDispatcher('whatsapp', hours_before=24, max_workers=1).run()
+
+        AppointmentReminder.objects.all().delete()
+        ReminderDispatchCursor.objects.all().delete()
+        book(patient, doctor_user, receptionist_user, 15, hours_ahead=24)
+        with CaptureQueriesContext(connection) as large:
+            ReminderDispatcher('whatsapp', hours_before=24, max_workers=1).run()
+
+        assert len(large.captured_queries) == len(small.captured_queries)
+
+    def test_catches_up_after_downtime(self, patient, doctor_user, receptionist_user):
+        # Appointment now 18h away: its 24h reminder fell due while cron was down
+        book(patient, doctor_user, receptionist_user, 1, hours_ahead=18)
+        ReminderDispatchCursor.objects.create(
+            channel='whatsapp', hours_before=24, dispatched_until=timezone.now() - timedelta(hours=8),
+        )
+        result = ReminderDispatcher('whatsapp', hours_before=24).run()
+        assert result.sent == 1
+
+        cursor = ReminderDispatchCursor.objects.get(channel='whatsapp', hours_before=24)
+        assert cursor.dispatched_until > timezone.now() - timedelta(minutes=1)
+
+    def test_first_run_only_covers_current_window(self, patient, doctor_user, receptionist_user):
+        book(patient, doctor_user, receptionist_user, 1, hours_ahead=18)
+        result = ReminderDispatcher('whatsapp', hours_before=24).run()
+        assert result.selected == 0
+
+    def test_provider_failure_marks_reminder_failed(self, patient, doctor_user, receptionist_user, settings):
+        settings.WHATSAPP_STUB_ALWAYS_FAIL = True
+        book(patient, doctor_user, receptionist_user, 2, hours_ahead=2)
+        result = ReminderDispatcher('whatsapp', hours_before=2).run()
+        assert (result.sent, result.failed) == (0, 2)
+        assert AppointmentReminder.objects.filter(hours_before=2, status='FAILED').count() == 2
@@ -0,0 +1,209 @@
+"""
+Tests for request metrics: per-route histograms, sampling, the query dump header and /api/v1/metrics/.
+"""
+import json
+import time
+
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from core.middleware.request_metrics import RequestMetricsMiddleware
+from core.request_metrics import Histogram, MetricsRegistry, RequestSample, activate_sample, deactivate_sample, registry
+
+PATIENTS_URL = '/api/v1/patients/'
+
+
+def metrics_settings(settings, **overrides):
+    return {**settings.EMR_SETTINGS, 'REQUEST_METRICS': {**settings.EMR_SETTINGS['REQUEST_METRICS'], **overrides}}
+
+
+@pytest.fixture
+def admin_user():
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    user = User(username='metrics_admin', email='metrics_admin@test.com', role='ADMIN')
+    user.set_password('testpass123')
+    user.save()
+    return user
+
+
+@pytest.fixture
+def admin_token(admin_user):
+    from rest_framework_simplejwt.tokens import RefreshToken
+    return str(RefreshToken.for_user(admin_user).access_token)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def patients_series():
+    for (method, route), series in registry._series.items():
+        if method == 'GET' and route.startswith('api/v1/patients/'):
+            return series
+    return None
+
+
+class TestHistogram:
+
+    def test_cumulative_buckets_and_render(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        assert histogram.cumulative() == [(0.1, 2), (1.0, 3), ('+Inf', 4)]
+        assert histogram.sum == pytest.approx(3.65)
+
+        metrics = MetricsRegistry()
+        sample = RequestSample()
+        sample.queries, sample.db_seconds, sample.cache_hits = 3, 0.002, 2
+        metrics.record('GET', 'api/v1/visits/<int:pk>/', 200, 0.03, size=512, sample=sample)
+        metrics.record('GET', 'api/v1/visits/<int:pk>/', 404, 0.01, size=40)
+        text = metrics.render()
+
+        labels = 'method="GET",route="api/v1/visits/<int:pk>/"'
+        assert f'emr_http_requests_total{{{labels},status="200"}} 1' in text
+        assert f'emr_http_requests_total{{{labels},status="404"}} 1' in text
+        assert f'emr_http_request_duration_seconds_count{{{labels}}} 2' in text
+        assert f'emr_http_request_db_queries_bucket{{{labels},le="5"}} 1' in text
+        assert f'emr_http_sampled_requests_total{{{labels}}} 1' in text
+        assert f'emr_http_cache_hits_total{{{labels}}} 2' in text
+        assert '# TYPE emr_http_request_duration_seconds histogram' in text
+
+
+@pytest.mark.django_db
+class TestRequestMetricsMiddleware:
+
+    def test_sampled_request_records_queries_and_cache(self, settings, receptionist_user, patient):
+        settings.EMR_SETTINGS = metrics_settings(settings, SAMPLE_RATE=1.0)
+        client = APIClient()
+        client.force_authenticate(user=receptionist_user)
+
+        response = client.get(PATIENTS_URL)
+
+        assert response.status_code == 200
+        series = patients_series()
+        assert series is not None
+        assert series.statuses == {200: 1}
+        assert series.sampled == 1
+        assert series.queries.sum > 0
+        assert series.size.sum == len(response.content)
+        assert 'X-Query-Count' not in response
+
+    def test_unsampled_request_is_still_timed(self, settings, receptionist_user):
+        settings.EMR_SETTINGS = metrics_settings(settings, SAMPLE_RATE=0.0)
+        client = APIClient()
+        client.force_authenticate(user=receptionist_user)
+
+        client.get(PATIENTS_URL)
+
+        series = patients_series()
+        assert series.duration.count == 1
+        assert series.sampled == 0
+        assert series.queries.count == 0
+
+    def test_cache_hits_and_misses_count_inside_sample(self):
+        sample = RequestSample()
+        token = activate_sample(sample)
+        try:
+            cache.set('request-metrics-probe', 1)
+            cache.get('request-metrics-probe')
+            cache.get('request-metrics-missing')
+            cache.get_many(['request-metrics-probe', 'request-metrics-missing'])
+        finally:
+            deactivate_sample(token)
+        cache.get('request-metrics-probe')  # outside the sample: not counted
+
+        assert (sample.cache_hits, sample.cache_misses) == (2, 2)
+
+    def test_debug_header_dumps_slowest_queries_for_admin(self, settings, admin_token, patient):
+        settings.EMR_SETTINGS = metrics_settings(settings, SAMPLE_RATE=0.0)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {admin_token}')
+
+        response = client.get(PATIENTS_URL, HTTP_X_DEBUG_QUERIES='1')
+
+        assert response.status_code == 200
+        assert int(response['X-Query-Count']) > 0
+        assert float(response['X-Query-Time-Ms']) >= 0
+        slowest = json.loads(response['X-Slow-Queries'])
+        assert 0 < len(slowest) <= 5
+        assert all('SELECT' in sql.upper() for _, sql in slowest)
+        assert patients_series().sampled == 1
+
+    def test_debug_header_ignored_for_other_roles(self, settings, receptionist_token):
+        settings.EMR_SETTINGS = metrics_settings(settings, SAMPLE_RATE=0.0)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {receptionist_token}')
+
+        response = client.get(PATIENTS_URL, HTTP_X_DEBUG_QUERIES='1')
+
+        assert 'X-Query-Count' not in response
+        assert 'X-Slow-Queries' not in response
+        # Not sampled either: the header cannot force query capture
+        assert patients_series().sampled == 0
+
+    def test_debug_header_ignored_without_valid_token(self, settings):
+        settings.EMR_SETTINGS = metrics_settings(settings, SAMPLE_RATE=0.0)
+        client = APIClient()
+
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer not-a-token'}):
+            response = client.get(PATIENTS_URL, HTTP_X_DEBUG_QUERIES='1', **headers)
+            assert response.status_code == 401
+            assert 'X-Query-Count' not in response
+        assert patients_series().sampled == 0
+
+    def test_disabled_records_nothing(self, settings, receptionist_user):
+        settings.EMR_SETTINGS = metrics_settings(settings, ENABLED=False)
+        client = APIClient()
+        client.force_authenticate(user=receptionist_user)
+
+        client.get(PATIENTS_URL)
+
+        assert patients_series() is None
+
+    def test_unsampled_overhead_is_small(self, settings):
+        settings.EMR_SETTINGS = metrics_settings(settings, SAMPLE_RATE=0.0)
+        request = RequestFactory().get('/api/v1/health/')
+        response = HttpResponse(b'ok')
+        middleware = RequestMetricsMiddleware(lambda request: response)
+        iterations = 2000
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            middleware(request)
+        per_request_us = (time.perf_counter() - started) / iterations * 1_000_000
+
+        # Well under 1% of a typical 10-50 ms API request
+        assert per_request_us < 100
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+
+    def test_admin_gets_prometheus_text(self, admin_user, receptionist_user):
+        client = APIClient()
+        client.force_authenticate(user=receptionist_user)
+        client.get(PATIENTS_URL)
+
+        client.force_authenticate(user=admin_user)
+        response = client.get('/api/v1/metrics/')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        body = response.content.decode()
+        assert '# TYPE emr_http_requests_total counter' in body
+        assert 'route="api/v1/patients/' in body
+
+    def test_other_roles_are_denied(self, receptionist_user):
+        client = APIClient()
+        assert client.get('/api/v1/metrics/').status_code in (401, 403)
+
+        client.force_authenticate(user=receptionist_user)
+        assert client.get('/api/v1/metrics/').status_code == 403
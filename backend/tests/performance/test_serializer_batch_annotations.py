@@ -0,0 +1,93 @@
+"""
+Tests for batch-annotated serializer method fields (patient insurance, visit lists).
+"""
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.billing.bill_models import InsurancePolicy, InsuranceProvider
+from apps.patients.models import Patient
+from apps.patients.serializers import PatientSerializer, patient_has_active_insurance
+from apps.visits.models import Visit
+from apps.visits.serializers import VisitReadSerializer
+
+
+@pytest.fixture
+def insured_patients():
+    """30 patients: a third insured, a third with an expired latest policy, a third uninsured."""
+    provider = InsuranceProvider.objects.create(name='NHIA', code='NHIA')
+    today = timezone.now().date()
+    patients = []
+    for i in range(30):
+        patient = Patient.objects.create(first_name=f'P{i}', last_name='Batch', patient_id=f'BATCH{i:03d}')
+        if i % 3 == 0:
+            InsurancePolicy.objects.create(
+                patient=patient, provider=provider, policy_number=f'POL{i}', valid_from=today - timedelta(days=30),
+            )
+        elif i % 3 == 1:
+            InsurancePolicy.objects.create(
+                patient=patient, provider=provider, policy_number=f'OLD{i}', valid_from=today - timedelta(days=30),
+            )
+            # The latest active policy decides, as in the per-row check
+            InsurancePolicy.objects.create(
+                patient=patient, provider=provider, policy_number=f'EXP{i}',
+                valid_from=today - timedelta(days=20), valid_to=today - timedelta(days=1),
+            )
+        patients.append(patient)
+    return patients
+
+
+@pytest.mark.django_db
+class TestPatientInsuranceBatching:
+
+    def test_list_prefetches_insurance_in_one_query(self, insured_patients):
+        expected = {p.pk: patient_has_active_insurance(p) for p in insured_patients}
+        assert sum(expected.values()) == 10
+
+        patients = list(Patient.objects.filter(last_name='Batch'))
+        with CaptureQueriesContext(connection) as ctx:
+            data = PatientSerializer(patients, many=True).data
+        # Insurance policies, plus the latest medical history segment ids
+        assert len(ctx.captured_queries) == 2
+        assert {row['id']: row['has_active_insurance'] for row in data} == expected
+
+    def test_annotated_queryset_needs_no_extra_queries(self, insured_patients):
+        expected = {p.pk: patient_has_active_insurance(p) for p in insured_patients}
+
+        queryset = PatientSerializer.annotate_queryset(Patient.objects.filter(last_name='Batch'))
+        with CaptureQueriesContext(connection) as ctx:
+            data = PatientSerializer(queryset, many=True).data
+        # Patients themselves, plus the latest medical history segment ids
+        assert len(ctx.captured_queries) == 2
+        assert {row['id']: row['has_active_insurance'] for row in data} == expected
+
+    def test_retrieve_endpoint_uses_annotation(self, insured_patients, receptionist_user):
+        client = APIClient()
+        client.force_authenticate(user=receptionist_user)
+
+        insured = client.get(f'/api/v1/patients/{insured_patients[0].pk}/')
+        expired = client.get(f'/api/v1/patients/{insured_patients[1].pk}/')
+
+        assert insured.data['has_active_insurance'] is True
+        assert expired.data['has_active_insurance'] is False
+
+
+@pytest.mark.django_db
+class TestVisitListBatching:
+
+    def test_visit_list_loads_relations_once(self, insured_patients, doctor_user):
+        for patient in insured_patients[:20]:
+            Visit.objects.create(patient=patient, status='OPEN', payment_status='PAID', assigned_doctor=doctor_user)
+
+        visits = list(Visit.objects.filter(patient__last_name='Batch'))
+        with CaptureQueriesContext(connection) as ctx:
+            data = VisitReadSerializer(visits, many=True).data
+        # One query each for patients and assigned doctors, whatever the list length
+        assert len(ctx.captured_queries) == 2
+        assert len(data) == 20
+        assert data[0]['patient_retainership']['has_retainership'] is False
+        assert data[0]['assigned_doctor_name'].startswith('Dr.')
@@ -0,0 +1,93 @@
+"""
+Tests for startup time: boot budget, lazy heavy imports and the startup profiler.
+"""
+import sys
+
+import pytest
+
+from core.lazy_imports import HEAVY_MODULES, lazy_import, module_available
+from core.startup_profile import framework_baseline_ms, parse_importtime, profile_startup, summarize
+
+# Multiples of a bare Django + third-party apps boot on the same machine;
+# measured at about 1.9x for django.setup() and 1.6x for the URL conf.
+SETUP_BUDGET_RATIO = 3
+URLS_BUDGET_RATIO = 2.5
+
+
+@pytest.fixture(scope='module')
+def startup_report():
+    return profile_startup(include_urls=True)
+
+
+@pytest.fixture(scope='module')
+def baseline_ms():
+    return framework_baseline_ms()
+
+
+class TestBootBudget:
+
+    def test_setup_and_url_loading_stay_within_budget(self, startup_report, baseline_ms):
+        phases = startup_report['phases']
+
+        assert phases['setup_ms'] < SETUP_BUDGET_RATIO * baseline_ms
+        assert phases['urls_ms'] < URLS_BUDGET_RATIO * baseline_ms
+
+    def test_heavy_libraries_are_not_imported_at_boot(self, startup_report):
+        loaded = [name for name in HEAVY_MODULES if name in startup_report['loaded_modules']]
+
+        assert loaded == []
+
+    def test_report_covers_every_app(self, startup_report):
+        apps = startup_report['apps']
+
+        assert 'apps.billing' in apps
+        assert apps['apps.billing']['own_ms'] > 0
+        # ready() connects the billing signal receivers
+        assert apps['apps.billing']['ready_ms'] > 0
+        assert startup_report['entry_points'][0]['imported_by']
+
+
+class TestImportTrace:
+
+    TRACE = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       100 |        100 |     numpy.core',
+        'import time:       400 |        500 |   numpy',
+        'import time:      2000 |       2500 | pandas',
+        'import time:       200 |        200 |   apps.billing.price_lists',
+        'import time:       300 |       3000 | apps.billing.service_import_views',
+    ])
+
+    def test_parents_and_app_attribution(self):
+        rows = parse_importtime(self.TRACE)
+        parents = {row['name']: row['parent'] for row in rows}
+
+        assert parents == {
+            'numpy.core': 'numpy',
+            'numpy': 'pandas',
+            'pandas': None,
+            'apps.billing.price_lists': 'apps.billing.service_import_views',
+            'apps.billing.service_import_views': None,
+        }
+        report = summarize(rows, ['apps.billing'], {'apps.billing': 1.5})
+        assert report['apps']['apps.billing'] == {'own_ms': 0.5, 'inclusive_ms': 0.5, 'ready_ms': 1.5}
+        assert report['entry_points'][0] == {'module': 'numpy', 'cumulative_ms': 0.5, 'imported_by': 'pandas'}
+
+
+class TestLazyImports:
+
+    def test_module_is_imported_on_first_attribute_access(self):
+        module = lazy_import('core.lazy_imports_probe')
+        assert not module.loaded
+        assert 'core.lazy_imports_probe' not in sys.modules
+
+        with pytest.raises(ImportError):
+            module.anything
+
+        json_module = lazy_import('json')
+        assert json_module.dumps({'a': 1}) == '{"a": 1}'
+        assert json_module.loaded
+
+    def test_module_available_does_not_import(self):
+        assert module_available('json')
+        assert not module_available('core.lazy_imports_probe')
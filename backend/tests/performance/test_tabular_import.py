@@ -0,0 +1,153 @@
+"""
+Tests for the bulk tabular import engine (service catalog and drug catalog).
+"""
+import csv
+import time
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.billing.service_catalog_import import import_services
+from apps.billing.service_catalog_models import ServiceCatalog
+from apps.pharmacy.models import Drug, DrugInventory
+
+BENCHMARK_ROWS = 50000
+# ~10 s on SQLite; the budget leaves room for slower CI machines
+BENCHMARK_SECONDS = 30
+
+
+def service_rows(count, amount='1500', start=0):
+    return [
+        {
+            'Department': 'HEMATOLOGY' if i % 2 else 'PROCEDURE',
+            'Service Code': f'SVC-{i:05d}',
+            'Service Name': f'Service {i}',
+            'Amount': amount,
+            'Allowed Roles': 'DOCTOR, NURSE',
+        }
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.mark.django_db
+class TestServiceCatalogImport:
+
+    def test_creates_then_updates(self):
+        stats = import_services(service_rows(4))
+        assert (stats['created'], stats['skipped'], stats['errors']) == (4, 0, [])
+        lab = ServiceCatalog.objects.get(service_code='SVC-00001')
+        assert (lab.department, lab.workflow_type, lab.description) == ('LAB', 'LAB_ORDER', '[HEMATOLOGY]')
+        assert lab.allowed_roles == ['DOCTOR', 'NURSE']
+
+        rows = service_rows(4)
+        rows[0]['Amount'] = '2000'
+        stats = import_services(rows, update_existing=True)
+        assert (stats['created'], stats['updated'], stats['unchanged']) == (0, 1, 3)
+        assert ServiceCatalog.objects.get(service_code='SVC-00000').amount == Decimal('2000')
+
+        stats = import_services(rows)
+        assert stats['skipped'] == 4
+
+    def test_field_limits_are_row_errors(self):
+        rows = service_rows(3)
+        rows[1]['Service Name'] = 'N' * 300
+        rows[2]['Amount'] = '123456789012'
+
+        stats = import_services(rows)
+        assert stats['created'] == 1
+        assert [error.split(':')[0] for error in stats['errors']] == ['Row 2', 'Row 3']
+        assert ServiceCatalog.objects.count() == 1
+
+    def test_column_validation_errors(self):
+        rows = service_rows(6)
+        rows[1]['Amount'] = 'abc'
+        rows[2]['Amount'] = '0'
+        rows[3]['Department'] = 'KITCHEN'
+        rows[4]['Allowed Roles'] = 'DOCTOR, JANITOR'
+        rows[5]['Service Code'] = rows[0]['Service Code']
+
+        stats = import_services(rows)
+        assert stats['created'] == 1
+        assert stats['skipped'] == 5
+        assert stats['errors'][0] == "Row 2: Invalid amount 'abc'"
+        assert stats['errors'][1] == "Row 3: Amount must be greater than zero"
+        assert stats['errors'][2].startswith("Row 4: Invalid department 'KITCHEN'")
+        assert stats['errors'][3].startswith("Row 5: Invalid roles: JANITOR")
+        assert stats['errors'][4] == "Row 6: Duplicate service_code 'SVC-00000' (also in row 1)"
+
+    def test_dry_run_reports_diff_without_writing(self):
+        import_services(service_rows(2))
+        rows = service_rows(3)
+        rows[0]['Service Name'] = 'Renamed'
+
+        stats = import_services(rows, update_existing=True, dry_run=True)
+        assert stats['diff']['create'] == [{'row': 3, 'service_code': 'SVC-00002'}]
+        assert stats['diff']['update'] == [
+            {'row': 1, 'service_code': 'SVC-00000', 'changes': {'name': ['Service 0', 'Renamed']}},
+        ]
+        assert ServiceCatalog.objects.count() == 2
+        assert ServiceCatalog.objects.get(service_code='SVC-00000').name == 'Service 0'
+
+    def test_benchmark_50k_rows(self):
+        import_services(service_rows(BENCHMARK_ROWS // 2))
+        rows = service_rows(BENCHMARK_ROWS, amount='1750')
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            stats = import_services(rows, update_existing=True)
+        elapsed = time.perf_counter() - started
+
+        assert stats['created'] == BENCHMARK_ROWS // 2
+        assert stats['updated'] == BENCHMARK_ROWS // 2
+        # Prefetches and batched writes only (SQLite caps rows per INSERT/UPDATE)
+        assert len(ctx.captured_queries) < BENCHMARK_ROWS // 25
+        assert elapsed < BENCHMARK_SECONDS
+
+
+@pytest.mark.django_db
+class TestDrugCatalogImport:
+
+    def write_csv(self, path, rows):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def test_upsert_with_inventory_and_catalog_sync(self, pharmacist_user, tmp_path):
+        Drug.objects.create(name='Paracetamol', sales_price=Decimal('50.00'), created_by=pharmacist_user)
+        path = tmp_path / 'drugs.csv'
+        self.write_csv(path, [
+            {'name': 'PARACETAMOL', 'drug_code': '', 'price': '60', 'stock': '10', 'unit': 'tabs'},
+            {'name': 'Amoxicillin', 'drug_code': 'AMX', 'price': '1,200', 'stock': '', 'unit': ''},
+            {'name': '', 'drug_code': 'X', 'price': '10', 'stock': '', 'unit': ''},
+            {'name': 'Cheap', 'drug_code': '', 'price': '-5', 'stock': '', 'unit': ''},
+        ])
+
+        call_command(
+            'import_drug_catalog', str(path), update=True, with_inventory=True,
+            user=pharmacist_user.username, stdout=StringIO(),
+        )
+
+        assert Drug.objects.count() == 2
+        assert Drug.objects.get(name='PARACETAMOL').sales_price == Decimal('60')
+        assert Drug.objects.get(drug_code='AMX').sales_price == Decimal('1200')
+        inventory = DrugInventory.objects.get(drug__drug_code='AMX')
+        assert (inventory.current_stock, inventory.unit) == (Decimal('0'), 'units')
+        assert DrugInventory.objects.get(drug__name='PARACETAMOL').unit == 'tabs'
+        assert ServiceCatalog.objects.get(service_code='DRUG-AMX').amount == Decimal('1200')
+
+    def test_dry_run_leaves_database_untouched(self, pharmacist_user, tmp_path):
+        path = tmp_path / 'drugs.csv'
+        self.write_csv(path, [{'name': f'Drug {i}', 'price': '100'} for i in range(20)])
+
+        call_command(
+            'import_drug_catalog', str(path), dry_run=True,
+            user=pharmacist_user.username, stdout=StringIO(),
+        )
+
+        assert not Drug.objects.exists()
+        assert not ServiceCatalog.objects.exists()
@@ -0,0 +1,115 @@
+"""
+Tests for timeline event insertion (insert-or-ignore, per-transaction batching) and the backfill.
+"""
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.consultations.models import Consultation
+from apps.laboratory.models import LabOrder
+from apps.patients.models import Patient
+from apps.visits.models import Visit
+from apps.visits.timeline_events import EVENT_SOURCES
+from apps.visits.timeline_models import TimelineEvent
+from apps.visits.timeline_signals import create_timeline_event
+
+
+def timeline_inserts(ctx):
+    return [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT') and 'timeline_events' in q['sql']]
+
+
+@pytest.mark.django_db
+class TestTimelineWrites:
+
+    def test_events_of_a_transaction_are_written_in_one_insert(self, patient, doctor_user,
+                                                               django_capture_on_commit_callbacks):
+        with CaptureQueriesContext(connection) as ctx:
+            with django_capture_on_commit_callbacks(execute=True):
+                with transaction.atomic():
+                    visit = Visit.objects.create(patient=patient, status='OPEN', payment_status='PAID')
+                    consultation = Consultation.objects.create(visit=visit, created_by=doctor_user)
+                    for tests in (['CBC'], ['LFT'], ['U&E']):
+                        LabOrder.objects.create(visit=visit, consultation=consultation, ordered_by=doctor_user,
+                                                tests_requested=tests)
+
+        assert len(timeline_inserts(ctx)) == 1
+        # No lookups for existing events either
+        assert not [q for q in ctx.captured_queries if 'timeline_events' in q['sql'] and q['sql'].startswith('SELECT')]
+        assert list(TimelineEvent.objects.filter(visit=visit).values_list('event_type', flat=True)) == [
+            'VISIT_CREATED', 'CONSULTATION_STARTED', 'LAB_ORDERED', 'LAB_ORDERED', 'LAB_ORDERED',
+        ]
+        assert TimelineEvent.objects.get(event_type='VISIT_CREATED').description == (
+            f"Visit #{visit.pk} created for {patient.get_full_name()}"
+        )
+
+    def test_duplicates_are_skipped_and_rolled_back_savepoints_dropped(self, open_visit_with_payment, doctor_user,
+                                                                        django_capture_on_commit_callbacks):
+        visit = open_visit_with_payment
+        # Each block opens its own savepoint, as a request's transaction would
+        with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+            create_timeline_event(visit, 'PROCEDURE_ORDERED', 'Dressing', actor=doctor_user,
+                                  source_type='procedure_task', source_id=7)
+        with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+            create_timeline_event(visit, 'PROCEDURE_ORDERED', 'Dressing again', source_type='procedure_task',
+                                  source_id=7)
+            try:
+                with transaction.atomic():
+                    create_timeline_event(visit, 'PROCEDURE_ORDERED', 'Rolled back', source_type='procedure_task',
+                                          source_id=8)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            create_timeline_event(visit, 'PROCEDURE_COMPLETED', 'Dressing done', source_type='procedure_task',
+                                  source_id=7)
+
+        events = TimelineEvent.objects.filter(visit=visit, source_type='procedure_task')
+        assert sorted(events.values_list('description', flat=True)) == ['Dressing', 'Dressing done']
+        assert events.get(event_type='PROCEDURE_ORDERED').actor_role == doctor_user.role
+
+    def test_rolled_back_transaction_does_not_leak_into_the_next(self, open_visit_with_payment,
+                                                                 django_capture_on_commit_callbacks):
+        visit = open_visit_with_payment
+        try:
+            with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+                create_timeline_event(visit, 'PROCEDURE_ORDERED', 'Rolled back', source_type='procedure_task',
+                                      source_id=1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+            create_timeline_event(visit, 'PROCEDURE_ORDERED', 'Kept', source_type='procedure_task', source_id=2)
+
+        assert list(TimelineEvent.objects.filter(source_type='procedure_task').values_list('description', flat=True)) == [
+            'Kept',
+        ]
+
+
+@pytest.mark.django_db
+class TestTimelineBackfill:
+
+    def test_backfill_creates_missing_events_once(self, consultation, doctor_user):
+        # Signals queue events for commit, which never happens inside the test
+        # transaction: these rows look like migrated data without a timeline
+        visit = consultation.visit
+        LabOrder.objects.create(visit=visit, consultation=consultation, ordered_by=doctor_user,
+                                tests_requested=['CBC'])
+        legacy = Patient.objects.create(first_name='Old', last_name='Record', patient_id='LIFEWAYLEG42')
+        legacy_visit = Visit.objects.create(patient=legacy, status='CLOSED', payment_status='PAID')
+        assert not TimelineEvent.objects.exists()
+
+        call_command('rebuild_visit_timelines', legacy_prefix='LIFEWAYLEG', stdout=None)
+        assert list(TimelineEvent.objects.values_list('visit_id', 'event_type')) == [(legacy_visit.pk, 'VISIT_CREATED')]
+
+        call_command('rebuild_visit_timelines', stdout=None)
+        assert sorted(TimelineEvent.objects.filter(visit=visit).values_list('event_type', flat=True)) == [
+            'CONSULTATION_STARTED', 'LAB_ORDERED', 'VISIT_CREATED',
+        ]
+        event = TimelineEvent.objects.get(event_type='CONSULTATION_STARTED')
+        assert (event.timestamp, event.actor_id) == (consultation.created_at, doctor_user.pk)
+
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('rebuild_visit_timelines', stdout=None)
+        assert TimelineEvent.objects.count() == 4
+        # One read per event type and one insert per batch, never one per row
+        assert len(ctx.captured_queries) <= 2 * len(EVENT_SOURCES) + 2
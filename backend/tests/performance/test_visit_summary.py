@@ -0,0 +1,118 @@
+"""
+Tests for the consolidated visit summary endpoint (?include=, per-section ETags, cache invalidation).
+"""
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.clinical.models import VitalSigns
+from apps.laboratory.models import LabOrder
+from apps.nursing.models import NursingNote
+from apps.users.models import User
+from apps.visits.visit_summary import SECTIONS
+
+
+def summary_url(visit):
+    return f'/api/v1/visits/{visit.pk}/summary/'
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Rolled-back test transactions reuse SQLite ids, and with them the cache keys
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def nurse_user():
+    return User.objects.create_user(
+        username='test_nurse', password='testpass123', first_name='Test', last_name='Nurse', role='NURSE',
+    )
+
+
+def add_rows(consultation, doctor_user, nurse_user, count):
+    visit = consultation.visit
+    for i in range(count):
+        LabOrder.objects.create(visit=visit, consultation=consultation, ordered_by=doctor_user,
+                                tests_requested=[f'TEST{i}'])
+        VitalSigns.objects.create(visit=visit, recorded_by=doctor_user, pulse=70 + i)
+        NursingNote.objects.create(visit=visit, recorded_by=nurse_user, note_content=f'Note {i}')
+
+
+@pytest.mark.django_db
+class TestVisitSummary:
+
+    def test_all_sections_from_a_fixed_set_of_queries(self, consultation, doctor_user, nurse_user):
+        client = client_for(doctor_user)
+        add_rows(consultation, doctor_user, nurse_user, 2)
+
+        with CaptureQueriesContext(connection) as small:
+            response = client.get(summary_url(consultation.visit))
+        assert response.status_code == 200
+        sections = response.data['sections']
+        assert list(sections) == list(SECTIONS)
+        assert sections['consultation']['data']['id'] == consultation.pk
+        assert len(sections['lab_orders']['data']) == 2
+        assert sections['admission']['data'] is None
+        assert 'total_charges' in sections['billing']['data']
+
+        add_rows(consultation, doctor_user, nurse_user, 3)
+        cache.clear()
+        with CaptureQueriesContext(connection) as large:
+            response = client.get(summary_url(consultation.visit))
+        assert len(response.data['sections']['vitals']['data']) == 5
+        assert len(large.captured_queries) == len(small.captured_queries)
+
+    def test_include_and_access(self, consultation, doctor_user, receptionist_user):
+        client = client_for(doctor_user)
+
+        response = client.get(summary_url(consultation.visit), {'include': 'vitals,consultation'})
+        assert list(response.data['sections']) == ['vitals', 'consultation']
+
+        assert client.get(summary_url(consultation.visit), {'include': 'vitals,gossip'}).status_code == 400
+        assert client_for(receptionist_user).get(summary_url(consultation.visit)).status_code == 403
+
+    def test_cached_sections_are_invalidated_by_writes(self, consultation, doctor_user,
+                                                       django_capture_on_commit_callbacks):
+        client = client_for(doctor_user)
+        visit = consultation.visit
+        params = {'include': 'vitals,lab_orders,timeline'}
+        first = client.get(summary_url(visit), params)
+        etags = {name: entry['etag'] for name, entry in first.data['sections'].items()}
+
+        with CaptureQueriesContext(connection) as ctx:
+            again = client.get(summary_url(visit), params)
+        assert again['ETag'] == first['ETag']
+        # Nothing but the request's visit lookups and the audit entry
+        assert not [q for q in ctx.captured_queries if 'FROM "vital_signs"' in q['sql'] or 'FROM "lab_orders"' in q['sql']]
+
+        assert client.get(summary_url(visit), params, HTTP_IF_NONE_MATCH=first['ETag']).status_code == 304
+
+        with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+            VitalSigns.objects.create(visit=visit, recorded_by=doctor_user, pulse=88)
+            LabOrder.objects.create(visit=visit, consultation=consultation, ordered_by=doctor_user,
+                                    tests_requested=['CBC'])
+
+        known = ','.join(f'{name}:{etag}' for name, etag in etags.items())
+        changed = client.get(summary_url(visit), {**params, 'etags': known})
+        assert changed['ETag'] != first['ETag']
+        sections = changed.data['sections']
+        assert len(sections['vitals']['data']) == 1 and len(sections['lab_orders']['data']) == 1
+        # The lab order's timeline event was written at commit and invalidated its section too
+        assert [event['event_type'] for event in sections['timeline']['data']][-1] == 'LAB_ORDERED'
+        assert all(not entry.get('not_modified') for entry in sections.values())
+
+        unchanged = client.get(summary_url(visit), {'include': 'consultation', 'etags': 'consultation:x'})
+        consultation_etag = unchanged.data['sections']['consultation']['etag']
+        skipped = client.get(summary_url(visit), {'include': 'consultation',
+                                                  'etags': f'consultation:{consultation_etag}'})
+        assert skipped.data['sections']['consultation'] == {'etag': consultation_etag, 'not_modified': True}
@@ -0,0 +1,130 @@
+"""
+Tests for the wallet and telemedicine session listings (opt-in keyset pages, server-side filters).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.patients.models import Patient
+from apps.telemedicine.models import TelemedicineSession
+from apps.visits.models import Visit
+from apps.wallet.models import Wallet
+
+WALLETS_URL = '/api/v1/wallet/wallets/'
+SESSIONS_URL = '/api/v1/telemedicine/'
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def wallets():
+    created = []
+    for i, (last_name, balance) in enumerate([('Adeyemi', 0), ('Bello', 1500), ('Okafor', 250), ('Obi', 9000)]):
+        patient = Patient.objects.create(
+            first_name='Test', last_name=last_name, patient_id=f'LMC{i:04d}', phone=f'0803000{i:04d}',
+        )
+        # Patients get a wallet on creation
+        Wallet.objects.filter(patient=patient).update(balance=Decimal(balance), is_active=i != 3)
+        created.append(Wallet.objects.get(patient=patient))
+    return created
+
+
+@pytest.fixture
+def sessions(patient, doctor_user):
+    visit = Visit.objects.create(patient=patient, status='OPEN', payment_status='PAID')
+    start = timezone.now()
+    return [
+        TelemedicineSession.objects.create(
+            visit=visit, doctor=doctor_user, patient=patient, status=status,
+            scheduled_start=start + timedelta(hours=i),
+            twilio_room_sid=f'RM{i}', twilio_room_name=f'visit-{visit.pk}-{i}', created_by=doctor_user,
+        )
+        for i, status in enumerate(['COMPLETED', 'SCHEDULED', 'SCHEDULED', 'CANCELLED'])
+    ]
+
+
+@pytest.mark.django_db
+class TestWalletListing:
+
+    def test_array_by_default_and_pages_on_request(self, receptionist_user, wallets):
+        client = client_for(receptionist_user)
+
+        legacy = client.get(WALLETS_URL)
+        assert isinstance(legacy.data, list) and len(legacy.data) == 4
+
+        first = client.get(WALLETS_URL, {'page_size': 3})
+        assert [row['id'] for row in first.data['results']] == [w.pk for w in reversed(wallets)][:3]
+        second = client.get(first.data['next'])
+        assert [row['id'] for row in second.data['results']] == [wallets[0].pk]
+        assert second.data['next'] is None
+
+    def test_server_side_filters(self, receptionist_user, wallets):
+        client = client_for(receptionist_user)
+
+        def ids(**params):
+            return sorted(row['id'] for row in client.get(WALLETS_URL, params).data)
+
+        assert ids(search='ok') == [wallets[2].pk]
+        assert ids(search='lmc0001') == [wallets[1].pk]
+        assert ids(min_balance='200', max_balance='1500') == [wallets[1].pk, wallets[2].pk]
+        assert ids(is_active='false') == [wallets[3].pk]
+        assert ids(patient=wallets[0].patient_id) == [wallets[0].pk]
+        assert client.get(WALLETS_URL, {'min_balance': 'lots'}).status_code == 400
+        assert client.get(WALLETS_URL, {'patient': 'LMC000001'}).status_code == 400
+
+    def test_rows_do_not_cost_a_query_each(self, receptionist_user, wallets):
+        client = client_for(receptionist_user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(WALLETS_URL)
+
+        assert len(response.data) == 4
+        assert len(ctx.captured_queries) <= 3
+
+
+@pytest.mark.django_db
+class TestTelemedicineListing:
+
+    def test_pages_latest_first_with_status_filter(self, doctor_user, sessions):
+        client = client_for(doctor_user)
+
+        assert len(client.get(SESSIONS_URL).data) == 4
+
+        first = client.get(SESSIONS_URL, {'page_size': 1, 'status': 'SCHEDULED,COMPLETED'})
+        assert [row['id'] for row in first.data['results']] == [sessions[2].pk]
+        rest = client.get(first.data['next'].replace('page_size=1', 'page_size=10'))
+        assert [row['id'] for row in rest.data['results']] == [sessions[1].pk, sessions[0].pk]
+
+        window = {'scheduled_from': sessions[1].scheduled_start.isoformat(),
+                  'scheduled_to': sessions[2].scheduled_start.isoformat()}
+        assert sorted(row['id'] for row in client.get(SESSIONS_URL, window).data) == [sessions[1].pk, sessions[2].pk]
+        assert client.get(SESSIONS_URL, {'scheduled_from': 'tomorrow'}).status_code == 400
+
+    def test_patient_and_visit_filters_take_ids(self, doctor_user, patient, sessions):
+        client = client_for(doctor_user)
+
+        assert len(client.get(SESSIONS_URL, {'patient': patient.pk}).data) == 4
+        assert len(client.get(SESSIONS_URL, {'visit_id': sessions[0].visit_id}).data) == 4
+        response = client.get(SESSIONS_URL, {'patient': 'abc'})
+        assert response.status_code == 400
+        assert 'patient' in response.data
+        assert client.get(SESSIONS_URL, {'visit_id': 'abc'}).status_code == 400
+
+    def test_patient_sees_own_sessions_without_a_patient_lookup(self, patient_with_user, sessions):
+        patient = patient_with_user
+        client = client_for(patient.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(SESSIONS_URL)
+
+        assert len(response.data) == 4
+        assert not [q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'FROM "patients"' in q['sql']]
@@ -0,0 +1,38 @@
+#!/bin/bash
+# Periodic management commands (the images have no cron).
+# Runs as the scheduler service in docker-compose.prod.yml and in the
+# background of the standalone container (start.sh).
+# Intervals are in seconds and can be overridden from .env.
+set -u
+
+cd "${APP_DIR:-/app}"
+
+PAYSTACK_EVENTS_INTERVAL="${PAYSTACK_EVENTS_INTERVAL:-60}"
+BILL_TOTALS_INTERVAL="${BILL_TOTALS_INTERVAL:-3600}"
+SCHEDULER_TICK="${SCHEDULER_TICK:-15}"
+
+declare -A last_run
+
+# due NAME INTERVAL: true when NAME last ran at least INTERVAL seconds ago
+due() {
+  local now
+  now=$(date +%s)
+  if (( now - ${last_run[$1]:-0} >= $2 )); then
+    last_run[$1]=$now
+    return 0
+  fi
+  return 1
+}
+
+run() {
+  python manage.py "$@" || echo "scheduler: manage.py $1 failed" >&2
+}
+
+echo "Scheduler started (tick ${SCHEDULER_TICK}s)"
+while true; do
+  # Stored Paystack webhooks are only applied by this job
+  due paystack_events "$PAYSTACK_EVENTS_INTERVAL" && run process_paystack_events
+  # Repairs Bill totals written behind the models' back (queryset.update, raw SQL)
+  due bill_totals "$BILL_TOTALS_INTERVAL" && run verify_bill_totals --fix
+  sleep "$SCHEDULER_TICK"
+done
@@ -35,6 +35,9 @@ python manage.py migrate --noinput
 # Collect static files
 python manage.py collectstatic --noinput
 
+# Periodic jobs (Paystack webhook processing, ...)
+APP_DIR=/app/backend /scheduler.sh &
+
 # Start nginx in background
 nginx -g "daemon off;" &  # run in shell background so gunicorn can start
 
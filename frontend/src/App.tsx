@@ -8,6 +8,7 @@ import { BrowserRouter, Routes, Route, Navigate, useParams } from 'react-router-
 import { AuthProvider, useAuth } from './contexts/AuthContext';
 import { NotificationProvider } from './contexts/NotificationContext';
 import { ThemeProvider } from './contexts/ThemeContext';
+import { LockBatchProvider } from './contexts/LockBatchContext';
 import ProtectedRoute from './components/routing/ProtectedRoute';
 import AppShell from './components/layout/AppShell';
 import ErrorBoundary from './components/common/ErrorBoundary';
@@ -95,7 +96,11 @@ function ConsultationPageWrapper() {
     return <div>Visit ID is required</div>;
   }
 
-  return <ConsultationPage visitId={visitId} />;
+  return (
+    <LockBatchProvider>
+      <ConsultationPage visitId={visitId} />
+    </LockBatchProvider>
+  );
 }
 
 /**
@@ -282,7 +287,9 @@ function AppRoutes() {
         path="/lab-orders"
         element={
           <ProtectedRoute requiredRole="LAB_TECH">
-            <LabOrdersPage />
+            <LockBatchProvider>
+              <LabOrdersPage />
+            </LockBatchProvider>
           </ProtectedRoute>
         }
       />
@@ -292,7 +299,9 @@ function AppRoutes() {
         path="/radiology-orders"
         element={
           <ProtectedRoute requiredRole="RADIOLOGY_TECH">
-            <RadiologyOrdersPage />
+            <LockBatchProvider>
+              <RadiologyOrdersPage />
+            </LockBatchProvider>
           </ProtectedRoute>
         }
       />
@@ -312,7 +321,9 @@ function AppRoutes() {
         path="/prescriptions"
         element={
           <ProtectedRoute requiredRole="PHARMACIST">
-            <PrescriptionsPage />
+            <LockBatchProvider>
+              <PrescriptionsPage />
+            </LockBatchProvider>
           </ProtectedRoute>
         }
       />
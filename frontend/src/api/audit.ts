@@ -46,7 +46,7 @@ export async function fetchAuditLogs(filters?: AuditLogFilters): Promise<AuditLo
   const params = new URLSearchParams();
   if (filters?.visit_id) params.append('visit_id', filters.visit_id.toString());
   if (filters?.user) params.append('user', filters.user.toString());
-  if (filters?.action) params.append('action', filters.action);
+  if (filters?.action) params.append('action_prefix', filters.action);
   if (filters?.resource_type) params.append('resource_type', filters.resource_type);
   if (filters?.date_from) params.append('date_from', filters.date_from);
   if (filters?.date_to) params.append('date_to', filters.date_to);
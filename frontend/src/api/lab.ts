@@ -6,13 +6,16 @@
  * - POST   /api/v1/visits/{visitId}/laboratory/          - Create lab order (Doctor)
  * - GET    /api/v1/visits/{visitId}/laboratory/results/   - List lab results
  * - POST   /api/v1/visits/{visitId}/laboratory/results/   - Create lab result (Lab Tech)
+ *
+ * Patient-scoped:
+ * - GET    /api/v1/laboratory/trends/?patient={patientId}   - Analyte trends across visits (Doctor)
  */
 import { LabOrder, LabOrderCreateData, LabResult, LabResultCreateData } from '../types/lab';
 import { Visit } from '../types/visit';
 import { apiRequest } from '../utils/apiClient';
 
 // Re-export types for convenience
-export type { LabOrder, LabOrderCreateData, LabResult, LabResultCreateData } from '../types/lab';
+export type { LabAnalyteInput, LabOrder, LabOrderCreateData, LabResult, LabResultCreateData } from '../types/lab';
 
 interface WorklistResponse<T> {
   count: number;
@@ -68,6 +71,49 @@ export async function createLabResult(
   });
 }
 
+/**
+ * Analyte trend series; observed_at, value, delta, ... are parallel arrays, oldest first
+ */
+export interface LabAnalyteTrend {
+  analyte: string;
+  name: string;
+  reference_min: number | null;
+  reference_max: number | null;
+  observed_at: string[];
+  value: number[];
+  delta: (number | null)[];
+  flag: ('LOW' | 'NORMAL' | 'HIGH' | '')[];
+  unit: string[];
+  visit_id: number[];
+  lab_result_id: number[];
+  count: number;
+  latest: number;
+  change: number | null;
+}
+
+/**
+ * Fetch a patient's analyte trends (Doctor only)
+ */
+export async function fetchLabTrends(
+  patientId: number | string,
+  options: { analytes?: string[]; since?: string; until?: string } = {}
+): Promise<LabAnalyteTrend[]> {
+  const params = new URLSearchParams({ patient: String(patientId) });
+  if (options.analytes?.length) {
+    params.append('analyte', options.analytes.join(','));
+  }
+  if (options.since) {
+    params.append('since', options.since);
+  }
+  if (options.until) {
+    params.append('until', options.until);
+  }
+  const response = await apiRequest<{ patient_id: number; series: LabAnalyteTrend[] }>(
+    `/laboratory/trends/?${params.toString()}`
+  );
+  return response.series;
+}
+
 /**
  * Lab Test Template Types
  */
@@ -109,3 +109,34 @@ export const checkProcedureLock = async (
   return apiRequest<LockResult>(`/locks/procedure/?${params}`);
 };
 
+
+export interface BatchLockAction {
+  key?: string;
+  action_type: string;
+  etag?: string;
+  [param: string]: any;
+}
+
+export type BatchLockResult =
+  | (LockResult & { etag: string; not_modified?: false })
+  | { etag: string; not_modified: true };
+
+/**
+ * Evaluate all locks of a screen in one request.
+ *
+ * Shared params (visit_id, consultation_id) apply to every action that takes
+ * them. Pass each action's last etag to get { not_modified: true } back when
+ * its lock has not changed.
+ */
+export const evaluateLocksBatch = async (
+  actions: BatchLockAction[],
+  shared: { visit_id?: number; consultation_id?: number } = {}
+): Promise<{ results: Record<string, BatchLockResult> }> => {
+  return apiRequest<{ results: Record<string, BatchLockResult> }>('/locks/batch/', {
+    method: 'POST',
+    body: JSON.stringify({ ...shared, actions }),
+    headers: {
+      'Content-Type': 'application/json',
+    },
+  });
+};
@@ -0,0 +1,78 @@
+/**
+ * API client for the batched offline sync protocol.
+ */
+import { apiRequest } from '../utils/apiClient';
+
+export type OfflineActionType =
+  | 'RECORD_VITALS'
+  | 'CREATE_NURSING_NOTE'
+  | 'ADMINISTER_MEDICATION'
+  | 'SAVE_CONSULTATION_DRAFT';
+
+export interface OfflineAction {
+  idempotency_key: string;
+  action_type: OfflineActionType;
+  visit_id: number;
+  data: Record<string, any>;
+  // Consultation drafts: the consultation's updated_at when the draft was started
+  base_updated_at?: string;
+}
+
+export interface OfflineActionResult {
+  idempotency_key: string;
+  action_type: OfflineActionType;
+  visit_id: number;
+  status: 'applied' | 'duplicate' | 'conflict' | 'rejected';
+  resource_type: string | null;
+  resource_id?: number | null;
+  reason?: string;
+  detail?: string;
+  errors?: any;
+  server?: Record<string, any>;
+  draft_id?: number;
+}
+
+export interface OfflineSyncResponse {
+  results: OfflineActionResult[];
+  changes: {
+    visits: Array<{ id: number; status: string; payment_status: string; updated_at: string }>;
+    vital_signs: Record<string, any>[];
+    nursing_notes: Record<string, any>[];
+    medication_administrations: Record<string, any>[];
+    consultations: Record<string, any>[];
+  };
+  cursor: string;
+}
+
+const gzipBody = async (json: string): Promise<Blob | null> => {
+  if (typeof CompressionStream === 'undefined') {
+    return null;
+  }
+  const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+  return new Response(stream).blob();
+};
+
+/**
+ * Send queued offline actions and pull server changes in one round trip.
+ *
+ * Actions are replay-safe: re-sending an idempotency_key that already
+ * synced returns its original result. The body is gzip-compressed when the
+ * browser supports CompressionStream.
+ */
+export const syncOfflineQueue = async (
+  actions: OfflineAction[],
+  options: { cursor?: string | null; visitIds?: number[]; deviceId?: string } = {}
+): Promise<OfflineSyncResponse> => {
+  const json = JSON.stringify({
+    actions,
+    cursor: options.cursor ?? null,
+    visit_ids: options.visitIds ?? [],
+    device_id: options.deviceId,
+  });
+  const compressed = await gzipBody(json);
+  return apiRequest<OfflineSyncResponse>('/offline/sync/', {
+    method: 'POST',
+    body: compressed ?? json,
+    headers: compressed ? { 'Content-Encoding': 'gzip' } : {},
+  });
+};
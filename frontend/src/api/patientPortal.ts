@@ -64,8 +64,21 @@ export async function getPatientPrescriptions(): Promise<Prescription[]> {
 }
 
 /**
- * Get patient's comprehensive medical history
+ * Get one page of the patient's medical history stream (newest first).
+ *
+ * Pass the previous page's `next` URL to get the following page.
  */
-export async function getPatientMedicalHistory(): Promise<PatientPortalMedicalHistory> {
-  return apiRequest<PatientPortalMedicalHistory>('/patient-portal/medical-history/');
+export async function getPatientMedicalHistory(
+  next?: string | null,
+  options: { pageSize?: number; types?: string[] } = {}
+): Promise<PatientPortalMedicalHistory> {
+  const params = new URLSearchParams();
+  const cursor = next ? new URL(next, window.location.origin).searchParams.get('cursor') : null;
+  if (cursor) params.append('cursor', cursor);
+  if (options.pageSize) params.append('page_size', String(options.pageSize));
+  if (options.types?.length) params.append('type', options.types.join(','));
+  const query = params.toString();
+  return apiRequest<PatientPortalMedicalHistory>(
+    `/patient-portal/medical-history/${query ? `?${query}` : ''}`
+  );
 }
@@ -36,6 +36,25 @@ export async function fetchTelemedicineSessions(
   return apiRequest<TelemedicineSession[]>(url);
 }
 
+export interface TelemedicineSessionPage {
+  next: string | null;
+  results: TelemedicineSession[];
+}
+
+/**
+ * Fetch one page of telemedicine sessions, latest scheduled first.
+ * Follow `next` (or pass its cursor) for the following page.
+ */
+export async function fetchTelemedicineSessionPage(
+  filters: { visitId?: number; status?: string[]; cursor?: string; pageSize?: number } = {}
+): Promise<TelemedicineSessionPage> {
+  const params = new URLSearchParams({ page_size: String(filters.pageSize ?? 50) });
+  if (filters.visitId) params.append('visit_id', filters.visitId.toString());
+  if (filters.status?.length) params.append('status', filters.status.join(','));
+  if (filters.cursor) params.append('cursor', filters.cursor);
+  return apiRequest<TelemedicineSessionPage>(`/telemedicine/?${params.toString()}`);
+}
+
 /**
  * Get a telemedicine session by ID
  */
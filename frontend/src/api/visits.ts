@@ -6,6 +6,7 @@
  * - POST   /api/v1/visits/          - Create visit
  * - GET    /api/v1/visits/{id}/     - Get visit
  * - POST   /api/v1/visits/{id}/close/ - Close visit (Doctor)
+ * - GET    /api/v1/visits/{id}/summary/ - Clinical summary, all sections in one request (Doctor)
  */
 import { apiRequest } from '../utils/apiClient';
 import { Visit, VisitCreateData } from '../types/visit';
@@ -118,3 +119,47 @@ export async function closeVisit(visitId: number): Promise<Visit> {
     method: 'POST',
   });
 }
+
+export type VisitSummarySectionName =
+  | 'visit'
+  | 'consultation'
+  | 'vitals'
+  | 'lab_orders'
+  | 'radiology'
+  | 'prescriptions'
+  | 'nursing_notes'
+  | 'alerts'
+  | 'timeline'
+  | 'admission'
+  | 'billing';
+
+export interface VisitSummarySection<T = any> {
+  etag: string;
+  data?: T;
+  /** Set instead of data when the ETag sent for this section still matches */
+  not_modified?: boolean;
+}
+
+export interface VisitSummary {
+  visit_id: number;
+  sections: Partial<Record<VisitSummarySectionName, VisitSummarySection>>;
+}
+
+/**
+ * Fetch the clinical summary of a visit in one request (Doctor only).
+ * Pass the ETags of sections already held to get them back as not_modified.
+ */
+export async function fetchVisitSummary(
+  visitId: number,
+  include?: VisitSummarySectionName[],
+  knownEtags: Partial<Record<VisitSummarySectionName, string>> = {}
+): Promise<VisitSummary> {
+  const params = new URLSearchParams();
+  if (include && include.length) params.append('include', include.join(','));
+  const etags = Object.entries(knownEtags)
+    .filter(([, etag]) => etag)
+    .map(([section, etag]) => `${section}:${etag}`);
+  if (etags.length) params.append('etags', etags.join(','));
+  const query = params.toString();
+  return apiRequest<VisitSummary>(`/visits/${visitId}/summary/${query ? `?${query}` : ''}`);
+}
@@ -2,7 +2,7 @@
  * Wallet API Client
  * 
  * Endpoints:
- * - GET /api/v1/wallet/wallets/ - List wallets
+ * - GET /api/v1/wallet/wallets/ - List wallets (array; ?page_size=/?cursor= for {next, results} pages)
  * - GET /api/v1/wallet/wallets/{id}/ - Get wallet
  * - GET /api/v1/wallet/wallets/{id}/transactions/ - Get transactions
  * - POST /api/v1/wallet/wallets/{id}/top-up/ - Top up wallet
@@ -28,6 +28,36 @@ export async function getWallet(walletId: number): Promise<Wallet> {
   return apiRequest<Wallet>(`/wallet/wallets/${walletId}/`);
 }
 
+export interface WalletFilters {
+  patient?: number;
+  search?: string;
+  min_balance?: string;
+  max_balance?: string;
+  is_active?: boolean;
+  cursor?: string;
+  page_size?: number;
+}
+
+export interface WalletPage {
+  next: string | null;
+  results: Wallet[];
+}
+
+/**
+ * Fetch one page of wallets (receptionists), filtered server-side.
+ * Follow `next` for the following page.
+ */
+export async function fetchWalletPage(filters: WalletFilters = {}): Promise<WalletPage> {
+  const params = new URLSearchParams({ page_size: String(filters.page_size ?? 50) });
+  if (filters.patient) params.append('patient', filters.patient.toString());
+  if (filters.search) params.append('search', filters.search);
+  if (filters.min_balance) params.append('min_balance', filters.min_balance);
+  if (filters.max_balance) params.append('max_balance', filters.max_balance);
+  if (filters.is_active !== undefined) params.append('is_active', String(filters.is_active));
+  if (filters.cursor) params.append('cursor', filters.cursor);
+  return apiRequest<WalletPage>(`/wallet/wallets/?${params.toString()}`);
+}
+
 /**
  * Get current user's wallet (for patients)
  * Auto-creates wallet if it doesn't exist (handled by backend)
@@ -75,7 +75,7 @@ export default function CollectPaymentModal({
 
     try {
       setLoadingWallet(true);
-      const wallets = await apiRequest<any>(`/wallet/wallets/`);
+      const wallets = await apiRequest<any>(`/wallet/wallets/?patient=${patient.id}`);
       const walletList = Array.isArray(wallets) ? wallets : wallets.results || [];
       const wallet = walletList.find(
         (w: any) => w.patient === patient.id || w.patient_id === patient.id
@@ -94,7 +94,7 @@ export default function PaymentOptions({
 
   const loadPatientWallet = async () => {
     try {
-      const wallets = await apiRequest<any>(`/wallet/wallets/`);
+      const wallets = await apiRequest<any>(`/wallet/wallets/?patient=${visit.patient}`);
       const walletList = Array.isArray(wallets) ? wallets : wallets.results || [];
       // Find wallet for this visit's patient
       const wallet = walletList.find((w: any) => w.patient === visit.patient || w.patient_id === visit.patient);
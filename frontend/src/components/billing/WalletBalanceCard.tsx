@@ -49,7 +49,7 @@ export default function WalletBalanceCard({
 
     try {
       setLoading(true);
-      const wallets = await apiRequest<any>(`/wallet/wallets/`);
+      const wallets = await apiRequest<any>(`/wallet/wallets/?patient=${patient.id}`);
       const walletList = Array.isArray(wallets) ? wallets : wallets.results || [];
       const patientWallet = walletList.find(
         (w: any) => w.patient === patient.id || w.patient_id === patient.id
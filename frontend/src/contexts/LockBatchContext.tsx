@@ -0,0 +1,195 @@
+/**
+ * Lock Batch Context
+ *
+ * Evaluates the action locks of a screen with one request to /locks/batch/
+ * instead of one request per button. useActionLock calls under a
+ * LockBatchProvider register their action here; actions registered in the
+ * same render are sent together, and a single interval refreshes them all,
+ * passing each action's last ETag so unchanged locks come back as
+ * not_modified.
+ */
+import React, { createContext, useCallback, useEffect, useMemo, useRef } from 'react';
+import { isAccessTokenExpired } from '../api/auth';
+import { evaluateLocksBatch, BatchLockResult, LockResult } from '../api/locks';
+
+// Server limit on actions per batch request
+const MAX_BATCH_ACTIONS = 50;
+
+export type LockListener = (
+  lockResult: LockResult | null,
+  loading: boolean,
+  error: string | null
+) => void;
+
+interface LockEntry {
+  key: string;
+  actionType: string;
+  params: Record<string, any>;
+  listeners: Set<LockListener>;
+  lockResult: LockResult | null;
+  etag?: string;
+}
+
+interface LockBatchContextType {
+  subscribe: (actionType: string, params: Record<string, any>, listener: LockListener) => () => void;
+  refresh: (actionType?: string, params?: Record<string, any>) => Promise<void>;
+}
+
+export const LockBatchContext = createContext<LockBatchContextType | null>(null);
+
+const lockKey = (actionType: string, params: Record<string, any>) =>
+  `${actionType}:${JSON.stringify(params)}`;
+
+/**
+ * Whether a lock check can be sent: skip it while the access token is
+ * expired to avoid 401 errors.
+ */
+export function canCheckLocks(): boolean {
+  try {
+    const storedTokens = localStorage.getItem('auth_tokens');
+    if (!storedTokens) {
+      return false;
+    }
+    const parsed = JSON.parse(storedTokens);
+    return !(parsed?.access && isAccessTokenExpired(parsed.access));
+  } catch {
+    return false;
+  }
+}
+
+/**
+ * Result to show when a lock check fails: unlocked, so the button still
+ * shows instead of disappearing.
+ */
+export function lockCheckFailed(err: any): LockResult {
+  // Don't log 401 (auth) or 504 (gateway timeout - transient) to reduce console noise
+  if (err?.status !== 401 && err?.status !== 504) {
+    console.warn('Lock check failed:', err?.message || err);
+  }
+  return {
+    is_locked: false,
+    reason_code: 'ERROR',
+    human_readable_message: 'Unable to verify lock status. Action may be available.',
+    details: { error: err?.message },
+  };
+}
+
+export function LockBatchProvider({
+  children,
+  checkInterval = 30000, // 30 seconds default
+}: {
+  children: React.ReactNode;
+  checkInterval?: number;
+}) {
+  const entries = useRef(new Map<string, LockEntry>());
+  const pending = useRef(new Set<string>());
+  const flushTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
+
+  const notify = (entry: LockEntry, loading: boolean, error: string | null = null) => {
+    entry.listeners.forEach((listener) => listener(entry.lockResult, loading, error));
+  };
+
+  const evaluate = useCallback(async (keys: string[]) => {
+    const batch = keys
+      .map((key) => entries.current.get(key))
+      .filter((entry): entry is LockEntry => !!entry);
+    if (batch.length === 0 || !canCheckLocks()) {
+      return;
+    }
+
+    for (let start = 0; start < batch.length; start += MAX_BATCH_ACTIONS) {
+      const chunk = batch.slice(start, start + MAX_BATCH_ACTIONS);
+      chunk.forEach((entry) => notify(entry, true));
+      try {
+        const { results } = await evaluateLocksBatch(
+          chunk.map((entry) => ({
+            ...entry.params,
+            key: entry.key,
+            action_type: entry.actionType,
+            etag: entry.lockResult ? entry.etag : undefined,
+          }))
+        );
+        chunk.forEach((entry) => {
+          const result: BatchLockResult | undefined = results[entry.key];
+          if (result) {
+            entry.etag = result.etag;
+            if (!result.not_modified) {
+              const { etag, not_modified, ...lockResult } = result;
+              entry.lockResult = lockResult;
+            }
+          }
+          notify(entry, false);
+        });
+      } catch (err: any) {
+        const lockResult = lockCheckFailed(err);
+        chunk.forEach((entry) => {
+          entry.lockResult = lockResult;
+          entry.etag = undefined;
+          notify(entry, false, err.message || 'Failed to check lock status');
+        });
+      }
+    }
+  }, []);
+
+  const subscribe = useCallback(
+    (actionType: string, params: Record<string, any>, listener: LockListener) => {
+      const key = lockKey(actionType, params);
+      let entry = entries.current.get(key);
+      if (!entry) {
+        entry = { key, actionType, params, listeners: new Set(), lockResult: null };
+        entries.current.set(key, entry);
+        // Actions registered in the same render go out in one request
+        pending.current.add(key);
+        if (!flushTimer.current) {
+          flushTimer.current = setTimeout(() => {
+            flushTimer.current = null;
+            const keys = Array.from(pending.current);
+            pending.current.clear();
+            evaluate(keys);
+          }, 0);
+        }
+      } else if (entry.lockResult) {
+        listener(entry.lockResult, false, null);
+      }
+      entry.listeners.add(listener);
+
+      const subscribed = entry;
+      return () => {
+        subscribed.listeners.delete(listener);
+        if (subscribed.listeners.size === 0) {
+          entries.current.delete(key);
+          pending.current.delete(key);
+        }
+      };
+    },
+    [evaluate]
+  );
+
+  const refresh = useCallback(
+    (actionType?: string, params?: Record<string, any>) =>
+      evaluate(
+        actionType
+          ? [lockKey(actionType, params || {})]
+          : Array.from(entries.current.keys())
+      ),
+    [evaluate]
+  );
+
+  useEffect(() => {
+    if (checkInterval <= 0) {
+      return;
+    }
+    const interval = setInterval(() => refresh(), checkInterval);
+    return () => clearInterval(interval);
+  }, [refresh, checkInterval]);
+
+  useEffect(() => () => {
+    if (flushTimer.current) {
+      clearTimeout(flushTimer.current);
+    }
+  }, []);
+
+  const value = useMemo(() => ({ subscribe, refresh }), [subscribe, refresh]);
+
+  return <LockBatchContext.Provider value={value}>{children}</LockBatchContext.Provider>;
+}
@@ -3,10 +3,14 @@
  * 
  * Provides a simple interface for checking if an action is locked
  * and getting the explanation.
+ *
+ * Under a LockBatchProvider the action is evaluated with the rest of the
+ * screen's locks in one batch request, refreshed on the provider's
+ * interval; otherwise it is checked on its own.
  */
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useContext } from 'react';
 import { useAuth } from '../contexts/AuthContext';
-import { isAccessTokenExpired } from '../api/auth';
+import { LockBatchContext, canCheckLocks, lockCheckFailed } from '../contexts/LockBatchContext';
 import {
   evaluateLock,
   checkConsultationLock,
@@ -36,6 +40,7 @@ export const useActionLock = ({
   checkInterval = 30000, // 30 seconds default
 }: UseActionLockOptions) => {
   const { user } = useAuth();
+  const batch = useContext(LockBatchContext);
   const [lockResult, setLockResult] = useState<LockResult | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -47,18 +52,11 @@ export const useActionLock = ({
       return;
     }
 
-    // Skip lock check if access token is expired to avoid 401 errors
-    try {
-      const storedTokens = localStorage.getItem('auth_tokens');
-      if (storedTokens) {
-        const parsed = JSON.parse(storedTokens);
-        if (parsed?.access && isAccessTokenExpired(parsed.access)) {
-          return;
-        }
-      } else {
-        return;
-      }
-    } catch {
+    if (batch) {
+      return batch.refresh(actionType, params);
+    }
+
+    if (!canCheckLocks()) {
       return;
     }
 
@@ -101,18 +99,7 @@ export const useActionLock = ({
       setLockResult(result);
     } catch (err: any) {
       setError(err.message || 'Failed to check lock status');
-      // Don't log 401 (auth) or 504 (gateway timeout - transient) to reduce console noise
-      if (err?.status !== 401 && err?.status !== 504) {
-        console.warn('Lock check failed:', err?.message || err);
-      }
-      // On error, set a default unlocked result so the button still shows
-      // This prevents the button from disappearing when lock check fails
-      setLockResult({
-        is_locked: false,
-        reason_code: 'ERROR',
-        human_readable_message: 'Unable to verify lock status. Action may be available.',
-        details: { error: err.message },
-      });
+      setLockResult(lockCheckFailed(err));
     } finally {
       setLoading(false);
     }
@@ -123,13 +110,21 @@ export const useActionLock = ({
       return;
     }
 
+    if (batch) {
+      return batch.subscribe(actionType, params, (result, isLoading, batchError) => {
+        setLockResult(result);
+        setLoading(isLoading);
+        setError(batchError);
+      });
+    }
+
     checkLock();
 
     if (autoCheck && checkInterval > 0) {
       const interval = setInterval(checkLock, checkInterval);
       return () => clearInterval(interval);
     }
-  }, [actionType, JSON.stringify(params), actuallyEnabled, autoCheck, checkInterval]);
+  }, [actionType, JSON.stringify(params), actuallyEnabled, autoCheck, checkInterval, batch]);
 
   return {
     lockResult,
@@ -1,24 +1,55 @@
 /**
  * Patient Portal - Medical History Page
  * 
- * Shows comprehensive medical history for the patient.
+ * Shows the patient's medical history as one stream (visits, consultations,
+ * lab and radiology results, prescriptions, appointments), newest first,
+ * a page at a time.
  */
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
-import { getPatientMedicalHistory } from '../api/patientPortal';
-import { PatientPortalMedicalHistory } from '../types/patientPortal';
+import { getPatientMedicalHistory, getPatientProfile } from '../api/patientPortal';
+import { Patient, PatientHistoryEntry, PatientHistoryRecordType } from '../types/patientPortal';
 import { useToast } from '../hooks/useToast';
 import LoadingSkeleton from '../components/common/LoadingSkeleton';
 import styles from '../styles/PatientPortal.module.css';
 
+const RECORD_TYPE_LABELS: Record<PatientHistoryRecordType, string> = {
+  visit: 'Visit',
+  consultation: 'Consultation',
+  lab_result: 'Lab Result',
+  radiology_result: 'Radiology Result',
+  prescription: 'Prescription',
+  appointment: 'Appointment',
+};
+
+const statusBadge = (status: string) => {
+  switch (status) {
+    case 'CRITICAL':
+      return styles.critical;
+    case 'ABNORMAL':
+      return styles.abnormal;
+    case 'NORMAL':
+      return styles.normal;
+    case 'CLOSED':
+      return styles.closed;
+    case 'SCHEDULED':
+      return styles.scheduled;
+    default:
+      return styles.open;
+  }
+};
+
 export default function PatientPortalMedicalHistoryPage() {
   const { user } = useAuth();
   const navigate = useNavigate();
   const { showError } = useToast();
 
-  const [history, setHistory] = useState<PatientPortalMedicalHistory | null>(null);
+  const [patient, setPatient] = useState<Patient | null>(null);
+  const [entries, setEntries] = useState<PatientHistoryEntry[]>([]);
+  const [next, setNext] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (user?.role !== 'PATIENT') {
@@ -31,8 +62,10 @@ export default function PatientPortalMedicalHistoryPage() {
   const loadMedicalHistory = async () => {
     try {
       setLoading(true);
-      const data = await getPatientMedicalHistory();
-      setHistory(data);
+      const [profile, page] = await Promise.all([getPatientProfile(), getPatientMedicalHistory()]);
+      setPatient(profile);
+      setEntries(page.results);
+      setNext(page.next);
     } catch (error) {
       const errorMessage = error instanceof Error ? error.message : 'Failed to load medical history';
       showError(errorMessage);
@@ -41,6 +74,21 @@ export default function PatientPortalMedicalHistoryPage() {
     }
   };
 
+  const loadMore = async () => {
+    if (!next) return;
+    try {
+      setLoadingMore(true);
+      const page = await getPatientMedicalHistory(next);
+      setEntries((current) => [...current, ...page.results]);
+      setNext(page.next);
+    } catch (error) {
+      const errorMessage = error instanceof Error ? error.message : 'Failed to load medical history';
+      showError(errorMessage);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const formatDate = (dateString: string) => {
     return new Date(dateString).toLocaleDateString('en-US', {
       year: 'numeric',
@@ -67,7 +115,7 @@ export default function PatientPortalMedicalHistoryPage() {
     );
   }
 
-  if (!history) {
+  if (!patient) {
     return (
       <div className={styles.dashboard}>
         <p className={styles.emptyText}>Medical history not found.</p>
@@ -81,7 +129,7 @@ export default function PatientPortalMedicalHistoryPage() {
         <div className={styles.headerContent}>
           <div>
             <h1>My Medical History</h1>
-            <p>Comprehensive view of all your medical records</p>
+            <p>All your medical records, newest first</p>
           </div>
           <button
             className={styles.viewAllButton}
@@ -98,128 +146,70 @@ export default function PatientPortalMedicalHistoryPage() {
           <h2>Patient Information</h2>
           <div className={styles.infoCard}>
             <div className={styles.infoRow}>
-              <strong>Name:</strong> {history.patient.first_name} {history.patient.last_name}
+              <strong>Name:</strong> {patient.first_name} {patient.last_name}
             </div>
             <div className={styles.infoRow}>
-              <strong>Patient ID:</strong> {history.patient.patient_id}
+              <strong>Patient ID:</strong> {patient.patient_id}
             </div>
-            {history.patient.date_of_birth && (
+            {patient.date_of_birth && (
               <div className={styles.infoRow}>
-                <strong>Date of Birth:</strong> {formatDate(history.patient.date_of_birth)}
+                <strong>Date of Birth:</strong> {formatDate(patient.date_of_birth)}
               </div>
             )}
-            {history.patient.blood_group && (
+            {patient.blood_group && (
               <div className={styles.infoRow}>
-                <strong>Blood Group:</strong> {history.patient.blood_group}
+                <strong>Blood Group:</strong> {patient.blood_group}
               </div>
             )}
-            {history.patient.allergies && (
+            {patient.allergies && (
               <div className={styles.infoRow}>
-                <strong>Allergies:</strong> {history.patient.allergies}
+                <strong>Allergies:</strong> {patient.allergies}
               </div>
             )}
           </div>
         </section>
 
-        {/* Visits Summary */}
-        <section className={styles.section}>
-          <h2>Visits ({history.visits.length})</h2>
-          {history.visits.length === 0 ? (
-            <p className={styles.emptyText}>No visits found.</p>
-          ) : (
-            <div className={styles.list}>
-              {history.visits.slice(0, 10).map((visit) => (
-                <div key={visit.id} className={styles.card}>
-                  <div className={styles.cardHeader}>
-                    <h3>Visit #{visit.id}</h3>
-                    <span className={`${styles.badge} ${visit.status === 'CLOSED' ? styles.closed : styles.open}`}>
-                      {visit.status}
-                    </span>
-                  </div>
-                  <div className={styles.cardDetails}>
-                    <p><strong>Date:</strong> {formatDateTime(visit.created_at)}</p>
-                    <p><strong>Payment Status:</strong> {visit.payment_status}</p>
-                  </div>
-                </div>
-              ))}
-            </div>
-          )}
-        </section>
-
-        {/* Consultations Summary */}
+        {/* History stream */}
         <section className={styles.section}>
-          <h2>Consultations ({history.consultations.length})</h2>
-          {history.consultations.length === 0 ? (
-            <p className={styles.emptyText}>No consultations found.</p>
+          <h2>Records</h2>
+          {entries.length === 0 ? (
+            <p className={styles.emptyText}>No medical records found.</p>
           ) : (
             <div className={styles.list}>
-              {history.consultations.slice(0, 10).map((consultation) => (
-                <div key={consultation.id} className={styles.card}>
+              {entries.map((entry) => (
+                <div key={entry.id} className={styles.card}>
                   <div className={styles.cardHeader}>
-                    <h3>Consultation #{consultation.id}</h3>
-                  </div>
-                  <div className={styles.cardDetails}>
-                    <p><strong>Date:</strong> {formatDateTime(consultation.created_at)}</p>
-                    {consultation.diagnosis && (
-                      <p><strong>Diagnosis:</strong> {consultation.diagnosis.substring(0, 100)}...</p>
+                    <h3>
+                      {RECORD_TYPE_LABELS[entry.record_type] || entry.record_type}
+                      {entry.title && entry.title !== RECORD_TYPE_LABELS[entry.record_type] ? `: ${entry.title}` : ''}
+                    </h3>
+                    {entry.status && (
+                      <span className={`${styles.badge} ${statusBadge(entry.status)}`}>
+                        {entry.status}
+                      </span>
                     )}
                   </div>
-                </div>
-              ))}
-            </div>
-          )}
-        </section>
-
-        {/* Lab Results Summary */}
-        <section className={styles.section}>
-          <h2>Lab Results ({history.lab_results.length})</h2>
-          {history.lab_results.length === 0 ? (
-            <p className={styles.emptyText}>No lab results found.</p>
-          ) : (
-            <div className={styles.list}>
-              {history.lab_results.slice(0, 10).map((result) => (
-                <div key={result.id} className={styles.card}>
-                  <div className={styles.cardHeader}>
-                    <h3>Lab Result #{result.id}</h3>
-                    <span className={`${styles.badge} ${
-                      result.abnormal_flag === 'CRITICAL' ? styles.critical :
-                      result.abnormal_flag === 'ABNORMAL' ? styles.abnormal :
-                      styles.normal
-                    }`}>
-                      {result.abnormal_flag}
-                    </span>
-                  </div>
                   <div className={styles.cardDetails}>
-                    <p><strong>Date:</strong> {formatDateTime(result.recorded_at)}</p>
+                    <p><strong>Date:</strong> {formatDateTime(entry.occurred_at)}</p>
+                    {entry.details?.diagnosis && (
+                      <p><strong>Diagnosis:</strong> {String(entry.details.diagnosis).substring(0, 100)}</p>
+                    )}
+                    {entry.details?.dosage && (
+                      <p><strong>Dosage:</strong> {entry.details.dosage}</p>
+                    )}
                   </div>
                 </div>
               ))}
             </div>
           )}
-        </section>
-
-        {/* Prescriptions Summary */}
-        <section className={styles.section}>
-          <h2>Prescriptions ({history.prescriptions.length})</h2>
-          {history.prescriptions.length === 0 ? (
-            <p className={styles.emptyText}>No prescriptions found.</p>
-          ) : (
-            <div className={styles.list}>
-              {history.prescriptions.slice(0, 10).map((prescription) => (
-                <div key={prescription.id} className={styles.card}>
-                  <div className={styles.cardHeader}>
-                    <h3>{prescription.drug || 'Prescription'}</h3>
-                    <span className={`${styles.badge} ${prescription.status === 'DISPENSED' ? styles.open : styles.scheduled}`}>
-                      {prescription.status}
-                    </span>
-                  </div>
-                  <div className={styles.cardDetails}>
-                    <p><strong>Dosage:</strong> {prescription.dosage}</p>
-                    <p><strong>Date:</strong> {formatDateTime(prescription.created_at)}</p>
-                  </div>
-                </div>
-              ))}
-            </div>
+          {next && (
+            <button
+              className={styles.viewAllButton}
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
           )}
         </section>
       </div>
@@ -28,8 +28,16 @@ export interface LabResult {
   recorded_at: string;
 }
 
+export interface LabAnalyteInput {
+  analyte: string;
+  value: number | string;
+  unit?: string;
+}
+
 export interface LabResultCreateData {
   lab_order: number;
   result_data: string;
   abnormal_flag?: 'NORMAL' | 'ABNORMAL' | 'CRITICAL';
+  // Structured values for trends; parsed from result_data when omitted
+  analytes?: LabAnalyteInput[];
 }
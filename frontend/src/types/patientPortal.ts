@@ -55,12 +55,35 @@ export interface PatientPortalPrescriptions {
   prescriptions: Prescription[];
 }
 
+export type PatientHistoryRecordType =
+  | 'visit'
+  | 'consultation'
+  | 'lab_result'
+  | 'radiology_result'
+  | 'prescription'
+  | 'appointment';
+
+/**
+ * One item of the medical history stream; the full record is fetched
+ * via record_type/record_id when needed.
+ */
+export interface PatientHistoryEntry {
+  id: number;
+  record_type: PatientHistoryRecordType;
+  record_id: number;
+  visit_id: number | null;
+  occurred_at: string;
+  title: string;
+  status: string;
+  details: Record<string, any>;
+  is_deleted: boolean;
+  updated_at: string;
+}
+
+/**
+ * One page of the medical history stream, newest first.
+ */
 export interface PatientPortalMedicalHistory {
-  patient: Patient;
-  visits: Visit[];
-  consultations: Consultation[];
-  lab_results: LabResult[];
-  radiology_results: RadiologyResult[];
-  prescriptions: Prescription[];
-  appointments: Appointment[];
+  next: string | null;
+  results: PatientHistoryEntry[];
 }